@@ -0,0 +1,296 @@
+"""
+Identity cache for get_current_user
+
+Maps a token subject (Keycloak user id) to the resolved member context so
+authenticated requests skip the Member lookup. Entries live in an in-process
+LRU with a TTL and, when IDENTITY_CACHE_REDIS_URL is set, in a shared Redis
+tier. Member inserts/updates/deletes invalidate their subject once the
+transaction commits. Subjects without a member are cached too, and are
+provisioned in the background instead of on the request.
+
+Invalidation reaches the worker that made the change and Redis only; other
+workers keep their in-memory copy until IDENTITY_CACHE_LOCAL_TTL_SECONDS
+(default 10s) runs out, so that is the staleness bound across workers.
+In Redis an invalidated subject is replaced by a tombstone for
+IDENTITY_CACHE_TOMBSTONE_SECONDS and entries are only written with SET NX, so
+a worker that read the row before the commit cannot put it back afterwards.
+Bulk query.update()/delete() calls skip mapper events and must call
+invalidate_after_commit themselves.
+"""
+
+import enum
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Date, DateTime, Enum, event, inspect
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Session, object_session
+
+from ..models.enhanced_member import Member
+
+logger = logging.getLogger(__name__)
+
+IDENTITY_CACHE_TTL_SECONDS = int(os.getenv("IDENTITY_CACHE_TTL_SECONDS", "300"))
+# Other workers only drop their local copy when it expires
+IDENTITY_CACHE_LOCAL_TTL_SECONDS = int(
+    os.getenv("IDENTITY_CACHE_LOCAL_TTL_SECONDS", "10")
+)
+# Must outlast a member lookup that started before the invalidating commit
+IDENTITY_CACHE_TOMBSTONE_SECONDS = int(
+    os.getenv("IDENTITY_CACHE_TOMBSTONE_SECONDS", "30")
+)
+IDENTITY_CACHE_MAX_ENTRIES = int(os.getenv("IDENTITY_CACHE_MAX_ENTRIES", "10000"))
+IDENTITY_CACHE_REDIS_URL = os.getenv("IDENTITY_CACHE_REDIS_URL") or None
+
+REDIS_PREFIX = "makrcave:identity:"
+_TOMBSTONE = b"-"
+
+# Member columns never copied into the cache (or Redis)
+SECRET_COLUMNS = frozenset(
+    {"two_factor_secret", "two_factor_backup_codes", "password_history"}
+)
+_COLUMNS = [c for c in Member.__table__.columns if c.key not in SECRET_COLUMNS]
+
+_PENDING_KEY = "identity_cache_invalidations"
+
+
+def member_snapshot(member: Member) -> Dict[str, Any]:
+    """Column values of a member, detached from any session"""
+    return {column.key: getattr(member, column.key) for column in _COLUMNS}
+
+
+def member_identity(snapshot: Optional[Dict[str, Any]]) -> Optional[SimpleNamespace]:
+    """Attribute view of a snapshot, for CurrentUser's model passthrough"""
+    return SimpleNamespace(**snapshot) if snapshot is not None else None
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _decode(column, value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(column.type, Enum) and column.type.enum_class is not None:
+        return column.type.enum_class(value)
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Date):
+        return date.fromisoformat(value)
+    if isinstance(column.type, UUID):
+        return uuid.UUID(value)
+    return value
+
+
+class IdentityCache:
+    """
+    Subject -> {"member": snapshot or None} with an LRU memory tier and an
+    optional Redis tier. Redis failures are logged and treated as misses.
+    """
+
+    def __init__(
+        self,
+        ttl: int = IDENTITY_CACHE_TTL_SECONDS,
+        max_entries: int = IDENTITY_CACHE_MAX_ENTRIES,
+        redis_url: Optional[str] = IDENTITY_CACHE_REDIS_URL,
+        local_ttl: int = IDENTITY_CACHE_LOCAL_TTL_SECONDS,
+        tombstone_ttl: int = IDENTITY_CACHE_TOMBSTONE_SECONDS,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.redis_url = redis_url
+        self.local_ttl = min(local_ttl, ttl)
+        self.tombstone_ttl = tombstone_ttl
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        self._async_redis = None
+        # Bumped by every invalidation; see version()
+        self._version = 0
+        self.hits = {"memory": 0, "redis": 0}
+        self.misses = 0
+
+    # Memory tier
+
+    def _memory_get(self, subject: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._memory.get(subject)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._memory[subject]
+                return None
+            self._memory.move_to_end(subject)
+            return value
+
+    def _memory_set(self, subject: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._memory[subject] = (time.monotonic() + self.local_ttl, value)
+            self._memory.move_to_end(subject)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    # Redis tier
+
+    def _sync_redis(self):
+        if self.redis_url and self._redis is None:
+            import redis
+
+            self._redis = redis.Redis.from_url(self.redis_url)
+        return self._redis
+
+    def _async_redis_client(self):
+        if self.redis_url and self._async_redis is None:
+            from redis.asyncio import Redis as AsyncRedis
+
+            self._async_redis = AsyncRedis.from_url(self.redis_url)
+        return self._async_redis
+
+    @staticmethod
+    def _serialize(value: Dict[str, Any]) -> str:
+        member = value["member"]
+        if member is not None:
+            member = {key: _encode(item) for key, item in member.items()}
+        return json.dumps({"member": member}, separators=(",", ":"))
+
+    @staticmethod
+    def _deserialize(raw) -> Dict[str, Any]:
+        member = json.loads(raw)["member"]
+        if member is not None:
+            member = {
+                column.key: _decode(column, member.get(column.key))
+                for column in _COLUMNS
+            }
+        return {"member": member}
+
+    # Public API
+
+    async def get_async(self, subject: str) -> Optional[Dict[str, Any]]:
+        value = self._memory_get(subject)
+        if value is not None:
+            self.hits["memory"] += 1
+            return value
+        if self.redis_url:
+            try:
+                raw = await self._async_redis_client().get(REDIS_PREFIX + subject)
+                if raw is not None and raw != _TOMBSTONE:
+                    value = self._deserialize(raw)
+                    self.hits["redis"] += 1
+                    self._memory_set(subject, value)
+                    return value
+            except Exception as e:
+                logger.warning(f"Identity cache Redis get failed: {e}")
+        self.misses += 1
+        return None
+
+    def version(self) -> int:
+        """Token to pass to set_async when the value is read from the database.
+
+        If this process invalidates between the read and the set, the set is
+        dropped rather than caching the row as it was before the change.
+        Invalidations from other workers are caught by the Redis tombstone.
+        """
+        return self._version
+
+    async def set_async(
+        self, subject: str, value: Dict[str, Any], version: Optional[int] = None
+    ) -> None:
+        with self._lock:
+            if version is not None and version != self._version:
+                return
+        self._memory_set(subject, value)
+        if self.redis_url:
+            try:
+                # NX: a tombstone left by a recent invalidation wins
+                await self._async_redis_client().set(
+                    REDIS_PREFIX + subject,
+                    self._serialize(value),
+                    ex=self.ttl,
+                    nx=True,
+                )
+            except Exception as e:
+                logger.warning(f"Identity cache Redis set failed: {e}")
+
+    def invalidate(self, *subjects: str) -> None:
+        """Drop subjects locally and from Redis (blocking, for ORM events)"""
+        with self._lock:
+            self._version += 1
+            for subject in subjects:
+                self._memory.pop(subject, None)
+        if self.redis_url and subjects:
+            try:
+                pipe = self._sync_redis().pipeline(transaction=False)
+                for subject in subjects:
+                    pipe.set(
+                        REDIS_PREFIX + subject, _TOMBSTONE, ex=self.tombstone_ttl
+                    )
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"Identity cache Redis invalidation failed: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = len(self._memory)
+        return {
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "entries": entries,
+            "redis": bool(self.redis_url),
+        }
+
+
+# Global identity cache instance
+identity_cache = IdentityCache()
+
+
+# Invalidation: subjects touched in a flush are dropped once the transaction
+# commits, so a concurrent request cannot re-cache the pre-commit row
+
+
+def invalidate_after_commit(session: Optional[Session], *subjects: str) -> None:
+    """Drop subjects once `session` commits (immediately without a session)"""
+    subjects = {s for s in subjects if s}
+    if session is None:
+        identity_cache.invalidate(*subjects)
+    else:
+        session.info.setdefault(_PENDING_KEY, set()).update(subjects)
+
+
+def _queue_invalidation(mapper, connection, target: Member) -> None:
+    # A changed keycloak_user_id must drop the old subject as well
+    history = inspect(target).attrs.keycloak_user_id.history
+    invalidate_after_commit(
+        object_session(target),
+        target.keycloak_user_id,
+        *(history.deleted or ()),
+    )
+
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(Member, _event, _queue_invalidation)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_invalidations(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        identity_cache.invalidate(*pending)
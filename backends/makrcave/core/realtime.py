@@ -0,0 +1,25 @@
+"""
+Realtime hub for MakrCave WebSockets
+
+Collaboration rooms and notification sockets share one FanoutHub per worker.
+With WS_FANOUT_REDIS_URL (or REDIS_URL) set, messages and presence go
+through Redis so every worker sees them; tests run without Redis.
+"""
+
+import os
+
+from backends.utils import FanoutHub
+
+WS_FANOUT_REDIS_URL = os.getenv("WS_FANOUT_REDIS_URL") or os.getenv("REDIS_URL")
+if os.getenv("ENVIRONMENT") == "test":
+    WS_FANOUT_REDIS_URL = None
+
+realtime_hub = FanoutHub("makrcave:ws", redis_url=WS_FANOUT_REDIS_URL)
+
+
+def project_channel(project_id: str) -> str:
+    return f"project:{project_id}"
+
+
+def user_channel(user_id: str) -> str:
+    return f"user:{user_id}"
@@ -0,0 +1,92 @@
+"""
+Keep synchronous database work off the event loop.
+
+Most MakrCave handlers are declared ``async def`` but only run synchronous
+SQLAlchemy queries through ``get_db``. Awaited on the loop, each query stalls
+every other request on the worker. Handlers that never await anything are
+turned back into plain functions, so FastAPI runs them in its bounded
+threadpool next to the ``get_db`` dependency itself.
+"""
+
+import dis
+import functools
+import inspect
+import logging
+import os
+from typing import Any, Callable, List
+
+import anyio.to_thread
+from fastapi import FastAPI
+from fastapi.dependencies.models import Dependant
+from fastapi.routing import APIRoute, request_response
+
+from ..database import get_db
+
+logger = logging.getLogger(__name__)
+
+# Opcodes that suspend a coroutine (await, async for, async with)
+_SUSPENDING_OPS = frozenset(
+    {"GET_AWAITABLE", "GET_AITER", "GET_ANEXT", "BEFORE_ASYNC_WITH", "SEND"}
+)
+
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+
+
+def awaits_anything(func: Callable[..., Any]) -> bool:
+    """True if the coroutine function body can suspend"""
+    return any(
+        instruction.opname in _SUSPENDING_OPS
+        for instruction in dis.get_instructions(func)
+    )
+
+
+def as_sync(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Plain-function twin of an ``async def`` that never awaits"""
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        coro = func(*args, **kwargs)
+        try:
+            coro.send(None)
+        except StopIteration as done:
+            return done.value
+        coro.close()
+        raise RuntimeError(f"{func.__qualname__} suspended; cannot run in a thread")
+
+    return run
+
+
+def uses_dependency(dependant: Dependant, target: Callable[..., Any]) -> bool:
+    return any(
+        sub.call is target or uses_dependency(sub, target)
+        for sub in dependant.dependencies
+    )
+
+
+def offload_blocking_endpoints(
+    app: FastAPI, dependency: Callable[..., Any] = get_db
+) -> List[str]:
+    """
+    Run await-free async endpoints that use ``dependency`` in the threadpool.
+
+    Call after all routers are included. Returns the converted route paths.
+    """
+    converted = []
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        endpoint = route.endpoint
+        if not inspect.iscoroutinefunction(endpoint) or awaits_anything(endpoint):
+            continue
+        if not uses_dependency(route.dependant, dependency):
+            continue
+        route.endpoint = route.dependant.call = as_sync(endpoint)
+        route.app = request_response(route.get_route_handler())
+        converted.append(route.path)
+    logger.info(f"Running {len(converted)} blocking endpoints in the threadpool")
+    return converted
+
+
+def configure_threadpool(size: int = THREADPOOL_SIZE) -> None:
+    """Bound worker threads (sync endpoints and dependencies) for this loop"""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = size
@@ -0,0 +1,84 @@
+"""
+Conditional aggregates: many COUNT/SUM figures from one table scan.
+
+Each named figure carries its own condition and is rendered as
+``COUNT(*) FILTER (WHERE ...)`` where the database supports it (Postgres,
+SQLite 3.30+) and as ``SUM(CASE WHEN ...)`` everywhere else.
+"""
+
+import sqlite3
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+
+@dataclass(frozen=True)
+class Aggregate:
+    """One named figure: COUNT of rows or SUM of ``column`` matching ``condition``"""
+
+    kind: str
+    column: Any = None
+    condition: Any = None
+    default: Any = 0
+
+
+def count_if(condition=None) -> Aggregate:
+    return Aggregate("count", condition=condition)
+
+
+def sum_if(column, condition=None, default=0) -> Aggregate:
+    return Aggregate("sum", column=column, condition=condition, default=default)
+
+
+def supports_filter_clause(db: Session) -> bool:
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return True
+    if dialect == "sqlite":
+        return sqlite3.sqlite_version_info >= (3, 30, 0)
+    return False
+
+
+def _expression(aggregate: Aggregate, use_filter: bool):
+    condition = aggregate.condition
+    if aggregate.kind == "count":
+        if condition is None:
+            return func.count()
+        if use_filter:
+            return func.count().filter(condition)
+        return func.sum(case((condition, 1), else_=0))
+
+    if condition is None:
+        return func.sum(aggregate.column)
+    if use_filter:
+        return func.sum(aggregate.column).filter(condition)
+    return func.sum(case((condition, aggregate.column)))
+
+
+def conditional_aggregates(
+    db: Session,
+    model,
+    aggregates: Dict[str, Aggregate],
+    *criteria,
+    use_filter: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """
+    Evaluate every aggregate in a single SELECT over the ``model`` rows
+    matching ``criteria``. Returns a dict with the same keys; empty sums
+    fall back to the aggregate's default.
+    """
+    if use_filter is None:
+        use_filter = supports_filter_clause(db)
+
+    names = list(aggregates)
+    columns = [
+        _expression(aggregates[name], use_filter).label(name) for name in names
+    ]
+    row = db.query(*columns).select_from(model).filter(*criteria).one()
+
+    return {
+        name: aggregates[name].default if value is None else value
+        for name, value in zip(names, row)
+    }
@@ -1,6 +1,6 @@
 import uuid
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
 
 from sqlalchemy import and_, desc, extract, func
 from sqlalchemy.orm import Session
@@ -24,6 +24,19 @@ from ..schemas.analytics import (
     TimePeriodEnum,
     UsageEventCreate,
 )
+from ..utils.streaming_export import EXPORT_CHUNK_ROWS, iter_query
+
+# Usage report export columns, in order
+USAGE_REPORT_COLUMNS = (
+    "Date",
+    "Time",
+    "Event Type",
+    "User ID",
+    "Resource Type",
+    "Resource ID",
+    "Duration (minutes)",
+    "Metadata",
+)
 
 
 class AnalyticsCRUD:
@@ -75,6 +88,105 @@ class AnalyticsCRUD:
             query.order_by(desc(UsageEvent.timestamp)).offset(skip).limit(limit).all()
         )
 
+    # Usage report export
+    def _usage_events_in_period(
+        self, query, makerspace_id: str, start_date: date, end_date: date
+    ):
+        return query.filter(
+            UsageEvent.makerspace_id == uuid.UUID(str(makerspace_id)),
+            UsageEvent.timestamp >= start_date,
+            UsageEvent.timestamp <= end_date,
+        )
+
+    def iter_usage_report_rows(
+        self,
+        makerspace_id: str,
+        start_date: date,
+        end_date: date,
+        chunk_size: int = EXPORT_CHUNK_ROWS,
+    ) -> Iterator[List[Any]]:
+        """Yield usage events as USAGE_REPORT_COLUMNS rows, batch by batch"""
+        query = self._usage_events_in_period(
+            self.db.query(
+                UsageEvent.timestamp,
+                UsageEvent.event_type,
+                UsageEvent.user_id,
+                UsageEvent.resource_type,
+                UsageEvent.resource_id,
+                UsageEvent.duration_minutes,
+                UsageEvent.log_metadata,
+            ),
+            makerspace_id,
+            start_date,
+            end_date,
+        ).order_by(UsageEvent.timestamp)
+
+        for (
+            timestamp,
+            event_type,
+            user_id,
+            resource_type,
+            resource_id,
+            duration,
+            metadata,
+        ) in iter_query(query, chunk_size):
+            yield [
+                timestamp.strftime("%Y-%m-%d"),
+                timestamp.strftime("%H:%M:%S"),
+                event_type,
+                str(user_id) if user_id else "System",
+                resource_type or "N/A",
+                str(resource_id) if resource_id else "N/A",
+                duration or 0,
+                str(metadata) if metadata else "",
+            ]
+
+    def get_usage_report_summary(
+        self, makerspace_id: str, start_date: date, end_date: date
+    ) -> Dict[str, Any]:
+        """Totals for the usage report header, aggregated in the database"""
+        by_type = self._usage_events_in_period(
+            self.db.query(
+                UsageEvent.event_type,
+                func.count(UsageEvent.id),
+                func.coalesce(func.sum(UsageEvent.duration_minutes), 0),
+            ),
+            makerspace_id,
+            start_date,
+            end_date,
+        ).group_by(UsageEvent.event_type)
+
+        counts = {row[0]: (row[1], row[2]) for row in by_type}
+        most_common = min(counts, key=lambda t: (-counts[t][0], t), default="N/A")
+        return {
+            "total_events": sum(count for count, _ in counts.values()),
+            "most_common_event": most_common,
+            "total_duration_hours": round(
+                sum(minutes for _, minutes in counts.values()) / 60, 2
+            ),
+        }
+
+    def usage_report_preamble(
+        self, makerspace_id: str, start_date: date, end_date: date
+    ) -> str:
+        """Commented header lines written above the usage report CSV"""
+        summary = self.get_usage_report_summary(makerspace_id, start_date, end_date)
+        lines = [
+            "# USAGE ANALYTICS REPORT",
+            f"# Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            f"# Makerspace ID: {makerspace_id}",
+            f"# Period: {start_date} to {end_date}",
+            "",
+            "# SUMMARY",
+            f"# Total Events: {summary['total_events']}",
+            f"# Date Range: {start_date} to {end_date}",
+            f"# Most Common Event: {summary['most_common_event']}",
+            f"# Total Duration (hours): {summary['total_duration_hours']}",
+            "",
+            "",
+        ]
+        return "\n".join(lines)
+
     # Analytics Overview
     def get_analytics_overview(self, makerspace_id: str) -> Dict[str, Any]:
         # Check if we have any data, if not use mock data
@@ -9,10 +9,12 @@ from ..models.billing import (
     CreditWallet,
     Invoice,
     InvoiceStatus,
+    PaymentGateway,
     PaymentMethod,
     Refund,
     Transaction,
     TransactionStatus,
+    TransactionType,
 )
 from ..schemas.billing import (
     CreditTransactionCreate,
@@ -26,6 +28,7 @@ from ..schemas.billing import (
     TransactionSort,
     TransactionUpdate,
 )
+from .aggregates import conditional_aggregates, count_if, sum_if
 
 
 # Transaction CRUD operations
@@ -603,44 +606,78 @@ def get_billing_analytics(
     if not end_date:
         end_date = datetime.now()
 
-    # Base query for successful transactions
-    base_query = db.query(Transaction).filter(
-        and_(
-            Transaction.makerspace_id == makerspace_id,
-            Transaction.status == TransactionStatus.SUCCESS,
-            Transaction.created_at >= start_date,
-            Transaction.created_at <= end_date,
-        )
+    in_range = and_(
+        Transaction.makerspace_id == makerspace_id,
+        Transaction.created_at >= start_date,
+        Transaction.created_at <= end_date,
     )
+    successful = Transaction.status == TransactionStatus.SUCCESS
+    amount = Transaction.amount
 
-    # Total revenue
-    total_revenue = base_query.with_entities(func.sum(Transaction.amount)).scalar() or 0
-
-    # Current month revenue
     current_month_start = datetime.now().replace(
         day=1, hour=0, minute=0, second=0, microsecond=0
     )
-    revenue_this_month = (
-        base_query.filter(Transaction.created_at >= current_month_start)
-        .with_entities(func.sum(Transaction.amount))
-        .scalar()
-        or 0
-    )
-
-    # Last month revenue
     last_month_start = (current_month_start - timedelta(days=1)).replace(day=1)
     last_month_end = current_month_start - timedelta(microseconds=1)
-    revenue_last_month = (
-        base_query.filter(
+
+    # Revenue by month windows (last 12 months)
+    months = []
+    for i in range(12):
+        month_start = (datetime.now().replace(day=1) - timedelta(days=30 * i)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        month_end = (month_start + timedelta(days=31)).replace(day=1) - timedelta(
+            microseconds=1
+        )
+        months.append((month_start, month_end))
+
+    aggregates = {
+        "total_revenue": sum_if(amount, successful),
+        "revenue_this_month": sum_if(
+            amount, and_(successful, Transaction.created_at >= current_month_start)
+        ),
+        "revenue_last_month": sum_if(
+            amount,
             and_(
+                successful,
                 Transaction.created_at >= last_month_start,
                 Transaction.created_at <= last_month_end,
-            )
+            ),
+        ),
+        "total_transactions": count_if(),
+        "successful_transactions": count_if(successful),
+        "failed_transactions": count_if(
+            Transaction.status == TransactionStatus.FAILED
+        ),
+        "pending_transactions": count_if(
+            Transaction.status == TransactionStatus.PENDING
+        ),
+    }
+    for tx_type in TransactionType:
+        aggregates[f"type:{tx_type.value}"] = sum_if(
+            amount, and_(successful, Transaction.type == tx_type), default=None
         )
-        .with_entities(func.sum(Transaction.amount))
-        .scalar()
-        or 0
-    )
+    for gateway in PaymentGateway:
+        aggregates[f"gateway:{gateway.value}"] = count_if(
+            and_(successful, Transaction.gateway == gateway)
+        )
+    for i, (month_start, month_end) in enumerate(months):
+        aggregates[f"month:{i}"] = sum_if(
+            amount,
+            and_(
+                successful,
+                Transaction.created_at >= month_start,
+                Transaction.created_at <= month_end,
+            ),
+        )
+
+    # Every figure over the range comes from one scan of the transactions
+    figures = conditional_aggregates(db, Transaction, aggregates, in_range)
+
+    total_revenue = figures["total_revenue"]
+    revenue_this_month = figures["revenue_this_month"]
+    revenue_last_month = figures["revenue_last_month"]
+    successful_transactions = figures["successful_transactions"]
 
     # Revenue growth
     revenue_growth = (
@@ -649,102 +686,40 @@ def get_billing_analytics(
         else 0
     )
 
-    # Transaction counts
-    total_transactions = (
-        db.query(Transaction)
-        .filter(
-            and_(
-                Transaction.makerspace_id == makerspace_id,
-                Transaction.created_at >= start_date,
-                Transaction.created_at <= end_date,
-            )
-        )
-        .count()
-    )
-
-    successful_transactions = base_query.count()
-
-    failed_transactions = (
-        db.query(Transaction)
-        .filter(
-            and_(
-                Transaction.makerspace_id == makerspace_id,
-                Transaction.status == TransactionStatus.FAILED,
-                Transaction.created_at >= start_date,
-                Transaction.created_at <= end_date,
-            )
-        )
-        .count()
-    )
-
-    pending_transactions = (
-        db.query(Transaction)
-        .filter(
-            and_(
-                Transaction.makerspace_id == makerspace_id,
-                Transaction.status == TransactionStatus.PENDING,
-                Transaction.created_at >= start_date,
-                Transaction.created_at <= end_date,
-            )
-        )
-        .count()
-    )
-
     # Average transaction value
     average_transaction_value = (
         total_revenue / successful_transactions if successful_transactions > 0 else 0
     )
 
-    # Revenue by type
-    revenue_by_type = {}
-    type_revenue = (
-        base_query.with_entities(Transaction.type, func.sum(Transaction.amount))
-        .group_by(Transaction.type)
-        .all()
-    )
-
-    for tx_type, revenue in type_revenue:
-        revenue_by_type[tx_type.value] = float(revenue)
-
-    # Revenue by month (last 12 months)
-    revenue_by_month = []
-    for i in range(12):
-        month_start = (datetime.now().replace(day=1) - timedelta(days=30 * i)).replace(
-            hour=0, minute=0, second=0, microsecond=0
-        )
-        month_end = (month_start + timedelta(days=31)).replace(day=1) - timedelta(
-            microseconds=1
-        )
-
-        month_revenue = (
-            base_query.filter(
-                and_(
-                    Transaction.created_at >= month_start,
-                    Transaction.created_at <= month_end,
-                )
-            )
-            .with_entities(func.sum(Transaction.amount))
-            .scalar()
-            or 0
-        )
-
-        revenue_by_month.append(
-            {
-                "month": month_start.strftime("%Y-%m"),
-                "revenue": float(month_revenue),
-            }
-        )
+    revenue_by_type = {
+        tx_type.value: float(figures[f"type:{tx_type.value}"])
+        for tx_type in TransactionType
+        if figures[f"type:{tx_type.value}"] is not None
+    }
 
+    revenue_by_month = [
+        {
+            "month": month_start.strftime("%Y-%m"),
+            "revenue": float(figures[f"month:{i}"]),
+        }
+        for i, (month_start, _) in enumerate(months)
+    ]
     revenue_by_month.reverse()
 
+    payment_method_distribution = {
+        gateway.value: figures[f"gateway:{gateway.value}"]
+        for gateway in PaymentGateway
+        if figures[f"gateway:{gateway.value}"]
+    }
+
     # Top services by revenue
     top_services = (
-        base_query.filter(Transaction.service_type.isnot(None))
-        .with_entities(
+        db.query(
             Transaction.service_type,
             func.sum(Transaction.amount),
             func.count(Transaction.id),
         )
+        .filter(in_range, successful, Transaction.service_type.isnot(None))
         .group_by(Transaction.service_type)
         .order_by(desc(func.sum(Transaction.amount)))
         .limit(10)
@@ -756,27 +731,15 @@ def get_billing_analytics(
         for service, revenue, count in top_services
     ]
 
-    # Payment method distribution
-    payment_method_distribution = {}
-    gateway_counts = (
-        base_query.with_entities(Transaction.gateway, func.count(Transaction.id))
-        .group_by(Transaction.gateway)
-        .all()
-    )
-
-    for gateway, count in gateway_counts:
-        if gateway:
-            payment_method_distribution[gateway.value] = count
-
     return {
         "total_revenue": float(total_revenue),
         "revenue_this_month": float(revenue_this_month),
         "revenue_last_month": float(revenue_last_month),
         "revenue_growth": float(revenue_growth),
-        "total_transactions": total_transactions,
+        "total_transactions": figures["total_transactions"],
         "successful_transactions": successful_transactions,
-        "failed_transactions": failed_transactions,
-        "pending_transactions": pending_transactions,
+        "failed_transactions": figures["failed_transactions"],
+        "pending_transactions": figures["pending_transactions"],
         "average_transaction_value": float(average_transaction_value),
         "revenue_by_type": revenue_by_type,
         "revenue_by_month": revenue_by_month,
@@ -1,10 +1,12 @@
 import csv
 import io
+import os
 import uuid
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
-from sqlalchemy import asc, desc, func, or_
+from sqlalchemy import asc, desc, func, insert, or_, update
 from sqlalchemy.orm import Session
 
 from ..models.inventory import (
@@ -24,6 +26,62 @@ from ..schemas.inventory import (
     InventoryItemCreate,
     InventoryItemUpdate,
 )
+from ..utils.streaming_export import (
+    EXPORT_CHUNK_ROWS,
+    csv_chunks,
+    export_value,
+    iter_query,
+)
+
+# Rows per validate/write/commit round of a CSV import
+IMPORT_CHUNK_SIZE = int(os.getenv("INVENTORY_IMPORT_CHUNK_SIZE", "1000"))
+
+# Columns an import row may overwrite on an item matched by product_code
+IMPORT_UPDATABLE_FIELDS = (
+    "name",
+    "category",
+    "subcategory",
+    "quantity",
+    "unit",
+    "min_threshold",
+    "location",
+    "status",
+    "supplier_type",
+    "image_url",
+    "notes",
+    "owner_user_id",
+    "restricted_access_level",
+    "price",
+    "supplier",
+    "description",
+)
+
+IMPORT_ENUM_FIELDS = {
+    "status": ItemStatus,
+    "supplier_type": SupplierType,
+    "restricted_access_level": AccessLevel,
+}
+
+# Inventory export columns, in order
+EXPORT_COLUMNS = (
+    "id",
+    "name",
+    "category",
+    "subcategory",
+    "quantity",
+    "unit",
+    "min_threshold",
+    "location",
+    "status",
+    "supplier_type",
+    "product_code",
+    "price",
+    "supplier",
+    "description",
+    "linked_makerspace_id",
+    "created_at",
+    "updated_at",
+)
 
 
 class InventoryCRUD:
@@ -512,6 +570,7 @@ class InventoryCRUD:
         successful: int,
         failed: int,
         errors: Optional[List[Dict]] = None,
+        finished: bool = False,
     ):
         """Update import job progress"""
         job = self.db.query(BulkImportJob).filter(BulkImportJob.id == job_id).first()
@@ -521,8 +580,10 @@ class InventoryCRUD:
             job.failed_rows = failed
             if errors:
                 job.error_log = errors
+            if finished:
+                job.total_rows = processed
 
-            if processed >= job.total_rows:
+            if finished or (job.total_rows and processed >= job.total_rows):
                 job.status = "completed" if failed == 0 else "completed_with_errors"
 
             self.db.commit()
@@ -658,24 +719,82 @@ class InventoryCRUD:
 
     def process_bulk_import(
         self,
-        csv_content: str,
+        csv_content: Union[str, Iterable[str]],
         job_id: str,
         makerspace_id: str,
         user_id: str,
         user_name: str,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
     ) -> None:
-        """Process CSV content and create/update a BulkImportJob."""
-        # Parse CSV
-        reader = csv.DictReader(io.StringIO(csv_content))
-        rows = list(reader)
+        """Stream CSV rows into inventory, upserting on product_code.
+
+        Rows are parsed lazily and handled ``chunk_size`` at a time: each chunk
+        is validated, written with one product_code lookup plus bulk INSERT and
+        UPDATE statements, and committed together with the job progress. Rows
+        that fail validation are recorded in the job error log by row number.
+        """
+        if isinstance(csv_content, str):
+            csv_content = io.StringIO(csv_content)
+        rows = enumerate(csv.DictReader(csv_content), start=1)
+
+        # Create or fetch job with provided job_id; the row total is only
+        # known once the stream is exhausted
+        self._get_or_create_import_job(job_id, makerspace_id, user_id)
+        self.db.commit()
+
+        processed = 0
+        successful = 0
+        errors: List[Dict[str, Any]] = []
+
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            written, chunk_errors = self._import_chunk(
+                chunk, makerspace_id, user_id, user_name
+            )
+            processed += len(chunk)
+            successful += written
+            errors.extend(chunk_errors)
+            self.update_import_job_progress(
+                job_id=job_id,
+                processed=processed,
+                successful=successful,
+                failed=len(errors),
+                # keep last 50 errors to limit payload
+                errors=errors[-50:],
+            )
+
+        # Final update
+        self.update_import_job_progress(
+            job_id=job_id,
+            processed=processed,
+            successful=successful,
+            failed=len(errors),
+            errors=errors,
+            finished=True,
+        )
 
-        # Create or fetch job with provided job_id
+    def fail_import_job(
+        self, job_id: str, makerspace_id: str, user_id: str, error: str
+    ) -> BulkImportJob:
+        """Mark an import job failed, keeping the progress it recorded."""
+        self.db.rollback()
+        job = self._get_or_create_import_job(job_id, makerspace_id, user_id)
+        job.status = "failed"
+        job.error_log = [*(job.error_log or [])[-49:], {"error": error}]
+        self.db.commit()
+        return job
+
+    def _get_or_create_import_job(
+        self, job_id: str, makerspace_id: str, user_id: str
+    ) -> BulkImportJob:
         job = self.db.query(BulkImportJob).filter(BulkImportJob.id == job_id).first()
         if not job:
             job = BulkImportJob(
                 id=job_id,
                 filename="upload.csv",
-                total_rows=len(rows),
+                total_rows=0,
                 created_by=user_id,
                 makerspace_id=makerspace_id,
                 status="processing",
@@ -684,162 +803,206 @@ class InventoryCRUD:
                 failed_rows=0,
             )
             self.db.add(job)
-            self.db.commit()
+        return job
 
-        processed = 0
-        successful = 0
-        failed = 0
+    def _import_chunk(
+        self,
+        chunk: List[Tuple[int, Dict[str, Any]]],
+        makerspace_id: str,
+        user_id: str,
+        user_name: str,
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """Validate and write one chunk of CSV rows; returns (written, errors)"""
         errors: List[Dict[str, Any]] = []
-
-        for idx, row in enumerate(rows, start=1):
-            processed += 1
+        parsed = []
+        for idx, row in chunk:
             try:
-                # Map minimal required fields with reasonable defaults
-                # Parse optional price safely
-                price_val = None
-                price_raw = row.get("price")
-                if price_raw is not None and str(price_raw).strip() != "":
-                    try:
-                        price_val = float(price_raw)
-                    except Exception:
-                        price_val = None
-
-                item_data = InventoryItemCreate(
-                    name=(
-                        row.get("name")
-                        or row.get("item_name")
-                        or f"Imported Item {idx}"
-                    ),
-                    category=row.get("category") or "consumables",
-                    subcategory=row.get("subcategory") or None,
-                    quantity=float(row.get("quantity") or 0),
-                    unit=row.get("unit") or "pcs",
-                    min_threshold=int(row.get("min_threshold") or 0),
-                    location=row.get("location") or "storage",
-                    status=(
-                        ItemStatus[row.get("status", "ACTIVE").upper()]
-                        if isinstance(row.get("status"), str)
-                        else ItemStatus.ACTIVE
-                    ),
-                    supplier_type=(
-                        SupplierType[row.get("supplier_type", "external").upper()]
-                        if isinstance(row.get("supplier_type"), str)
-                        else SupplierType.EXTERNAL
-                    ),
-                    product_code=row.get("product_code") or None,
-                    linked_makerspace_id=makerspace_id,
-                    image_url=row.get("image_url") or None,
-                    notes=row.get("notes") or None,
-                    owner_user_id=row.get("owner_user_id") or None,
-                    restricted_access_level=(
-                        AccessLevel[row.get("restricted_access_level", "basic").upper()]
-                        if isinstance(row.get("restricted_access_level"), str)
-                        else AccessLevel.BASIC
-                    ),
-                    price=price_val,
-                    supplier=row.get("supplier") or None,
-                    description=row.get("description") or None,
-                    is_scanned=False,
-                    created_by=user_id,
+                parsed.append(
+                    (idx, row, self._parse_import_row(row, idx, makerspace_id, user_id))
                 )
-
-                self.create_item(item_data)
-                successful += 1
             except Exception as e:
-                failed += 1
                 errors.append({"row": idx, "error": str(e), "data": row})
 
-            # Periodically update job progress
-            if processed % 10 == 0 or processed == len(rows):
-                self.update_import_job_progress(
-                    job_id=job_id,
-                    processed=processed,
-                    successful=successful,
-                    failed=failed,
-                    # keep last 50 errors to limit payload
-                    errors=errors[-50:],
+        try:
+            self._write_import_rows(parsed, makerspace_id, user_id, user_name)
+            return len(parsed), errors
+        except Exception:
+            self.db.rollback()
+
+        # The bulk write was rejected by the database: retry row by row so the
+        # offending rows can be reported and the rest still imported
+        written = 0
+        for idx, row, item in parsed:
+            try:
+                self._write_import_rows(
+                    [(idx, row, item)], makerspace_id, user_id, user_name
                 )
+                self.db.commit()
+                written += 1
+            except Exception as e:
+                self.db.rollback()
+                errors.append({"row": idx, "error": str(e), "data": row})
+        errors.sort(key=lambda error: error["row"])
+        return written, errors
+
+    @staticmethod
+    def _parse_import_row(
+        row: Dict[str, Any], idx: int, makerspace_id: str, user_id: str
+    ) -> Tuple[InventoryItemCreate, Set[str]]:
+        """Validate one CSV row; also returns the item fields the row sets."""
+        values = {
+            column: raw.strip()
+            for column, raw in row.items()
+            if isinstance(column, str) and isinstance(raw, str) and raw.strip()
+        }
+        if "name" not in values and "item_name" in values:
+            values["name"] = values["item_name"]
 
-        # Final update
-        self.update_import_job_progress(
-            job_id=job_id,
-            processed=processed,
-            successful=successful,
-            failed=failed,
-            errors=errors,
+        # Parse optional price safely
+        price_val = None
+        if "price" in values:
+            try:
+                price_val = float(values["price"])
+            except ValueError:
+                del values["price"]
+
+        item = InventoryItemCreate(
+            name=values.get("name") or f"Imported Item {idx}",
+            category=values.get("category", "consumables"),
+            subcategory=values.get("subcategory"),
+            quantity=float(values.get("quantity", 0)),
+            unit=values.get("unit", "pcs"),
+            min_threshold=int(values.get("min_threshold", 0)),
+            location=values.get("location", "storage"),
+            status=ItemStatus[values.get("status", "active").upper()],
+            supplier_type=SupplierType[values.get("supplier_type", "external").upper()],
+            product_code=values.get("product_code"),
+            linked_makerspace_id=makerspace_id,
+            image_url=values.get("image_url"),
+            notes=values.get("notes"),
+            owner_user_id=values.get("owner_user_id"),
+            restricted_access_level=AccessLevel[
+                values.get("restricted_access_level", "basic").upper()
+            ],
+            price=price_val,
+            supplier=values.get("supplier"),
+            description=values.get("description"),
+            is_scanned=False,
+            created_by=user_id,
         )
+        return item, {field for field in IMPORT_UPDATABLE_FIELDS if field in values}
+
+    def _write_import_rows(
+        self,
+        parsed: List[Tuple[int, Dict[str, Any], Tuple[InventoryItemCreate, Set[str]]]],
+        makerspace_id: str,
+        user_id: str,
+        user_name: str,
+    ) -> None:
+        """Bulk insert new items and update existing ones matched on product_code.
+
+        Only the columns present in a row overwrite an existing item. A code
+        repeated within the import updates the item created by its first row.
+        """
+        codes = {item.product_code for _, _, (item, _) in parsed if item.product_code}
+        existing: Dict[str, Dict[str, Any]] = {}
+        if codes:
+            matches = (
+                self.db.query(
+                    InventoryItem.id, InventoryItem.product_code, InventoryItem.quantity
+                )
+                .filter(
+                    InventoryItem.linked_makerspace_id == makerspace_id,
+                    InventoryItem.product_code.in_(codes),
+                )
+                .order_by(InventoryItem.created_at)
+            )
+            for item_id, code, quantity in matches:
+                existing.setdefault(code, {"id": item_id, "quantity": quantity})
+
+        now = datetime.utcnow()
+        inserts: List[Dict[str, Any]] = []
+        updates: Dict[str, Dict[str, Any]] = {}
+        logs: List[Dict[str, Any]] = []
+
+        for _, _, (item, provided) in parsed:
+            code = item.product_code
+            data = item.dict()
+            # Schema enums carry values; the model columns store member names
+            for field, enum_type in IMPORT_ENUM_FIELDS.items():
+                data[field] = enum_type(data[field])
+            if code in existing:
+                current = existing[code]
+                values = updates.setdefault(current["id"], {"id": current["id"]})
+                values.update({field: data[field] for field in provided})
+                values.update(updated_by=user_id, updated_at=now)
+                item_id = current["id"]
+                quantity_before = current["quantity"]
+                current["quantity"] = values.get("quantity", quantity_before)
+                quantity_after = current["quantity"]
+                action, reason = UsageAction.ADJUST, "Bulk import update"
+            else:
+                item_id = str(uuid.uuid4())
+                inserts.append(
+                    {"id": item_id, **data, "created_at": now, "updated_at": now}
+                )
+                if code:
+                    existing[code] = {"id": item_id, "quantity": item.quantity}
+                quantity_before, quantity_after = 0, item.quantity
+                action, reason = UsageAction.ADD, "Initial inventory entry"
+            logs.append(
+                {
+                    "id": str(uuid.uuid4()),
+                    "inventory_item_id": item_id,
+                    "timestamp": now,
+                    "user_id": user_id,
+                    "user_name": user_name,
+                    "action": action,
+                    "quantity_before": quantity_before,
+                    "quantity_after": quantity_after,
+                    "reason": reason,
+                }
+            )
+
+        if inserts:
+            self.db.execute(insert(InventoryItem), inserts)
+        if updates:
+            self.db.execute(update(InventoryItem), list(updates.values()))
+        if logs:
+            self.db.execute(insert(InventoryUsageLog), logs)
 
     def get_import_job_status(self, job_id: str) -> Optional[BulkImportJob]:
         """Return bulk import job status by id."""
         return self.db.query(BulkImportJob).filter(BulkImportJob.id == job_id).first()
 
-    def export_to_csv(
-        self, makerspace_id: str, filters: Optional[Dict[str, Any]] = None
-    ) -> str:
-        """Export inventory items to CSV string."""
-        query = self.db.query(InventoryItem).filter(
-            InventoryItem.linked_makerspace_id == makerspace_id
-        )
+    def iter_export_rows(
+        self,
+        makerspace_id: str,
+        filters: Optional[Dict[str, Any]] = None,
+        chunk_size: int = EXPORT_CHUNK_ROWS,
+    ) -> Iterator[List[Any]]:
+        """Yield inventory export rows (EXPORT_COLUMNS order) batch by batch."""
+        query = self.db.query(
+            *(getattr(InventoryItem, column) for column in EXPORT_COLUMNS)
+        ).filter(InventoryItem.linked_makerspace_id == makerspace_id)
         if filters:
             if filters.get("category"):
                 query = query.filter(InventoryItem.category == filters["category"])
             if filters.get("status"):
-                query = query.filter(InventoryItem.status == filters["status"])
-
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(
-            [
-                "id",
-                "name",
-                "category",
-                "subcategory",
-                "quantity",
-                "unit",
-                "min_threshold",
-                "location",
-                "status",
-                "supplier_type",
-                "product_code",
-                "price",
-                "supplier",
-                "description",
-                "linked_makerspace_id",
-                "created_at",
-                "updated_at",
-            ]
+                query = query.filter(
+                    InventoryItem.status == ItemStatus(filters["status"])
+                )
+
+        for row in iter_query(query.order_by(InventoryItem.id), chunk_size):
+            yield [export_value(value) for value in row]
+
+    def export_to_csv(
+        self, makerspace_id: str, filters: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Export inventory items to CSV string."""
+        return "".join(
+            csv_chunks(EXPORT_COLUMNS, self.iter_export_rows(makerspace_id, filters))
         )
-        for item in query.all():
-            writer.writerow(
-                [
-                    item.id,
-                    item.name,
-                    item.category,
-                    item.subcategory or "",
-                    item.quantity,
-                    item.unit,
-                    item.min_threshold,
-                    item.location,
-                    (
-                        item.status.value
-                        if hasattr(item.status, "value")
-                        else str(item.status)
-                    ),
-                    (
-                        item.supplier_type.value
-                        if hasattr(item.supplier_type, "value")
-                        else str(item.supplier_type)
-                    ),
-                    item.product_code or "",
-                    item.price or "",
-                    item.supplier or "",
-                    item.description or "",
-                    item.linked_makerspace_id,
-                    item.created_at.isoformat() if item.created_at else "",
-                    item.updated_at.isoformat() if item.updated_at else "",
-                ]
-            )
-        return output.getvalue()
 
     def bulk_delete_items(
         self,
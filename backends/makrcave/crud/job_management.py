@@ -1,8 +1,12 @@
+import copy
+import os
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import and_, desc, func, or_
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, desc, event, func, or_, true
+from sqlalchemy.orm import Session, object_session
 
 from ..models.job_management import (
     FilamentType,
@@ -492,139 +496,202 @@ def create_provider_equipment(
 
 
 # Dashboard and Analytics Functions
+ADMIN_ROLES = ["super_admin", "makerspace_admin"]
+ACTIVE_STATUSES = [
+    JobStatus.ACCEPTED,
+    JobStatus.IN_PROGRESS,
+    JobStatus.PRINTING,
+    JobStatus.POST_PROCESSING,
+]
+
+# Dashboard stats are cached per user scope ("*" for admins) for a short TTL
+DASHBOARD_STATS_TTL_SECONDS = float(os.getenv("DASHBOARD_STATS_TTL_SECONDS", "30"))
+_dashboard_stats_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_dashboard_stats_lock = threading.Lock()
+# Bumped on invalidation so stats computed before it are not stored after it
+_dashboard_stats_generation = 0
+_PENDING_KEY = "job_dashboard_stats_invalidations"
+
+
+def invalidate_dashboard_stats() -> None:
+    """Drop cached dashboard stats for every scope"""
+    global _dashboard_stats_generation
+    with _dashboard_stats_lock:
+        _dashboard_stats_generation += 1
+        _dashboard_stats_cache.clear()
+
+
+# Job writes invalidate once their transaction commits; at flush time a
+# concurrent request could still cache the old figures for the full TTL
+@event.listens_for(ServiceJob, "after_insert")
+@event.listens_for(ServiceJob, "after_update")
+@event.listens_for(ServiceJob, "after_delete")
+@event.listens_for(JobMaterialUsage, "after_insert")
+@event.listens_for(JobMaterialUsage, "after_update")
+@event.listens_for(JobMaterialUsage, "after_delete")
+def _queue_invalidation(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        invalidate_dashboard_stats()
+    else:
+        session.info[_PENDING_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_invalidations(session: Session) -> None:
+    if session.info.pop(_PENDING_KEY, False):
+        invalidate_dashboard_stats()
+
+
+def _completion_days(db: Session):
+    """SQL expression for actual_completion - actual_start in days"""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.julianday(ServiceJob.actual_completion) - func.julianday(
+            ServiceJob.actual_start
+        )
+    return (
+        func.extract("epoch", ServiceJob.actual_completion - ServiceJob.actual_start)
+        / 86400
+    )
+
+
 def get_job_dashboard_stats(
     db: Session, user_id: Optional[str] = None, user_role: Optional[str] = None
 ) -> Dict[str, Any]:
     """Get job dashboard statistics"""
-    base_query = db.query(ServiceJob)
-
-    # Apply user filtering for non-admin users
-    if user_role not in ["super_admin", "makerspace_admin"]:
-        base_query = base_query.filter(
-            or_(
-                ServiceJob.customer_id == user_id,
-                ServiceJob.assigned_provider_id == user_id,
+    is_admin = user_role in ADMIN_ROLES
+    scope = "*" if is_admin else f"user:{user_id}"
+
+    now = time.monotonic()
+    with _dashboard_stats_lock:
+        cached = _dashboard_stats_cache.get(scope)
+        generation = _dashboard_stats_generation
+    if cached and cached[0] > now:
+        return copy.deepcopy(cached[1])
+
+    stats = _compute_job_dashboard_stats(db, user_id, is_admin)
+
+    with _dashboard_stats_lock:
+        if generation == _dashboard_stats_generation:
+            _dashboard_stats_cache[scope] = (
+                now + DASHBOARD_STATS_TTL_SECONDS,
+                stats,
             )
-        )
-
-    # Total jobs
-    total_jobs = base_query.count()
-
-    # Jobs by status
-    status_counts = {}
-    for status in JobStatus:
-        count = base_query.filter(ServiceJob.status == status).count()
-        status_counts[status.value] = count
+    return copy.deepcopy(stats)
 
-    # Jobs by priority
-    priority_counts = {}
-    for priority in JobPriority:
-        count = base_query.filter(ServiceJob.priority == priority).count()
-        priority_counts[priority.value] = count
-
-    # Jobs by type
-    type_counts = {}
-    for job_type in JobType:
-        count = base_query.filter(ServiceJob.job_type == job_type).count()
-        type_counts[job_type.value] = count
-
-    # Active jobs (in progress statuses)
-    active_statuses = [
-        JobStatus.ACCEPTED,
-        JobStatus.IN_PROGRESS,
-        JobStatus.PRINTING,
-        JobStatus.POST_PROCESSING,
-    ]
-    active_jobs = base_query.filter(ServiceJob.status.in_(active_statuses)).count()
-
-    # Pending jobs
-    pending_jobs = base_query.filter(ServiceJob.status == JobStatus.PENDING).count()
-
-    # Completed today
-    today = datetime.utcnow().date()
-    completed_today = base_query.filter(
-        and_(
-            ServiceJob.status == JobStatus.COMPLETED,
-            func.date(ServiceJob.actual_completion) == today,
-        )
-    ).count()
-
-    # Average completion time calculation
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    completed_jobs = base_query.filter(
-        and_(
-            ServiceJob.status == JobStatus.COMPLETED,
-            ServiceJob.actual_completion >= thirty_days_ago,
-            ServiceJob.actual_start.isnot(None),
-        )
-    ).all()
 
-    average_completion_time = None
-    if completed_jobs:
-        total_time = sum(
-            [
-                (job.actual_completion - job.actual_start).total_seconds()
-                / 86400  # days
-                for job in completed_jobs
-                if job.actual_completion and job.actual_start
-            ]
-        )
-        average_completion_time = total_time / len(completed_jobs)
-
-    # Material usage today (simplified)
-    material_usage_today = {}
-    for material_type in FilamentType:
-        usage = (
-            db.query(func.sum(JobMaterialUsage.actual_weight))
-            .filter(
-                and_(
-                    JobMaterialUsage.material_type == material_type,
-                    func.date(JobMaterialUsage.recorded_at) == today,
-                )
-            )
-            .scalar()
-            or 0.0
+def _compute_job_dashboard_stats(
+    db: Session, user_id: Optional[str], is_admin: bool
+) -> Dict[str, Any]:
+    utc_now = datetime.utcnow()
+    today_start = utc_now.replace(hour=0, minute=0, second=0, microsecond=0)
+    tomorrow_start = today_start + timedelta(days=1)
+    month_start = today_start.replace(day=1)
+    thirty_days_ago = utc_now - timedelta(days=30)
+
+    completed = ServiceJob.status == JobStatus.COMPLETED
+    completed_today = and_(
+        completed,
+        ServiceJob.actual_completion >= today_start,
+        ServiceJob.actual_completion < tomorrow_start,
+    )
+    completed_this_month = and_(completed, ServiceJob.actual_completion >= month_start)
+    recently_completed = and_(
+        completed,
+        ServiceJob.actual_completion >= thirty_days_ago,
+        ServiceJob.actual_start.isnot(None),
+    )
+    days = _completion_days(db)
+
+    # Revenue is reported across all jobs, while counts follow the user's
+    # scope, so non-admins also read this month's completed jobs and the
+    # counts are filtered down to their own
+    if is_admin:
+        in_scope = None
+        job_filter = true()
+    else:
+        in_scope = or_(
+            ServiceJob.customer_id == user_id,
+            ServiceJob.assigned_provider_id == user_id,
         )
-        material_usage_today[material_type.value] = usage
-
-    # Revenue calculations
-    revenue_today = (
-        db.query(func.sum(ServiceJob.final_price))
-        .filter(
-            and_(
-                ServiceJob.status == JobStatus.COMPLETED,
-                func.date(ServiceJob.actual_completion) == today,
-            )
+        job_filter = or_(in_scope, completed_this_month)
+
+    def scoped(condition=None):
+        parts = [c for c in (in_scope, condition) if c is not None]
+        return and_(*parts) if parts else None
+
+    def count_where(condition=None):
+        condition = scoped(condition)
+        return func.count().filter(condition) if condition is not None else func.count()
+
+    # One pass over the jobs, grouped by every dimension the dashboard splits on
+    job_rows = (
+        db.query(
+            ServiceJob.status,
+            ServiceJob.priority,
+            ServiceJob.job_type,
+            count_where().label("jobs"),
+            count_where(completed_today).label("completed_today"),
+            func.sum(days).filter(scoped(recently_completed)).label("days_sum"),
+            count_where(recently_completed).label("days_count"),
+            func.sum(ServiceJob.final_price)
+            .filter(completed_today)
+            .label("revenue_today"),
+            func.sum(ServiceJob.final_price)
+            .filter(completed_this_month)
+            .label("revenue_this_month"),
         )
-        .scalar()
-        or 0.0
+        .filter(job_filter)
+        .group_by(ServiceJob.status, ServiceJob.priority, ServiceJob.job_type)
+        .all()
     )
 
-    # Revenue this month
-    month_start = datetime.utcnow().replace(
-        day=1, hour=0, minute=0, second=0, microsecond=0
-    )
-    revenue_this_month = (
-        db.query(func.sum(ServiceJob.final_price))
+    status_counts = {s.value: 0 for s in JobStatus}
+    priority_counts = {p.value: 0 for p in JobPriority}
+    type_counts = {t.value: 0 for t in JobType}
+    completed_today_count = 0
+    days_sum, days_count = 0.0, 0
+    revenue_today = revenue_this_month = 0.0
+
+    for row in job_rows:
+        if row.status is not None:
+            status_counts[row.status.value] += row.jobs
+        if row.priority is not None:
+            priority_counts[row.priority.value] += row.jobs
+        if row.job_type is not None:
+            type_counts[row.job_type.value] += row.jobs
+        completed_today_count += row.completed_today
+        days_sum += row.days_sum or 0.0
+        days_count += row.days_count
+        revenue_today += row.revenue_today or 0.0
+        revenue_this_month += row.revenue_this_month or 0.0
+
+    material_usage_today = {m.value: 0.0 for m in FilamentType}
+    material_rows = (
+        db.query(
+            JobMaterialUsage.material_type,
+            func.sum(JobMaterialUsage.actual_weight),
+        )
         .filter(
-            and_(
-                ServiceJob.status == JobStatus.COMPLETED,
-                ServiceJob.actual_completion >= month_start,
-            )
+            JobMaterialUsage.recorded_at >= today_start,
+            JobMaterialUsage.recorded_at < tomorrow_start,
         )
-        .scalar()
-        or 0.0
+        .group_by(JobMaterialUsage.material_type)
+        .all()
     )
+    for material_type, usage in material_rows:
+        if material_type is not None:
+            material_usage_today[material_type.value] = usage or 0.0
 
     return {
-        "total_jobs": total_jobs,
+        "total_jobs": sum(row.jobs for row in job_rows),
         "jobs_by_status": status_counts,
         "jobs_by_priority": priority_counts,
         "jobs_by_type": type_counts,
-        "pending_jobs": pending_jobs,
-        "active_jobs": active_jobs,
-        "completed_today": completed_today,
-        "average_completion_time": average_completion_time,
+        "pending_jobs": status_counts[JobStatus.PENDING.value],
+        "active_jobs": sum(status_counts[s.value] for s in ACTIVE_STATUSES),
+        "completed_today": completed_today_count,
+        "average_completion_time": days_sum / days_count if days_count else None,
         "material_usage_today": material_usage_today,
         "revenue_today": revenue_today,
         "revenue_this_month": revenue_this_month,
@@ -26,6 +26,7 @@ from ..schemas.member import (
     MemberSuspend,
     MemberUpdate,
 )
+from .aggregates import conditional_aggregates, count_if
 
 
 # Member CRUD operations
@@ -610,52 +611,30 @@ def get_member_activities(
 # Statistics and analytics
 def get_member_statistics(db: Session, makerspace_id: str) -> Dict[str, Any]:
     """Get member statistics for a makerspace"""
-    total_members = (
-        db.query(Member).filter(Member.makerspace_id == makerspace_id).count()
-    )
-
-    active_members = (
-        db.query(Member)
-        .filter(
-            and_(
-                Member.makerspace_id == makerspace_id,
-                Member.status == MemberStatus.ACTIVE,
-            )
-        )
-        .count()
-    )
-
-    expired_members = (
-        db.query(Member)
-        .filter(
-            and_(
-                Member.makerspace_id == makerspace_id,
-                Member.status == MemberStatus.EXPIRED,
-            )
-        )
-        .count()
-    )
-
-    pending_members = (
-        db.query(Member)
-        .filter(
-            and_(
-                Member.makerspace_id == makerspace_id,
-                Member.status == MemberStatus.PENDING,
-            )
-        )
-        .count()
-    )
+    now = datetime.utcnow()
+    start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    expiring_soon_date = now + timedelta(days=30)
 
-    suspended_members = (
-        db.query(Member)
-        .filter(
-            and_(
-                Member.makerspace_id == makerspace_id,
-                Member.status == MemberStatus.SUSPENDED,
-            )
-        )
-        .count()
+    counts = conditional_aggregates(
+        db,
+        Member,
+        {
+            "total_members": count_if(),
+            "active_members": count_if(Member.status == MemberStatus.ACTIVE),
+            "expired_members": count_if(Member.status == MemberStatus.EXPIRED),
+            "pending_members": count_if(Member.status == MemberStatus.PENDING),
+            "suspended_members": count_if(Member.status == MemberStatus.SUSPENDED),
+            "new_members_this_month": count_if(Member.created_at >= start_of_month),
+            # Expiring soon (next 30 days)
+            "expiring_soon": count_if(
+                and_(
+                    Member.status == MemberStatus.ACTIVE,
+                    Member.end_date <= expiring_soon_date,
+                    Member.end_date > now,
+                )
+            ),
+        },
+        Member.makerspace_id == makerspace_id,
     )
 
     # Members by role
@@ -679,46 +658,16 @@ def get_member_statistics(db: Session, makerspace_id: str) -> Dict[str, Any]:
 
     members_by_plan = {plan: count for plan, count in plan_stats}
 
-    # New members this month
-    start_of_month = datetime.utcnow().replace(
-        day=1, hour=0, minute=0, second=0, microsecond=0
-    )
-    new_members_this_month = (
-        db.query(Member)
-        .filter(
-            and_(
-                Member.makerspace_id == makerspace_id,
-                Member.created_at >= start_of_month,
-            )
-        )
-        .count()
-    )
-
-    # Expiring soon (next 30 days)
-    expiring_soon_date = datetime.utcnow() + timedelta(days=30)
-    expiring_soon = (
-        db.query(Member)
-        .filter(
-            and_(
-                Member.makerspace_id == makerspace_id,
-                Member.status == MemberStatus.ACTIVE,
-                Member.end_date <= expiring_soon_date,
-                Member.end_date > datetime.utcnow(),
-            )
-        )
-        .count()
-    )
-
     return {
-        "total_members": total_members,
-        "active_members": active_members,
-        "expired_members": expired_members,
-        "pending_members": pending_members,
-        "suspended_members": suspended_members,
+        "total_members": counts["total_members"],
+        "active_members": counts["active_members"],
+        "expired_members": counts["expired_members"],
+        "pending_members": counts["pending_members"],
+        "suspended_members": counts["suspended_members"],
         "members_by_role": members_by_role,
         "members_by_plan": members_by_plan,
-        "new_members_this_month": new_members_this_month,
-        "expiring_soon": expiring_soon,
+        "new_members_this_month": counts["new_members_this_month"],
+        "expiring_soon": counts["expiring_soon"],
     }
 
 
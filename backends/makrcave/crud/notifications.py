@@ -1,8 +1,17 @@
 import sys
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from ..models.notifications import Notification, NotificationStatus
+from ..core.realtime import realtime_hub, user_channel
+from ..models.notifications import (
+    Notification,
+    NotificationDeliveryLog,
+    NotificationPriority,
+    NotificationStatus,
+    NotificationType,
+)
+from ..utils.streaming_export import EXPORT_CHUNK_ROWS, export_value, iter_query
 import uuid
-from typing import Optional
+from typing import Any, Iterator, List, Optional, Sequence
 from . import notifications_stubs as _stubs
 
 # Patch: Re-export missing stub functions if not present
@@ -318,3 +327,117 @@ def delete_rule(db: Session, rule_id: str):
     db.commit()
     return True
 
+
+# --- Real-time delivery ---
+
+async def register_websocket_connection(user_id: str, websocket):
+    """Subscribe an accepted socket to the user's notifications (all workers)."""
+    return await realtime_hub.connect(
+        websocket,
+        [user_channel(user_id)],
+        presence=("notifications", {"user_id": user_id}),
+        accept=False,
+    )
+
+
+async def unregister_websocket_connection(connection):
+    await realtime_hub.disconnect(connection)
+
+
+async def push_notification(user_id: str, notification: dict):
+    """Deliver a notification to every open socket of the user."""
+    await realtime_hub.publish(
+        user_channel(user_id), {"type": "notification", "data": notification}
+    )
+
+
+# Export
+NOTIFICATION_EXPORT_COLUMNS = (
+    "id",
+    "notification_type",
+    "priority",
+    "status",
+    "channels",
+    "recipient_id",
+    "related_resource_type",
+    "related_resource_id",
+    "created_at",
+    "sent_at",
+    "delivered_at",
+    "read_at",
+)
+NOTIFICATION_CONTENT_COLUMNS = ("title", "message", "action_url")
+
+
+def notification_export_columns(export_request) -> Sequence[str]:
+    """Header for a notification export, following its include_* flags."""
+    columns = list(NOTIFICATION_EXPORT_COLUMNS)
+    if export_request.include_content:
+        columns[2:2] = NOTIFICATION_CONTENT_COLUMNS
+    if export_request.include_delivery_logs:
+        columns.append("delivery_attempts")
+    return columns
+
+
+def iter_notification_export_rows(
+    db: Session,
+    makerspace_id: str,
+    export_request,
+    chunk_size: int = EXPORT_CHUNK_ROWS,
+) -> Iterator[List[Any]]:
+    """Yield notification export rows, matching notification_export_columns."""
+    columns = notification_export_columns(export_request)
+    selected = [
+        getattr(Notification, name) for name in columns if name != "delivery_attempts"
+    ]
+    if export_request.include_delivery_logs:
+        selected.append(
+            db.query(func.count(NotificationDeliveryLog.id))
+            .filter(NotificationDeliveryLog.notification_id == Notification.id)
+            .correlate(Notification)
+            .scalar_subquery()
+        )
+
+    query = db.query(*selected).filter(Notification.makerspace_id == makerspace_id)
+    filters = export_request.filters
+    if filters:
+        if filters.notification_types:
+            query = query.filter(
+                Notification.notification_type.in_(
+                    [NotificationType(t.value) for t in filters.notification_types]
+                )
+            )
+        if filters.statuses:
+            query = query.filter(
+                Notification.status.in_(
+                    [NotificationStatus(s.value) for s in filters.statuses]
+                )
+            )
+        if filters.priorities:
+            query = query.filter(
+                Notification.priority.in_(
+                    [NotificationPriority(p.value) for p in filters.priorities]
+                )
+            )
+        if filters.channels:
+            query = query.filter(
+                Notification.channels.overlap(
+                    [c.value for c in filters.channels]
+                )
+            )
+        if filters.start_date:
+            query = query.filter(Notification.created_at >= filters.start_date)
+        if filters.end_date:
+            query = query.filter(Notification.created_at <= filters.end_date)
+        if filters.recipient_id:
+            query = query.filter(Notification.recipient_id == filters.recipient_id)
+        if filters.read_status is True:
+            query = query.filter(Notification.read_at.isnot(None))
+        elif filters.read_status is False:
+            query = query.filter(Notification.read_at.is_(None))
+
+    channels_at = columns.index("channels")
+    for row in iter_query(query.order_by(Notification.created_at), chunk_size):
+        values = [export_value(value) for value in row]
+        values[channels_at] = ";".join(row[channels_at] or [])
+        yield values
@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import and_, desc, or_
+from sqlalchemy import and_, desc
 from sqlalchemy.orm import Session, joinedload
 
 from ..models.skill import (
@@ -22,6 +22,7 @@ from ..schemas.skill import (
     UserSkillCreate,
     UserSkillUpdate,
 )
+from ..services import access
 
 
 # Skill CRUD Operations
@@ -364,92 +365,95 @@ def update_skill_request(
 
 
 # Equipment Access Control
+def _access_check(
+    matrix: access.AccessMatrix, equipment_id: str, user_mask: int
+) -> EquipmentAccessCheck:
+    equipment_name, required = matrix.equipment[equipment_id]
+    missing = matrix.names(required & ~user_mask)
+    if missing:
+        return EquipmentAccessCheck(
+            equipment_id=equipment_id,
+            equipment_name=equipment_name,
+            can_access=False,
+            missing_skills=missing,
+            reason=f"Missing required skills: {', '.join(missing)}",
+        )
+    return EquipmentAccessCheck(
+        equipment_id=equipment_id,
+        equipment_name=equipment_name,
+        can_access=True,
+        user_skills=matrix.names(required),
+    )
+
+
 def check_equipment_access(
     db: Session, user_id: str, equipment_id: str
 ) -> EquipmentAccessCheck:
-    # Get equipment's required skills
     from ..models.equipment import Equipment
 
-    equipment = (
-        db.query(Equipment)
-        .options(joinedload(Equipment.required_skills))
+    makerspace_id = (
+        db.query(Equipment.linked_makerspace_id)
         .filter(Equipment.id == equipment_id)
-        .first()
+        .scalar()
     )
-
-    if not equipment:
+    if makerspace_id is None:
         return EquipmentAccessCheck(
             equipment_id=equipment_id,
             equipment_name="Unknown Equipment",
             can_access=False,
             reason="Equipment not found",
         )
+    matrix = access.access_matrix_cache.get(db, makerspace_id, equipment_id)
 
-    # If no skills required, access is granted
-    if not equipment.required_skills:
-        return EquipmentAccessCheck(
-            equipment_id=equipment_id,
-            equipment_name=equipment.name,
-            can_access=True,
-        )
+    # If no skills required, access is granted without loading the user
+    if not matrix.required(equipment_id):
+        return _access_check(matrix, equipment_id, 0)
 
-    # Get user's certified skills
-    user_skills = (
-        db.query(UserSkill)
-        .join(Skill)
-        .filter(
-            and_(
-                UserSkill.user_id == user_id,
-                UserSkill.status == SkillStatus.CERTIFIED,
-                or_(
-                    UserSkill.expires_at.is_(None),
-                    UserSkill.expires_at > datetime.utcnow(),
-                ),
-            )
-        )
-        .all()
-    )
+    user_skills = access.valid_skills(access.certified_skills(db, user_id))
+    return _access_check(matrix, equipment_id, matrix.mask(user_skills))
 
-    user_skill_ids = {us.skill_id for us in user_skills}
-    required_skill_ids = {skill.id for skill in equipment.required_skills}
-    missing_skill_ids = required_skill_ids - user_skill_ids
 
-    if missing_skill_ids:
-        missing_skills = db.query(Skill).filter(Skill.id.in_(missing_skill_ids)).all()
-        return EquipmentAccessCheck(
-            equipment_id=equipment_id,
-            equipment_name=equipment.name,
-            can_access=False,
-            missing_skills=[skill.name for skill in missing_skills],
-            reason=f"Missing required skills: {', '.join([skill.name for skill in missing_skills])}",
-        )
-
-    return EquipmentAccessCheck(
-        equipment_id=equipment_id,
-        equipment_name=equipment.name,
-        can_access=True,
-        user_skills=[skill.name for skill in equipment.required_skills],
-    )
+def check_equipment_access_bulk(
+    db: Session, user_id: str, makerspace_id: Optional[str] = None
+) -> List[EquipmentAccessCheck]:
+    """Access checks for every machine from one matrix and one skill lookup"""
+    matrix = access.access_matrix_cache.get(db, makerspace_id)
+    user_mask = matrix.mask(access.valid_skills(access.certified_skills(db, user_id)))
+    return [
+        _access_check(matrix, equipment_id, user_mask)
+        for equipment_id in matrix.equipment
+    ]
 
 
 def get_user_accessible_equipment(
     db: Session, user_id: str, makerspace_id: Optional[str] = None
 ) -> List[str]:
-    from ..models.equipment import Equipment
+    return access.accessible_equipment(db, user_id, makerspace_id)
 
-    query = db.query(Equipment)
-    if makerspace_id:
-        query = query.filter(Equipment.linked_makerspace_id == makerspace_id)
 
-    equipment_list = query.all()
-    accessible_equipment = []
-
-    for equipment in equipment_list:
-        access_check = check_equipment_access(db, user_id, equipment.id)
-        if access_check.can_access:
-            accessible_equipment.append(equipment.id)
+def get_equipment_authorized_users(
+    db: Session, equipment_id: str
+) -> Optional[Dict[str, Any]]:
+    """Who holds every skill the equipment requires"""
+    from ..models.equipment import Equipment
 
-    return accessible_equipment
+    makerspace_id = (
+        db.query(Equipment.linked_makerspace_id)
+        .filter(Equipment.id == equipment_id)
+        .scalar()
+    )
+    if makerspace_id is None:
+        return None
+    matrix = access.access_matrix_cache.get(db, makerspace_id, equipment_id)
+    required = matrix.required(equipment_id)
+    user_ids = access.authorized_users(db, matrix, equipment_id)
+    return {
+        "equipment_id": equipment_id,
+        "required_skills": matrix.names(required),
+        "open_access": not required,
+        "user_ids": user_ids,
+        "total": len(user_ids),
+    }
 
 
 # Audit Log
@@ -3,18 +3,25 @@ Authentication and dependency injection for MakrCave Backend - Unified
 Ecosystem. Integrates with Keycloak SSO system.
 """
 
+import asyncio
 import os
-import time
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Set
 
-import httpx
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 
+from backends.utils import (
+    KeySetUnavailable,
+    TokenVerificationError,
+    TokenVerifier,
+    shared_key_set,
+)
+
 # from functools import wraps  # unused
-from .database import get_db
+from .core.identity_cache import identity_cache, member_identity, member_snapshot
+from .database import get_db, get_db_session
 from .models.enhanced_member import Member
 
 security = HTTPBearer()
@@ -38,86 +45,113 @@ KEYCLOAK_USE_JWKS = os.getenv("KEYCLOAK_USE_JWKS", "true").lower() in (
     "yes",
 )
 
-# Cache for Keycloak public key with TTL
-_keycloak_public_key = None
-_keycloak_public_key_ts = 0.0
-_jwks_cache: dict[str, str] = {}
-_jwks_ts = 0.0
+# Shared verifier: JWKS keys are parsed once, refreshed single-flight in the
+# background, and verified claims are reused until the token expires
+token_verifier = TokenVerifier(
+    shared_key_set(
+        f"{KEYCLOAK_URL}/realms/{KEYCLOAK_REALM}/protocol/openid-connect/certs",
+        realm_url=f"{KEYCLOAK_URL}/realms/{KEYCLOAK_REALM}",
+        ttl=KEYCLOAK_PK_TTL_SECONDS,
+    ),
+    issuer=KEYCLOAK_ISSUER,
+    audience=KEYCLOAK_CLIENT_ID if KEYCLOAK_VERIFY_AUD else None,
+    use_jwks=KEYCLOAK_USE_JWKS,
+    realm_key_fallback=True,
+)
 
 
-def _pem_from_x5c(x5c_entry: str) -> str:
-    return "-----BEGIN CERTIFICATE-----\n" f"{x5c_entry}\n" "-----END CERTIFICATE-----"
+async def get_keycloak_public_key(force: bool = False):
+    """Get Keycloak public key for JWT verification"""
+    try:
+        await token_verifier.keys.get_realm_key(force=force)
+    except KeySetUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Could not connect to authentication service",
+        )
+    return token_verifier.keys.realm_public_key_pem
 
 
-async def get_jwks_pem(kid: str) -> Optional[str]:
-    global _jwks_cache, _jwks_ts
-    now = time.time()
-    if (
-        _jwks_cache
-        and (now - _jwks_ts) < KEYCLOAK_PK_TTL_SECONDS
-        and kid in _jwks_cache
-    ):
-        return _jwks_cache.get(kid)
-    url = f"{KEYCLOAK_URL}/realms/{KEYCLOAK_REALM}/protocol/openid-connect/certs"
-    tries = 3
-    for _ in range(tries):
+def _get_or_create_member(db: Session, payload: dict) -> Optional[Member]:
+    keycloak_user_id = payload["sub"]
+    db_user = (
+        db.query(Member).filter(Member.keycloak_user_id == keycloak_user_id).first()
+    )
+    if db_user is None:
         try:
-            async with httpx.AsyncClient(timeout=5) as client:
-                resp = await client.get(url)
-                resp.raise_for_status()
-                data = resp.json()
-                new_cache = {}
-                for k in data.get("keys", []):
-                    this_kid = k.get("kid")
-                    x5c = k.get("x5c")
-                    if this_kid and x5c:
-                        new_cache[this_kid] = _pem_from_x5c(x5c[0])
-                if new_cache:
-                    _jwks_cache = new_cache
-                    _jwks_ts = now
-                return _jwks_cache.get(kid)
+            db_user = Member(
+                keycloak_user_id=keycloak_user_id,
+                email=payload["email"],
+                first_name=payload.get("given_name", ""),
+                last_name=payload.get("family_name", ""),
+                makerspace_id=payload.get("makerspace_id", "default"),
+            )
+            db.add(db_user)
+            db.commit()
+            db.refresh(db_user)
         except Exception:
-            await _async_sleep(0.2)
-            continue
-    # fall back to previously cached key if present
-    return _jwks_cache.get(kid)
+            # If creation fails due to schema constraints, continue with token
+            # context
+            db.rollback()
+            db_user = None
+    return db_user
 
 
-async def get_keycloak_public_key(force: bool = False):
-    """Get Keycloak public key for JWT verification"""
-    global _keycloak_public_key, _keycloak_public_key_ts
-    now = time.time()
-    if (
-        (not force)
-        and _keycloak_public_key
-        and (now - _keycloak_public_key_ts) < KEYCLOAK_PK_TTL_SECONDS
-    ):
-        return _keycloak_public_key
-    url = f"{KEYCLOAK_URL}/realms/{KEYCLOAK_REALM}"
-    tries = 3
-    for _ in range(tries):
-        try:
-            async with httpx.AsyncClient(timeout=5) as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                realm_info = response.json()
-                _keycloak_public_key = (
-                    "-----BEGIN PUBLIC KEY-----\n"
-                    f"{realm_info['public_key']}\n"
-                    "-----END PUBLIC KEY-----"
-                )
-                _keycloak_public_key_ts = now
-                return _keycloak_public_key
-        except Exception:
-            await _async_sleep(0.2)
-            continue
-    # If we have a cached key, use it despite refresh failure
-    if _keycloak_public_key:
-        return _keycloak_public_key
-    raise HTTPException(
-        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-        detail="Could not connect to authentication service",
+def _lookup_member(db: Session, keycloak_user_id: str) -> Optional[Dict[str, Any]]:
+    member = (
+        db.query(Member).filter(Member.keycloak_user_id == keycloak_user_id).first()
     )
+    return member_snapshot(member) if member is not None else None
+
+
+def _provision_member(payload: dict) -> None:
+    db = get_db_session()
+    try:
+        _get_or_create_member(db, payload)
+    finally:
+        db.close()
+
+
+# Subjects with a provisioning attempt in flight, and the tasks running them
+_provisioning: Set[str] = set()
+_provisioning_tasks: Set[asyncio.Task] = set()
+
+
+def _schedule_member_provisioning(payload: dict) -> None:
+    """Create the member for a new subject without holding up the request"""
+    subject = payload["sub"]
+    if subject in _provisioning:
+        return
+    _provisioning.add(subject)
+
+    async def provision():
+        try:
+            await run_in_threadpool(_provision_member, payload)
+        finally:
+            _provisioning.discard(subject)
+
+    task = asyncio.get_running_loop().create_task(provision())
+    _provisioning_tasks.add(task)
+    task.add_done_callback(_provisioning_tasks.discard)
+
+
+async def resolve_member(db: Session, payload: dict) -> Optional[Dict[str, Any]]:
+    """
+    Member snapshot for the token subject, served from the identity cache.
+    On a miss the lookup runs in the threadpool. A subject with no member is
+    cached as such and provisioned in the background.
+    """
+    subject = payload["sub"]
+    cached = await identity_cache.get_async(subject)
+    if cached is not None:
+        return cached["member"]
+
+    version = identity_cache.version()
+    snapshot = await run_in_threadpool(_lookup_member, db, subject)
+    await identity_cache.set_async(subject, {"member": snapshot}, version)
+    if snapshot is None:
+        _schedule_member_provisioning(payload)
+    return snapshot
 
 
 async def get_current_user(
@@ -135,25 +169,7 @@ async def get_current_user(
     )
 
     try:
-        # Determine verification key
-        token = credentials.credentials
-        header = jwt.get_unverified_header(token)
-        key_to_use = None
-        if KEYCLOAK_USE_JWKS:
-            kid = header.get("kid")
-            if kid:
-                key_to_use = await get_jwks_pem(kid)
-        if not key_to_use:
-            key_to_use = await get_keycloak_public_key()
-
-        # Decode JWT token
-        decode_kwargs = {
-            "algorithms": ["RS256"],
-            "issuer": KEYCLOAK_ISSUER,
-        }
-        if KEYCLOAK_VERIFY_AUD:
-            decode_kwargs["audience"] = KEYCLOAK_CLIENT_ID
-        payload = jwt.decode(token, key_to_use, **decode_kwargs)
+        payload = await token_verifier.verify(credentials.credentials)
 
         # Extract user information
         keycloak_user_id = payload.get("sub")
@@ -162,30 +178,17 @@ async def get_current_user(
         if keycloak_user_id is None or email is None:
             raise credentials_exception
 
-    except JWTError:
+    except KeySetUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Could not connect to authentication service",
+        )
+    except TokenVerificationError:
         raise credentials_exception
 
-    # Get or create user in DB (best-effort; do not block response context)
-    db_user = (
-        db.query(Member).filter(Member.keycloak_user_id == keycloak_user_id).first()
-    )
-    if db_user is None:
-        try:
-            db_user = Member(
-                keycloak_user_id=keycloak_user_id,
-                email=email,
-                first_name=payload.get("given_name", ""),
-                last_name=payload.get("family_name", ""),
-                makerspace_id=payload.get("makerspace_id", "default"),
-            )
-            db.add(db_user)
-            db.commit()
-            db.refresh(db_user)
-        except Exception:
-            # If creation fails due to schema constraints, continue with token
-            # context
-            db.rollback()
-            db_user = None
+    # Resolve the member (cached per subject); unknown subjects are
+    # provisioned in the background
+    member = await resolve_member(db, payload)
 
     # Build a unified user context supporting both attribute and key access
     roles = payload.get("realm_access", {}).get("roles", []) + payload.get(
@@ -193,8 +196,8 @@ async def get_current_user(
     ).get(KEYCLOAK_CLIENT_ID, {}).get("roles", [])
     # Normalize makerspace_id to string when present
     ms_id = (
-        str(db_user.makerspace_id)
-        if db_user and getattr(db_user, "makerspace_id", None) is not None
+        str(member["makerspace_id"])
+        if member and member.get("makerspace_id") is not None
         else (
             payload.get("makerspace_id")
             if isinstance(payload.get("makerspace_id"), str)
@@ -208,7 +211,7 @@ async def get_current_user(
         last_name=payload.get("family_name"),
         makerspace_id=ms_id,
         roles=roles,
-        model=db_user,
+        model=member_identity(member),
     )
     return ctx
 
@@ -328,7 +331,7 @@ class CurrentUser(dict):
         last_name: Optional[str],
         makerspace_id: Optional[str],
         roles: List[str],
-        model: Optional[Member],
+        model: Optional[Any],
     ):
         super().__init__(
             user_id=user_id,
@@ -411,12 +414,3 @@ def check_permission(user_role: str, permission: str) -> bool:
 
     # Check if the required permission is in the list
     return permission in permissions
-
-
-async def _async_sleep(seconds: float):
-    try:
-        import asyncio
-
-        await asyncio.sleep(seconds)
-    except Exception:
-        pass
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import time
 import uuid
@@ -10,16 +11,21 @@ from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import text
 from starlette.middleware.trustedhost import TrustedHostMiddleware
 
-from .database import engine, reset_db
+from .core.realtime import realtime_hub
+from .core.threadpool import configure_threadpool, offload_blocking_endpoints
+from .database import engine, get_db_session, reset_db
 from .dependencies import get_keycloak_public_key
 from .logging_config import configure_logging
 from .middleware.error_handling import ErrorHandlingMiddleware
 
 # Import security middleware
 from .middleware.security import add_security_middleware
+from .models.announcements import index_announcement_audiences
 from .redis_utils import check_redis_connection
 from .routes import api_router
 from .routes.health import router as health_router
+from .services.analytics_rollups import ROLLUP_INTERVAL_SECONDS, run_rollup_job
+from .services.project_trending import TRENDING_INTERVAL_SECONDS, run_trending_job
 
 
 # --- CENTRALIZED CONFIG/ENV VALIDATION ---
@@ -99,6 +105,7 @@ validate_env_secrets()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: warm caches and verify dependencies
+    configure_threadpool()
     if os.getenv("ENVIRONMENT") == "test":
         try:
             reset_db()
@@ -122,8 +129,32 @@ async def lifespan(app: FastAPI):
         log.error("database_connectivity_failed", error=str(e))
     except Exception as e:
         log.error("unexpected_database_connectivity_error", error=str(e))
+    if os.getenv("ENVIRONMENT") != "test":
+        db = get_db_session()
+        try:
+            indexed = index_announcement_audiences(db)
+            if indexed:
+                log.info("announcement_audiences_backfilled", count=indexed)
+        except Exception as e:
+            log.error("announcement_audience_backfill_failed", error=str(e))
+        finally:
+            db.close()
+    rollup_task = None
+    if os.getenv("ENVIRONMENT") != "test" and ROLLUP_INTERVAL_SECONDS > 0:
+        rollup_task = asyncio.create_task(run_rollup_job(ROLLUP_INTERVAL_SECONDS))
+        log.info("analytics_rollup_job_started", interval=ROLLUP_INTERVAL_SECONDS)
+    trending_task = None
+    if os.getenv("ENVIRONMENT") != "test" and TRENDING_INTERVAL_SECONDS > 0:
+        trending_task = asyncio.create_task(
+            run_trending_job(TRENDING_INTERVAL_SECONDS)
+        )
+        log.info("project_trending_job_started", interval=TRENDING_INTERVAL_SECONDS)
     yield
-    # Shutdown: nothing special yet
+    # Shutdown: stop background jobs and close realtime sockets
+    for task in (rollup_task, trending_task):
+        if task is not None:
+            task.cancel()
+    await realtime_hub.close()
 
 
 app = FastAPI(
@@ -279,6 +310,9 @@ app.include_router(health_router, prefix="/api/v1")
 app.include_router(api_router, prefix="/api")
 app.include_router(health_router, prefix="/api")
 
+# async handlers that only do sync DB work would block the event loop
+offload_blocking_endpoints(app)
+
 # Optional Prometheus metrics
 if os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes"):
     try:
@@ -0,0 +1,48 @@
+"""
+Add projects.trending_score and the showcase trending index
+
+create_all builds new tables (project_trending_events included) but never
+adds columns or indexes to an existing projects table, so they are added
+here. On a fresh database the projects table does not exist yet when
+migrations run; create_all then creates it with both.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0006_project_trending_score"
+down_revision = "0d7dbf6fb981"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "idx_project_showcase_trending"
+INDEX_COLUMNS = ["visibility", "is_approved", "trending_score", "updated_at"]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("projects"):
+        return
+    columns = {column["name"] for column in inspector.get_columns("projects")}
+    if "trending_score" not in columns:
+        op.add_column(
+            "projects",
+            sa.Column(
+                "trending_score", sa.Float(), nullable=False, server_default="0"
+            ),
+        )
+    indexes = {index["name"] for index in inspector.get_indexes("projects")}
+    if INDEX_NAME not in indexes:
+        op.create_index(INDEX_NAME, "projects", INDEX_COLUMNS)
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("projects"):
+        return
+    indexes = {index["name"] for index in inspector.get_indexes("projects")}
+    if INDEX_NAME in indexes:
+        op.drop_index(INDEX_NAME, table_name="projects")
+    columns = {column["name"] for column in inspector.get_columns("projects")}
+    if "trending_score" in columns:
+        op.drop_column("projects", "trending_score")
@@ -8,6 +8,7 @@ Models are automatically imported to ensure they're registered with SQLAlchemy.
 # Import all models to register them with SQLAlchemy Base
 from .access_control import *
 from .analytics import *
+from .analytics_rollups import *
 from .announcements import *
 from .billing import *
 from .collaboration import *
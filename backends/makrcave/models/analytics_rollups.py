@@ -0,0 +1,64 @@
+"""
+Pre-aggregated analytics rollups
+
+Hourly and daily figures per makerspace, maintained incrementally from raw
+member activity and equipment utilization rows by services.analytics_rollups.
+Buckets are UTC and keyed by their start.
+"""
+
+from sqlalchemy import Column, DateTime, Float, Index, Integer, String
+
+from ..database import Base
+
+
+class AnalyticsHourlyRollup(Base):
+    __tablename__ = "analytics_hourly_rollups"
+
+    makerspace_id = Column(String(100), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+
+    activity_count = Column(Integer, nullable=False, default=0)
+    checkin_count = Column(Integer, nullable=False, default=0)
+
+
+class AnalyticsDailyRollup(Base):
+    __tablename__ = "analytics_daily_rollups"
+
+    makerspace_id = Column(String(100), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+
+    activity_count = Column(Integer, nullable=False, default=0)
+    checkin_count = Column(Integer, nullable=False, default=0)
+    active_members = Column(Integer, nullable=False, default=0)
+    equipment_sessions = Column(Integer, nullable=False, default=0)
+    equipment_hours = Column(Float, nullable=False, default=0.0)
+
+
+class MemberActivityDailyRollup(Base):
+    """Per-member activity per day; distinct member counts come from here"""
+
+    __tablename__ = "member_activity_daily_rollups"
+
+    makerspace_id = Column(String(100), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    member_id = Column(String(100), primary_key=True)
+
+    activity_count = Column(Integer, nullable=False, default=0)
+    last_activity_at = Column(DateTime, nullable=True)
+
+
+class AnalyticsRollupWatermark(Base):
+    """Raw rows created before ``high_water`` are folded into the rollups"""
+
+    __tablename__ = "analytics_rollup_watermarks"
+
+    name = Column(String(50), primary_key=True)
+    high_water = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+
+Index(
+    "idx_member_activity_rollup_member",
+    MemberActivityDailyRollup.makerspace_id,
+    MemberActivityDailyRollup.member_id,
+)
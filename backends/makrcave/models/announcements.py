@@ -1,5 +1,6 @@
 import enum
 import uuid
+from datetime import datetime, timedelta, timezone
 
 from sqlalchemy import (
     JSON,
@@ -7,9 +8,14 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
+    event,
+    exists,
+    inspect,
+    select,
 )
 from sqlalchemy import (
     Enum as SQLEnum,
@@ -51,6 +57,19 @@ class TargetAudience(enum.Enum):
     NEW_MEMBERS = "new_members"
 
 
+ADMIN_ROLES = ("admin", "makerspace_admin", "super_admin")
+NEW_MEMBER_DAYS = 30
+
+# Announcement columns that decide its audience segments
+TARGETING_FIELDS = (
+    "makerspace_id",
+    "target_audience",
+    "target_membership_plans",
+    "target_skills",
+    "target_members",
+)
+
+
 class Announcement(Base):
     __tablename__ = "announcements"
 
@@ -222,46 +241,33 @@ class Announcement(Base):
 
         return True
 
+    def audience_segments(self):
+        """Segments indexed in AnnouncementAudience for this announcement.
+
+        A member sees the announcement when one of these is among
+        member_audience_segments(member); this mirrors is_targeted_to_member.
+        """
+        audience = self.target_audience or TargetAudience.ALL_MEMBERS
+        if audience == TargetAudience.ALL_MEMBERS:
+            return ["all"]
+        if audience == TargetAudience.ACTIVE_MEMBERS:
+            return ["active"]
+        if audience == TargetAudience.ADMINS_ONLY:
+            return ["admins"]
+        if audience == TargetAudience.NEW_MEMBERS:
+            return ["new"]
+        prefix, targets = {
+            TargetAudience.SPECIFIC_PLANS: ("plan", self.target_membership_plans),
+            TargetAudience.SPECIFIC_SKILLS: ("skill", self.target_skills),
+            TargetAudience.SPECIFIC_MEMBERS: ("member", self.target_members),
+        }[audience]
+        return sorted({f"{prefix}:{target}" for target in targets or []})
+
     def is_targeted_to_member(self, member):
         """Check if announcement is targeted to a specific member"""
-        if self.target_audience == TargetAudience.ALL_MEMBERS:
-            return True
-
-        if self.target_audience == TargetAudience.ACTIVE_MEMBERS:
-            return member.is_active if hasattr(member, "is_active") else True
-
-        if self.target_audience == TargetAudience.SPECIFIC_PLANS:
-            if self.target_membership_plans and member.membership_plan_id:
-                return str(member.membership_plan_id) in self.target_membership_plans
-            return False
-
-        if self.target_audience == TargetAudience.SPECIFIC_SKILLS:
-            if self.target_skills and hasattr(member, "skills"):
-                member_skills = [str(skill.id) for skill in member.skills]
-                return any(skill_id in member_skills for skill_id in self.target_skills)
-            return False
-
-        if self.target_audience == TargetAudience.SPECIFIC_MEMBERS:
-            if self.target_members:
-                return str(member.id) in self.target_members
-            return False
-
-        if self.target_audience == TargetAudience.ADMINS_ONLY:
-            return (
-                member.role in ["admin", "makerspace_admin", "super_admin"]
-                if hasattr(member, "role")
-                else False
-            )
-
-        if self.target_audience == TargetAudience.NEW_MEMBERS:
-            # Consider members joined in last 30 days as new
-            from datetime import datetime, timedelta
-
-            if hasattr(member, "created_at"):
-                return member.created_at > (datetime.utcnow() - timedelta(days=30))
-            return False
-
-        return False
+        return not set(self.audience_segments()).isdisjoint(
+            member_audience_segments(member)
+        )
 
     def get_priority_color(self):
         """Get color class for priority display"""
@@ -298,6 +304,47 @@ class Announcement(Base):
         self.click_count += 1
 
 
+def member_audience_segments(member, now=None):
+    """Audience segments a member belongs to (see Announcement.audience_segments)"""
+    if now is None:
+        now = datetime.utcnow()
+
+    segments = ["all", f"member:{member.id}"]
+    if member.is_active:
+        segments.append("active")
+    if member.role in ADMIN_ROLES:
+        segments.append("admins")
+    if member.membership_plan_id:
+        segments.append(f"plan:{member.membership_plan_id}")
+    for skill in member.skills or []:
+        skill_id = skill.get("id") if isinstance(skill, dict) else skill
+        segments.append(f"skill:{skill_id}")
+
+    joined = member.created_at
+    if joined is not None and joined.tzinfo is not None:
+        joined = joined.astimezone(timezone.utc).replace(tzinfo=None)
+    if joined is not None and joined > now - timedelta(days=NEW_MEMBER_DAYS):
+        segments.append("new")
+    return segments
+
+
+class AnnouncementAudience(Base):
+    """Audience index: one row per (announcement, segment) it targets"""
+
+    __tablename__ = "announcement_audiences"
+
+    announcement_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("announcements.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    segment = Column(String(120), primary_key=True)  # e.g. "all", "plan:<id>"
+    makerspace_id = Column(UUID(as_uuid=True), nullable=False)
+
+    def __repr__(self):
+        return f"<AnnouncementAudience(announcement_id={self.announcement_id}, segment={self.segment})>"
+
+
 class AnnouncementAcknowledgment(Base):
     __tablename__ = "announcement_acknowledgments"
 
@@ -350,3 +397,72 @@ class AnnouncementView(Base):
 
     def __repr__(self):
         return f"<AnnouncementView(announcement_id={self.announcement_id}, member_id={self.member_id})>"
+
+
+# Indexes for the member announcement feed
+Index(
+    "idx_announcement_audience_lookup",
+    AnnouncementAudience.makerspace_id,
+    AnnouncementAudience.segment,
+    AnnouncementAudience.announcement_id,
+)
+Index(
+    "idx_announcement_ack_member",
+    AnnouncementAcknowledgment.member_id,
+    AnnouncementAcknowledgment.announcement_id,
+)
+
+
+# The audience index is rewritten in the same flush as the announcement, so
+# it changes whatever code path creates or edits one
+
+
+def _write_audience(connection, announcement):
+    audiences = AnnouncementAudience.__table__
+    connection.execute(
+        audiences.delete().where(audiences.c.announcement_id == announcement.id)
+    )
+    rows = [
+        {
+            "announcement_id": announcement.id,
+            "segment": segment,
+            "makerspace_id": announcement.makerspace_id,
+        }
+        for segment in announcement.audience_segments()
+    ]
+    if rows:
+        connection.execute(audiences.insert(), rows)
+
+
+@event.listens_for(Announcement, "after_insert")
+def _index_new_announcement(mapper, connection, target):
+    _write_audience(connection, target)
+
+
+@event.listens_for(Announcement, "after_update")
+def _reindex_announcement(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in TARGETING_FIELDS):
+        _write_audience(connection, target)
+
+
+@event.listens_for(Announcement, "before_delete")
+def _unindex_announcement(mapper, connection, target):
+    audiences = AnnouncementAudience.__table__
+    connection.execute(
+        audiences.delete().where(audiences.c.announcement_id == target.id)
+    )
+
+
+def index_announcement_audiences(session):
+    """Backfill the audience index for announcements that have no rows yet"""
+    missing = session.scalars(
+        select(Announcement).where(
+            ~exists().where(AnnouncementAudience.announcement_id == Announcement.id)
+        )
+    ).all()
+    connection = session.connection()
+    for announcement in missing:
+        _write_audience(connection, announcement)
+    session.commit()
+    return len(missing)
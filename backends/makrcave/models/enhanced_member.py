@@ -555,3 +555,9 @@ Index("idx_enhanced_member_two_factor", Member.two_factor_enabled)
 Index("idx_enhanced_member_created_at", Member.created_at)
 Index("idx_enhanced_member_join_date", Member.join_date)
 Index("idx_enhanced_member_last_activity", Member.last_activity)
+Index("idx_member_activity_log_created_at", MemberActivityLog.created_at)
+Index(
+    "idx_member_activity_log_member_created",
+    MemberActivityLog.member_id,
+    MemberActivityLog.created_at,
+)
@@ -2,6 +2,7 @@ import enum
 import uuid
 
 from sqlalchemy import (
+    DDL,
     JSON,
     Boolean,
     Column,
@@ -9,9 +10,11 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
+    event,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -181,6 +184,38 @@ class EnhancedEquipmentReservation(Base):
     )
 
 
+# Range lookups per machine (the availability engine's query on other databases)
+Index(
+    "idx_enhanced_reservation_equipment_window",
+    EnhancedEquipmentReservation.equipment_id,
+    EnhancedEquipmentReservation.requested_start,
+    EnhancedEquipmentReservation.requested_end,
+)
+
+# On Postgres the database itself rejects overlapping approved/active bookings
+# of one machine. The constraint's GiST index also serves the engine's range
+# overlap (&&) queries. Enum columns store member names, hence the upper case.
+RESERVATION_OVERLAP_CONSTRAINT = """
+ALTER TABLE enhanced_equipment_reservations
+ADD CONSTRAINT excl_enhanced_reservation_overlap
+EXCLUDE USING gist (
+    equipment_id WITH =,
+    tstzrange(requested_start, requested_end, '[)') WITH &&
+) WHERE (status IN ('APPROVED', 'ACTIVE'))
+"""
+
+event.listen(
+    EnhancedEquipmentReservation.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
+event.listen(
+    EnhancedEquipmentReservation.__table__,
+    "after_create",
+    DDL(RESERVATION_OVERLAP_CONSTRAINT).execute_if(dialect="postgresql"),
+)
+
+
 class EquipmentCostRule(Base):
     """Cost rules for equipment pricing"""
 
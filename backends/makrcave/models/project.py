@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import enum
 import uuid
+from datetime import datetime
 
 from sqlalchemy import (
     JSON,
@@ -11,9 +12,11 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
+    event,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -160,6 +163,8 @@ class Project(Base):
     like_count = Column(Integer, default=0)
     comment_count = Column(Integer, default=0)
     download_count = Column(Integer, default=0)
+    # Decayed engagement in log space, kept by services.project_trending
+    trending_score = Column(Float, nullable=False, default=0.0, server_default="0")
 
     thumbnail_url = Column(String(500), nullable=True)
     gallery_images = Column(JSON, nullable=True, default=list)
@@ -536,6 +541,27 @@ class ProjectBookmark(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
+class ProjectTrendingEvent(Base):
+    """Engagement not yet folded into ``Project.trending_score``"""
+
+    __tablename__ = "project_trending_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    project_id = Column(String(100), nullable=False)
+    kind = Column(String(20), nullable=False)  # view, like, bookmark, fork
+    occurred_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class ProjectViewer(Base):
+    """A user's counted view of a project; one per project, user and window"""
+
+    __tablename__ = "project_viewers"
+
+    project_id = Column(String(100), primary_key=True)
+    user_id = Column(String(100), primary_key=True)
+    window_start = Column(DateTime, primary_key=True)
+
+
 class ProjectFollow(Base):
     __tablename__ = "project_follows"
 
@@ -611,3 +637,40 @@ def _set_activity_metadata(self: ProjectActivityLog, value: dict | None) -> None
 ProjectActivityLog.metadata = property(  # type: ignore[attr-defined]
     _get_activity_metadata, _set_activity_metadata
 )
+
+
+# The showcase lists public, approved projects by trending score
+Index(
+    "idx_project_showcase_trending",
+    Project.visibility,
+    Project.is_approved,
+    Project.trending_score,
+    Project.updated_at,
+)
+
+
+# Likes, bookmarks and forks queue a trending event in the same transaction,
+# whatever code path creates them (views are recorded by the showcase route)
+
+
+def _queue_trending_event(connection, project_id, kind):
+    connection.execute(
+        ProjectTrendingEvent.__table__.insert().values(
+            project_id=project_id, kind=kind, occurred_at=datetime.utcnow()
+        )
+    )
+
+
+@event.listens_for(ProjectLike, "after_insert")
+def _like_trending_event(mapper, connection, target):
+    _queue_trending_event(connection, target.project_id, "like")
+
+
+@event.listens_for(ProjectBookmark, "after_insert")
+def _bookmark_trending_event(mapper, connection, target):
+    _queue_trending_event(connection, target.project_id, "bookmark")
+
+
+@event.listens_for(ProjectFork, "after_insert")
+def _fork_trending_event(mapper, connection, target):
+    _queue_trending_event(connection, target.original_project_id, "fork")
@@ -1,11 +1,12 @@
 """Analytics API routes with real database integration"""
 
 import logging
-from datetime import datetime
+from datetime import date, datetime
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
+from ..crud.analytics import USAGE_REPORT_COLUMNS, AnalyticsCRUD
 from ..database import get_db
 from ..dependencies import (
     get_current_makerspace,
@@ -20,6 +21,12 @@ from ..utils.analytics_mock_data import (
     get_mock_revenue_analytics,
     get_mock_usage_stats,
 )
+from ..utils.streaming_export import (
+    csv_chunks,
+    stream_with_session,
+    streaming_download,
+    xlsx_chunks,
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -449,3 +456,32 @@ async def export_analytics(
     except Exception as e:
         logger.error(f"Analytics export error: {e}")
         raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
+
+
+@router.get("/export/usage-events")
+async def export_usage_events(
+    start_date: date = Query(..., description="First day of the period"),
+    end_date: date = Query(..., description="Last day of the period"),
+    format: str = Query("csv", pattern="^(csv|xlsx)$", description="csv or xlsx"),
+    current_user=Depends(get_current_user),
+    makerspace=Depends(get_current_makerspace),
+    _: bool = Depends(require_permission("analytics:export")),
+):
+    """Stream the usage events of a period as a CSV report or XLSX sheet"""
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date is before start_date")
+    makerspace_id = str(getattr(makerspace, "id", makerspace))
+
+    def produce(db):
+        analytics = AnalyticsCRUD(db)
+        rows = analytics.iter_usage_report_rows(makerspace_id, start_date, end_date)
+        if format == "xlsx":
+            return xlsx_chunks(USAGE_REPORT_COLUMNS, rows, sheet_title="Usage Events")
+        preamble = analytics.usage_report_preamble(makerspace_id, start_date, end_date)
+        return csv_chunks(USAGE_REPORT_COLUMNS, rows, preamble=preamble)
+
+    return streaming_download(
+        stream_with_session(produce),
+        f"usage_report_{makerspace_id}_{start_date}_{end_date}.{format}",
+        format,
+    )
@@ -3,7 +3,7 @@ from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel, Field
-from sqlalchemy import and_, desc, or_
+from sqlalchemy import and_, case, desc, exists, or_, select
 from sqlalchemy.orm import Session
 
 from ..database import get_db
@@ -11,16 +11,39 @@ from ..dependencies import get_current_admin_user, get_current_user
 from ..models.announcements import (
     Announcement,
     AnnouncementAcknowledgment,
+    AnnouncementAudience,
     AnnouncementType,
     AnnouncementView,
     Priority,
     TargetAudience,
+    member_audience_segments,
 )
 from ..models.enhanced_member import Member
 from ..security.input_validation import InputSanitizer
 
 router = APIRouter(prefix="/announcements", tags=["Announcements"])
 
+# Member feed order: pinned first, then by priority, then newest
+PRIORITY_RANK = case(
+    (Announcement.priority == Priority.CRITICAL, 5),
+    (Announcement.priority == Priority.URGENT, 4),
+    (Announcement.priority == Priority.HIGH, 3),
+    (Announcement.priority == Priority.LOW, 1),
+    else_=2,
+)
+
+
+def _get_member(db: Session, current_user) -> Member:
+    member = (
+        db.query(Member).filter(Member.keycloak_user_id == current_user.id).first()
+    )
+    if not member:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Member record not found",
+        )
+    return member
+
 
 class AnnouncementCreate(BaseModel):
     title: str = Field(..., min_length=1, max_length=255)
@@ -215,71 +238,46 @@ async def get_member_announcements(
 ):
     """Get announcements targeted to the current member"""
 
-    # Get member record
-    member = db.query(Member).filter(Member.user_id == current_user.id).first()
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Member record not found",
-        )
+    member = _get_member(db, current_user)
 
-    # Get all active announcements for the makerspace
+    # One query: the audience index picks the announcements targeted to any
+    # of the member's segments, and acknowledged ones are excluded in SQL
     current_time = datetime.utcnow()
+    targeted = select(AnnouncementAudience.announcement_id).where(
+        AnnouncementAudience.makerspace_id == member.makerspace_id,
+        AnnouncementAudience.segment.in_(member_audience_segments(member)),
+    )
     query = db.query(Announcement).filter(
-        and_(
-            Announcement.makerspace_id == member.makerspace_id,
-            Announcement.is_published,
-            or_(
-                Announcement.publish_at.is_(None),
-                Announcement.publish_at <= current_time,
-            ),
-            or_(
-                Announcement.expires_at.is_(None),
-                Announcement.expires_at > current_time,
-            ),
-        )
+        Announcement.makerspace_id == member.makerspace_id,
+        Announcement.is_published.is_(True),
+        or_(
+            Announcement.publish_at.is_(None),
+            Announcement.publish_at <= current_time,
+        ),
+        or_(
+            Announcement.expires_at.is_(None),
+            Announcement.expires_at > current_time,
+        ),
+        Announcement.id.in_(targeted),
     )
 
-    all_announcements = query.all()
-
-    # Filter announcements targeted to this member
-    targeted_announcements = []
-    for announcement in all_announcements:
-        if announcement.is_targeted_to_member(member):
-            targeted_announcements.append(announcement)
-
-    # If not including acknowledged, filter out acknowledged announcements
     if not include_acknowledged:
-        acknowledged_ids = (
-            db.query(AnnouncementAcknowledgment.announcement_id)
-            .filter(AnnouncementAcknowledgment.member_id == member.id)
-            .all()
-        )
-        acknowledged_ids = [str(ack[0]) for ack in acknowledged_ids]
-
-        targeted_announcements = [
-            ann for ann in targeted_announcements if str(ann.id) not in acknowledged_ids
-        ]
-
-    # Sort by priority and pinned status
-    def sort_key(ann):
-        priority_order = {
-            Priority.CRITICAL: 5,
-            Priority.URGENT: 4,
-            Priority.HIGH: 3,
-            Priority.NORMAL: 2,
-            Priority.LOW: 1,
-        }
-        return (
-            ann.is_pinned,
-            priority_order.get(ann.priority, 2),
-            ann.created_at,
+        query = query.filter(
+            ~exists().where(
+                AnnouncementAcknowledgment.announcement_id == Announcement.id,
+                AnnouncementAcknowledgment.member_id == member.id,
+            )
         )
 
-    targeted_announcements.sort(key=sort_key, reverse=True)
-
-    # Limit results
-    targeted_announcements = targeted_announcements[:limit]
+    targeted_announcements = (
+        query.order_by(
+            desc(Announcement.is_pinned),
+            desc(PRIORITY_RANK),
+            desc(Announcement.created_at),
+        )
+        .limit(limit)
+        .all()
+    )
 
     # Format response
     response_announcements = []
@@ -319,7 +317,9 @@ async def get_announcement(
         )
 
     # Record view if this is a member viewing
-    member = db.query(Member).filter(Member.user_id == current_user.id).first()
+    member = (
+        db.query(Member).filter(Member.keycloak_user_id == current_user.id).first()
+    )
     if member:
         # Check if this member can see this announcement
         if not announcement.is_targeted_to_member(member):
@@ -635,13 +635,7 @@ async def acknowledge_announcement(
             detail="Announcement not found",
         )
 
-    # Get member record
-    member = db.query(Member).filter(Member.user_id == current_user.id).first()
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Member record not found",
-        )
+    member = _get_member(db, current_user)
 
     # Check if announcement is targeted to this member
     if not announcement.is_targeted_to_member(member):
@@ -1,8 +1,5 @@
-import asyncio
-import atexit
 import json
-from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Optional
 
 from fastapi import (
@@ -14,13 +11,16 @@ from fastapi import (
 )
 from sqlalchemy.orm import Session
 
+from backends.utils.ws_fanout import Connection
+
+from ..core.realtime import project_channel, realtime_hub, user_channel
 from ..database import get_db
 from ..dependencies import get_current_user
 from ..models.collaboration import (
     CollaborationMessage,
     WhiteboardAction,
 )
-from ..models.projects import Project
+from ..models.project import Project
 from ..schemas.collaboration import (
     CursorUpdate,
     DocumentChangeCreate,
@@ -36,22 +36,32 @@ router = APIRouter(prefix="/collaboration", tags=["collaboration"])
 
 # WebSocket connection manager for real-time collaboration
 class CollaborationManager:
-    def __init__(self):
-        # Store active connections by project_id
-        self.active_connections: Dict[str, List[WebSocket]] = defaultdict(list)
-        self.user_presence: Dict[str, Dict] = {}  # user_id -> presence_data
+    """
+    Project rooms on top of the shared realtime hub.
+
+    Broadcasts go through Redis pub/sub so collaborators connected to other
+    workers receive them, and presence is kept in Redis with a TTL instead of
+    a per-process dict.
+    """
+
+    def __init__(self, hub=realtime_hub):
+        self.hub = hub
+        self.connections: Dict[WebSocket, Connection] = {}
 
     async def connect(self, websocket: WebSocket, project_id: str, user_id: str):
-        await websocket.accept()
-        self.active_connections[project_id].append(websocket)
-
-        # Update user presence
-        self.user_presence[user_id] = {
-            "project_id": project_id,
-            "websocket": websocket,
-            "last_seen": datetime.utcnow(),
-            "status": "active",
-        }
+        connection = await self.hub.connect(
+            websocket,
+            [project_channel(project_id), user_channel(user_id)],
+            presence=(
+                project_channel(project_id),
+                {
+                    "user_id": user_id,
+                    "status": "active",
+                    "last_seen": datetime.utcnow().isoformat(),
+                },
+            ),
+        )
+        self.connections[websocket] = connection
 
         # Notify others of user joining
         await self.broadcast_to_project(
@@ -63,27 +73,31 @@ class CollaborationManager:
             },
             exclude_ws=websocket,
         )
+        return connection
 
-    def disconnect(self, websocket: WebSocket, project_id: str, user_id: str):
-        if websocket in self.active_connections[project_id]:
-            self.active_connections[project_id].remove(websocket)
-
-        # Remove user presence
-        if user_id in self.user_presence:
-            del self.user_presence[user_id]
+    async def disconnect(self, websocket: WebSocket, project_id: str, user_id: str):
+        connection = self.connections.pop(websocket, None)
+        if connection is not None:
+            await self.hub.disconnect(connection)
 
         # Notify others of user leaving
-        asyncio.create_task(
-            self.broadcast_to_project(
-                project_id,
-                {
-                    "type": "user_left",
-                    "user_id": user_id,
-                    "timestamp": datetime.utcnow().isoformat(),
-                },
-            )
+        await self.broadcast_to_project(
+            project_id,
+            {
+                "type": "user_left",
+                "user_id": user_id,
+                "timestamp": datetime.utcnow().isoformat(),
+            },
         )
 
+    async def touch(self, websocket: WebSocket, **presence):
+        """Refresh a collaborator's presence entry"""
+        connection = self.connections.get(websocket)
+        if connection is not None:
+            await self.hub.touch(
+                connection, last_seen=datetime.utcnow().isoformat(), **presence
+            )
+
     async def broadcast_to_project(
         self,
         project_id: str,
@@ -91,33 +105,19 @@ class CollaborationManager:
         exclude_ws: Optional[WebSocket] = None,
     ):
         """Broadcast message to all users in a project"""
-        connections = self.active_connections[project_id]
-        message_str = json.dumps(message)
-
-        disconnected = []
-        for websocket in connections:
-            if websocket == exclude_ws:
-                continue
-
-            try:
-                await websocket.send_text(message_str)
-            except Exception:
-                disconnected.append(websocket)
-
-        # Clean up disconnected websockets
-        for ws in disconnected:
-            if ws in connections:
-                connections.remove(ws)
+        await self.hub.publish(
+            project_channel(project_id),
+            message,
+            exclude=self.connections.get(exclude_ws),
+        )
 
     async def broadcast_to_user(self, user_id: str, message: dict):
         """Send message to specific user"""
-        if user_id in self.user_presence:
-            websocket = self.user_presence[user_id]["websocket"]
-            try:
-                await websocket.send_text(json.dumps(message))
-            except Exception:
-                # Clean up disconnected user
-                del self.user_presence[user_id]
+        await self.hub.publish(user_channel(user_id), message)
+
+    async def get_project_presence(self, project_id: str) -> List[Dict]:
+        """Collaborators connected to the project on any worker"""
+        return await self.hub.presence(project_channel(project_id))
 
 
 # Global collaboration manager instance
@@ -171,6 +171,9 @@ async def websocket_endpoint(websocket: WebSocket, project_id: str, user_id: str
                 )
 
             elif message_type == "presence_update":
+                await collaboration_manager.touch(
+                    websocket, status=message.get("status") or "active"
+                )
                 await collaboration_manager.broadcast_to_project(
                     project_id,
                     {
@@ -187,7 +190,9 @@ async def websocket_endpoint(websocket: WebSocket, project_id: str, user_id: str
                 )
 
     except WebSocketDisconnect:
-        collaboration_manager.disconnect(websocket, project_id, user_id)
+        pass
+    finally:
+        await collaboration_manager.disconnect(websocket, project_id, user_id)
 
 
 # Chat and messaging endpoints
@@ -439,61 +444,14 @@ async def broadcast_viewing_status(
 async def get_active_users(project_id: str, current_user=Depends(get_current_user)):
     """Get list of currently active users in project"""
 
-    active_users = []
-    for user_id, presence in collaboration_manager.user_presence.items():
-        if presence["project_id"] == project_id:
-            # Check if user is still active (within last 30 seconds)
-            if datetime.utcnow() - presence["last_seen"] < timedelta(seconds=30):
-                active_users.append(
-                    {
-                        "user_id": user_id,
-                        "status": presence["status"],
-                        "last_seen": presence["last_seen"].isoformat(),
-                    }
-                )
+    # Entries expire unless their worker refreshes them, so no cleanup task
+    active_users = [
+        {
+            "user_id": presence["user_id"],
+            "status": presence["status"],
+            "last_seen": presence["last_seen"],
+        }
+        for presence in await collaboration_manager.get_project_presence(project_id)
+    ]
 
     return {"active_users": active_users, "total": len(active_users)}
-
-
-# Clean up inactive users periodically
-async def cleanup_inactive_users():
-    """Background task to clean up inactive users"""
-    while True:
-        try:
-            current_time = datetime.utcnow()
-            inactive_users = []
-
-            for (
-                user_id,
-                presence,
-            ) in collaboration_manager.user_presence.items():
-                if current_time - presence["last_seen"] > timedelta(minutes=5):
-                    inactive_users.append(user_id)
-
-            # Remove inactive users
-            for user_id in inactive_users:
-                if user_id in collaboration_manager.user_presence:
-                    project_id = collaboration_manager.user_presence[user_id][
-                        "project_id"
-                    ]
-                    del collaboration_manager.user_presence[user_id]
-
-                    # Notify others
-                    await collaboration_manager.broadcast_to_project(
-                        project_id,
-                        {
-                            "type": "user_left",
-                            "user_id": user_id,
-                            "timestamp": current_time.isoformat(),
-                        },
-                    )
-
-        except Exception as e:
-            print(f"Error in cleanup task: {e}")
-
-        await asyncio.sleep(60)  # Run every minute
-
-
-# Start cleanup task when module loads
-cleanup_task = asyncio.create_task(cleanup_inactive_users())
-atexit.register(lambda: cleanup_task.cancel())
@@ -10,6 +10,7 @@ from fastapi import (
     Query,
     status,
 )
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from .. import models
@@ -25,10 +26,22 @@ from ..schemas.equipment_reservations import (
     EnhancedReservationCreate,
     EnhancedReservationResponse,
     EnhancedReservationUpdate,
+    EquipmentFreeSlot,
+    NextFreeSlotRequest,
+    NextFreeSlotResponse,
     ReservationApprovalRequest,
     SkillGateCreate,
     SkillGateResponse,
 )
+from ..services.access import access_matrix_cache, certified_skills, valid_skills
+from ..services.availability import (
+    busy_intervals,
+    find_conflict,
+    first_fit,
+    grid_slots,
+    naive_utc,
+    next_free_slots,
+)
 
 router = APIRouter(prefix="/equipment-reservations", tags=["equipment-reservations"])
 
@@ -207,6 +220,8 @@ async def create_enhanced_reservation(
         raise
     except Exception as e:
         db.rollback()
+        if _is_overlap_violation(e):
+            raise _overlap_conflict()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create reservation: {str(e)}",
@@ -360,7 +375,7 @@ async def update_reservation(
             reservation.estimated_cost = duration * equipment.hourly_rate
             reservation.total_cost = reservation.estimated_cost
 
-    db.commit()
+    _commit_or_conflict(db)
     db.refresh(reservation)
     return reservation
 
@@ -411,7 +426,7 @@ async def approve_reservation(
     if approval_data.admin_notes:
         reservation.admin_notes = approval_data.admin_notes
 
-    db.commit()
+    _commit_or_conflict(db)
 
     action = "approved" if approval_data.approved else "rejected"
     return {"message": f"Reservation {action} successfully"}
@@ -668,25 +683,11 @@ async def check_availability(
             status_code=status.HTTP_404_NOT_FOUND, detail="Equipment not found"
         )
 
-    # Get existing reservations
-    existing_reservations = (
-        db.query(models.EnhancedEquipmentReservation)
-        .filter(
-            models.EnhancedEquipmentReservation.equipment_id
-            == availability_request.equipment_id,
-            models.EnhancedEquipmentReservation.status.in_(
-                [
-                    models.ReservationStatus.APPROVED,
-                    models.ReservationStatus.ACTIVE,
-                ]
-            ),
-            models.EnhancedEquipmentReservation.requested_start
-            < availability_request.end_date,
-            models.EnhancedEquipmentReservation.requested_end
-            > availability_request.start_date,
-        )
-        .all()
-    )
+    start_date = naive_utc(availability_request.start_date)
+    end_date = naive_utc(availability_request.end_date)
+    busy = busy_intervals(
+        db, [availability_request.equipment_id], start_date, end_date
+    )[availability_request.equipment_id]
 
     # Check skill gates if user specified
     skill_gate_blocking = []
@@ -698,76 +699,136 @@ async def check_availability(
             gate["gate_name"] for gate in skill_gates if not gate["passed"]
         ]
 
-    # Generate availability slots (simplified)
+    def slot(start_time, end_time):
+        return {
+            "start_time": start_time,
+            "end_time": end_time,
+            "duration_hours": (end_time - start_time).total_seconds() / 3600,
+            "is_available": True,
+            "requires_skill_verification": len(skill_gate_blocking) > 0,
+            "skill_gates_blocking": skill_gate_blocking,
+        }
+
+    granularity = timedelta(minutes=availability_request.slot_minutes)
+    slots_checked = 0
     available_slots = []
-    current_time = availability_request.start_date
-
-    while current_time < availability_request.end_date:
-        slot_end = min(
-            current_time + timedelta(hours=1),
-            availability_request.end_date,
-        )
+    for start_time, end_time, free in grid_slots(
+        busy, start_date, end_date, granularity
+    ):
+        slots_checked += 1
+        if free:
+            available_slots.append(slot(start_time, end_time))
 
-        # Check for conflicts
-        has_conflict = any(
-            res.requested_start < slot_end and res.requested_end > current_time
-            for res in existing_reservations
+    next_available_slot = available_slots[0] if available_slots else None
+    if availability_request.duration_hours:
+        fit = first_fit(
+            busy,
+            start_date,
+            end_date,
+            timedelta(hours=availability_request.duration_hours),
+            granularity,
         )
-
-        if not has_conflict:
-            available_slots.append(
-                {
-                    "start_time": current_time,
-                    "end_time": slot_end,
-                    "duration_hours": (
-                        (slot_end - current_time).total_seconds() / 3600
-                    ),
-                    "is_available": True,
-                    "requires_skill_verification": (len(skill_gate_blocking) > 0),
-                    "skill_gates_blocking": skill_gate_blocking,
-                }
-            )
-
-        current_time = slot_end
+        next_available_slot = slot(*fit) if fit else None
 
     response = AvailabilityResponse(
         equipment_id=availability_request.equipment_id,
         check_period_start=availability_request.start_date,
         check_period_end=availability_request.end_date,
-        total_slots_checked=len(available_slots),
+        total_slots_checked=slots_checked,
         available_slots=available_slots,
-        next_available_slot=available_slots[0] if available_slots else None,
+        next_available_slot=next_available_slot,
     )
 
     return response
 
 
+@router.post("/availability/next-free/", response_model=NextFreeSlotResponse)
+async def find_next_free_slot(
+    request: NextFreeSlotRequest,
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Find the earliest free slot of a given length across several machines"""
+    equipment_ids = list(dict.fromkeys(request.equipment_ids))
+    found = {
+        equipment_id
+        for (equipment_id,) in db.query(models.Equipment.id).filter(
+            models.Equipment.id.in_(equipment_ids)
+        )
+    }
+    missing = [id_ for id_ in equipment_ids if id_ not in found]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Equipment not found: {', '.join(missing)}",
+        )
+
+    search_start = naive_utc(request.earliest_start or datetime.utcnow())
+    horizon = timedelta(days=request.search_horizon_days)
+    slots = next_free_slots(
+        db,
+        equipment_ids,
+        timedelta(hours=request.duration_hours),
+        search_start,
+        granularity=timedelta(minutes=request.slot_minutes),
+        horizon=horizon,
+    )
+
+    free_slots = sorted(
+        (
+            EquipmentFreeSlot(
+                equipment_id=equipment_id, start_time=slot[0], end_time=slot[1]
+            )
+            for equipment_id, slot in slots.items()
+            if slot
+        ),
+        key=lambda slot: slot.start_time,
+    )
+    return NextFreeSlotResponse(
+        duration_hours=request.duration_hours,
+        search_start=search_start,
+        search_end=search_start + horizon,
+        next_free_slot=free_slots[0] if free_slots else None,
+        free_slots=free_slots,
+        unavailable_equipment_ids=[
+            equipment_id for equipment_id, slot in slots.items() if not slot
+        ],
+    )
+
+
 # Helper functions
+def _is_overlap_violation(error: Exception) -> bool:
+    return isinstance(error, IntegrityError) and (
+        "excl_enhanced_reservation_overlap" in str(error.orig)
+    )
+
+
+def _overlap_conflict() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Equipment not available: overlaps an approved reservation",
+    )
+
+
+def _commit_or_conflict(db: Session) -> None:
+    """Commit, turning the Postgres overlap exclusion constraint into a 409"""
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if _is_overlap_violation(e):
+            raise _overlap_conflict()
+        raise
+
+
 async def check_equipment_availability(
     db: Session, equipment_id: str, start_time: datetime, end_time: datetime
 ) -> Optional[str]:
     """Check if equipment is available for the requested time"""
-    conflicts = (
-        db.query(models.EnhancedEquipmentReservation)
-        .filter(
-            models.EnhancedEquipmentReservation.equipment_id == equipment_id,
-            models.EnhancedEquipmentReservation.status.in_(
-                [
-                    models.ReservationStatus.APPROVED,
-                    models.ReservationStatus.ACTIVE,
-                ]
-            ),
-            models.EnhancedEquipmentReservation.requested_start < end_time,
-            models.EnhancedEquipmentReservation.requested_end > start_time,
-        )
-        .first()
-    )
+    conflict = find_conflict(db, equipment_id, start_time, end_time)
 
-    if conflicts:
-        return (
-            f"Conflicting reservation from {conflicts.requested_start} "
-            f"to {conflicts.requested_end}"
-        )
+    if conflict:
+        return f"Conflicting reservation from {conflict[0]} to {conflict[1]}"
 
     return None
 
@@ -785,23 +846,35 @@ async def verify_skill_gates(
         .all()
     )
 
+    # One certification lookup for every gate; each gate is then a set test
+    certifications = certified_skills(db, user_id) if skill_gates else {}
+    now = datetime.utcnow()
+    matrix = None
+
     results = []
     for gate in skill_gates:
-        # Simplified skill verification - in production this would check
-        # against actual skill system
-        passed = True  # Default to pass for mock
+        passed = True
         notes = "Auto-verified"
 
-        # Mock some skill gate logic
-        if gate.gate_type == models.SkillGateType.REQUIRED_SKILL:
-            # Check if user has required skill
-            passed = True  # Mock: assume user has skills
-        elif gate.gate_type == models.SkillGateType.CERTIFICATION:
-            # Check certification
-            passed = True  # Mock: assume user is certified
-        elif gate.gate_type == models.SkillGateType.EXPERIENCE_LEVEL:
-            # Check experience level
-            passed = True  # Mock: assume user has experience
+        if gate.gate_type in (
+            models.SkillGateType.REQUIRED_SKILL,
+            models.SkillGateType.CERTIFICATION,
+        ):
+            held = valid_skills(
+                certifications, now, timedelta(days=gate.grace_period_days or 0)
+            )
+            if gate.required_skill_id:
+                passed = gate.required_skill_id in held
+                notes = "Skill certified" if passed else "Required skill missing"
+            elif gate.gate_type == models.SkillGateType.REQUIRED_SKILL:
+                # No specific skill: every skill the machine requires
+                if matrix is None:
+                    matrix = access_matrix_cache.get(
+                        db, gate.equipment.linked_makerspace_id, equipment_id
+                    )
+                missing = matrix.names(matrix.missing(equipment_id, matrix.mask(held)))
+                passed = not missing
+                notes = f"Missing skills: {', '.join(missing)}" if missing else notes
 
         results.append(
             {
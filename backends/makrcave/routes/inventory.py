@@ -1,4 +1,6 @@
 import logging
+import os
+import tempfile
 import uuid
 from datetime import datetime
 from typing import Any, List, Optional
@@ -11,14 +13,14 @@ from fastapi import (
     File,
     HTTPException,
     Query,
-    Response,
     UploadFile,
 )
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from backends.utils import error_detail
 
-from ..crud.inventory import InventoryCRUD
+from ..crud.inventory import EXPORT_COLUMNS, InventoryCRUD
 
 # Models used via CRUD operations; direct imports not required here
 from ..database import get_db
@@ -30,9 +32,15 @@ from ..schemas.inventory import (
     InventoryStatsResponse,
     InventoryUsageLogResponse,
     IssueItemRequest,
+    ItemStatus,
     LowStockAlertResponse,
     ReorderRequest,
 )
+from ..utils.streaming_export import (
+    export_chunks,
+    stream_with_session,
+    streaming_download,
+)
 
 # Router without local prefix; mounted under '/inventory'
 router = APIRouter(tags=["inventory"])
@@ -40,6 +48,9 @@ router = APIRouter(tags=["inventory"])
 
 logger = logging.getLogger(__name__)
 
+# Bulk imports copy the upload to disk in blocks of this size
+IMPORT_SPOOL_BLOCK_BYTES = 1024 * 1024
+
 
 def _fetch_makerspace_item(
     *,
@@ -715,16 +726,29 @@ async def bulk_import_inventory(
         )
 
     try:
-        # Read CSV content
-        content = await file.read()
-        csv_content = content.decode("utf-8")
+        # The upload is closed once this handler returns, so copy it to a
+        # temp file in fixed-size blocks; the job streams rows from there
+        spooled = tempfile.NamedTemporaryFile(
+            prefix="inventory-import-", suffix=".csv", delete=False
+        )
+        try:
+            with spooled:
+                while True:
+                    block = await file.read(IMPORT_SPOOL_BLOCK_BYTES)
+                    if not block:
+                        break
+                    await run_in_threadpool(spooled.write, block)
+        except BaseException:
+            os.unlink(spooled.name)
+            raise
 
         # Create background job for processing
         job_id = str(uuid.uuid4())
 
         background_tasks.add_task(
-            crud.process_bulk_import,
-            csv_content=csv_content,
+            _import_spooled_csv,
+            crud,
+            spooled.name,
             job_id=job_id,
             makerspace_id=current_user.makerspace_id,
             user_id=current_user.id,
@@ -746,6 +770,29 @@ async def bulk_import_inventory(
         ) from exc
 
 
+def _import_spooled_csv(crud: InventoryCRUD, path: str, **job: Any) -> None:
+    """Run a bulk import over a spooled upload, one line at a time"""
+    try:
+        with open(path, encoding="utf-8", newline="") as lines:
+            crud.process_bulk_import(csv_content=lines, **job)
+    except Exception as exc:
+        # Rows are decoded lazily, so a bad upload only fails here, after
+        # the job exists; record it instead of leaving the job "processing"
+        logger.exception("Bulk import job %s failed", job["job_id"])
+        if isinstance(exc, UnicodeDecodeError):
+            error = "File must be UTF-8 encoded"
+        else:
+            error = f"Import failed: {exc}"
+        crud.fail_import_job(
+            job_id=job["job_id"],
+            makerspace_id=job["makerspace_id"],
+            user_id=job["user_id"],
+            error=error,
+        )
+    finally:
+        os.unlink(path)
+
+
 @router.get("/bulk/import/{job_id}")
 async def get_import_job_status(
     job_id: str,
@@ -786,15 +833,8 @@ async def get_import_job_status(
     return job_status
 
 
-@router.get("/export/csv")
-async def export_inventory_csv(
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
-    category: Optional[str] = Query(None),
-    status: Optional[str] = Query(None),
-    crud: InventoryCRUD = Depends(get_inventory_crud),
-):
-    """Export inventory items as CSV"""
+def _stream_inventory_export(current_user, category, status, fmt: str):
+    """Validate export filters, then stream the matching items as ``fmt``"""
     # Check permissions
     if not check_permission(current_user.role, "view_inventory"):
         raise HTTPException(
@@ -807,19 +847,18 @@ async def export_inventory_csv(
         if category:
             filters["category"] = category
         if status:
-            filters["status"] = status
-
-        csv_content = crud.export_to_csv(
-            makerspace_id=current_user.makerspace_id, filters=filters
-        )
-
-        return Response(
-            content=csv_content,
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": ("attachment; filename=" "inventory_export.csv")
-            },
+            # Validate up front: once streaming starts the status code is sent
+            filters["status"] = ItemStatus(status)
+
+        makerspace_id = current_user.makerspace_id
+        chunks = stream_with_session(
+            lambda db: export_chunks(
+                fmt,
+                EXPORT_COLUMNS,
+                InventoryCRUD(db).iter_export_rows(makerspace_id, filters),
+            )
         )
+        return streaming_download(chunks, f"inventory_export.{fmt}", fmt)
     except ValueError as exc:
         logger.warning(
             "Invalid export filters for makerspace %s",
@@ -832,7 +871,8 @@ async def export_inventory_csv(
         ) from exc
     except Exception as exc:
         logger.exception(
-            "Unexpected error while exporting inventory CSV for makerspace %s",
+            "Unexpected error while exporting inventory %s for makerspace %s",
+            fmt,
             current_user.makerspace_id,
         )
         raise HTTPException(
@@ -844,6 +884,26 @@ async def export_inventory_csv(
         ) from exc
 
 
+@router.get("/export/csv")
+async def export_inventory_csv(
+    current_user=Depends(get_current_user),
+    category: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+):
+    """Export inventory items as CSV, streamed in chunks"""
+    return _stream_inventory_export(current_user, category, status, "csv")
+
+
+@router.get("/export/xlsx")
+async def export_inventory_xlsx(
+    current_user=Depends(get_current_user),
+    category: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+):
+    """Export inventory items as an Excel workbook, streamed in chunks"""
+    return _stream_inventory_export(current_user, category, status, "xlsx")
+
+
 @router.delete("/{item_id}")
 async def delete_inventory_item(
     item_id: str,
@@ -7,6 +7,7 @@ from pydantic import BaseModel, Field
 from sqlalchemy import and_
 from sqlalchemy.orm import Session
 
+from ..core.identity_cache import invalidate_after_commit
 from ..database import get_db
 from ..dependencies import get_current_admin_user, get_current_user
 
@@ -399,9 +400,17 @@ async def delete_membership_plan(
             user_id=current_user.id,
             details={"plan_id": plan_id, "member_count": member_count},
         )
+        subjects = [
+            subject
+            for (subject,) in db.query(Member.keycloak_user_id).filter(
+                Member.membership_plan_id == plan_id
+            )
+        ]
         db.query(Member).filter(Member.membership_plan_id == plan_id).update(
             {Member.membership_plan_id: None}
         )
+        # Bulk updates skip the mapper events the identity cache listens to
+        invalidate_after_commit(db, *subjects)
 
     db.delete(plan)
     db.commit()
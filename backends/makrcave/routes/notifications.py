@@ -25,7 +25,6 @@ from ..schemas.notifications import (
 )
 from ..models.notifications import Notification
 from ..models.notifications import Notification
-from jose import jwt, JWTError
 from sqlalchemy.orm import Session
 import json
 from datetime import datetime
@@ -40,14 +39,18 @@ from fastapi import (
     status,
     WebSocketDisconnect
 )
+from ..core.realtime import realtime_hub
 from ..crud import notifications as crud_notifications
 from ..crud import notifications_stubs as crud_notifications_stubs
 from ..database import get_db
 from ..dependencies import get_current_user
-from ..dependencies import (
-    get_jwks_pem, get_keycloak_public_key, KEYCLOAK_USE_JWKS,
-    KEYCLOAK_ISSUER, KEYCLOAK_CLIENT_ID, KEYCLOAK_VERIFY_AUD
+from ..dependencies import token_verifier
+from ..utils.streaming_export import (
+    export_chunks,
+    stream_with_session,
+    streaming_download,
 )
+from backends.utils import TokenVerificationError
 import logging
 logger = logging.getLogger(__name__)
 
@@ -621,11 +624,9 @@ async def get_system_health(
 @router.post("/export")
 async def export_notifications(
     export_request: NotificationExport,
-    background_tasks: BackgroundTasks,
     current_user=Depends(get_current_user),
-    db: Session = Depends(get_db),
 ):
-    """Export notifications data"""
+    """Export notifications data, streamed as CSV, XLSX or JSON"""
     if not _has_notification_permission(current_user, "export"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -633,16 +634,19 @@ async def export_notifications(
         )
 
     try:
-        export_id = crud_notifications.create_export_request(
-            db,
-            export_request,
-            _get_user_makerspace_id(current_user),
-            current_user.user_id,
-        )
-
-        background_tasks.add_task(crud_notifications.process_export, db, export_id)
-
-        return {"export_id": export_id, "message": "Export request created"}
+        fmt = export_request.format
+        makerspace_id = _get_user_makerspace_id(current_user)
+        columns = crud_notifications.notification_export_columns(export_request)
+        chunks = stream_with_session(
+            lambda db: export_chunks(
+                fmt,
+                columns,
+                crud_notifications.iter_notification_export_rows(
+                    db, makerspace_id, export_request
+                ),
+            )
+        )
+        return streaming_download(chunks, f"notifications_export.{fmt}", fmt)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -674,37 +678,27 @@ async def websocket_endpoint(
 
     # Verify JWT
     try:
-        header = jwt.get_unverified_header(token)
-        key_to_use = None
-        if KEYCLOAK_USE_JWKS:
-            kid = header.get("kid")
-            if kid:
-                key_to_use = await get_jwks_pem(kid)
-        if not key_to_use:
-            key_to_use = await get_keycloak_public_key()
-        decode_kwargs = {
-            "algorithms": ["RS256"],
-            "issuer": KEYCLOAK_ISSUER,
-        }
-        if KEYCLOAK_VERIFY_AUD:
-            decode_kwargs["audience"] = KEYCLOAK_CLIENT_ID
-        payload = jwt.decode(token, key_to_use, **decode_kwargs)
+        payload = await token_verifier.verify(token)
         # Optionally, check that user_id matches token subject
         if payload.get("sub") != user_id:
             await websocket.close(code=4403)
             return
-    except JWTError:
+    except TokenVerificationError:
         await websocket.close(code=4401)
         return
 
     await websocket.accept()
+    connection = await crud_notifications.register_websocket_connection(
+        user_id, websocket
+    )
     try:
-        crud_notifications.register_websocket_connection(user_id, websocket)
         while True:
             data = await websocket.receive_text()
             message = json.loads(data)
             if message.get("type") == "ping":
-                await websocket.send_text(json.dumps({"type": "pong"}))
+                # Replies share the socket's send queue with pushed notifications
+                realtime_hub.send(connection, {"type": "pong"})
+                await realtime_hub.touch(connection)
             elif message.get("type") == "mark_read":
                 notification_id = message.get("notification_id")
                 if notification_id:
@@ -714,7 +708,7 @@ async def websocket_endpoint(
     except Exception as e:
         logger.error("WebSocket error", exc_info=e)
     finally:
-        crud_notifications.unregister_websocket_connection(user_id)
+        await crud_notifications.unregister_websocket_connection(connection)
 
 
 
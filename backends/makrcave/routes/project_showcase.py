@@ -1,34 +1,153 @@
+import os
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm import Session
 
-from ..crud.project_social_async import (
-    get_project_bookmark,
-    get_project_follow,
-    get_project_like,
-)
 from ..database import get_db
 from ..dependencies import get_current_user
 from ..models.enhanced_member import Member
 
 # Models
-from ..models.project import Project, ProjectCollaborator, ProjectVisibility
+from ..models.project import (
+    Project,
+    ProjectBookmark,
+    ProjectCollaborator,
+    ProjectFollow,
+    ProjectLike,
+    ProjectVisibility,
+)
 
 # Schemas
 from ..schemas.project_showcase import (
     ProjectAward,
     ProjectStatsResponse,
-    ShowcaseBOMItem,
     ShowcaseFiltersResponse,
     ShowcaseProjectResponse,
 )
+from ..services.project_trending import event_score, record_project_view
 
 router = APIRouter(prefix="/projects", tags=["project-showcase"])
 
+# The trending widget is the same for everyone, so its ranking is memoized
+SHOWCASE_TRENDING_TTL_SECONDS = float(os.getenv("SHOWCASE_TRENDING_TTL_SECONDS", "60"))
+_trending_cache: Dict[int, Tuple[float, List[ShowcaseProjectResponse]]] = {}
+_trending_lock = threading.Lock()
+
+
+# Batch hydration: one query per kind of related row for a whole page
+
+
+def _load_owners(db: Session, projects: Iterable[Project]) -> Dict[str, Member]:
+    """Owners of the projects keyed by owner_id (their Keycloak user id)"""
+    owner_ids = {project.owner_id for project in projects if project.owner_id}
+    if not owner_ids:
+        return {}
+    members = db.execute(
+        select(Member).where(Member.keycloak_user_id.in_(owner_ids))
+    ).scalars()
+    return {member.keycloak_user_id: member for member in members}
+
+
+def _collaborator_counts(db: Session, project_ids: List[str]) -> Dict[str, int]:
+    if not project_ids:
+        return {}
+    rows = db.execute(
+        select(ProjectCollaborator.project_id, func.count(ProjectCollaborator.id))
+        .where(ProjectCollaborator.project_id.in_(project_ids))
+        .group_by(ProjectCollaborator.project_id)
+    )
+    return dict(rows.all())
+
+
+def _viewer_flags(
+    db: Session, project_ids: List[str], owners: Dict[str, Member], user_id: str
+) -> Tuple[Set[str], Set[str], Set[str]]:
+    """Projects the viewer liked and bookmarked, and owners they follow"""
+    if not project_ids:
+        return set(), set(), set()
+    liked = db.execute(
+        select(ProjectLike.project_id).where(
+            ProjectLike.user_id == user_id, ProjectLike.project_id.in_(project_ids)
+        )
+    ).scalars()
+    bookmarked = db.execute(
+        select(ProjectBookmark.project_id).where(
+            ProjectBookmark.user_id == user_id,
+            ProjectBookmark.project_id.in_(project_ids),
+        )
+    ).scalars()
+    followed: Iterable[str] = ()
+    owner_ids = [str(owner.id) for owner in owners.values()]
+    if owner_ids:
+        followed = db.execute(
+            select(ProjectFollow.owner_id).where(
+                ProjectFollow.follower_id == user_id,
+                ProjectFollow.owner_id.in_(owner_ids),
+            )
+        ).scalars()
+    return set(liked), set(bookmarked), set(followed)
+
+
+def _showcase_response(
+    project: Project,
+    owner: Optional[Member],
+    collaborator_count: int = 0,
+    **fields,
+) -> ShowcaseProjectResponse:
+    """Showcase card for a project; ``fields`` override the defaults"""
+    values = dict(
+        project_id=project.project_id,
+        name=project.name,
+        description=project.description,
+        owner_id=project.owner_id,
+        owner_name=(
+            f"{owner.first_name} {owner.last_name}" if owner else "Unknown Maker"
+        ),
+        owner_avatar=owner.profile_image_url if owner else None,
+        makerspace_name=None,
+        makerspace_id=project.makerspace_id,
+        visibility="public",
+        status=getattr(project.status, "value", project.status),
+        difficulty_level=project.difficulty_level or "intermediate",
+        estimated_time=project.estimated_duration or "2-4 hours",
+        category=project.category or "Electronics",
+        subcategories=project.subcategories or [],
+        tags=project.tags or [],
+        skills_required=project.skills_required or ["3D Printing", "Electronics"],
+        equipment_used=["3D Printer", "Soldering Station"],
+        view_count=project.view_count or 0,
+        like_count=project.like_count or 0,
+        fork_count=project.fork_count or 0,
+        comment_count=project.comment_count or 0,
+        download_count=project.download_count or 0,
+        collaborator_count=collaborator_count,
+        completion_rate=75,
+        thumbnail_url=project.thumbnail_url,
+        gallery_images=project.gallery_images or [],
+        demo_video_url=project.demo_video_url,
+        bill_of_materials=[],
+        total_estimated_cost=project.estimated_cost or 50,
+        is_featured=bool(project.is_featured),
+        is_staff_pick=False,
+        is_trending=False,
+        awards=[],
+        created_at=project.created_at.isoformat(),
+        updated_at=project.updated_at.isoformat(),
+        featured_at=None,
+        is_liked=False,
+        is_bookmarked=False,
+        is_following_owner=False,
+    )
+    values.update(fields)
+    return ShowcaseProjectResponse(**values)
+
 
 @router.get("/showcase", response_model=List[ShowcaseProjectResponse])
 async def get_showcase_projects(
@@ -42,7 +161,7 @@ async def get_showcase_projects(
     limit: int = Query(50, ge=1, le=100, description="Number of projects to return"),
     offset: int = Query(0, ge=0, description="Number of projects to skip"),
     current_user=Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: Session = Depends(get_db),
 ):
     """Get showcase projects with filtering and sorting options"""
     showcase_projects = []
@@ -71,126 +190,53 @@ async def get_showcase_projects(
     elif sort_by == "recently_updated":
         stmt = stmt.order_by(Project.updated_at.desc())
     else:  # trending
-        stmt = stmt.order_by(
-            (Project.like_count + Project.view_count + Project.fork_count).desc(),
-            Project.updated_at.desc(),
-        )
+        stmt = stmt.order_by(Project.trending_score.desc(), Project.updated_at.desc())
     # Apply pagination
     stmt = stmt.offset(offset).limit(limit)
-    result = await db.execute(stmt)
-    projects = result.scalars().all()
+    projects = db.execute(stmt).scalars().all()
+
+    project_ids = [project.project_id for project in projects]
+    owners = _load_owners(db, projects)
+    collaborator_counts = _collaborator_counts(db, project_ids)
+    liked, bookmarked, followed = _viewer_flags(
+        db, project_ids, owners, current_user["user_id"]
+    )
     for project in projects:
         try:
-            # Get project owner info
-            owner_result = await db.execute(
-                select(Member).where(Member.id == project.owner_id)
-            )
-            owner = (
-                owner_result.scalars().first() if hasattr(project, "owner_id") else None
-            )
-            # Get collaborator count
-            await db.execute(
-                select(ProjectCollaborator).where(
-                    ProjectCollaborator.project_id == project.project_id
-                )
-            )
-            # collaborator_count = len(collab_result.scalars().all()) if hasattr(project, 'project_id') else 0 # Removed unused variable
+            owner = owners.get(project.owner_id)
             # Calculate completion rate (mock calculation)
-            completion_rate = min(
-                95, max(10, 50 + (getattr(project, "like_count", 0) * 2))
-            )
-            # Generate mock BOM data
-            bom_items = [
-                {
-                    "name": f"Component {i + 1}",
-                    "quantity": i + 1,
-                    "estimated_cost": (i + 1) * 5,
-                    "supplier": ("MakrX Store" if i % 2 == 0 else "Local Supplier"),
-                }
-                for i in range(min(5, getattr(project, "bom_items_count", 0) or 0))
+            completion_rate = min(95, max(10, 50 + ((project.like_count or 0) * 2)))
+            skills_required = project.skills_required or [
+                "3D Printing",
+                "Electronics",
+                "Programming",
             ]
-            skills_required = (
-                getattr(project, "required_skills", None)
-                or ["3D Printing", "Electronics", "Programming"][:3]
-            )
-            equipment_used = ["3D Printer", "Soldering Station", "Multimeter"][:3]
+            equipment_used = ["3D Printer", "Soldering Station", "Multimeter"]
             awards = []
-            if getattr(project, "is_featured", False):
+            if project.is_featured:
                 awards.append(
-                    {
-                        "type": "featured",
-                        "name": "Featured Project",
-                        "icon": "⭐",
-                        "awarded_at": (
-                            project.featured_at.isoformat()
-                            if getattr(project, "featured_at", None)
-                            else datetime.utcnow().isoformat()
-                        ),
-                    }
+                    ProjectAward(
+                        type="featured",
+                        name="Featured Project",
+                        icon="⭐",
+                        awarded_at=datetime.utcnow().isoformat(),
+                    )
+                )
+            showcase_projects.append(
+                _showcase_response(
+                    project,
+                    owner,
+                    collaborator_counts.get(project.project_id, 0),
+                    skills_required=skills_required,
+                    equipment_used=equipment_used,
+                    completion_rate=completion_rate,
+                    total_estimated_cost=0,
+                    awards=awards,
+                    is_liked=project.project_id in liked,
+                    is_bookmarked=project.project_id in bookmarked,
+                    is_following_owner=bool(owner and str(owner.id) in followed),
                 )
-            is_liked = bool(
-                await get_project_like(db, project.id, current_user["user_id"])
-            )
-            is_bookmarked = bool(
-                await get_project_bookmark(db, project.id, current_user["user_id"])
-            )
-            is_following_owner = bool(
-                owner
-                and await get_project_follow(db, str(owner.id), current_user["user_id"])
-            )
-            showcase_project = ShowcaseProjectResponse(
-                project_id=project.project_id,
-                name=project.name,
-                description=project.description,
-                owner_id=project.owner_id,
-                owner_name=(
-                    f"{owner.first_name} {owner.last_name}"
-                    if owner
-                    else "Unknown Maker"
-                ),
-                owner_avatar=(
-                    getattr(owner, "profile_image_url", None) if owner else None
-                ),
-                makerspace_name=None,
-                makerspace_id=project.makerspace_id,
-                visibility="public",
-                status=project.status,
-                difficulty_level=getattr(project, "difficulty_level", "intermediate"),
-                estimated_time=getattr(project, "estimated_time", "2-4 hours"),
-                category=getattr(project, "category", "Electronics"),
-                subcategories=getattr(project, "subcategories", []),
-                tags=getattr(project, "tags", []),
-                skills_required=skills_required,
-                equipment_used=equipment_used,
-                view_count=getattr(project, "view_count", 0),
-                like_count=getattr(project, "like_count", 0),
-                fork_count=getattr(project, "fork_count", 0),
-                comment_count=getattr(project, "comment_count", 0),
-                download_count=getattr(project, "download_count", 0),
-                completion_rate=completion_rate,
-                thumbnail_url=getattr(project, "thumbnail_url", None),
-                gallery_images=getattr(project, "gallery_images", []),
-                demo_video_url=getattr(project, "demo_video_url", None),
-                bill_of_materials=[ShowcaseBOMItem(**item) for item in bom_items],
-                total_estimated_cost=sum(
-                    item["estimated_cost"] * item["quantity"] for item in bom_items
-                ),
-                is_featured=getattr(project, "is_featured", False),
-                is_staff_pick=getattr(project, "is_staff_pick", False),
-                is_trending=getattr(project, "is_trending", False),
-                awards=[ProjectAward(**award) for award in awards],
-                created_at=project.created_at.isoformat(),
-                updated_at=project.updated_at.isoformat(),
-                featured_at=(
-                    project.featured_at.isoformat()
-                    if getattr(project, "featured_at", None)
-                    else None
-                ),
-                is_liked=is_liked,
-                is_bookmarked=is_bookmarked,
-                is_following_owner=is_following_owner,
             )
-            showcase_projects.append(showcase_project)
         except Exception as e:
             import logging
 
@@ -282,7 +328,7 @@ async def get_showcase_filters(
 async def get_featured_projects(
     limit: int = Query(10, ge=1, le=20),
     current_user=Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: Session = Depends(get_db),
 ):
     """Get featured projects for carousel"""
     stmt = (
@@ -292,78 +338,27 @@ async def get_featured_projects(
             Project.is_featured,
             Project.is_approved,
         )
-        .order_by(Project.featured_at.desc())
+        .order_by(Project.updated_at.desc())
         .limit(limit)
     )
-    result = await db.execute(stmt)
-    featured_projects = result.scalars().all()
-    showcase_projects = []
-    for project in featured_projects:
-        owner_result = await db.execute(
-            select(Member).where(Member.id == project.owner_id)
-        )
-        owner = owner_result.scalars().first() if hasattr(project, "owner_id") else None
-        showcase_project = ShowcaseProjectResponse(
-            project_id=project.project_id,
-            name=project.name,
-            description=project.description,
-            owner_id=project.owner_id,
-            owner_name=(
-                f"{owner.first_name} {owner.last_name}" if owner else "Unknown Maker"
-            ),
-            owner_avatar=(getattr(owner, "profile_image_url", None) if owner else None),
-            makerspace_name=None,
-            makerspace_id=project.makerspace_id,
-            visibility="public",
-            status=project.status,
-            difficulty_level=getattr(project, "difficulty_level", "intermediate"),
-            estimated_time=getattr(project, "estimated_time", "2-4 hours"),
-            category=getattr(project, "category", "Electronics"),
-            subcategories=getattr(project, "subcategories", []),
-            tags=getattr(project, "tags", []),
-            skills_required=getattr(
-                project, "required_skills", ["3D Printing", "Electronics"]
-            ),
-            equipment_used=["3D Printer", "Soldering Station"],
-            view_count=getattr(project, "view_count", 0),
-            like_count=getattr(project, "like_count", 0),
-            fork_count=getattr(project, "fork_count", 0),
-            comment_count=getattr(project, "comment_count", 0),
-            download_count=getattr(project, "download_count", 0),
-            completion_rate=75,
-            thumbnail_url=getattr(project, "thumbnail_url", None),
-            gallery_images=getattr(project, "gallery_images", []),
-            demo_video_url=getattr(project, "demo_video_url", None),
-            bill_of_materials=[],
-            total_estimated_cost=getattr(project, "estimated_cost", 50),
+    featured_projects = db.execute(stmt).scalars().all()
+    owners = _load_owners(db, featured_projects)
+    return [
+        _showcase_response(
+            project,
+            owners.get(project.owner_id),
             is_featured=True,
-            is_staff_pick=getattr(project, "is_staff_pick", False),
-            is_trending=getattr(project, "is_trending", False),
             awards=[
                 ProjectAward(
                     type="featured",
                     name="Featured Project",
                     icon="⭐",
-                    awarded_at=(
-                        project.featured_at.isoformat()
-                        if project.featured_at
-                        else datetime.utcnow().isoformat()
-                    ),
+                    awarded_at=datetime.utcnow().isoformat(),
                 )
             ],
-            created_at=project.created_at.isoformat(),
-            updated_at=project.updated_at.isoformat(),
-            featured_at=(
-                project.featured_at.isoformat()
-                if getattr(project, "featured_at", None)
-                else None
-            ),
-            is_liked=False,
-            is_bookmarked=False,
-            is_following_owner=False,
         )
-        showcase_projects.append(showcase_project)
-    return showcase_projects
+        for project in featured_projects
+    ]
 
 
 # Compatibility alias for frontend expecting a featured maker endpoint
@@ -376,7 +371,7 @@ async def get_featured_maker_alias(
     Shape is compatible with the frontend MakerSpotlight component minimal needs.
     """
     # Reuse featured projects list and adapt a minimal response
-    projects = await get_featured_projects(current_user=current_user, db=db)
+    projects = await get_featured_projects(limit=1, current_user=current_user, db=db)
     if not projects:
         return {
             "user_id": "",
@@ -428,69 +423,40 @@ async def get_featured_maker_alias(
 async def get_trending_projects(
     limit: int = Query(10, ge=1, le=20),
     current_user=Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: Session = Depends(get_db),
 ):
     """Get trending projects for widget"""
+    now = time.monotonic()
+    with _trending_lock:
+        cached = _trending_cache.get(limit)
+    if cached and cached[0] > now:
+        return cached[1]
 
-    # Get projects with high recent activity
-    recent_date = datetime.utcnow() - timedelta(days=7)
+    # Projects with at least the engagement of one view a week ago
+    recent_floor = event_score(datetime.utcnow() - timedelta(days=7))
 
     stmt = (
         select(Project)
         .filter(
             Project.visibility == ProjectVisibility.PUBLIC,
-            Project.updated_at >= recent_date,
             Project.is_approved,
+            Project.trending_score >= recent_floor,
         )
-        .order_by((Project.like_count + Project.view_count + Project.fork_count).desc())
+        .order_by(Project.trending_score.desc(), Project.updated_at.desc())
         .limit(limit)
     )
-    result = await db.execute(stmt)
-    trending_projects_data = result.scalars().all()
+    trending_projects_data = db.execute(stmt).scalars().all()
+    owners = _load_owners(db, trending_projects_data)
+    collaborator_counts = _collaborator_counts(
+        db, [project.project_id for project in trending_projects_data]
+    )
 
     # Convert to showcase format
-    showcase_projects = []
-    for project in trending_projects_data:
-        owner_result = await db.execute(
-            select(Member).where(Member.id == project.owner_id)
-        )
-        owner = owner_result.scalars().first() if hasattr(project, "owner_id") else None
-        showcase_project = ShowcaseProjectResponse(
-            project_id=project.project_id,
-            name=project.name,
-            description=project.description,
-            owner_id=project.owner_id,
-            owner_name=(
-                f"{owner.first_name} {owner.last_name}" if owner else "Unknown Maker"
-            ),
-            owner_avatar=(getattr(owner, "profile_image_url", None) if owner else None),
-            makerspace_name=None,
-            makerspace_id=project.makerspace_id,
-            visibility="public",
-            status=project.status,
-            difficulty_level=getattr(project, "difficulty_level", "intermediate"),
-            estimated_time=getattr(project, "estimated_time", "2-4 hours"),
-            category=getattr(project, "category", "Electronics"),
-            subcategories=getattr(project, "subcategories", []),
-            tags=getattr(project, "tags", []),
-            skills_required=getattr(
-                project, "required_skills", ["3D Printing", "Electronics"]
-            ),
-            equipment_used=["3D Printer", "Soldering Station"],
-            view_count=getattr(project, "view_count", 0),
-            like_count=getattr(project, "like_count", 0),
-            fork_count=getattr(project, "fork_count", 0),
-            comment_count=getattr(project, "comment_count", 0),
-            download_count=getattr(project, "download_count", 0),
-            completion_rate=75,
-            thumbnail_url=getattr(project, "thumbnail_url", None),
-            gallery_images=getattr(project, "gallery_images", []),
-            demo_video_url=getattr(project, "demo_video_url", None),
-            bill_of_materials=[],
-            total_estimated_cost=getattr(project, "estimated_cost", 50),
-            is_featured=getattr(project, "is_featured", False),
-            is_staff_pick=getattr(project, "is_staff_pick", False),
-            is_trending=getattr(project, "is_trending", False),
+    showcase_projects = [
+        _showcase_response(
+            project,
+            owners.get(project.owner_id),
+            collaborator_counts.get(project.project_id, 0),
             awards=[
                 ProjectAward(
                     type="trending",
@@ -499,18 +465,12 @@ async def get_trending_projects(
                     awarded_at=datetime.utcnow().isoformat(),
                 )
             ],
-            created_at=project.created_at.isoformat(),
-            updated_at=project.updated_at.isoformat(),
-            featured_at=(
-                project.featured_at.isoformat()
-                if getattr(project, "featured_at", None)
-                else None
-            ),
-            is_liked=False,
-            is_bookmarked=False,
-            is_following_owner=False,
         )
-        showcase_projects.append(showcase_project)
+        for project in trending_projects_data
+    ]
+    expires_at = now + SHOWCASE_TRENDING_TTL_SECONDS
+    with _trending_lock:
+        _trending_cache[limit] = (expires_at, showcase_projects)
     return showcase_projects
 
 
@@ -563,6 +523,22 @@ async def get_project_stats(db: AsyncSession = Depends(get_db)):
     )
 
 
+@router.post("/{project_id}/view")
+async def view_project(
+    project_id: str,
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Count a view of a public project towards its stats and trending score
+
+    Repeat views by the same user within PROJECT_VIEW_WINDOW_HOURS count once.
+    """
+    if not record_project_view(db, project_id, current_user["user_id"]):
+        raise HTTPException(status_code=404, detail="Project not found")
+    db.commit()
+    return {"status": "viewed"}
+
+
 @router.post("/{project_id}/like")
 async def like_project(
     project_id: str,
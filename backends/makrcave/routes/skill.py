@@ -4,7 +4,6 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from ..crud import skill as skill_crud
-from ..crud.equipment import get_equipment
 from ..database import get_db
 from ..dependencies import get_current_user, require_roles
 from ..models.skill import RequestStatus, SkillStatus
@@ -359,33 +358,39 @@ async def check_bulk_equipment_access(
     else:
         check_user_id = current_user.id
 
-    # Get all equipment in makerspace
-    equipment_list = get_equipment(db=db, makerspace_id=makerspace_id)
-
-    access_checks = []
-    accessible_count = 0
-
-    for equipment in equipment_list:
-        access_check = skill_crud.check_equipment_access(
-            db=db, user_id=check_user_id, equipment_id=equipment.id
-        )
-        access_checks.append(access_check)
-        if access_check.can_access:
-            accessible_count += 1
+    access_checks = skill_crud.check_equipment_access_bulk(
+        db=db, user_id=check_user_id, makerspace_id=makerspace_id
+    )
+    accessible_count = sum(1 for check in access_checks if check.can_access)
 
     return BulkAccessCheck(
         user_id=check_user_id,
         equipment_access=access_checks,
         summary={
-            "total_equipment": len(equipment_list),
+            "total_equipment": len(access_checks),
             "accessible_equipment": accessible_count,
             "access_percentage": (
-                (accessible_count / len(equipment_list) * 100) if equipment_list else 0
+                (accessible_count / len(access_checks) * 100) if access_checks else 0
             ),
         },
     )
 
 
+@router.get("/access/equipment/{equipment_id}/users")
+async def get_equipment_authorized_users(
+    equipment_id: str,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_roles(["super_admin", "makerspace_admin"])),
+):
+    """List users holding every skill the equipment requires (Admin only)"""
+    authorized = skill_crud.get_equipment_authorized_users(
+        db=db, equipment_id=equipment_id
+    )
+    if authorized is None:
+        raise HTTPException(status_code=404, detail="Equipment not found")
+    return authorized
+
+
 # --- Compat alias for legacy frontend endpoint ---
 
 
@@ -401,6 +401,7 @@ class AvailabilityCheckRequest(BaseModel):
     end_date: datetime
     duration_hours: Optional[float] = None
     user_id: Optional[str] = None  # For skill-based availability
+    slot_minutes: int = Field(60, ge=5, le=1440)
 
 
 class AvailabilitySlot(BaseModel):
@@ -425,6 +426,29 @@ class AvailabilityResponse(BaseModel):
     recommendations: List[str] = []
 
 
+class NextFreeSlotRequest(BaseModel):
+    equipment_ids: List[str] = Field(..., min_length=1, max_length=200)
+    duration_hours: float = Field(..., gt=0, le=168)
+    earliest_start: Optional[datetime] = None  # Defaults to now
+    slot_minutes: int = Field(15, ge=5, le=1440)
+    search_horizon_days: int = Field(30, ge=1, le=365)
+
+
+class EquipmentFreeSlot(BaseModel):
+    equipment_id: str
+    start_time: datetime
+    end_time: datetime
+
+
+class NextFreeSlotResponse(BaseModel):
+    duration_hours: float
+    search_start: datetime
+    search_end: datetime
+    next_free_slot: Optional[EquipmentFreeSlot] = None  # Earliest across machines
+    free_slots: List[EquipmentFreeSlot]  # Earliest per machine, soonest first
+    unavailable_equipment_ids: List[str] = []  # Nothing free within the horizon
+
+
 # Bulk operations
 class BulkReservationAction(BaseModel):
     action: str = Field(..., pattern="^(approve|reject|cancel|update_status)$")
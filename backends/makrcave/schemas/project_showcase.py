@@ -46,6 +46,7 @@ class ShowcaseProjectResponse(BaseModel):
     fork_count: int
     comment_count: int
     download_count: int
+    collaborator_count: int = 0
     completion_rate: int  # Percentage
 
     # Media and assets
@@ -0,0 +1,182 @@
+"""
+Benchmark analytics dashboards on raw rows vs rollups plus live tail
+
+Builds a synthetic year of member activity, transactions and equipment
+utilization for one makerspace in a throwaway SQLite file, then times the
+usage/revenue/member analytics over 365 days: first straight from raw rows
+(no watermark yet), then after the backfill refresh from the rollups plus
+the raw tail; transactions are read raw either way. Also times the backfill
+and a one-hour incremental refresh.
+
+    python -m backends.makrcave.scripts.bench_analytics_rollups \
+        --activities 50000 --transactions 10000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from ..database import Base
+from ..models.billing import Transaction, TransactionStatus, TransactionType
+from ..models.enhanced_analytics import EquipmentUtilizationMetrics
+from ..models.enhanced_member import Member, MemberActivityLog
+from ..services import analytics_rollups
+from ..services.real_analytics_service import RealAnalyticsService
+
+MAKERSPACE = uuid.uuid4()
+ACTIVITY_TYPES = ["login", "checkin", "reservation", "project_update"]
+
+
+def _seed(db, members, activities, transactions, equipment, now):
+    rng = random.Random(7)
+    year_ago = now - timedelta(days=365)
+    member_ids = [uuid.uuid4() for _ in range(members)]
+    db.execute(
+        insert(Member),
+        [
+            {
+                "id": member_id,
+                "keycloak_user_id": f"kc-{i}",
+                "email": f"m{i}@example.com",
+                "first_name": "Member",
+                "last_name": str(i),
+                "membership_plan_id": uuid.uuid4(),
+                "makerspace_id": MAKERSPACE,
+                "start_date": year_ago,
+                "end_date": now + timedelta(days=365),
+            }
+            for i, member_id in enumerate(member_ids)
+        ],
+    )
+
+    def moment():
+        return year_ago + timedelta(seconds=rng.uniform(0, 365 * 86400))
+
+    db.execute(
+        insert(MemberActivityLog),
+        [
+            {
+                "id": uuid.uuid4(),
+                "member_id": rng.choice(member_ids),
+                "activity_type": rng.choice(ACTIVITY_TYPES),
+                "created_at": moment(),
+            }
+            for _ in range(activities)
+        ],
+    )
+    db.execute(
+        insert(Transaction),
+        [
+            {
+                "id": str(uuid.uuid4()),
+                "user_id": f"kc-{rng.randrange(members)}",
+                "makerspace_id": str(MAKERSPACE),
+                "amount": round(rng.uniform(5, 200), 2),
+                "type": TransactionType.SERVICE,
+                "status": (
+                    TransactionStatus.SUCCESS
+                    if rng.random() < 0.9
+                    else TransactionStatus.FAILED
+                ),
+                "created_at": moment(),
+            }
+            for _ in range(transactions)
+        ],
+    )
+    equipment_ids = [uuid.uuid4() for _ in range(equipment)]
+    db.execute(
+        insert(EquipmentUtilizationMetrics),
+        [
+            {
+                "id": uuid.uuid4(),
+                "makerspace_id": MAKERSPACE,
+                "equipment_id": equipment_id,
+                "date": year_ago + timedelta(days=day),
+                "period_type": "daily",
+                "total_available_hours": 12.0,
+                "total_used_hours": rng.uniform(0, 12),
+                "usage_frequency": rng.randrange(0, 10),
+                "created_at": year_ago + timedelta(days=day + 1),
+            }
+            for equipment_id in equipment_ids
+            for day in range(365)
+        ],
+    )
+    db.commit()
+
+
+def _time_dashboards(db, repeat):
+    service = RealAnalyticsService(db)
+    space = str(MAKERSPACE)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for result in (
+            service.get_usage_analytics(space, days=365),
+            service.get_revenue_analytics(space, days=365),
+            service.get_member_analytics(space, days=365),
+        ):
+            assert "error" not in result, result
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def run(members, activities, transactions, equipment, repeat):
+    path = os.path.join(tempfile.mkdtemp(), "bench_rollups.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    now = datetime.utcnow()
+
+    started = time.perf_counter()
+    _seed(db, members, activities, transactions, equipment, now)
+    print(
+        f"seeded {activities} activities, {transactions} transactions, "
+        f"{equipment * 365} equipment-days in {time.perf_counter() - started:.1f}s"
+    )
+
+    raw_ms = _time_dashboards(db, repeat)
+
+    started = time.perf_counter()
+    analytics_rollups.refresh_rollups(db, now=now - timedelta(hours=1))
+    backfill = time.perf_counter() - started
+    started = time.perf_counter()
+    analytics_rollups.refresh_rollups(db, now=now)
+    incremental = (time.perf_counter() - started) * 1000
+
+    rollup_ms = _time_dashboards(db, repeat)
+
+    print(f"{'dashboards (usage+revenue+members, 365d)':<44}{'ms':>10}")
+    print(f"{'  raw rows':<44}{raw_ms:>10.1f}")
+    print(f"{'  rollups + live tail':<44}{rollup_ms:>10.1f}")
+    print(f"{'backfill refresh (s)':<44}{backfill:>10.2f}")
+    print(f"{'incremental refresh, one hour (ms)':<44}{incremental:>10.1f}")
+    db.close()
+    engine.dispose()
+    os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--members", type=int, default=200)
+    parser.add_argument("--activities", type=int, default=50_000)
+    parser.add_argument("--transactions", type=int, default=10_000)
+    parser.add_argument("--equipment", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+    run(
+        args.members,
+        args.activities,
+        args.transactions,
+        args.equipment,
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
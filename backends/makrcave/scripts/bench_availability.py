@@ -0,0 +1,209 @@
+"""
+Benchmark equipment availability: per-slot scans vs the sweep-line engine
+
+Books a month of dense, back-to-back reservations (a share of them pending
+or cancelled) on a set of machines in a throwaway SQLite file, then times
+two questions over the whole month:
+
+- free slots per machine: the previous check_availability (one query per
+  machine, every reservation tested for every slot) vs one query for all
+  machines swept against the slot grid;
+- next free slot of a given length on any machine: stepping the grid and
+  calling the conflict check per candidate vs next_free_slots.
+
+Both sides must give the same answers; the script fails otherwise.
+
+    python -m backends.makrcave.scripts.bench_availability \
+        --machines 40 --days 30 --slot-minutes 15
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from ..models.equipment_reservations import (
+    EnhancedEquipmentReservation,
+    ReservationStatus,
+)
+from ..services.availability import (
+    BLOCKING_STATUSES,
+    busy_intervals,
+    ceil_to_grid,
+    find_conflict,
+    grid_slots,
+    next_free_slots,
+)
+
+START = datetime(2026, 3, 1)
+STATUSES = [ReservationStatus.APPROVED] * 8 + [
+    ReservationStatus.ACTIVE,
+    ReservationStatus.PENDING,
+    ReservationStatus.CANCELLED,
+]
+
+
+def _seed(db, machines, days):
+    rng = random.Random(3)
+    end = START + timedelta(days=days)
+    rows = []
+    for machine in range(machines):
+        cursor = START + timedelta(minutes=rng.randrange(0, 60))
+        while cursor < end:
+            hours = rng.choice([0.5, 1, 1, 2, 2, 3, 4])
+            rows.append(
+                {
+                    "id": f"r-{len(rows)}",
+                    "equipment_id": f"machine-{machine:03d}",
+                    "user_id": f"user-{rng.randrange(500)}",
+                    "user_name": "Member",
+                    "requested_start": cursor,
+                    "requested_end": cursor + timedelta(hours=hours),
+                    "duration_hours": hours,
+                    "status": rng.choice(STATUSES),
+                }
+            )
+            cursor += timedelta(hours=hours, minutes=rng.choice([0, 0, 15, 30, 45]))
+    db.execute(insert(EnhancedEquipmentReservation), rows)
+    db.commit()
+    return len(rows)
+
+
+def _legacy_slots(db, equipment_id, start, end, granularity):
+    """The previous check_availability loop, kept for comparison"""
+    reservation = EnhancedEquipmentReservation
+    existing = (
+        db.query(reservation)
+        .filter(
+            reservation.equipment_id == equipment_id,
+            reservation.status.in_(BLOCKING_STATUSES),
+            reservation.requested_start < end,
+            reservation.requested_end > start,
+        )
+        .all()
+    )
+    slots = []
+    current = start
+    while current < end:
+        slot_end = min(current + granularity, end)
+        if not any(
+            res.requested_start < slot_end and res.requested_end > current
+            for res in existing
+        ):
+            slots.append(current)
+        current = slot_end
+    return slots
+
+
+def _legacy_next_free(db, equipment_id, after, until, duration, granularity):
+    """Step the grid and run the per-call conflict check at each candidate"""
+    candidate = ceil_to_grid(after, granularity)
+    while candidate + duration <= until:
+        if find_conflict(db, equipment_id, candidate, candidate + duration) is None:
+            return candidate, candidate + duration
+        candidate += granularity
+    return None
+
+
+def _timed(label, counter, fn):
+    statements = counter["statements"]
+    started = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"{label:<34}{elapsed:>11.1f}{counter['statements'] - statements:>12}")
+    return result
+
+
+def run(machines, days, slot_minutes, duration_hours):
+    path = os.path.join(tempfile.mkdtemp(), "bench_availability.db")
+    engine = create_engine(f"sqlite:///{path}")
+    EnhancedEquipmentReservation.metadata.create_all(
+        engine, tables=[EnhancedEquipmentReservation.__table__]
+    )
+    db = sessionmaker(bind=engine)()
+    counter = {"statements": 0}
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda *args: counter.__setitem__("statements", counter["statements"] + 1),
+    )
+
+    bookings = _seed(db, machines, days)
+    equipment_ids = [f"machine-{machine:03d}" for machine in range(machines)]
+    end = START + timedelta(days=days)
+    granularity = timedelta(minutes=slot_minutes)
+    duration = timedelta(hours=duration_hours)
+    print(
+        f"{machines} machines, {days} days, {bookings} reservations, "
+        f"{slot_minutes} min slots, {duration_hours} h next-free search"
+    )
+    print(f"{'':<34}{'ms':>11}{'statements':>12}")
+
+    legacy = _timed(
+        "free slots: per-slot scan",
+        counter,
+        lambda: {
+            equipment_id: _legacy_slots(db, equipment_id, START, end, granularity)
+            for equipment_id in equipment_ids
+        },
+    )
+
+    def sweep():
+        busy = busy_intervals(db, equipment_ids, START, end)
+        return {
+            equipment_id: [
+                slot_start
+                for slot_start, _, free in grid_slots(
+                    intervals, START, end, granularity
+                )
+                if free
+            ]
+            for equipment_id, intervals in busy.items()
+        }
+
+    swept = _timed("free slots: sweep-line", counter, sweep)
+    assert swept == legacy, "free slots differ"
+
+    legacy_next = _timed(
+        "next free: per-candidate check",
+        counter,
+        lambda: {
+            equipment_id: _legacy_next_free(
+                db, equipment_id, START, end, duration, granularity
+            )
+            for equipment_id in equipment_ids
+        },
+    )
+    engine_next = _timed(
+        "next free: next_free_slots",
+        counter,
+        lambda: next_free_slots(
+            db, equipment_ids, duration, START, granularity, end - START
+        ),
+    )
+    assert engine_next == legacy_next, "next free slots differ"
+    earliest = min(slot for slot in engine_next.values() if slot)
+    print(f"earliest {duration_hours} h slot on any machine: {earliest[0]}")
+
+    db.close()
+    engine.dispose()
+    os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--machines", type=int, default=40)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--slot-minutes", type=int, default=15)
+    parser.add_argument("--duration-hours", type=float, default=3)
+    args = parser.parse_args()
+    run(args.machines, args.days, args.slot_minutes, args.duration_hours)
+
+
+if __name__ == "__main__":
+    main()
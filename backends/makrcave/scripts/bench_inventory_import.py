@@ -0,0 +1,195 @@
+"""
+Benchmark CSV inventory import: per-row create_item vs streamed chunks
+
+Generates a partner-space CSV (a share of rows repeat an earlier product
+code, a share are invalid) and imports it into a throwaway SQLite file twice:
+with the previous importer, which builds every row into create_item and
+commits per row (plus progress every 10 rows), and with
+InventoryCRUD.process_bulk_import, which streams chunks through bulk
+INSERT/UPDATE with one commit per chunk. Reports wall time, rows/s and the
+number of SQL statements and commits.
+
+On SQLite the per-row path reports every row as failed: create_item writes
+the schema enum values, and its refresh() cannot map them back to the
+model enum. The item is already committed by then, so only its usage log
+is skipped, which slightly flatters the old numbers.
+
+    python -m backends.makrcave.scripts.bench_inventory_import \
+        --rows 50000 --chunk-size 1000
+"""
+
+import argparse
+import csv
+import io
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from ..crud.inventory import InventoryCRUD
+from ..models.inventory import BulkImportJob, InventoryItem, InventoryUsageLog
+from ..schemas.inventory import InventoryItemCreate
+
+CATEGORIES = ["filament", "resin", "tools", "electronics", "components"]
+FIELDS = ["name", "category", "quantity", "unit", "min_threshold", "location"]
+FIELDS += ["product_code", "price", "supplier", "notes"]
+
+
+def _csv(rows, duplicate_share, invalid_share):
+    rng = random.Random(11)
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=FIELDS)
+    writer.writeheader()
+    for i in range(rows):
+        code = i
+        if i and rng.random() < duplicate_share:
+            code = rng.randrange(i)
+        writer.writerow(
+            {
+                "name": f"Part {i}",
+                "category": (
+                    "unknown"
+                    if rng.random() < invalid_share
+                    else rng.choice(CATEGORIES)
+                ),
+                "quantity": rng.randrange(0, 500),
+                "unit": "pcs",
+                "min_threshold": rng.randrange(0, 20),
+                "location": f"Shelf {rng.randrange(40)}",
+                "product_code": f"SKU-{code:06d}",
+                "price": round(rng.uniform(0.1, 80), 2),
+                "supplier": "Partner Space",
+                "notes": "",
+            }
+        )
+    return out.getvalue()
+
+
+def _legacy_import(crud, csv_content, job_id, user_id):
+    """The per-row importer this change replaces, kept for comparison"""
+    rows = list(csv.DictReader(io.StringIO(csv_content)))
+    crud.db.add(
+        BulkImportJob(
+            id=job_id,
+            filename="upload.csv",
+            total_rows=len(rows),
+            created_by=user_id,
+            makerspace_id="ms-1",
+        )
+    )
+    crud.db.commit()
+    processed = successful = failed = 0
+    errors = []
+    for idx, row in enumerate(rows, start=1):
+        processed += 1
+        try:
+            crud.create_item(
+                InventoryItemCreate(
+                    name=row.get("name") or f"Imported Item {idx}",
+                    category=row.get("category") or "consumables",
+                    quantity=float(row.get("quantity") or 0),
+                    unit=row.get("unit") or "pcs",
+                    min_threshold=int(row.get("min_threshold") or 0),
+                    location=row.get("location") or "storage",
+                    product_code=row.get("product_code") or None,
+                    linked_makerspace_id="ms-1",
+                    price=float(row["price"]) if row.get("price") else None,
+                    supplier=row.get("supplier") or None,
+                    created_by=user_id,
+                )
+            )
+            successful += 1
+        except Exception as e:
+            failed += 1
+            errors.append({"row": idx, "error": str(e), "data": row})
+        if processed % 10 == 0 or processed == len(rows):
+            crud.update_import_job_progress(
+                job_id, processed, successful, failed, errors[-50:]
+            )
+    crud.update_import_job_progress(job_id, processed, successful, failed, errors)
+
+
+def _run(label, importer, csv_content, rows):
+    path = os.path.join(tempfile.mkdtemp(), "bench_import.db")
+    engine = create_engine(f"sqlite:///{path}")
+    tables = [
+        InventoryItem.__table__,
+        InventoryUsageLog.__table__,
+        BulkImportJob.__table__,
+    ]
+    InventoryItem.metadata.create_all(engine, tables=tables)
+    db = sessionmaker(bind=engine)()
+    counts = {"statements": 0, "commits": 0}
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda *args: counts.__setitem__("statements", counts["statements"] + 1),
+    )
+    event.listen(
+        db,
+        "after_commit",
+        lambda session: counts.__setitem__("commits", counts["commits"] + 1),
+    )
+
+    started = time.perf_counter()
+    importer(InventoryCRUD(db), csv_content)
+    elapsed = time.perf_counter() - started
+
+    job = db.query(BulkImportJob).one()
+    items = db.query(InventoryItem).count()
+    print(
+        f"{label:<12}{elapsed:>9.2f}{rows / elapsed:>11.0f}"
+        f"{counts['statements']:>12}{counts['commits']:>9}"
+        f"{job.successful_rows:>9}{job.failed_rows:>8}{items:>8}"
+    )
+    db.close()
+    engine.dispose()
+    os.remove(path)
+
+
+def run(rows, chunk_size, duplicate_share, invalid_share, skip_legacy):
+    csv_content = _csv(rows, duplicate_share, invalid_share)
+    print(f"{rows} rows, {len(csv_content) / 1e6:.1f} MB")
+    print(
+        f"{'importer':<12}{'s':>9}{'rows/s':>11}{'statements':>12}"
+        f"{'commits':>9}{'ok':>9}{'failed':>8}{'items':>8}"
+    )
+    if not skip_legacy:
+        _run(
+            "per-row",
+            lambda crud, content: _legacy_import(crud, content, "legacy", "u1"),
+            csv_content,
+            rows,
+        )
+    _run(
+        "streamed",
+        lambda crud, content: crud.process_bulk_import(
+            content, "streamed", "ms-1", "u1", "Importer", chunk_size=chunk_size
+        ),
+        csv_content,
+        rows,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--duplicate-share", type=float, default=0.1)
+    parser.add_argument("--invalid-share", type=float, default=0.01)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+    run(
+        args.rows,
+        args.chunk_size,
+        args.duplicate_share,
+        args.invalid_share,
+        args.skip_legacy,
+    )
+
+
+if __name__ == "__main__":
+    main()
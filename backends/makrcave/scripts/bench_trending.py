@@ -0,0 +1,204 @@
+"""
+Benchmark the showcase trending sort: per-request expression vs indexed score
+
+Seeds public and private projects with engagement counters in a throwaway
+SQLite file, seeds their trending scores from the counters (the job's first
+run), folds a burst of like/bookmark/view events into them, then times a
+trending showcase page three ways:
+
+- the previous ``like_count + view_count + fork_count`` sort (no decay);
+- the trending score sorted as an expression, which has to scan and sort;
+- the trending score read off idx_project_showcase_trending.
+
+The last two must return the same page; the script fails otherwise.
+
+    python -m backends.makrcave.scripts.bench_trending \
+        --projects 1000000 --events 100000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, insert, select, text
+from sqlalchemy.orm import sessionmaker
+
+from ..models.analytics_rollups import AnalyticsRollupWatermark
+from ..models.project import Project, ProjectTrendingEvent, ProjectVisibility
+from ..services import project_trending
+
+NOW = datetime.utcnow()
+KINDS = ["view"] * 6 + ["like"] * 3 + ["bookmark"]
+_CHUNK = 50_000
+
+
+def _seed(db, projects):
+    rng = random.Random(5)
+    for start in range(0, projects, _CHUNK):
+        db.execute(
+            insert(Project),
+            [
+                {
+                    "id": f"p-{n:07d}",
+                    "project_id": f"p-{n:07d}",
+                    "name": f"Project {n}",
+                    "creator_id": f"kc-{n % 5000}",
+                    "visibility": (
+                        ProjectVisibility.PUBLIC
+                        if rng.random() < 0.7
+                        else ProjectVisibility.PRIVATE
+                    ),
+                    "is_approved": rng.random() < 0.95,
+                    "view_count": int(rng.paretovariate(1.2)) - 1,
+                    "like_count": int(rng.paretovariate(1.5)) - 1,
+                    "fork_count": int(rng.paretovariate(2.5)) - 1,
+                    "created_at": NOW - timedelta(days=400),
+                    "updated_at": NOW - timedelta(hours=rng.uniform(0, 24 * 365)),
+                }
+                for n in range(start, min(start + _CHUNK, projects))
+            ],
+        )
+    db.commit()
+
+
+def _queue_events(db, projects, events):
+    rng = random.Random(9)
+    hot = [f"p-{rng.randrange(projects):07d}" for _ in range(max(1, events // 20))]
+    db.execute(
+        insert(ProjectTrendingEvent),
+        [
+            {
+                "project_id": rng.choice(hot),
+                "kind": rng.choice(KINDS),
+                "occurred_at": NOW - timedelta(minutes=rng.uniform(0, 24 * 60)),
+            }
+            for _ in range(events)
+        ],
+    )
+    db.commit()
+
+
+def _page(order_by, limit, offset=0):
+    return (
+        select(Project.project_id)
+        .where(Project.visibility == ProjectVisibility.PUBLIC, Project.is_approved)
+        .order_by(*order_by)
+        .offset(offset)
+        .limit(limit)
+    )
+
+
+def _plan(db, stmt):
+    compiled = stmt.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    rows = db.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return "; ".join(row[-1] for row in rows)
+
+
+def _timed(label, counter, fn, repeat):
+    statements = counter["statements"]
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = (time.perf_counter() - started) * 1000 / repeat
+    count = (counter["statements"] - statements) // repeat
+    print(f"{label:<40}{elapsed:>11.2f}{count:>12}")
+    return result
+
+
+def run(projects, events, limit, offset, repeat):
+    path = os.path.join(tempfile.mkdtemp(), "bench_trending.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Project.metadata.create_all(
+        engine,
+        tables=[
+            Project.__table__,
+            ProjectTrendingEvent.__table__,
+            AnalyticsRollupWatermark.__table__,
+        ],
+    )
+    db = sessionmaker(bind=engine)()
+    counter = {"statements": 0}
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda *args: counter.__setitem__("statements", counter["statements"] + 1),
+    )
+
+    started = time.perf_counter()
+    _seed(db, projects)
+    print(f"seeded {projects} projects in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    seeded = project_trending.refresh_trending_scores(db, now=NOW)["backfilled"]
+    print(
+        f"first run seeded {seeded} scores from counters "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+    _queue_events(db, projects, events)
+    started = time.perf_counter()
+    folded = project_trending.refresh_trending_scores(db, now=NOW)
+    print(
+        f"folded {folded['events']} events into {folded['projects']} projects "
+        f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+    )
+    db.execute(text("ANALYZE"))
+
+    legacy = _page(
+        [
+            (Project.like_count + Project.view_count + Project.fork_count).desc(),
+            Project.updated_at.desc(),
+        ],
+        limit,
+        offset,
+    )
+    # "+ 0" keeps the planner off the index: the same ranking, sorted per request
+    scanned = _page(
+        [(Project.trending_score + 0).desc(), Project.updated_at.desc()],
+        limit,
+        offset,
+    )
+    indexed = _page(
+        [Project.trending_score.desc(), Project.updated_at.desc()], limit, offset
+    )
+
+    print(f"trending page of {limit} at offset {offset}")
+    print(f"{'':<40}{'ms':>11}{'statements':>12}")
+    _timed("counter sum (previous)", counter, lambda: db.scalars(legacy).all(), repeat)
+    full_sort = _timed(
+        "trending score, sorted per request",
+        counter,
+        lambda: db.scalars(scanned).all(),
+        repeat,
+    )
+    from_index = _timed(
+        "trending score, index range scan",
+        counter,
+        lambda: db.scalars(indexed).all(),
+        repeat,
+    )
+    assert from_index == full_sort, "indexed trending page differs"
+
+    print(f"plan, counter sum:    {_plan(db, legacy)}")
+    print(f"plan, trending index: {_plan(db, indexed)}")
+
+    db.close()
+    engine.dispose()
+    os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--projects", type=int, default=1_000_000)
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--offset", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.projects, args.events, args.limit, args.offset, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Load test: concurrent throughput of DB-backed MakrCave routes
+
+Drives the real app in-process (httpx ASGI transport) with N concurrent
+clients against list endpoints that query through get_db. A fixed delay is
+added to every SQL statement to stand in for the network round trip to
+Postgres. Runs twice: handlers awaited on the event loop (before) and
+offloaded to the threadpool (after). Reports requests/s, latency, and the
+latency of /health served alongside.
+
+    python -m backends.makrcave.scripts.load_test_threadpool \
+        --clients 12 --seconds 5 --latency-ms 5
+
+Keep --clients below the connection pool size (15 by default). In the
+"before" mode, the event loop itself blocks on pool checkout while the
+connections waiting to be released need that same loop to close their
+sessions. That stalls until the pool timeout, which is another reason
+for the change.
+"""
+
+import argparse
+import asyncio
+import inspect
+import logging
+import os
+import statistics
+import time
+
+for _key, _value in {
+    "DATABASE_URL": "sqlite:///./loadtest.db",
+    "ENVIRONMENT": "test",
+    "SMTP_USERNAME": "loadtest",
+    "SMTP_PASSWORD": "loadtest",
+    "FROM_EMAIL": "loadtest@example.com",
+    # Each request gets its own X-Forwarded-For so the per-IP rate limit
+    # does not cut the run short
+    "TRUST_PROXY": "true",
+}.items():
+    os.environ.setdefault(_key, _value)
+
+import httpx  # noqa: E402
+from fastapi.routing import APIRoute, request_response  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from ..core.threadpool import configure_threadpool, offload_blocking_endpoints  # noqa: E402
+from ..database import engine, init_db  # noqa: E402
+from ..dependencies import CurrentUser, get_current_user  # noqa: E402
+from ..main import app  # noqa: E402
+
+PATHS = ["/api/v1/members/", "/api/v1/equipment/", "/api/v1/skills/"]
+
+
+def _restore_async(app):
+    """Undo offload_blocking_endpoints to measure the previous behaviour"""
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        original = getattr(route.endpoint, "__wrapped__", None)
+        if original and inspect.iscoroutinefunction(original):
+            if not inspect.iscoroutinefunction(route.endpoint):
+                route.endpoint = route.dependant.call = original
+                route.app = request_response(route.get_route_handler())
+
+
+async def _drive(clients, seconds):
+    configure_threadpool()
+    transport = httpx.ASGITransport(app=app)
+    latencies, health = [], []
+    deadline = time.perf_counter() + seconds
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://load") as client:
+
+        async def worker(i):
+            n = i
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get(
+                    PATHS[n % len(PATHS)],
+                    headers={"X-Forwarded-For": f"10.{i}.{n // 250 % 250}.{n % 250}"},
+                )
+                assert response.status_code == 200, response.text
+                latencies.append(time.perf_counter() - started)
+                n += 1
+
+        async def probe():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await client.get("/health")
+                health.append(time.perf_counter() - started)
+                await asyncio.sleep(0.05)
+
+        started = time.perf_counter()
+        await asyncio.gather(probe(), *(worker(i) for i in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "health_p99": sorted(health)[int(len(health) * 0.99) - 1] * 1000,
+    }
+
+
+def run(clients, seconds, latency_ms):
+    logging.disable(logging.CRITICAL)  # per-request logs would dominate
+    init_db()
+    user = CurrentUser(
+        user_id="load-test",
+        email="load@example.com",
+        first_name="Load",
+        last_name="Test",
+        makerspace_id="load-ms",
+        roles=["admin"],
+        model=None,
+    )
+    app.dependency_overrides[get_current_user] = lambda: user
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _network_round_trip(*args):
+        time.sleep(latency_ms / 1000)
+
+    print(f"clients={clients} seconds={seconds} sql latency={latency_ms}ms")
+    print(f"{'mode':<22}{'req/s':>8}{'p50 ms':>9}{'p99 ms':>9}{'/health p99':>13}")
+    for name, prepare in (
+        ("before (on the loop)", _restore_async),
+        ("after (threadpool)", offload_blocking_endpoints),
+    ):
+        prepare(app)
+        stats = asyncio.run(_drive(clients, seconds))
+        print(
+            f"{name:<22}{stats['rps']:>8.0f}{stats['p50']:>9.1f}"
+            f"{stats['p99']:>9.1f}{stats['health_p99']:>13.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=12)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    args = parser.parse_args()
+    run(args.clients, args.seconds, args.latency_ms)
+
+
+if __name__ == "__main__":
+    main()
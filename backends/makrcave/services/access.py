@@ -0,0 +1,229 @@
+"""
+Equipment access evaluation
+
+Which skills each machine of a makerspace requires is loaded in one query
+and kept as a bitmap per machine (one bit per skill). The matrix is cached
+per makerspace and dropped when a skill or a machine changes. A member's
+certified skills are loaded once per evaluation and turned into the same
+kind of bitmap, so "which machines can this member use" is one AND per
+machine and "who can use this machine" is one query plus one AND per member.
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, inspect, or_
+from sqlalchemy.orm import Session, object_session
+
+from ..models.equipment import Equipment
+from ..models.skill import Skill, SkillStatus, UserSkill, skill_equipment
+
+ACCESS_MATRIX_TTL_SECONDS = int(os.getenv("ACCESS_MATRIX_TTL_SECONDS", "300"))
+
+_PENDING_KEY = "access_matrix_invalidations"
+
+
+@dataclass
+class AccessMatrix:
+    """Required-skill bitmaps for the machines of one makerspace"""
+
+    skill_bits: Dict[str, int] = field(default_factory=dict)
+    skill_names: Dict[int, str] = field(default_factory=dict)
+    # equipment id -> (name, bitmap of required skills)
+    equipment: Dict[str, Tuple[str, int]] = field(default_factory=dict)
+
+    def mask(self, skill_ids: Iterable[str]) -> int:
+        """Bitmap of the given skills; skills no machine requires are ignored"""
+        bits = 0
+        for skill_id in skill_ids:
+            bit = self.skill_bits.get(skill_id)
+            if bit is not None:
+                bits |= 1 << bit
+        return bits
+
+    def names(self, mask: int) -> List[str]:
+        return sorted(name for bit, name in self.skill_names.items() if mask >> bit & 1)
+
+    def required(self, equipment_id: str) -> int:
+        return self.equipment[equipment_id][1]
+
+    def missing(self, equipment_id: str, user_mask: int) -> int:
+        """Required skills of the machine the member does not hold"""
+        return self.required(equipment_id) & ~user_mask
+
+    def accessible(self, user_mask: int) -> List[str]:
+        return [
+            equipment_id
+            for equipment_id, (_, required) in self.equipment.items()
+            if required & ~user_mask == 0
+        ]
+
+
+def load_access_matrix(db: Session, makerspace_id: Optional[str]) -> AccessMatrix:
+    """Build the matrix of a makerspace (all machines when None) in one query"""
+    query = (
+        db.query(Equipment.id, Equipment.name, Skill.id, Skill.name)
+        .outerjoin(skill_equipment, skill_equipment.c.equipment_id == Equipment.id)
+        .outerjoin(Skill, Skill.id == skill_equipment.c.skill_id)
+    )
+    if makerspace_id:
+        query = query.filter(Equipment.linked_makerspace_id == makerspace_id)
+
+    matrix = AccessMatrix()
+    for equipment_id, equipment_name, skill_id, skill_name in query:
+        _, required = matrix.equipment.get(equipment_id, (equipment_name, 0))
+        if skill_id is not None:
+            bit = matrix.skill_bits.setdefault(skill_id, len(matrix.skill_bits))
+            matrix.skill_names[bit] = skill_name
+            required |= 1 << bit
+        matrix.equipment[equipment_id] = (equipment_name, required)
+    return matrix
+
+
+class AccessMatrixCache:
+    """Makerspace -> AccessMatrix with a TTL (other workers' changes age out)"""
+
+    def __init__(self, ttl: int = ACCESS_MATRIX_TTL_SECONDS):
+        self.ttl = ttl
+        self._entries: Dict[Optional[str], Tuple[float, AccessMatrix]] = {}
+        self._lock = threading.Lock()
+        # Bumped by every invalidation so a build racing a change is not kept
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self,
+        db: Session,
+        makerspace_id: Optional[str],
+        equipment_id: Optional[str] = None,
+    ) -> AccessMatrix:
+        """Cached matrix of a makerspace; reloaded if it lacks ``equipment_id``
+        (a machine added through another worker)"""
+        with self._lock:
+            entry = self._entries.get(makerspace_id)
+            if (
+                entry is not None
+                and entry[0] > time.monotonic()
+                and (equipment_id is None or equipment_id in entry[1].equipment)
+            ):
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            version = self._version
+        matrix = load_access_matrix(db, makerspace_id)
+        with self._lock:
+            if version == self._version:
+                self._entries[makerspace_id] = (time.monotonic() + self.ttl, matrix)
+        return matrix
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+
+# Global access matrix cache instance
+access_matrix_cache = AccessMatrixCache()
+
+
+def certified_skills(db: Session, user_id: str) -> Dict[str, Optional[datetime]]:
+    """Skill id -> expiry of every certification the member holds"""
+    rows = db.query(UserSkill.skill_id, UserSkill.expires_at).filter(
+        UserSkill.user_id == user_id,
+        UserSkill.status == SkillStatus.CERTIFIED,
+    )
+    return dict(rows)
+
+
+def valid_skills(
+    certifications: Dict[str, Optional[datetime]],
+    now: Optional[datetime] = None,
+    grace: timedelta = timedelta(0),
+) -> set:
+    """Certifications still valid at ``now``, allowing ``grace`` past expiry"""
+    now = now or datetime.utcnow()
+    return {
+        skill_id
+        for skill_id, expires_at in certifications.items()
+        if expires_at is None or _naive(expires_at) + grace > now
+    }
+
+
+def _naive(value: datetime) -> datetime:
+    return value.replace(tzinfo=None) if value.tzinfo is not None else value
+
+
+def accessible_equipment(
+    db: Session, user_id: str, makerspace_id: Optional[str] = None
+) -> List[str]:
+    """Machines of the makerspace whose required skills the member all holds"""
+    matrix = access_matrix_cache.get(db, makerspace_id)
+    user_mask = matrix.mask(valid_skills(certified_skills(db, user_id)))
+    return matrix.accessible(user_mask)
+
+
+def authorized_users(db: Session, matrix: AccessMatrix, equipment_id: str) -> List[str]:
+    """Members holding every skill a machine of ``matrix`` requires"""
+    required = matrix.required(equipment_id)
+    skill_ids = [s for s, bit in matrix.skill_bits.items() if required >> bit & 1]
+    if not skill_ids:
+        return []
+
+    rows = db.query(UserSkill.user_id, UserSkill.skill_id).filter(
+        UserSkill.skill_id.in_(skill_ids),
+        UserSkill.status == SkillStatus.CERTIFIED,
+        or_(UserSkill.expires_at.is_(None), UserSkill.expires_at > datetime.utcnow()),
+    )
+    masks: Dict[str, int] = defaultdict(int)
+    for user_id, skill_id in rows:
+        masks[user_id] |= 1 << matrix.skill_bits[skill_id]
+    return sorted(user_id for user_id, mask in masks.items() if mask == required)
+
+
+# Invalidation: matrices are dropped once a transaction that changed what
+# they hold commits (required skills can be edited from either side)
+
+_WATCHED = {
+    Equipment: ("name", "linked_makerspace_id", "required_skills"),
+    Skill: ("name", "equipment"),
+}
+
+
+def _queue_invalidation(mapper, connection, target) -> None:
+    session = object_session(target)
+    if session is None:
+        access_matrix_cache.invalidate()
+    else:
+        session.info[_PENDING_KEY] = True
+
+
+def _queue_if_changed(mapper, connection, target) -> None:
+    state = inspect(target)
+    if any(state.attrs[key].history.has_changes() for key in _WATCHED[type(target)]):
+        _queue_invalidation(mapper, connection, target)
+
+
+event.listen(Equipment, "after_insert", _queue_invalidation)
+for _model in _WATCHED:
+    event.listen(_model, "after_update", _queue_if_changed)
+    event.listen(_model, "after_delete", _queue_invalidation)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_invalidations(session: Session) -> None:
+    if session.info.pop(_PENDING_KEY, False):
+        access_matrix_cache.invalidate()
@@ -0,0 +1,509 @@
+"""
+Incremental analytics rollups
+
+``refresh_rollups`` folds raw rows created since the stored watermark into
+the hourly, daily and per-member daily rollup tables, up to the last closed
+hour. Readers combine the rollups with a live tail of raw rows past the
+watermark, so figures stay exact however far behind the job is.
+
+Transactions are not rolled up: they are created PENDING, completed and
+refunded later, so a row created before the watermark can still change what
+it contributes. Transaction counts and revenue are always read from the raw
+table with the same SUCCESS filter as the other revenue figures.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import case, func, text
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.analytics_rollups import (
+    AnalyticsDailyRollup,
+    AnalyticsHourlyRollup,
+    AnalyticsRollupWatermark,
+    MemberActivityDailyRollup,
+)
+from ..models.billing import Transaction, TransactionStatus
+from ..models.enhanced_analytics import AggregationPeriod, EquipmentUtilizationMetrics
+from ..models.enhanced_member import Member, MemberActivityLog
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = "analytics"
+ROLLUP_INTERVAL_SECONDS = int(os.getenv("ANALYTICS_ROLLUP_INTERVAL_SECONDS", "300"))
+CHECKIN_ACTIVITY = "checkin"
+
+# Arbitrary key so only one worker refreshes at a time on Postgres
+_ADVISORY_LOCK_KEY = 0x4D414B52
+
+# Figures kept in AnalyticsDailyRollup
+_ROLLED_UP_FIGURES = (
+    "activity_count",
+    "checkin_count",
+    "active_members",
+    "equipment_sessions",
+    "equipment_hours",
+)
+# Read live from transactions, whose status changes after they are created
+_LIVE_FIGURES = ("transaction_count", "revenue")
+_DAILY_FIGURES = _ROLLED_UP_FIGURES + _LIVE_FIGURES
+
+
+def floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _naive_utc(value) -> Optional[datetime]:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _as_uuid(makerspace_id) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(str(makerspace_id))
+    except ValueError:
+        return None
+
+
+def _bucket(db: Session, column, unit: str):
+    """Start of the hour/day containing ``column``"""
+    if db.get_bind().dialect.name == "sqlite":
+        fmt = "%Y-%m-%d %H:00:00" if unit == "hour" else "%Y-%m-%d 00:00:00"
+        return func.strftime(fmt, column)
+    return func.date_trunc(unit, column)
+
+
+# Raw sources, grouped by makerspace and bucket
+
+
+def _activity(
+    db: Session,
+    unit: str,
+    since: Optional[datetime],
+    until: Optional[datetime] = None,
+    makerspace_id: Optional[str] = None,
+    per_member: bool = False,
+):
+    created = MemberActivityLog.created_at
+    bucket = _bucket(db, created, unit)
+    keys = [Member.makerspace_id, bucket]
+    if per_member:
+        keys.append(MemberActivityLog.member_id)
+
+    query = db.query(
+        *keys,
+        func.count(MemberActivityLog.id),
+        func.count(case((MemberActivityLog.activity_type == CHECKIN_ACTIVITY, 1))),
+        func.max(created),
+    ).join(Member, Member.id == MemberActivityLog.member_id)
+    if makerspace_id is not None:
+        space = _as_uuid(makerspace_id)
+        if space is None:
+            return []
+        query = query.filter(Member.makerspace_id == space)
+    if since is not None:
+        query = query.filter(created >= since)
+    if until is not None:
+        query = query.filter(created < until)
+    return query.group_by(*keys).all()
+
+
+def _transactions(
+    db: Session,
+    unit: str,
+    since: Optional[datetime],
+    until: Optional[datetime] = None,
+    makerspace_id: Optional[str] = None,
+):
+    created = Transaction.created_at
+    bucket = _bucket(db, created, unit)
+    query = db.query(
+        Transaction.makerspace_id,
+        bucket,
+        func.count(Transaction.id),
+        func.sum(Transaction.amount),
+    ).filter(Transaction.status == TransactionStatus.SUCCESS)
+    if makerspace_id is not None:
+        query = query.filter(Transaction.makerspace_id == str(makerspace_id))
+    if since is not None:
+        query = query.filter(created >= since)
+    if until is not None:
+        query = query.filter(created < until)
+    return query.group_by(Transaction.makerspace_id, bucket).all()
+
+
+def _equipment(
+    db: Session,
+    created_since: Optional[datetime],
+    created_until: Optional[datetime] = None,
+    day_since: Optional[datetime] = None,
+    makerspace_id: Optional[str] = None,
+):
+    # Utilization metrics are already per equipment per day, but may be
+    # written after the day they describe, so they are selected by created_at
+    metrics = EquipmentUtilizationMetrics
+    bucket = _bucket(db, metrics.date, "day")
+    query = db.query(
+        metrics.makerspace_id,
+        bucket,
+        func.sum(metrics.usage_frequency),
+        func.sum(metrics.total_used_hours),
+    ).filter(metrics.period_type == AggregationPeriod.DAILY.value)
+    if makerspace_id is not None:
+        space = _as_uuid(makerspace_id)
+        if space is None:
+            return []
+        query = query.filter(metrics.makerspace_id == space)
+    if created_since is not None:
+        query = query.filter(metrics.created_at >= created_since)
+    if created_until is not None:
+        query = query.filter(metrics.created_at < created_until)
+    if day_since is not None:
+        query = query.filter(metrics.date >= day_since)
+    return query.group_by(metrics.makerspace_id, bucket).all()
+
+
+def _earliest_raw(db: Session) -> Optional[datetime]:
+    candidates = [
+        db.query(func.min(MemberActivityLog.created_at)).scalar(),
+        db.query(func.min(EquipmentUtilizationMetrics.created_at)).scalar(),
+    ]
+    candidates = [_naive_utc(c) for c in candidates if c is not None]
+    return min(candidates) if candidates else None
+
+
+def get_high_water(db: Session) -> Optional[datetime]:
+    mark = db.get(AnalyticsRollupWatermark, WATERMARK_NAME)
+    return mark.high_water if mark else None
+
+
+# Incremental refresh
+
+
+def _acquire_refresh_lock(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return True
+    return bool(
+        db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"),
+            {"key": _ADVISORY_LOCK_KEY},
+        ).scalar()
+    )
+
+
+def refresh_rollups(db: Session, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Fold raw rows created between the watermark and the last closed hour into
+    the rollups, then advance the watermark. Safe to re-run; each run rewrites
+    only the hours and days it touches.
+    """
+    now = now or datetime.utcnow()
+    until = floor_hour(now)
+    if not _acquire_refresh_lock(db):
+        return {"skipped": True}
+
+    mark = db.get(AnalyticsRollupWatermark, WATERMARK_NAME)
+    since = mark.high_water if mark else _earliest_raw(db)
+    if since is not None:
+        since = floor_hour(since)
+
+    if since is None or since >= until:
+        if mark is None:
+            db.add(
+                AnalyticsRollupWatermark(
+                    name=WATERMARK_NAME, high_water=until, updated_at=now
+                )
+            )
+        db.commit()
+        return {"since": since, "until": until, "hours": 0, "days": 0}
+
+    first_day = floor_day(since)
+
+    # Hourly buckets for [since, until)
+    hourly = defaultdict(lambda: defaultdict(float))
+    for space, bucket, count, checkins, _ in _activity(db, "hour", since, until):
+        row = hourly[(str(space), _naive_utc(bucket))]
+        row["activity_count"] += count
+        row["checkin_count"] += checkins
+
+    db.query(AnalyticsHourlyRollup).filter(
+        AnalyticsHourlyRollup.bucket_start >= since,
+        AnalyticsHourlyRollup.bucket_start < until,
+    ).delete(synchronize_session=False)
+    db.bulk_insert_mappings(
+        AnalyticsHourlyRollup,
+        [
+            {
+                "makerspace_id": space,
+                "bucket_start": bucket,
+                "activity_count": int(figures["activity_count"]),
+                "checkin_count": int(figures["checkin_count"]),
+            }
+            for (space, bucket), figures in hourly.items()
+        ],
+    )
+
+    # Per-member days are rebuilt from the start of the first touched day
+    db.query(MemberActivityDailyRollup).filter(
+        MemberActivityDailyRollup.bucket_start >= first_day
+    ).delete(synchronize_session=False)
+    member_days = _activity(db, "day", first_day, until, per_member=True)
+    db.bulk_insert_mappings(
+        MemberActivityDailyRollup,
+        [
+            {
+                "makerspace_id": str(space),
+                "bucket_start": _naive_utc(bucket),
+                "member_id": str(member_id),
+                "activity_count": count,
+                "last_activity_at": _naive_utc(last_at),
+            }
+            for space, bucket, member_id, count, _, last_at in member_days
+        ],
+    )
+
+    # Days to rebuild: the ones covered above plus any day that received
+    # equipment metrics since the watermark
+    days = set()
+    day = first_day
+    while day < until:
+        days.add(day)
+        day += timedelta(days=1)
+    equipment_dirty = _equipment(db, since if mark else None, until)
+    days.update(_naive_utc(bucket) for _, bucket, _, _ in equipment_dirty)
+
+    daily = defaultdict(lambda: dict.fromkeys(_ROLLED_UP_FIGURES, 0))
+    oldest = min(days)
+    for row in (
+        db.query(AnalyticsHourlyRollup)
+        .filter(AnalyticsHourlyRollup.bucket_start >= oldest)
+        .all()
+    ):
+        day = floor_day(row.bucket_start)
+        if day not in days:
+            continue
+        figures = daily[(row.makerspace_id, day)]
+        figures["activity_count"] += row.activity_count
+        figures["checkin_count"] += row.checkin_count
+    for space, day, members in (
+        db.query(
+            MemberActivityDailyRollup.makerspace_id,
+            MemberActivityDailyRollup.bucket_start,
+            func.count(MemberActivityDailyRollup.member_id),
+        )
+        .filter(MemberActivityDailyRollup.bucket_start >= oldest)
+        .group_by(
+            MemberActivityDailyRollup.makerspace_id,
+            MemberActivityDailyRollup.bucket_start,
+        )
+        .all()
+    ):
+        if day in days:
+            daily[(space, day)]["active_members"] = members
+    for space, bucket, sessions, hours in _equipment(
+        db, None, until, day_since=oldest
+    ):
+        day = _naive_utc(bucket)
+        if day in days:
+            daily[(str(space), day)]["equipment_sessions"] = int(sessions or 0)
+            daily[(str(space), day)]["equipment_hours"] = float(hours or 0)
+
+    db.query(AnalyticsDailyRollup).filter(
+        AnalyticsDailyRollup.bucket_start.in_(sorted(days))
+    ).delete(synchronize_session=False)
+    db.bulk_insert_mappings(
+        AnalyticsDailyRollup,
+        [
+            {"makerspace_id": space, "bucket_start": day, **figures}
+            for (space, day), figures in daily.items()
+        ],
+    )
+
+    if mark is None:
+        mark = AnalyticsRollupWatermark(name=WATERMARK_NAME)
+        db.add(mark)
+    mark.high_water = until
+    mark.updated_at = now
+    db.commit()
+
+    logger.info(
+        f"Analytics rollups refreshed from {since} to {until} "
+        f"({len(hourly)} hourly, {len(daily)} daily buckets)"
+    )
+    return {"since": since, "until": until, "hours": len(hourly), "days": len(daily)}
+
+
+def _refresh_in_new_session() -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        return refresh_rollups(db)
+    finally:
+        db.close()
+
+
+async def run_rollup_job(interval: int = ROLLUP_INTERVAL_SECONDS) -> None:
+    """Background loop keeping the rollups within one interval of now"""
+    while True:
+        try:
+            await asyncio.to_thread(_refresh_in_new_session)
+        except Exception as e:
+            logger.error(f"Analytics rollup refresh failed: {e}", exc_info=True)
+        await asyncio.sleep(interval)
+
+
+# Readers: rollups up to the watermark plus the raw tail after it
+
+
+def _tail_since(db: Session, window_start: datetime) -> datetime:
+    high_water = get_high_water(db)
+    return max(high_water, window_start) if high_water else window_start
+
+
+def daily_series(
+    db: Session,
+    makerspace_id: str,
+    start: datetime,
+    end: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """Per-day figures for the days in [start, end), oldest first"""
+    start_day = floor_day(start)
+    end_day = floor_day(end) if end else None
+    high_water = get_high_water(db)
+    tail_since = _tail_since(db, start_day)
+
+    def in_window(day):
+        return day >= start_day and (end_day is None or day < end_day)
+
+    days = defaultdict(lambda: dict.fromkeys(_DAILY_FIGURES, 0))
+    query = db.query(AnalyticsDailyRollup).filter(
+        AnalyticsDailyRollup.makerspace_id == str(makerspace_id),
+        AnalyticsDailyRollup.bucket_start >= start_day,
+    )
+    if end_day is not None:
+        query = query.filter(AnalyticsDailyRollup.bucket_start < end_day)
+    for row in query.all():
+        days[row.bucket_start].update(
+            (name, getattr(row, name)) for name in _ROLLED_UP_FIGURES
+        )
+
+    tail_days = set()
+    if end_day is None or tail_since < end_day:
+        for _, bucket, count, checkins, _ in _activity(
+            db, "day", tail_since, end_day, makerspace_id
+        ):
+            day = _naive_utc(bucket)
+            days[day]["activity_count"] += count
+            days[day]["checkin_count"] += checkins
+            tail_days.add(day)
+    for _, bucket, count, revenue in _transactions(
+        db, "day", start_day, end_day, makerspace_id
+    ):
+        day = _naive_utc(bucket)
+        days[day]["transaction_count"] += count
+        days[day]["revenue"] += float(revenue or 0)
+    for _, bucket, sessions, hours in _equipment(
+        db, high_water, None, start_day, makerspace_id
+    ):
+        day = _naive_utc(bucket)
+        if in_window(day):
+            days[day]["equipment_sessions"] += int(sessions or 0)
+            days[day]["equipment_hours"] += float(hours or 0)
+
+    # Distinct members do not add up; union rolled-up and tail members
+    if tail_days:
+        members = defaultdict(set)
+        for member_id, day in db.query(
+            MemberActivityDailyRollup.member_id, MemberActivityDailyRollup.bucket_start
+        ).filter(
+            MemberActivityDailyRollup.makerspace_id == str(makerspace_id),
+            MemberActivityDailyRollup.bucket_start.in_(sorted(tail_days)),
+        ):
+            members[day].add(member_id)
+        for _, bucket, member_id, *_ in _activity(
+            db, "day", tail_since, end_day, makerspace_id, per_member=True
+        ):
+            members[_naive_utc(bucket)].add(str(member_id))
+        for day in tail_days:
+            days[day]["active_members"] = len(members[day])
+
+    return [{"date": day.date(), **days[day]} for day in sorted(days) if in_window(day)]
+
+
+def activity_by_hour_of_day(
+    db: Session, makerspace_id: str, start: datetime
+) -> Dict[int, int]:
+    """Activity counts per hour of day (0-23) since ``start``"""
+    start_hour = floor_hour(start)
+    totals: Dict[int, int] = defaultdict(int)
+    for bucket, count in db.query(
+        AnalyticsHourlyRollup.bucket_start, AnalyticsHourlyRollup.activity_count
+    ).filter(
+        AnalyticsHourlyRollup.makerspace_id == str(makerspace_id),
+        AnalyticsHourlyRollup.bucket_start >= start_hour,
+        AnalyticsHourlyRollup.activity_count > 0,
+    ):
+        totals[bucket.hour] += count
+    for _, bucket, count, _, _ in _activity(
+        db, "hour", _tail_since(db, start_hour), None, makerspace_id
+    ):
+        totals[_naive_utc(bucket).hour] += count
+    return dict(totals)
+
+
+def member_activity(
+    db: Session, makerspace_id: str, start: datetime
+) -> Dict[str, Dict[str, Any]]:
+    """Activity count and last activity per member id since ``start``"""
+    start_day = floor_day(start)
+    members: Dict[str, Dict[str, Any]] = {}
+
+    def add(member_id, count, last_at):
+        entry = members.setdefault(
+            str(member_id), {"activity_count": 0, "last_activity": None}
+        )
+        entry["activity_count"] += count
+        last_at = _naive_utc(last_at)
+        latest = entry["last_activity"]
+        if last_at and (latest is None or last_at > latest):
+            entry["last_activity"] = last_at
+
+    for member_id, count, last_at in (
+        db.query(
+            MemberActivityDailyRollup.member_id,
+            func.sum(MemberActivityDailyRollup.activity_count),
+            func.max(MemberActivityDailyRollup.last_activity_at),
+        )
+        .filter(
+            MemberActivityDailyRollup.makerspace_id == str(makerspace_id),
+            MemberActivityDailyRollup.bucket_start >= start_day,
+        )
+        .group_by(MemberActivityDailyRollup.member_id)
+    ):
+        add(member_id, count, last_at)
+    for _, _, member_id, count, _, last_at in _activity(
+        db, "day", _tail_since(db, start_day), None, makerspace_id, per_member=True
+    ):
+        add(member_id, count, last_at)
+    return members
+
+
+def summarize(series: Iterable[Dict[str, Any]], *names: str) -> Dict[str, Any]:
+    totals = dict.fromkeys(names, 0)
+    for day in series:
+        for name in names:
+            totals[name] += day[name]
+    return totals
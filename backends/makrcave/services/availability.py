@@ -0,0 +1,183 @@
+"""
+Equipment availability engine
+
+Reservations that block a machine (approved or active) are loaded for every
+requested machine in one range query, merged into sorted busy intervals and
+swept against a slot grid. Computing the free slots of a window costs
+O(slots + reservations) per machine instead of testing every reservation for
+every slot. On Postgres the range query is answered by the GiST index behind
+the reservation overlap exclusion constraint.
+"""
+
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models.equipment_reservations import (
+    EnhancedEquipmentReservation,
+    ReservationStatus,
+)
+
+DEFAULT_SLOT_MINUTES = int(os.getenv("RESERVATION_SLOT_MINUTES", "60"))
+SEARCH_HORIZON_DAYS = int(os.getenv("RESERVATION_SEARCH_HORIZON_DAYS", "30"))
+
+BLOCKING_STATUSES = (ReservationStatus.APPROVED, ReservationStatus.ACTIVE)
+
+Interval = Tuple[datetime, datetime]
+
+
+def naive_utc(value: datetime) -> datetime:
+    """Compare request and database times on one footing (naive UTC)"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def ceil_to_grid(value: datetime, granularity: timedelta) -> datetime:
+    """Round up to the next multiple of ``granularity`` (e.g. :00, :15, ...)"""
+    offset = (value - datetime.min) % granularity
+    return value + (granularity - offset) if offset else value
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Sort intervals and merge the ones that overlap or touch"""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_intervals(
+    busy: Sequence[Interval], start: datetime, end: datetime
+) -> List[Interval]:
+    """Gaps between merged ``busy`` intervals, clipped to [start, end)"""
+    gaps = []
+    cursor = start
+    for busy_start, busy_end in busy:
+        if busy_end <= cursor:
+            continue
+        if busy_start >= end:
+            break
+        if busy_start > cursor:
+            gaps.append((cursor, busy_start))
+        cursor = max(cursor, busy_end)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def grid_slots(
+    busy: Sequence[Interval],
+    start: datetime,
+    end: datetime,
+    granularity: timedelta,
+) -> Iterator[Tuple[datetime, datetime, bool]]:
+    """Yield (slot start, slot end, is free) for each slot of the window.
+
+    Slots step by ``granularity`` from ``start``; the last one is cut at
+    ``end``. ``busy`` must be merged. Both sequences only move forward, so a
+    single pointer sweeps the reservations once.
+    """
+    index = 0
+    slot_start = start
+    while slot_start < end:
+        slot_end = min(slot_start + granularity, end)
+        while index < len(busy) and busy[index][1] <= slot_start:
+            index += 1
+        free = index == len(busy) or busy[index][0] >= slot_end
+        yield slot_start, slot_end, free
+        slot_start = slot_end
+
+
+def first_fit(
+    busy: Sequence[Interval],
+    after: datetime,
+    until: datetime,
+    duration: timedelta,
+    granularity: timedelta,
+) -> Optional[Interval]:
+    """Earliest grid-aligned interval of ``duration`` in [after, until)"""
+    for gap_start, gap_end in free_intervals(busy, after, until):
+        slot_start = ceil_to_grid(gap_start, granularity)
+        if slot_start + duration <= gap_end:
+            return slot_start, slot_start + duration
+    return None
+
+
+def _overlaps(db: Session, start: datetime, end: datetime):
+    reservation = EnhancedEquipmentReservation
+    if db.get_bind().dialect.name == "postgresql":
+        # Same expression as the exclusion constraint, so its index applies
+        return func.tstzrange(
+            reservation.requested_start, reservation.requested_end, "[)"
+        ).op("&&")(func.tstzrange(start, end, "[)"))
+    return (reservation.requested_start < end) & (reservation.requested_end > start)
+
+
+def busy_intervals(
+    db: Session, equipment_ids: Sequence[str], start: datetime, end: datetime
+) -> Dict[str, List[Interval]]:
+    """Merged blocking reservations per machine overlapping [start, end)"""
+    start, end = naive_utc(start), naive_utc(end)
+    reservation = EnhancedEquipmentReservation
+    rows = db.query(
+        reservation.equipment_id,
+        reservation.requested_start,
+        reservation.requested_end,
+    ).filter(
+        reservation.equipment_id.in_(list(equipment_ids)),
+        reservation.status.in_(BLOCKING_STATUSES),
+        _overlaps(db, start, end),
+    )
+
+    intervals: Dict[str, List[Interval]] = defaultdict(list)
+    for equipment_id, busy_start, busy_end in rows:
+        intervals[equipment_id].append((naive_utc(busy_start), naive_utc(busy_end)))
+    return {
+        equipment_id: merge_intervals(intervals.get(equipment_id, ()))
+        for equipment_id in equipment_ids
+    }
+
+
+def find_conflict(
+    db: Session, equipment_id: str, start: datetime, end: datetime
+) -> Optional[Interval]:
+    """First blocking reservation of the machine overlapping [start, end)"""
+    start, end = naive_utc(start), naive_utc(end)
+    reservation = EnhancedEquipmentReservation
+    return (
+        db.query(reservation.requested_start, reservation.requested_end)
+        .filter(
+            reservation.equipment_id == equipment_id,
+            reservation.status.in_(BLOCKING_STATUSES),
+            _overlaps(db, start, end),
+        )
+        .order_by(reservation.requested_start)
+        .first()
+    )
+
+
+def next_free_slots(
+    db: Session,
+    equipment_ids: Sequence[str],
+    duration: timedelta,
+    after: datetime,
+    granularity: timedelta = timedelta(minutes=DEFAULT_SLOT_MINUTES),
+    horizon: timedelta = timedelta(days=SEARCH_HORIZON_DAYS),
+) -> Dict[str, Optional[Interval]]:
+    """Earliest free interval of ``duration`` per machine, within ``horizon``"""
+    after = naive_utc(after)
+    until = after + horizon
+    busy = busy_intervals(db, equipment_ids, after, until)
+    return {
+        equipment_id: first_fit(intervals, after, until, duration, granularity)
+        for equipment_id, intervals in busy.items()
+    }
@@ -1,5 +1,6 @@
+import asyncio
 import os
-from functools import lru_cache
+import time
 from typing import Optional
 
 import httpx
@@ -10,26 +11,6 @@ CLIENT_ID = os.getenv("KEYCLOAK_CLIENT_ID", "makrcave-api")
 CLIENT_SECRET = os.getenv("KEYCLOAK_CLIENT_SECRET", "")
 
 
-@lru_cache()
-def _token_endpoint() -> str:
-    return f"{KEYCLOAK_URL}/realms/{KEYCLOAK_REALM}/protocol/openid-connect/token"
-
-
-async def get_service_token() -> str:
-    """Obtain access token using client credentials."""
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            _token_endpoint(),
-            data={
-                "grant_type": "client_credentials",
-                "client_id": CLIENT_ID,
-                "client_secret": CLIENT_SECRET,
-            },
-        )
-        resp.raise_for_status()
-        return resp.json()["access_token"]
-
-
 class KeycloakClient:
     """Minimal async client wrapper used by parts of the legacy codebase."""
 
@@ -44,6 +25,10 @@ class KeycloakClient:
         self.client_secret = client_secret
         self.base_url = base_url
         self.realm = realm
+        # Client-credential tokens are reused until shortly before expiry
+        self._token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
 
     @property
     def token_endpoint(self) -> str:
@@ -52,18 +37,36 @@ class KeycloakClient:
     async def get_service_token(self) -> str:
         """Fetch a client-credential token using instance configuration."""
 
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                self.token_endpoint,
-                data={
-                    "grant_type": "client_credentials",
-                    "client_id": self.client_id,
-                    "client_secret": self.client_secret,
-                },
-            )
-            resp.raise_for_status()
-            data = resp.json()
+        if self._token and time.monotonic() < self._token_expires_at:
+            return self._token
+        # Concurrent callers wait for one token request instead of each
+        # asking Keycloak
+        async with self._token_lock:
+            if self._token and time.monotonic() < self._token_expires_at:
+                return self._token
+            async with httpx.AsyncClient() as client:
+                resp = await client.post(
+                    self.token_endpoint,
+                    data={
+                        "grant_type": "client_credentials",
+                        "client_id": self.client_id,
+                        "client_secret": self.client_secret,
+                    },
+                )
+                resp.raise_for_status()
+                data = resp.json()
             token: Optional[str] = data.get("access_token")
             if not token:
                 raise RuntimeError("Keycloak did not return an access token")
+            expires_in = float(data.get("expires_in") or 0)
+            self._token = token
+            self._token_expires_at = time.monotonic() + max(expires_in - 30, 0)
             return token
+
+
+_default_client = KeycloakClient()
+
+
+async def get_service_token() -> str:
+    """Obtain access token using client credentials."""
+    return await _default_client.get_service_token()
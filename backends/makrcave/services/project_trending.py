@@ -0,0 +1,310 @@
+"""
+Maintained trending score for the project showcase
+
+Every view, like, bookmark and fork adds its weight to a project's score,
+and the weight halves every ``TRENDING_HALF_LIFE_HOURS``. Rather than decay
+all scores as time passes, each event is weighted relative to a fixed epoch
+and the sum is kept in log space:
+
+    trending_score = log(sum(weight * exp((occurred_at - EPOCH) / tau)))
+
+so the stored scores order projects exactly as their decayed sums at any
+later moment would, and an index on the column serves "top N trending".
+Events are queued in ``project_trending_events`` by the models and folded
+into the scores by ``refresh_trending_scores``, run in the background.
+"""
+
+import asyncio
+import logging
+import math
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import bindparam, exists, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.analytics_rollups import AnalyticsRollupWatermark
+from ..models.project import (
+    Project,
+    ProjectTrendingEvent,
+    ProjectViewer,
+    ProjectVisibility,
+)
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = "project_trending"
+TRENDING_INTERVAL_SECONDS = int(os.getenv("PROJECT_TRENDING_INTERVAL_SECONDS", "60"))
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "48"))
+TRENDING_BATCH_SIZE = 10_000
+TRENDING_WEIGHTS = {"view": 1.0, "like": 3.0, "bookmark": 4.0, "fork": 5.0}
+# A user's views of a project count once per window
+PROJECT_VIEW_WINDOW_HOURS = float(os.getenv("PROJECT_VIEW_WINDOW_HOURS", "24"))
+
+# Scores are relative to this moment; a project without engagement scores 0
+EPOCH = datetime(2020, 1, 1)
+_TAU_SECONDS = TRENDING_HALF_LIFE_HOURS * 3600 / math.log(2)
+
+# Arbitrary key so only one worker folds events at a time on Postgres
+_ADVISORY_LOCK_KEY = 0x54524E44
+
+_IN_CHUNK = 1000
+
+
+def event_score(at: datetime, weight: float = 1.0) -> float:
+    """Score of a single event of ``weight`` at ``at``"""
+    return math.log(weight) + (at - EPOCH).total_seconds() / _TAU_SECONDS
+
+
+def combine(score: float, other: float) -> float:
+    """Score of the union of two sets of events (log-add-exp)"""
+    high, low = max(score, other), min(score, other)
+    return high + math.log1p(math.exp(low - high))
+
+
+def current_weight(score: float, now: Optional[datetime] = None) -> float:
+    """Decayed engagement behind ``score`` as of ``now``, in event weights"""
+    if not score:
+        return 0.0
+    return math.exp(score - event_score(now or datetime.utcnow()))
+
+
+def _chunks(values: List[Any], size: int = _IN_CHUNK) -> Iterable[List[Any]]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def view_window_start(now: datetime) -> datetime:
+    """Start of the view-dedup window containing ``now``"""
+    window = timedelta(hours=PROJECT_VIEW_WINDOW_HOURS)
+    return EPOCH + (now - EPOCH) // window * window
+
+
+def _claim_view(db: Session, project_id: str, user_id: str, now: datetime) -> bool:
+    """Record the user's view for this window; False if already recorded"""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    result = db.execute(
+        dialect.insert(ProjectViewer.__table__)
+        .values(
+            project_id=project_id,
+            user_id=user_id,
+            window_start=view_window_start(now),
+        )
+        .on_conflict_do_nothing()
+    )
+    return bool(result.rowcount)
+
+
+def record_project_view(
+    db: Session, project_id: str, user_id: str, now: Optional[datetime] = None
+) -> bool:
+    """
+    Count a view of a public project and queue its trending event, at most
+    once per user and window. Returns False if there is no such project.
+    """
+    projects = Project.__table__
+    if not _claim_view(db, project_id, user_id, now or datetime.utcnow()):
+        return bool(
+            db.execute(
+                select(
+                    exists().where(
+                        projects.c.project_id == project_id,
+                        projects.c.visibility == ProjectVisibility.PUBLIC,
+                    )
+                )
+            ).scalar()
+        )
+    result = db.execute(
+        update(projects)
+        .where(
+            projects.c.project_id == project_id,
+            projects.c.visibility == ProjectVisibility.PUBLIC,
+        )
+        # A view is not an edit, so updated_at keeps its value
+        .values(
+            view_count=projects.c.view_count + 1, updated_at=projects.c.updated_at
+        )
+    )
+    if not result.rowcount:
+        return False
+    db.add(ProjectTrendingEvent(project_id=project_id, kind="view"))
+    return True
+
+
+# Folding queued events into the scores
+
+
+def _acquire_refresh_lock(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return True
+    return bool(
+        db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"),
+            {"key": _ADVISORY_LOCK_KEY},
+        ).scalar()
+    )
+
+
+def _write_scores(db: Session, scores: Dict[str, float]) -> None:
+    projects = Project.__table__
+    db.execute(
+        update(projects)
+        .where(projects.c.id == bindparam("_id"))
+        .values(
+            trending_score=bindparam("_score"), updated_at=projects.c.updated_at
+        ),
+        [{"_id": row_id, "_score": score} for row_id, score in scores.items()],
+    )
+
+
+def _fold(db: Session, contributions: Dict[str, float]) -> Set[str]:
+    """Add per-project event scores (keyed by project_id) to the stored ones"""
+    scores = {}
+    for chunk in _chunks(list(contributions)):
+        rows = db.query(Project.id, Project.project_id, Project.trending_score).filter(
+            Project.project_id.in_(chunk)
+        )
+        for row_id, project_id, score in rows:
+            added = contributions[project_id]
+            scores[row_id] = combine(score, added) if score else added
+    if scores:
+        _write_scores(db, scores)
+    return set(scores)
+
+
+def _backfill_from_counters(db: Session) -> int:
+    """
+    Seed scores of projects engaged with before events were recorded, from
+    their counters, as if all that engagement happened at their last update
+    """
+    backfilled = 0
+    after = ""
+    while True:
+        rows = (
+            db.query(
+                Project.id,
+                Project.view_count,
+                Project.like_count,
+                Project.fork_count,
+                Project.updated_at,
+                Project.created_at,
+            )
+            .filter(Project.id > after, Project.trending_score == 0)
+            .order_by(Project.id)
+            .limit(TRENDING_BATCH_SIZE)
+            .all()
+        )
+        if not rows:
+            return backfilled
+        scores = {}
+        for row_id, views, likes, forks, updated_at, created_at in rows:
+            weight = (
+                (views or 0) * TRENDING_WEIGHTS["view"]
+                + (likes or 0) * TRENDING_WEIGHTS["like"]
+                + (forks or 0) * TRENDING_WEIGHTS["fork"]
+            )
+            at = updated_at or created_at
+            if weight > 0 and at is not None:
+                scores[row_id] = event_score(_naive(at), weight)
+        if scores:
+            _write_scores(db, scores)
+            backfilled += len(scores)
+        after = rows[-1][0]
+
+
+def _naive(value: datetime) -> datetime:
+    return value.replace(tzinfo=None) if value.tzinfo is not None else value
+
+
+def refresh_trending_scores(
+    db: Session, now: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Fold every queued trending event into its project's score and drop it
+    from the queue. The first run also seeds scores from the counters.
+    """
+    now = now or datetime.utcnow()
+    if not _acquire_refresh_lock(db):
+        return {"skipped": True}
+
+    backfilled = 0
+    mark = db.get(AnalyticsRollupWatermark, WATERMARK_NAME)
+    if mark is None:
+        backfilled = _backfill_from_counters(db)
+        mark = AnalyticsRollupWatermark(
+            name=WATERMARK_NAME, high_water=now, updated_at=now
+        )
+        db.add(mark)
+
+    folded = 0
+    touched: Set[str] = set()
+    while True:
+        events = (
+            db.query(
+                ProjectTrendingEvent.id,
+                ProjectTrendingEvent.project_id,
+                ProjectTrendingEvent.kind,
+                ProjectTrendingEvent.occurred_at,
+            )
+            .order_by(ProjectTrendingEvent.id)
+            .limit(TRENDING_BATCH_SIZE)
+            .all()
+        )
+        if not events:
+            break
+        contributions: Dict[str, float] = {}
+        for _, project_id, kind, occurred_at in events:
+            weight = TRENDING_WEIGHTS.get(kind)
+            if weight is None:
+                continue
+            score = event_score(occurred_at, weight)
+            previous = contributions.get(project_id)
+            contributions[project_id] = (
+                score if previous is None else combine(previous, score)
+            )
+            mark.high_water = max(mark.high_water, occurred_at)
+        touched |= _fold(db, contributions)
+        # Delete exactly what was read; events committed meanwhile stay queued
+        for chunk in _chunks([event[0] for event in events]):
+            db.query(ProjectTrendingEvent).filter(
+                ProjectTrendingEvent.id.in_(chunk)
+            ).delete(synchronize_session=False)
+        folded += len(events)
+        if len(events) < TRENDING_BATCH_SIZE:
+            break
+
+    # Windows that have closed no longer dedupe anything
+    db.query(ProjectViewer).filter(
+        ProjectViewer.window_start < view_window_start(now)
+    ).delete(synchronize_session=False)
+
+    mark.updated_at = now
+    db.commit()
+
+    if folded or backfilled:
+        logger.info(
+            f"Trending scores refreshed: {folded} events over {len(touched)} "
+            f"projects, {backfilled} seeded from counters"
+        )
+    return {"events": folded, "projects": len(touched), "backfilled": backfilled}
+
+
+def _refresh_in_new_session() -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        return refresh_trending_scores(db)
+    finally:
+        db.close()
+
+
+async def run_trending_job(interval: int = TRENDING_INTERVAL_SECONDS) -> None:
+    """Background loop folding trending events into the scores"""
+    while True:
+        try:
+            await asyncio.to_thread(_refresh_in_new_session)
+        except Exception as e:
+            logger.error(f"Trending score refresh failed: {e}", exc_info=True)
+        await asyncio.sleep(interval)
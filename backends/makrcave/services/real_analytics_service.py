@@ -1,23 +1,43 @@
 """Real analytics service replacing mock data with actual database queries"""
 
 import logging
+import uuid
+from collections import Counter, defaultdict
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime, timedelta
 from typing import Any, Dict, List
 
-from sqlalchemy import and_, extract, func, text
+from sqlalchemy import and_, func
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import case
 
 from ..database import get_db
-from ..models.enhanced_analytics import EquipmentUtilizationMetrics
+from ..models.enhanced_analytics import AggregationPeriod, EquipmentUtilizationMetrics
 from ..models.enhanced_member import Member, MemberActivityLog
-from ..models.billing import CreditTransaction, Transaction
-from ..models.equipment import Equipment, EquipmentReservation
+from ..models.billing import (
+    CreditTransaction,
+    CreditWallet,
+    Transaction,
+    TransactionStatus,
+)
+from ..models.equipment import Equipment, EquipmentReservation, ReservationStatus
 from ..models.machine_access import SafetyIncident, UserCertification
+from ..models.membership_plans import MembershipPlan
+from ..models.skill import Skill
+from . import analytics_rollups
 
 logger = logging.getLogger(__name__)
 
+_ACTIVE_STATUSES = ("available", "in_use")
+
+
+def _engagement_level(activity_count: int) -> str:
+    if activity_count >= 20:
+        return "high"
+    if activity_count >= 10:
+        return "medium"
+    return "low"
+
 
 class RealAnalyticsService:
     """Production analytics service with real database queries"""
@@ -156,137 +176,56 @@ class RealAnalyticsService:
         try:
             start_date = datetime.utcnow() - timedelta(days=days)
 
-            # Daily usage trends
-            daily_usage = (
-                self.db.query(
-                    func.date(MemberActivityLog.timestamp).label("date"),
-                    func.count(func.distinct(MemberActivityLog.member_id)).label(
-                        "unique_members"
-                    ),
-                    func.count(MemberActivityLog.id).label("total_activities"),
-                )
-                .filter(
-                    and_(
-                        MemberActivityLog.makerspace_id == makerspace_id,
-                        MemberActivityLog.timestamp >= start_date,
-                    )
-                )
-                .group_by(func.date(MemberActivityLog.timestamp))
-                .order_by("date")
-                .all()
+            # Daily trends, peak hours and per-member activity come from the
+            # rollups plus the raw rows since the last refresh
+            daily_usage = analytics_rollups.daily_series(
+                self.db, makerspace_id, start_date
             )
-
-            # Peak hours analysis
-            hourly_usage = (
-                self.db.query(
-                    extract("hour", MemberActivityLog.timestamp).label("hour"),
-                    func.count(MemberActivityLog.id).label("activity_count"),
-                )
-                .filter(
-                    and_(
-                        MemberActivityLog.makerspace_id == makerspace_id,
-                        MemberActivityLog.timestamp >= start_date,
-                    )
-                )
-                .group_by(extract("hour", MemberActivityLog.timestamp))
-                .all()
+            hourly_usage = analytics_rollups.activity_by_hour_of_day(
+                self.db, makerspace_id, start_date
+            )
+            member_activity = analytics_rollups.member_activity(
+                self.db, makerspace_id, start_date
             )
 
             # Equipment popularity
-            equipment_usage = (
-                self.db.query(
-                    Equipment.name,
-                    Equipment.category,
-                    func.count(EquipmentUtilizationMetrics.id).label("usage_count"),
-                    func.avg(
-                        func.extract(
-                            "epoch",
-                            EquipmentUtilizationMetrics.end_time
-                            - EquipmentUtilizationMetrics.start_time,
-                        )
-                        / 3600
-                    ).label("avg_duration_hours"),
-                )
-                .join(
-                    EquipmentUtilizationMetrics,
-                    EquipmentUtilizationMetrics.equipment_id == Equipment.id,
-                )
-                .filter(
-                    and_(
-                        Equipment.makerspace_id == makerspace_id,
-                        EquipmentUtilizationMetrics.start_time >= start_date,
-                    )
-                )
-                .group_by(Equipment.id, Equipment.name, Equipment.category)
-                .order_by(text("usage_count desc"))
-                .limit(10)
-                .all()
-            )
+            equipment_usage = sorted(
+                self._equipment_usage(makerspace_id, start_date).values(),
+                key=lambda eq: eq["usage_count"],
+                reverse=True,
+            )[:10]
 
             # Member engagement levels
-            member_engagement = (
-                self.db.query(
-                    case(
-                        [
-                            (func.count(MemberActivityLog.id) >= 20, "high"),
-                            (func.count(MemberActivityLog.id) >= 10, "medium"),
-                        ],
-                        else_="low",
-                    ).label("engagement_level"),
-                    func.count(func.distinct(MemberActivityLog.member_id)).label(
-                        "member_count"
-                    ),
-                )
-                .filter(
-                    and_(
-                        MemberActivityLog.makerspace_id == makerspace_id,
-                        MemberActivityLog.timestamp >= start_date,
-                    )
-                )
-                .group_by(MemberActivityLog.member_id)
-                .subquery()
-            )
-
-            engagement_summary = (
-                self.db.query(
-                    member_engagement.c.engagement_level,
-                    func.count().label("member_count"),
-                )
-                .group_by(member_engagement.c.engagement_level)
-                .all()
+            engagement_summary = Counter(
+                _engagement_level(activity["activity_count"])
+                for activity in member_activity.values()
             )
 
             return {
                 "period_days": days,
                 "daily_trends": [
                     {
-                        "date": str(row.date),
-                        "unique_members": row.unique_members,
-                        "total_activities": row.total_activities,
+                        "date": str(row["date"]),
+                        "unique_members": row["active_members"],
+                        "total_activities": row["activity_count"],
                     }
                     for row in daily_usage
+                    if row["activity_count"]
                 ],
                 "peak_hours": [
-                    {
-                        "hour": int(row.hour),
-                        "activity_count": row.activity_count,
-                    }
-                    for row in hourly_usage
+                    {"hour": hour, "activity_count": count}
+                    for hour, count in sorted(hourly_usage.items())
                 ],
                 "popular_equipment": [
                     {
-                        "name": row.name,
-                        "category": row.category,
-                        "usage_count": row.usage_count,
-                        "avg_duration_hours": round(
-                            float(row.avg_duration_hours or 0), 2
-                        ),
+                        "name": eq["name"],
+                        "category": eq["category"],
+                        "usage_count": eq["usage_count"],
+                        "avg_duration_hours": round(eq["avg_session_hours"], 2),
                     }
-                    for row in equipment_usage
+                    for eq in equipment_usage
                 ],
-                "member_engagement": {
-                    row.engagement_level: row.member_count for row in engagement_summary
-                },
+                "member_engagement": dict(engagement_summary),
             }
 
         except SQLAlchemyError as e:
@@ -310,41 +249,26 @@ class RealAnalyticsService:
         """Get revenue and financial analytics"""
         try:
             start_date = datetime.utcnow() - timedelta(days=days)
+            completed = and_(
+                Transaction.makerspace_id == makerspace_id,
+                Transaction.created_at >= start_date,
+                Transaction.status == TransactionStatus.SUCCESS,
+            )
 
             # Daily revenue trends
-            daily_revenue = (
-                self.db.query(
-                    func.date(Transaction.created_at).label("date"),
-                    func.sum(Transaction.amount).label("revenue"),
-                    func.count(Transaction.id).label("transaction_count"),
-                )
-                .filter(
-                    and_(
-                        Transaction.makerspace_id == makerspace_id,
-                        Transaction.created_at >= start_date,
-                        Transaction.status == "completed",
-                    )
-                )
-                .group_by(func.date(Transaction.created_at))
-                .order_by("date")
-                .all()
+            daily_revenue = analytics_rollups.daily_series(
+                self.db, makerspace_id, start_date
             )
 
             # Revenue by category
             revenue_by_category = (
                 self.db.query(
-                    Transaction.category,
+                    Transaction.type.label("category"),
                     func.sum(Transaction.amount).label("revenue"),
                     func.count(Transaction.id).label("count"),
                 )
-                .filter(
-                    and_(
-                        Transaction.makerspace_id == makerspace_id,
-                        Transaction.created_at >= start_date,
-                        Transaction.status == "completed",
-                    )
-                )
-                .group_by(Transaction.category)
+                .filter(completed)
+                .group_by(Transaction.type)
                 .all()
             )
 
@@ -357,16 +281,10 @@ class RealAnalyticsService:
                     func.sum(Transaction.amount).label("total_spent"),
                     func.count(Transaction.id).label("transaction_count"),
                 )
-                .join(Transaction, Transaction.member_id == Member.id)
-                .filter(
-                    and_(
-                        Transaction.makerspace_id == makerspace_id,
-                        Transaction.created_at >= start_date,
-                        Transaction.status == "completed",
-                    )
-                )
-                .group_by(Member.id)
-                .order_by("total_spent desc")
+                .join(Transaction, Transaction.user_id == Member.keycloak_user_id)
+                .filter(completed)
+                .group_by(Member.id, Member.email, Member.first_name, Member.last_name)
+                .order_by(func.sum(Transaction.amount).desc())
                 .limit(10)
                 .all()
             )
@@ -377,7 +295,7 @@ class RealAnalyticsService:
                     func.sum(
                         case(
                             (
-                                CreditTransaction.transaction_type == "purchase",
+                                CreditTransaction.type == "earned",
                                 CreditTransaction.amount,
                             ),
                             else_=0,
@@ -386,19 +304,20 @@ class RealAnalyticsService:
                     func.sum(
                         case(
                             (
-                                CreditTransaction.transaction_type == "usage",
-                                CreditTransaction.amount,
+                                CreditTransaction.type == "spent",
+                                -CreditTransaction.amount,
                             ),
                             else_=0,
                         )
                     ).label("credits_used"),
-                    func.count(func.distinct(CreditTransaction.member_id)).label(
+                    func.count(func.distinct(CreditTransaction.user_id)).label(
                         "active_credit_users"
                     ),
                 )
+                .join(CreditWallet, CreditWallet.id == CreditTransaction.wallet_id)
                 .filter(
                     and_(
-                        CreditTransaction.makerspace_id == makerspace_id,
+                        CreditWallet.makerspace_id == makerspace_id,
                         CreditTransaction.created_at >= start_date,
                     )
                 )
@@ -406,24 +325,20 @@ class RealAnalyticsService:
             )
 
             # Calculate totals and growth
-            total_revenue = sum(float(row.revenue or 0) for row in daily_revenue)
-            total_transactions = sum(row.transaction_count for row in daily_revenue)
+            totals = analytics_rollups.summarize(
+                daily_revenue, "revenue", "transaction_count"
+            )
+            total_revenue = float(totals["revenue"])
+            total_transactions = totals["transaction_count"]
 
             # Growth calculation (compare with previous period)
             prev_start = start_date - timedelta(days=days)
-            prev_revenue = (
-                self.db.query(func.sum(Transaction.amount))
-                .filter(
-                    and_(
-                        Transaction.makerspace_id == makerspace_id,
-                        Transaction.created_at >= prev_start,
-                        Transaction.created_at < start_date,
-                        Transaction.status == "completed",
-                    )
-                )
-                .scalar()
-                or 0.0
-            )
+            prev_revenue = analytics_rollups.summarize(
+                analytics_rollups.daily_series(
+                    self.db, makerspace_id, prev_start, end=start_date
+                ),
+                "revenue",
+            )["revenue"]
 
             growth_rate = (
                 ((total_revenue - float(prev_revenue)) / float(prev_revenue) * 100)
@@ -445,15 +360,16 @@ class RealAnalyticsService:
                 },
                 "daily_trends": [
                     {
-                        "date": str(row.date),
-                        "revenue": float(row.revenue or 0),
-                        "transaction_count": row.transaction_count,
+                        "date": str(row["date"]),
+                        "revenue": float(row["revenue"]),
+                        "transaction_count": row["transaction_count"],
                     }
                     for row in daily_revenue
+                    if row["transaction_count"]
                 ],
                 "revenue_by_category": [
                     {
-                        "category": row.category,
+                        "category": row.category.value,
                         "revenue": float(row.revenue or 0),
                         "count": row.count,
                     }
@@ -495,72 +411,24 @@ class RealAnalyticsService:
     ) -> Dict[str, Any]:
         """Get detailed equipment analytics"""
         try:
-            start_date = datetime.utcnow() - timedelta(days=days)
+            now = datetime.utcnow()
+            start_date = now - timedelta(days=days)
 
             # Equipment utilization rates
-            equipment_stats = (
-                self.db.query(
-                    Equipment.id,
-                    Equipment.name,
-                    Equipment.category,
-                    Equipment.status,
-                    func.count(EquipmentUtilizationMetrics.id).label("usage_sessions"),
-                    func.sum(
-                        func.extract(
-                            "epoch",
-                            EquipmentUtilizationMetrics.end_time
-                            - EquipmentUtilizationMetrics.start_time,
-                        )
-                        / 3600
-                    ).label("total_hours"),
-                    func.avg(
-                        func.extract(
-                            "epoch",
-                            EquipmentUtilizationMetrics.end_time
-                            - EquipmentUtilizationMetrics.start_time,
-                        )
-                        / 3600
-                    ).label("avg_session_hours"),
-                )
-                .outerjoin(
-                    EquipmentUtilizationMetrics,
-                    and_(
-                        EquipmentUtilizationMetrics.equipment_id == Equipment.id,
-                        EquipmentUtilizationMetrics.start_time >= start_date,
-                    ),
-                )
-                .filter(Equipment.makerspace_id == makerspace_id)
-                .group_by(Equipment.id)
-                .all()
-            )
+            equipment_stats = self._equipment_usage(makerspace_id, start_date)
 
             # Maintenance tracking
             maintenance_due = (
-                self.db.query(
-                    Equipment.id,
-                    Equipment.name,
-                    Equipment.next_maintenance_date,
-                    Equipment.maintenance_hours_interval,
-                    func.sum(
-                        func.extract(
-                            "epoch",
-                            EquipmentUtilizationMetrics.end_time
-                            - EquipmentUtilizationMetrics.start_time,
-                        )
-                        / 3600
-                    ).label("hours_since_maintenance"),
-                )
-                .outerjoin(EquipmentUtilizationMetrics)
+                self.db.query(Equipment)
                 .filter(
                     and_(
-                        Equipment.makerspace_id == makerspace_id,
-                        Equipment.next_maintenance_date
-                        <= datetime.utcnow() + timedelta(days=7),
+                        Equipment.linked_makerspace_id == makerspace_id,
+                        Equipment.next_maintenance_date <= now + timedelta(days=7),
                     )
                 )
-                .group_by(Equipment.id)
                 .all()
             )
+            hours_since_maintenance = self._hours_since_maintenance(maintenance_due)
 
             # Equipment reservations
             upcoming_reservations = (
@@ -575,14 +443,15 @@ class RealAnalyticsService:
                     Equipment,
                     EquipmentReservation.equipment_id == Equipment.id,
                 )
-                .join(Member, EquipmentReservation.member_id == Member.id)
+                .outerjoin(
+                    Member, EquipmentReservation.member_id == Member.keycloak_user_id
+                )
                 .filter(
                     and_(
-                        Equipment.makerspace_id == makerspace_id,
-                        EquipmentReservation.start_time >= datetime.utcnow(),
-                        EquipmentReservation.start_time
-                        <= datetime.utcnow() + timedelta(days=7),
-                        EquipmentReservation.status == "confirmed",
+                        Equipment.linked_makerspace_id == makerspace_id,
+                        EquipmentReservation.start_time >= now,
+                        EquipmentReservation.start_time <= now + timedelta(days=7),
+                        EquipmentReservation.status == ReservationStatus.APPROVED,
                     )
                 )
                 .order_by(EquipmentReservation.start_time)
@@ -595,21 +464,21 @@ class RealAnalyticsService:
             total_available_hours = days * operating_hours_per_day
 
             equipment_list = []
-            for eq in equipment_stats:
+            for eq in equipment_stats.values():
                 utilization_rate = (
-                    (float(eq.total_hours or 0) / total_available_hours) * 100
+                    (eq["total_hours"] / total_available_hours) * 100
                     if total_available_hours > 0
                     else 0
                 )
                 equipment_list.append(
                     {
-                        "id": eq.id,
-                        "name": eq.name,
-                        "category": eq.category,
-                        "status": eq.status,
-                        "usage_sessions": eq.usage_sessions or 0,
-                        "total_hours": round(float(eq.total_hours or 0), 2),
-                        "avg_session_hours": round(float(eq.avg_session_hours or 0), 2),
+                        "id": eq["id"],
+                        "name": eq["name"],
+                        "category": eq["category"],
+                        "status": eq["status"],
+                        "usage_sessions": eq["usage_count"],
+                        "total_hours": round(eq["total_hours"], 2),
+                        "avg_session_hours": round(eq["avg_session_hours"], 2),
                         "utilization_rate": round(utilization_rate, 1),
                     }
                 )
@@ -627,12 +496,12 @@ class RealAnalyticsService:
                             else None
                         ),
                         "hours_since_maintenance": round(
-                            float(eq.hours_since_maintenance or 0), 2
+                            hours_since_maintenance.get(eq.id, 0.0), 2
                         ),
                         "urgency": (
                             "overdue"
                             if eq.next_maintenance_date
-                            and eq.next_maintenance_date < datetime.utcnow()
+                            and eq.next_maintenance_date < now
                             else "due_soon"
                         ),
                     }
@@ -649,8 +518,10 @@ class RealAnalyticsService:
                 ],
                 "summary": {
                     "total_equipment": len(equipment_list),
-                    "active_equipment": len(
-                        [eq for eq in equipment_list if eq["status"] == "operational"]
+                    "active_equipment": sum(
+                        1
+                        for eq in equipment_list
+                        if eq["status"] in _ACTIVE_STATUSES
                     ),
                     "maintenance_due": len(maintenance_due),
                     "average_utilization": (
@@ -686,29 +557,21 @@ class RealAnalyticsService:
         """Get member engagement and skill analytics"""
         try:
             start_date = datetime.utcnow() - timedelta(days=days)
+            makerspace = uuid.UUID(str(makerspace_id))
 
             # Member activity levels
-            member_activity = (
-                self.db.query(
-                    Member.id,
-                    Member.first_name,
-                    Member.last_name,
-                    Member.email,
-                    Member.membership_type,
-                    func.count(MemberActivityLog.id).label("activity_count"),
-                    func.max(MemberActivityLog.timestamp).label("last_activity"),
-                )
-                .outerjoin(
-                    MemberActivityLog,
-                    and_(
-                        MemberActivityLog.member_id == Member.id,
-                        MemberActivityLog.timestamp >= start_date,
-                    ),
-                )
-                .filter(Member.makerspace_id == makerspace_id)
-                .group_by(Member.id)
+            activity = analytics_rollups.member_activity(
+                self.db, makerspace_id, start_date
+            )
+            members = (
+                self.db.query(Member.id)
+                .filter(Member.makerspace_id == makerspace)
                 .all()
             )
+            member_activity = [
+                activity.get(str(member.id), {}).get("activity_count", 0)
+                for member in members
+            ]
 
             # Skills and certifications
             # TODO: Implement skills_distribution using UserSkill if needed
@@ -717,19 +580,20 @@ class RealAnalyticsService:
             # Recent certifications
             recent_certifications = (
                 self.db.query(
-                    UserCertification.certification_name,
-                    UserCertification.certification_date,
+                    Skill.name.label("certification_name"),
+                    UserCertification.issued_at.label("certification_date"),
                     Member.first_name,
                     Member.last_name,
                 )
-                .join(Member, UserCertification.member_id == Member.id)
+                .join(Skill, Skill.id == UserCertification.skill_id)
+                .join(Member, UserCertification.user_id == Member.keycloak_user_id)
                 .filter(
                     and_(
-                        Member.makerspace_id == makerspace_id,
-                        UserCertification.certification_date >= start_date,
+                        Member.makerspace_id == makerspace,
+                        UserCertification.issued_at >= start_date,
                     )
                 )
-                .order_by(UserCertification.certification_date.desc())
+                .order_by(UserCertification.issued_at.desc())
                 .limit(10)
                 .all()
             )
@@ -737,36 +601,28 @@ class RealAnalyticsService:
             # Membership type distribution
             membership_distribution = (
                 self.db.query(
-                    Member.membership_type,
+                    MembershipPlan.name.label("membership_type"),
                     func.count(Member.id).label("count"),
                 )
-                .filter(Member.makerspace_id == makerspace_id)
-                .group_by(Member.membership_type)
+                .outerjoin(
+                    MembershipPlan, Member.membership_plan_id == MembershipPlan.id
+                )
+                .filter(Member.makerspace_id == makerspace)
+                .group_by(MembershipPlan.name)
                 .all()
             )
 
             # Engagement categories
-            high_engagement = len(
-                [m for m in member_activity if (m.activity_count or 0) >= 20]
-            )
-            medium_engagement = len(
-                [m for m in member_activity if 10 <= (m.activity_count or 0) < 20]
-            )
-            low_engagement = len(
-                [m for m in member_activity if (m.activity_count or 0) < 10]
-            )
+            levels = Counter(_engagement_level(count) for count in member_activity)
+            high_engagement = levels["high"]
+            medium_engagement = levels["medium"]
+            low_engagement = levels["low"]
 
             return {
                 "period_days": days,
                 "summary": {
                     "total_members": len(member_activity),
-                    "active_members": len(
-                        [
-                            m
-                            for m in member_activity
-                            if m.activity_count and m.activity_count > 0
-                        ]
-                    ),
+                    "active_members": len([c for c in member_activity if c > 0]),
                     "high_engagement": high_engagement,
                     "medium_engagement": medium_engagement,
                     "low_engagement": low_engagement,
@@ -813,6 +669,74 @@ class RealAnalyticsService:
             )
             return {"error": str(e)}
 
+    def _equipment_usage(
+        self, makerspace_id: str, start_date: datetime
+    ) -> Dict[str, Dict[str, Any]]:
+        """Sessions and hours per equipment from the daily utilization metrics"""
+        equipment = {
+            eq.id: {
+                "id": eq.id,
+                "name": eq.name,
+                "category": eq.category.value if eq.category else None,
+                "status": eq.status.value if eq.status else None,
+                "usage_count": 0,
+                "total_hours": 0.0,
+                "avg_session_hours": 0.0,
+            }
+            for eq in self.db.query(Equipment).filter(
+                Equipment.linked_makerspace_id == makerspace_id
+            )
+        }
+        usage = (
+            self.db.query(
+                EquipmentUtilizationMetrics.equipment_id,
+                func.sum(EquipmentUtilizationMetrics.usage_frequency),
+                func.sum(EquipmentUtilizationMetrics.total_used_hours),
+            )
+            .filter(
+                and_(
+                    EquipmentUtilizationMetrics.period_type
+                    == AggregationPeriod.DAILY.value,
+                    EquipmentUtilizationMetrics.date >= start_date,
+                )
+            )
+            .group_by(EquipmentUtilizationMetrics.equipment_id)
+            .all()
+        )
+        for equipment_id, sessions, hours in usage:
+            eq = equipment.get(str(equipment_id))
+            if eq is None:
+                continue
+            eq["usage_count"] = int(sessions or 0)
+            eq["total_hours"] = float(hours or 0)
+            if eq["usage_count"]:
+                eq["avg_session_hours"] = eq["total_hours"] / eq["usage_count"]
+        return equipment
+
+    def _hours_since_maintenance(self, equipment: List[Equipment]) -> Dict[str, float]:
+        serviced = {eq.id: eq.last_maintenance_date for eq in equipment}
+        if not serviced:
+            return {}
+        hours: Dict[str, float] = defaultdict(float)
+        rows = self.db.query(
+            EquipmentUtilizationMetrics.equipment_id,
+            EquipmentUtilizationMetrics.date,
+            EquipmentUtilizationMetrics.total_used_hours,
+        ).filter(
+            EquipmentUtilizationMetrics.period_type == AggregationPeriod.DAILY.value
+        )
+        since = [d for d in serviced.values() if d is not None]
+        if len(since) == len(serviced):
+            rows = rows.filter(EquipmentUtilizationMetrics.date >= min(since))
+        for equipment_id, day, used in rows:
+            key = str(equipment_id)
+            if key not in serviced:
+                continue
+            last = serviced[key]
+            if last is None or day.replace(tzinfo=None) >= last:
+                hours[key] += used or 0.0
+        return hours
+
     def get_safety_analytics(
         self, makerspace_id: str, days: int = 30
     ) -> Dict[str, Any]:
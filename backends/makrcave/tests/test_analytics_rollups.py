@@ -0,0 +1,221 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backends.makrcave.database import Base
+from backends.makrcave.models.analytics_rollups import (
+    AnalyticsDailyRollup,
+    AnalyticsHourlyRollup,
+)
+from backends.makrcave.models.billing import (
+    Transaction,
+    TransactionStatus,
+    TransactionType,
+)
+from backends.makrcave.models.enhanced_analytics import EquipmentUtilizationMetrics
+from backends.makrcave.models.enhanced_member import Member, MemberActivityLog
+from backends.makrcave.services import analytics_rollups as rollups
+from backends.makrcave.services.real_analytics_service import RealAnalyticsService
+
+MAKERSPACE = uuid.UUID("6f1b5d0e-0000-4000-8000-000000000001")
+MEMBERS = {name: uuid.uuid4() for name in "ABC"}
+START = datetime(2026, 3, 8)
+NOW = datetime(2026, 3, 10, 14, 30)
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    _seed(session)
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _activity(member, at, activity_type="login"):
+    return MemberActivityLog(
+        member_id=MEMBERS[member], activity_type=activity_type, created_at=at
+    )
+
+
+def _transaction(amount, at, status=TransactionStatus.SUCCESS):
+    return Transaction(
+        user_id="u1",
+        makerspace_id=str(MAKERSPACE),
+        amount=amount,
+        type=TransactionType.SERVICE,
+        status=status,
+        created_at=at,
+    )
+
+
+def _seed(db):
+    for name, member_id in MEMBERS.items():
+        db.add(
+            Member(
+                id=member_id,
+                keycloak_user_id=f"kc-{name}",
+                email=f"{name}@example.com",
+                first_name=name,
+                last_name=name,
+                membership_plan_id=uuid.uuid4(),
+                makerspace_id=MAKERSPACE,
+                start_date=START,
+                end_date=datetime(2027, 1, 1),
+            )
+        )
+    db.add_all(
+        [
+            _activity("A", datetime(2026, 3, 8, 10, 5), "checkin"),
+            _activity("A", datetime(2026, 3, 8, 10, 6)),
+            _activity("B", datetime(2026, 3, 8, 10, 30)),
+            _activity("A", datetime(2026, 3, 8, 15, 0)),
+            _activity("C", datetime(2026, 3, 9, 9, 0)),
+            _activity("C", datetime(2026, 3, 9, 9, 10)),
+            _activity("A", datetime(2026, 3, 10, 8, 0)),
+            _activity("B", datetime(2026, 3, 10, 14, 10)),  # current hour
+            _transaction(100.0, datetime(2026, 3, 8, 11, 0)),
+            _transaction(50.0, datetime(2026, 3, 8, 11, 5), TransactionStatus.FAILED),
+            _transaction(20.0, datetime(2026, 3, 10, 13, 0)),
+            _transaction(5.0, datetime(2026, 3, 10, 14, 20)),  # current hour
+            EquipmentUtilizationMetrics(
+                makerspace_id=MAKERSPACE,
+                equipment_id=uuid.uuid4(),
+                date=datetime(2026, 3, 9),
+                period_type="daily",
+                total_available_hours=12.0,
+                total_used_hours=4.5,
+                usage_frequency=3,
+                created_at=datetime(2026, 3, 10, 1, 0),
+            ),
+        ]
+    )
+    db.commit()
+
+
+def _figures(db):
+    series = rollups.daily_series(db, str(MAKERSPACE), START)
+    return (
+        {
+            str(day["date"]): (
+                day["activity_count"],
+                day["checkin_count"],
+                day["active_members"],
+                day["transaction_count"],
+                day["revenue"],
+                day["equipment_sessions"],
+                day["equipment_hours"],
+            )
+            for day in series
+        },
+        rollups.activity_by_hour_of_day(db, str(MAKERSPACE), START),
+        {
+            member_id: entry["activity_count"]
+            for member_id, entry in rollups.member_activity(
+                db, str(MAKERSPACE), START
+            ).items()
+        },
+    )
+
+
+EXPECTED_DAYS = {
+    "2026-03-08": (4, 1, 2, 1, 100.0, 0, 0),
+    "2026-03-09": (2, 0, 1, 0, 0, 3, 4.5),
+    "2026-03-10": (2, 0, 2, 2, 25.0, 0, 0),
+}
+EXPECTED_HOURS = {8: 1, 9: 2, 10: 3, 14: 1, 15: 1}
+
+
+def test_rollups_plus_live_tail_match_raw_aggregation(db):
+    raw = _figures(db)  # no watermark yet: everything is read from raw rows
+
+    result = rollups.refresh_rollups(db, now=NOW)
+
+    assert result["until"] == datetime(2026, 3, 10, 14)
+    assert db.query(AnalyticsHourlyRollup).count() == 4
+    assert db.query(AnalyticsDailyRollup).count() == 3
+    assert _figures(db) == raw
+    days, hours, members = raw
+    assert days == EXPECTED_DAYS
+    assert hours == EXPECTED_HOURS
+    assert members == {
+        str(MEMBERS["A"]): 4,
+        str(MEMBERS["B"]): 2,
+        str(MEMBERS["C"]): 2,
+    }
+
+
+def test_refresh_is_incremental_and_idempotent(db):
+    rollups.refresh_rollups(db, now=NOW)
+    db.add(_activity("A", datetime(2026, 3, 10, 14, 40)))
+    db.commit()
+
+    later = datetime(2026, 3, 10, 15, 10)
+    first = rollups.refresh_rollups(db, now=later)
+    snapshot = _figures(db)
+    again = rollups.refresh_rollups(db, now=later)
+
+    assert first["since"] == datetime(2026, 3, 10, 14)
+    assert again["hours"] == 0
+    assert _figures(db) == snapshot
+    days, hours, members = snapshot
+    assert days["2026-03-10"] == (3, 0, 2, 2, 25.0, 0, 0)
+    assert hours[14] == 2
+    assert members[str(MEMBERS["A"])] == 5
+
+
+def test_payments_settled_after_a_refresh_are_counted(db):
+    pending = _transaction(40.0, datetime(2026, 3, 9, 12, 0), TransactionStatus.PENDING)
+    db.add(pending)
+    db.commit()
+    rollups.refresh_rollups(db, now=NOW)
+    day = (datetime(2026, 3, 9).date(), "2026-03-09")
+
+    # Completed after its hour was folded: counted from the next read on
+    pending.status = TransactionStatus.SUCCESS
+    db.commit()
+    days, _, _ = _figures(db)
+    assert days[day[1]] == (2, 0, 1, 1, 40.0, 3, 4.5)
+    rollups.refresh_rollups(db, now=datetime(2026, 3, 10, 16, 0))
+    assert _figures(db)[0][day[1]] == (2, 0, 1, 1, 40.0, 3, 4.5)
+
+    # A later refund takes it back out, matching revenue_by_category
+    original = db.query(Transaction).filter(Transaction.amount == 100.0).one()
+    original.status = TransactionStatus.REFUNDED
+    db.commit()
+    revenue = RealAnalyticsService(db).get_revenue_analytics(
+        str(MAKERSPACE), days=400
+    )
+    assert _figures(db)[0]["2026-03-08"][3:5] == (0, 0)
+    assert revenue["summary"]["total_revenue"] == 65.0
+    assert revenue["summary"]["total_revenue"] == sum(
+        row["revenue"] for row in revenue["revenue_by_category"]
+    )
+    assert [row["date"] for row in revenue["daily_trends"]] == [
+        str(day[0]),
+        "2026-03-10",
+    ]
+
+
+def test_analytics_service_reads_rollups(db):
+    rollups.refresh_rollups(db, now=NOW)
+    service = RealAnalyticsService(db)
+
+    usage = service.get_usage_analytics(str(MAKERSPACE), days=400)
+    revenue = service.get_revenue_analytics(str(MAKERSPACE), days=400)
+    members = service.get_member_analytics(str(MAKERSPACE), days=400)
+
+    assert [d["total_activities"] for d in usage["daily_trends"]] == [4, 2, 2]
+    assert usage["member_engagement"] == {"low": 3}
+    assert revenue["summary"]["total_revenue"] == 125.0
+    assert revenue["summary"]["total_transactions"] == 3
+    assert members["summary"]["active_members"] == 3
+    assert "error" not in service.get_equipment_analytics(str(MAKERSPACE), days=400)
@@ -0,0 +1,166 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backends.makrcave.models.announcements import (
+    Announcement,
+    AnnouncementAcknowledgment,
+    AnnouncementAudience,
+    Priority,
+    TargetAudience,
+    index_announcement_audiences,
+)
+from backends.makrcave.models.enhanced_member import Member, MemberRole
+from backends.makrcave.models.inventory import Makerspace, User
+from backends.makrcave.models.membership_plans import MembershipPlan
+from backends.makrcave.routes.announcements import get_member_announcements
+
+MAKERSPACE = uuid.uuid4()
+PLAN = uuid.uuid4()
+NOW = datetime.utcnow()
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    tables = [
+        Makerspace.__table__,
+        User.__table__,
+        MembershipPlan.__table__,
+        Member.__table__,
+        Announcement.__table__,
+        AnnouncementAudience.__table__,
+        AnnouncementAcknowledgment.__table__,
+    ]
+    Member.metadata.create_all(engine, tables=tables)
+    session = sessionmaker(bind=engine)()
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    session.statements = statements
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _member(db, subject, role=MemberRole.USER, joined_days_ago=200):
+    member = Member(
+        keycloak_user_id=subject,
+        email=f"{subject}@example.com",
+        first_name="Maker",
+        last_name=subject,
+        role=role,
+        membership_plan_id=PLAN,
+        makerspace_id=MAKERSPACE,
+        skills=["laser-safety"],
+        start_date=NOW,
+        end_date=NOW + timedelta(days=30),
+        created_at=NOW - timedelta(days=joined_days_ago),
+    )
+    db.add(member)
+    db.commit()
+    return member
+
+
+def _announce(db, title, minutes_ago, audience=TargetAudience.ALL_MEMBERS, **kwargs):
+    announcement = Announcement(
+        makerspace_id=kwargs.pop("makerspace_id", MAKERSPACE),
+        title=title,
+        content=title,
+        target_audience=audience,
+        is_published=kwargs.pop("is_published", True),
+        created_by=uuid.uuid4(),
+        created_at=NOW - timedelta(minutes=minutes_ago),
+        updated_at=NOW,
+        **kwargs,
+    )
+    db.add(announcement)
+    db.commit()
+    return announcement
+
+
+def _feed(db, subject, include_acknowledged=False):
+    return asyncio.run(
+        get_member_announcements(
+            include_acknowledged=include_acknowledged,
+            limit=20,
+            db=db,
+            current_user=SimpleNamespace(id=subject),
+        )
+    )
+
+
+def test_member_feed_is_one_indexed_query(db):
+    member = _member(db, "kc-1")
+    other = _member(db, "kc-2")
+    _announce(db, "general", 50)
+    _announce(db, "pinned", 60, is_pinned=True)
+    _announce(db, "urgent", 40, priority=Priority.URGENT)
+    plans = TargetAudience.SPECIFIC_PLANS
+    _announce(db, "plan", 30, plans, target_membership_plans=[str(PLAN)])
+    _announce(db, "skill", 20, TargetAudience.SPECIFIC_SKILLS, target_skills=["cnc"])
+    _announce(db, "admins", 10, TargetAudience.ADMINS_ONLY)
+    _announce(db, "new", 5, TargetAudience.NEW_MEMBERS)
+    _announce(db, "elsewhere", 1, makerspace_id=uuid.uuid4())
+    _announce(db, "draft", 1, is_published=False)
+    _announce(db, "expired", 1, expires_at=NOW - timedelta(minutes=1))
+    members = TargetAudience.SPECIFIC_MEMBERS
+    acknowledged = _announce(
+        db, "for kc-1", 3, members, target_members=[str(member.id)]
+    )
+    _announce(db, "for kc-2", 2, members, target_members=[str(other.id)])
+    db.add(
+        AnnouncementAcknowledgment(announcement_id=acknowledged.id, member_id=member.id)
+    )
+    db.commit()
+
+    del db.statements[:]
+    feed = _feed(db, "kc-1")
+
+    assert [item["title"] for item in feed] == ["pinned", "urgent", "plan", "general"]
+    assert len(db.statements) == 2  # the member row, then the feed
+    with_acknowledged = [item["title"] for item in _feed(db, "kc-1", True)]
+    assert with_acknowledged == ["pinned", "urgent", "for kc-1", "plan", "general"]
+
+
+def test_audience_index_follows_targeting_changes(db):
+    member = _member(db, "kc-1", joined_days_ago=3)
+    admin = _member(db, "kc-admin", role=MemberRole.MAKERSPACE_ADMIN)
+    announcement = _announce(db, "news", 5, TargetAudience.NEW_MEMBERS)
+
+    assert [item["title"] for item in _feed(db, "kc-1")] == ["news"]
+    assert _feed(db, "kc-admin") == []
+
+    announcement.target_audience = TargetAudience.ADMINS_ONLY
+    db.commit()
+    assert _feed(db, "kc-1") == []
+    assert [item["title"] for item in _feed(db, "kc-admin")] == ["news"]
+    assert announcement.is_targeted_to_member(admin)
+    assert not announcement.is_targeted_to_member(member)
+
+    db.delete(announcement)
+    db.commit()
+    assert db.query(AnnouncementAudience).count() == 0
+
+
+def test_backfill_indexes_announcements_without_rows(db):
+    _member(db, "kc-1")
+    _announce(db, "legacy", 5)
+    db.query(AnnouncementAudience).delete()
+    db.commit()
+    assert _feed(db, "kc-1") == []
+
+    assert index_announcement_audiences(db) == 1
+    assert [item["title"] for item in _feed(db, "kc-1")] == ["legacy"]
+    assert index_announcement_audiences(db) == 0
@@ -0,0 +1,142 @@
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backends.makrcave.models.equipment import Equipment, EquipmentCategory
+from backends.makrcave.models.equipment_reservations import (
+    EnhancedEquipmentReservation,
+    ReservationStatus,
+)
+from backends.makrcave.routes import equipment_reservations as routes
+from backends.makrcave.schemas.equipment_reservations import (
+    AvailabilityCheckRequest,
+    NextFreeSlotRequest,
+)
+from backends.makrcave.services.availability import grid_slots, merge_intervals
+
+MONDAY = datetime(2026, 3, 2)
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    tables = [Equipment.__table__, EnhancedEquipmentReservation.__table__]
+    Equipment.metadata.create_all(engine, tables=tables)
+    session = sessionmaker(bind=engine)()
+    for name in ("laser", "printer", "cnc"):
+        session.add(
+            Equipment(
+                id=name,
+                equipment_id=name,
+                name=name.title(),
+                category=EquipmentCategory.LASER_CUTTER,
+                location="Bay 1",
+                linked_makerspace_id="ms-1",
+                created_by="admin",
+            )
+        )
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _book(db, equipment_id, start_hour, hours, status=ReservationStatus.APPROVED):
+    start = MONDAY + timedelta(hours=start_hour)
+    db.add(
+        EnhancedEquipmentReservation(
+            equipment_id=equipment_id,
+            user_id="u1",
+            user_name="User",
+            requested_start=start,
+            requested_end=start + timedelta(hours=hours),
+            duration_hours=hours,
+            status=status,
+        )
+    )
+    db.commit()
+
+
+def test_sweep_matches_per_slot_scan():
+    rng = random.Random(5)
+    start, end = MONDAY, MONDAY + timedelta(days=3, minutes=20)
+    bookings = []
+    for _ in range(120):
+        booking_start = start + timedelta(minutes=rng.randrange(-120, 4400))
+        bookings.append(
+            (booking_start, booking_start + timedelta(minutes=rng.randrange(5, 300)))
+        )
+
+    for minutes in (15, 60, 90):
+        granularity = timedelta(minutes=minutes)
+        expected = []
+        slot_start = start
+        while slot_start < end:  # the per-slot scan the engine replaces
+            slot_end = min(slot_start + granularity, end)
+            free = not any(b < slot_end and e > slot_start for b, e in bookings)
+            expected.append((slot_start, slot_end, free))
+            slot_start = slot_end
+
+        swept = list(grid_slots(merge_intervals(bookings), start, end, granularity))
+        assert swept == expected
+
+
+def test_check_availability_ignores_non_blocking_reservations(db):
+    _book(db, "laser", 9, 2)
+    _book(db, "laser", 10, 3)  # overlaps the first one
+    _book(db, "laser", 14, 1, ReservationStatus.PENDING)
+    _book(db, "printer", 9, 8)
+    request = AvailabilityCheckRequest(
+        equipment_id="laser",
+        start_date=MONDAY + timedelta(hours=8),
+        end_date=MONDAY + timedelta(hours=16),
+        duration_hours=2,
+    )
+
+    response = asyncio.run(routes.check_availability(request, {}, db))
+
+    free_hours = [slot.start_time.hour for slot in response.available_slots]
+    assert free_hours == [8, 13, 14, 15]
+    assert response.total_slots_checked == 8
+    assert response.next_available_slot.start_time.hour == 13
+    assert response.next_available_slot.end_time.hour == 15
+
+
+def test_next_free_slot_across_machines(db):
+    _book(db, "laser", 0, 30)
+    _book(db, "printer", 0, 9.25)
+    _book(db, "printer", 10, 5)
+    _book(db, "cnc", 0, 10.5)
+    request = NextFreeSlotRequest(
+        equipment_ids=["laser", "printer", "cnc"],
+        duration_hours=1,
+        earliest_start=(MONDAY + timedelta(hours=1)).replace(tzinfo=timezone.utc),
+        search_horizon_days=1,
+    )
+
+    response = asyncio.run(routes.find_next_free_slot(request, {}, db))
+
+    assert response.next_free_slot.equipment_id == "cnc"
+    assert response.next_free_slot.start_time == MONDAY + timedelta(hours=10.5)
+    assert [slot.equipment_id for slot in response.free_slots] == ["cnc", "printer"]
+    # 9:15-10:00 is too short for an hour, so the printer frees up at 15:00
+    assert response.free_slots[1].start_time == MONDAY + timedelta(hours=15)
+    assert response.unavailable_equipment_ids == ["laser"]
+
+
+def test_next_free_slot_rejects_unknown_equipment(db):
+    request = NextFreeSlotRequest(equipment_ids=["laser", "lathe"], duration_hours=1)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(routes.find_next_free_slot(request, {}, db))
+
+    assert error.value.status_code == 404
+    assert "lathe" in error.value.detail
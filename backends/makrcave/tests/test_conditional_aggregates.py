@@ -0,0 +1,134 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backends.makrcave.crud import aggregates, billing, member
+from backends.makrcave.models.billing import (
+    PaymentGateway,
+    Transaction,
+    TransactionStatus,
+    TransactionType,
+)
+from backends.makrcave.models.enhanced_member import Member, MemberRole, MemberStatus
+from backends.makrcave.models.membership_plans import MembershipPlan
+
+
+@pytest.fixture(params=[True, False], ids=["filter", "sum-case"])
+def db(request, monkeypatch):
+    monkeypatch.setattr(aggregates, "supports_filter_clause", lambda db: request.param)
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    tables = [MembershipPlan.__table__, Member.__table__, Transaction.__table__]
+    Member.metadata.create_all(engine, tables=tables)
+    session = sessionmaker(bind=engine)()
+
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    session.statements = statements
+    yield session
+    session.close()
+    engine.dispose()
+
+
+MAKERSPACE = uuid.uuid4()
+PLAN = uuid.uuid4()
+
+
+def _member(status, ends_in_days, makerspace_id=MAKERSPACE):
+    now = datetime.utcnow()
+    return Member(
+        id=uuid.uuid4(),
+        keycloak_user_id=str(uuid.uuid4()),
+        email="m@example.com",
+        first_name="M",
+        last_name="M",
+        role=MemberRole.USER,
+        membership_plan_id=PLAN,
+        makerspace_id=makerspace_id,
+        start_date=now - timedelta(days=10),
+        end_date=now + timedelta(days=ends_in_days),
+        status=status,
+    )
+
+
+def _transaction(amount, status, tx_type, gateway, days_ago=0, makerspace_id="ms-1"):
+    return Transaction(
+        user_id="u1",
+        makerspace_id=makerspace_id,
+        amount=amount,
+        type=tx_type,
+        status=status,
+        gateway=gateway,
+        service_type="printing" if tx_type == TransactionType.PRINTING_3D else None,
+        created_at=datetime.now() - timedelta(days=days_ago),
+    )
+
+
+def test_member_statistics_in_one_scan(db):
+    db.add(MembershipPlan(id=PLAN, makerspace_id=MAKERSPACE, name="Basic", price=0.0))
+    db.add_all(
+        [
+            _member(MemberStatus.ACTIVE, 10),
+            _member(MemberStatus.ACTIVE, 90),
+            _member(MemberStatus.EXPIRED, -5),
+            _member(MemberStatus.SUSPENDED, 40),
+            _member(MemberStatus.ACTIVE, 5, makerspace_id=uuid.uuid4()),
+        ]
+    )
+    db.commit()
+
+    db.statements.clear()
+    stats = member.get_member_statistics(db, MAKERSPACE)
+
+    assert len(db.statements) == 3  # status figures, by role, by plan
+    assert stats["total_members"] == 4
+    assert stats["active_members"] == 2
+    assert stats["expired_members"] == 1
+    assert stats["pending_members"] == 0
+    assert stats["suspended_members"] == 1
+    assert stats["new_members_this_month"] == 4
+    assert stats["expiring_soon"] == 1
+    assert stats["members_by_plan"] == {"Basic": 4}
+
+
+def test_billing_analytics_in_one_scan(db):
+    ok, failed = TransactionStatus.SUCCESS, TransactionStatus.FAILED
+    pending = TransactionStatus.PENDING
+    db.add_all(
+        [
+            _transaction(100.0, ok, TransactionType.MEMBERSHIP, PaymentGateway.UPI),
+            _transaction(50.0, ok, TransactionType.PRINTING_3D, PaymentGateway.CASH),
+            _transaction(30.0, ok, TransactionType.PRINTING_3D, PaymentGateway.UPI, 40),
+            _transaction(999.0, failed, TransactionType.SERVICE, PaymentGateway.UPI),
+            _transaction(5.0, pending, TransactionType.MATERIAL, None),
+            _transaction(77.0, ok, TransactionType.MEMBERSHIP, None, makerspace_id="x"),
+        ]
+    )
+    db.commit()
+
+    db.statements.clear()
+    stats = billing.get_billing_analytics(db, "ms-1")
+
+    assert len(db.statements) == 2  # every figure, then top services
+    assert stats["total_revenue"] == 180.0
+    assert stats["total_transactions"] == 5
+    assert stats["successful_transactions"] == 3
+    assert stats["failed_transactions"] == 1
+    assert stats["pending_transactions"] == 1
+    assert stats["average_transaction_value"] == 60.0
+    assert stats["revenue_by_type"] == {"membership": 100.0, "printing_3d": 80.0}
+    assert stats["payment_method_distribution"] == {"upi": 2, "cash": 1}
+    assert sum(m["revenue"] for m in stats["revenue_by_month"]) == 180.0
+    assert stats["revenue_by_month"][-1]["month"] == datetime.now().strftime("%Y-%m")
+    assert stats["top_services"] == [
+        {"service": "printing", "revenue": 80.0, "transactions": 2}
+    ]
@@ -0,0 +1,204 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backends.makrcave import dependencies
+from backends.makrcave.core.identity_cache import (
+    IdentityCache,
+    identity_cache,
+    invalidate_after_commit,
+    member_snapshot,
+)
+from backends.makrcave.models.enhanced_member import Member, MemberRole, MemberStatus
+from backends.makrcave.models.membership_plans import MembershipPlan
+
+MAKERSPACE = uuid.uuid4()
+CREDENTIALS = HTTPAuthorizationCredentials(scheme="Bearer", credentials="token")
+
+
+@pytest.fixture()
+def db(monkeypatch):
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    tables = [MembershipPlan.__table__, Member.__table__]
+    Member.metadata.create_all(engine, tables=tables)
+    session = sessionmaker(bind=engine)()
+    now = datetime.utcnow()
+    session.add(
+        Member(
+            keycloak_user_id="kc-known",
+            email="known@example.com",
+            first_name="Known",
+            last_name="Member",
+            role=MemberRole.USER,
+            membership_plan_id=uuid.uuid4(),
+            makerspace_id=MAKERSPACE,
+            start_date=now,
+            end_date=now + timedelta(days=30),
+        )
+    )
+    session.commit()
+
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    session.statements = statements
+    identity_cache.clear()
+    yield session
+    identity_cache.clear()
+    session.close()
+    engine.dispose()
+
+
+def _authenticate(monkeypatch, db, subject):
+    async def verify(token):
+        return {"sub": subject, "email": f"{subject}@example.com"}
+
+    monkeypatch.setattr(dependencies.token_verifier, "verify", verify)
+
+    async def run():
+        user = await dependencies.get_current_user(CREDENTIALS, db)
+        await asyncio.gather(*dependencies._provisioning_tasks)
+        return user
+
+    return asyncio.run(run())
+
+
+def test_member_lookup_is_cached_per_subject(monkeypatch, db):
+    first = _authenticate(monkeypatch, db, "kc-known")
+    lookups = len(db.statements)
+    second = _authenticate(monkeypatch, db, "kc-known")
+
+    assert lookups == 1
+    assert len(db.statements) == lookups  # served from the identity cache
+    assert second.makerspace_id == first.makerspace_id == str(MAKERSPACE)
+    # Member columns still pass through CurrentUser, from the snapshot
+    assert second.keycloak_user_id == "kc-known"
+    assert second.status == MemberStatus.ACTIVE
+    assert not hasattr(second, "two_factor_secret")
+
+
+def test_member_change_invalidates_after_commit(monkeypatch, db):
+    _authenticate(monkeypatch, db, "kc-known")
+    member = db.query(Member).filter(Member.keycloak_user_id == "kc-known").one()
+    moved_to = uuid.uuid4()
+    member.makerspace_id = moved_to
+    db.flush()
+
+    assert _authenticate(monkeypatch, db, "kc-known").makerspace_id == str(MAKERSPACE)
+    db.commit()
+    assert _authenticate(monkeypatch, db, "kc-known").makerspace_id == str(moved_to)
+
+
+def test_bulk_update_invalidates_explicitly_after_commit(monkeypatch, db):
+    _authenticate(monkeypatch, db, "kc-known")
+    moved_to = uuid.uuid4()
+    db.query(Member).filter(Member.keycloak_user_id == "kc-known").update(
+        {Member.makerspace_id: moved_to}
+    )
+    invalidate_after_commit(db, "kc-known")
+
+    assert _authenticate(monkeypatch, db, "kc-known").makerspace_id == str(MAKERSPACE)
+    db.commit()
+    assert _authenticate(monkeypatch, db, "kc-known").makerspace_id == str(moved_to)
+
+
+def test_memory_tier_expires_quickly_without_redis(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("time.monotonic", lambda: clock[0])
+    cache = IdentityCache(ttl=300, local_ttl=10, redis_url=None)
+    asyncio.run(cache.set_async("kc-other-worker", {"member": None}))
+
+    clock[0] += 9
+    assert asyncio.run(cache.get_async("kc-other-worker")) == {"member": None}
+    clock[0] += 2
+    assert asyncio.run(cache.get_async("kc-other-worker")) is None
+
+
+def test_unknown_subject_is_provisioned_off_the_request(monkeypatch, db):
+    provisioned = []
+    monkeypatch.setattr(dependencies, "_provision_member", provisioned.append)
+
+    user = _authenticate(monkeypatch, db, "kc-new")
+    statements = len(db.statements)
+    again = _authenticate(monkeypatch, db, "kc-new")
+
+    assert user.user_id == "kc-new" and user.makerspace_id is None
+    assert [payload["sub"] for payload in provisioned] == ["kc-new"]
+    assert len(db.statements) == statements  # the miss is cached as well
+    assert again.user_id == "kc-new"
+
+
+class _FakeRedis:
+    def __init__(self, store):
+        self.store = store
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if not (nx and key in self.store):
+            self.store[key] = value.encode()
+
+
+class _FakeSyncRedis:
+    def __init__(self, store):
+        self.store = store
+        self.commands = []
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def set(self, key, value, ex=None):
+        self.commands.append((key, value, ex))
+
+    def execute(self):
+        for key, value, _ in self.commands:
+            self.store[key] = value
+        self.commands = []
+
+
+def _workers(count, store):
+    workers = [IdentityCache(redis_url="redis://shared") for _ in range(count)]
+    for worker in workers:
+        worker._async_redis = _FakeRedis(store)
+        worker._redis = _FakeSyncRedis(store)
+    return workers
+
+
+def test_redis_tier_shares_entries_between_workers(db):
+    store = {}
+    workers = _workers(2, store)
+    snapshot = member_snapshot(db.query(Member).one())
+
+    asyncio.run(workers[0].set_async("kc-known", {"member": snapshot}))
+    shared = asyncio.run(workers[1].get_async("kc-known"))
+
+    assert shared == {"member": snapshot}
+    assert workers[1].hits["redis"] == 1
+    workers[0].invalidate("kc-known")
+    assert store == {"makrcave:identity:kc-known": b"-"}
+
+
+def test_lookup_racing_another_workers_commit_is_not_shared(db):
+    store = {}
+    reader, writer, other = _workers(3, store)
+    stale = member_snapshot(db.query(Member).one())
+
+    # The reader loaded the row, then the writer committed a change
+    version = reader.version()
+    writer.invalidate("kc-known")
+    asyncio.run(reader.set_async("kc-known", {"member": stale}, version))
+
+    assert asyncio.run(other.get_async("kc-known")) is None
+    assert other.misses == 1
@@ -0,0 +1,200 @@
+import asyncio
+import io
+import os
+from types import SimpleNamespace
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException, UploadFile
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backends.makrcave.crud.inventory import InventoryCRUD
+from backends.makrcave.models.inventory import (
+    BulkImportJob,
+    InventoryItem,
+    InventoryUsageLog,
+    UsageAction,
+)
+from backends.makrcave.routes import inventory as inventory_routes
+
+HEADER = "name,category,quantity,unit,min_threshold,location,product_code,price\n"
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    tables = [
+        InventoryItem.__table__,
+        InventoryUsageLog.__table__,
+        BulkImportJob.__table__,
+    ]
+    InventoryItem.metadata.create_all(engine, tables=tables)
+    session = sessionmaker(bind=engine)()
+
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    session.statements = statements
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _import(db, csv_content, job_id="job-1", chunk_size=1000):
+    InventoryCRUD(db).process_bulk_import(
+        csv_content,
+        job_id=job_id,
+        makerspace_id="ms-1",
+        user_id="u1",
+        user_name="Importer",
+        chunk_size=chunk_size,
+    )
+    return db.query(BulkImportJob).filter(BulkImportJob.id == job_id).one()
+
+
+def test_import_reports_row_errors_and_progress_per_chunk(db, monkeypatch):
+    rows = [f"Bolt {i},tools,{i},pcs,1,Shelf A,,2.5\n" for i in range(7)]
+    rows[2] = "Bad,not-a-category,1,pcs,1,Shelf A,,\n"
+    rows[5] = "Bad qty,tools,lots,pcs,1,Shelf A,,\n"
+
+    progress = []
+    update_progress = InventoryCRUD.update_import_job_progress
+
+    def record_progress(self, **kwargs):
+        progress.append(kwargs["processed"])
+        update_progress(self, **kwargs)
+
+    monkeypatch.setattr(InventoryCRUD, "update_import_job_progress", record_progress)
+    job = _import(db, iter([HEADER, *rows]), chunk_size=3)
+
+    assert (job.total_rows, job.processed_rows) == (7, 7)
+    assert (job.successful_rows, job.failed_rows) == (5, 2)
+    assert job.status == "completed_with_errors"
+    assert [error["row"] for error in job.error_log] == [3, 6]
+    assert "Category must be one of" in job.error_log[0]["error"]
+    assert job.error_log[1]["data"]["name"] == "Bad qty"
+    assert progress == [3, 6, 7, 7]  # one commit per chunk, then the final
+    assert db.query(InventoryItem).count() == 5
+    assert db.query(InventoryUsageLog).count() == 5
+
+
+def test_import_upserts_on_product_code(db):
+    _import(db, HEADER + "PLA,filament,5,kg,1,Rack,PLA-1,20\n", job_id="seed")
+
+    job = _import(
+        db,
+        "product_code,quantity,notes\n"
+        "PLA-1,12,restocked\n"
+        "PETG-1,3,\n"
+        "PETG-1,4,second row\n",
+    )
+
+    assert job.status == "completed"
+    items = {item.product_code: item for item in db.query(InventoryItem)}
+    assert len(items) == 2
+    pla, petg = items["PLA-1"], items["PETG-1"]
+    assert (pla.name, pla.category, pla.quantity) == ("PLA", "filament", 12)
+    assert (pla.notes, pla.price, pla.updated_by) == ("restocked", 20, "u1")
+    assert (petg.quantity, petg.notes) == (4, "second row")
+    logs = db.query(InventoryUsageLog).filter(
+        InventoryUsageLog.inventory_item_id == petg.id
+    )
+    assert sorted(
+        (log.action.value, log.quantity_before, log.quantity_after) for log in logs
+    ) == [(UsageAction.ADD.value, 0, 3), (UsageAction.ADJUST.value, 3, 4)]
+
+
+def test_import_statements_do_not_grow_with_rows(db):
+    rows = "".join(
+        f"Part {i},components,1,pcs,0,Bin,P-{i % 50},\n" for i in range(400)
+    )
+    db.statements.clear()
+    job = _import(db, HEADER + rows, chunk_size=200)
+
+    assert (job.successful_rows, db.query(InventoryItem).count()) == (400, 50)
+    writes = [s for s in db.statements if s.lstrip().upper().startswith("INSERT")]
+    assert len(db.statements) < 30
+    assert len(writes) <= 2 * 2 + 1  # items and logs per chunk, plus the job
+
+
+def _start_import(db, upload):
+    user = SimpleNamespace(
+        role="super_admin", makerspace_id="ms-1", id="u1", name="Importer"
+    )
+    tasks = BackgroundTasks()
+    started = asyncio.run(
+        inventory_routes.bulk_import_inventory(
+            tasks, file=upload, db=db, current_user=user, crud=InventoryCRUD(db)
+        )
+    )
+    upload.file.close()  # FastAPI closes the upload before background tasks
+    asyncio.run(tasks())
+    return db.query(BulkImportJob).filter(BulkImportJob.id == started["job_id"]).one()
+
+
+def test_import_route_streams_the_upload_from_disk(db, monkeypatch):
+    rows = [f"Nut {i},tools,{i},pcs,1,Bin {i},NUT-{i},0.1\n" for i in range(50)]
+    content = (HEADER + "".join(rows)).encode()
+    upload = UploadFile(io.BytesIO(content), filename="nuts.csv")
+    seen = {}
+    process = InventoryCRUD.process_bulk_import
+
+    def spy(self, csv_content, **job):
+        seen["path"] = csv_content.name
+        return process(self, csv_content, **job)
+
+    monkeypatch.setattr(InventoryCRUD, "process_bulk_import", spy)
+    monkeypatch.setattr(inventory_routes, "IMPORT_SPOOL_BLOCK_BYTES", 64)
+
+    job = _start_import(db, upload)
+    assert not os.path.exists(seen["path"])  # the spooled copy is removed
+    assert (job.successful_rows, job.failed_rows) == (50, 0)
+    assert db.query(InventoryItem).count() == 50
+
+
+def test_undecodable_upload_fails_the_job(db, monkeypatch):
+    monkeypatch.setattr(inventory_routes, "IMPORT_SPOOL_BLOCK_BYTES", 64)
+    rows = "".join(f"Nut {i},tools,{i},pcs,1,Bin,NUT-{i},0.1\n" for i in range(5))
+    content = (HEADER + rows).encode() + "Écrou,tools,1\n".encode("latin-1")
+
+    job = _start_import(db, UploadFile(io.BytesIO(content), filename="nuts.csv"))
+
+    assert job.status == "failed"
+    assert job.error_log[-1] == {"error": "File must be UTF-8 encoded"}
+
+
+def test_import_route_removes_the_spool_when_the_upload_breaks(db, monkeypatch):
+    spooled = []
+    named_temporary_file = inventory_routes.tempfile.NamedTemporaryFile
+
+    def spy(**kwargs):
+        spooled.append(named_temporary_file(**kwargs))
+        return spooled[-1]
+
+    monkeypatch.setattr(inventory_routes.tempfile, "NamedTemporaryFile", spy)
+    upload = UploadFile(io.BytesIO(b""), filename="nuts.csv")
+
+    async def broken_read(size=-1):
+        raise OSError("connection reset")
+
+    upload.read = broken_read
+    user = SimpleNamespace(role="super_admin", makerspace_id="ms-1", id="u1")
+    with pytest.raises(HTTPException) as failed:
+        asyncio.run(
+            inventory_routes.bulk_import_inventory(
+                BackgroundTasks(),
+                file=upload,
+                db=db,
+                current_user=user,
+                crud=InventoryCRUD(db),
+            )
+        )
+
+    assert failed.value.status_code == 500
+    assert not os.path.exists(spooled[0].name)
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backends.makrcave.crud import job_management as crud
+from backends.makrcave.models.job_management import (
+    FilamentType,
+    JobMaterialUsage,
+    JobPriority,
+    JobStatus,
+    JobType,
+    ServiceJob,
+)
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    tables = [ServiceJob.__table__, JobMaterialUsage.__table__]
+    ServiceJob.metadata.create_all(engine, tables=tables)
+    session = sessionmaker(bind=engine)()
+    crud.invalidate_dashboard_stats()
+
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    session.statements = statements
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _job(n, customer, status, hours=None, price=None, **kwargs):
+    now = datetime.utcnow()
+    completion = now if hours is not None else None
+    return ServiceJob(
+        job_id=f"job-{n}",
+        title=f"Job {n}",
+        customer_id=customer,
+        status=status,
+        actual_start=completion - timedelta(hours=hours) if completion else None,
+        actual_completion=completion,
+        final_price=price,
+        **kwargs,
+    )
+
+
+def _seed(db):
+    db.add_all(
+        [
+            _job(1, "alice", JobStatus.PENDING, priority=JobPriority.HIGH),
+            _job(2, "alice", JobStatus.PRINTING, job_type=JobType.CNC_MILL),
+            _job(3, "alice", JobStatus.COMPLETED, hours=12, price=40.0),
+            _job(4, "bob", JobStatus.COMPLETED, hours=36, price=60.0),
+            _job(5, "bob", JobStatus.ACCEPTED, priority=JobPriority.URGENT),
+        ]
+    )
+    db.add(
+        JobMaterialUsage(
+            job_id="job-3",
+            material_type=FilamentType.PLA,
+            actual_weight=25.0,
+            recorded_by="alice",
+            recorded_at=datetime.utcnow(),
+        )
+    )
+    db.commit()
+
+
+def test_dashboard_stats_take_two_queries_and_are_cached_per_scope(db):
+    _seed(db)
+
+    db.statements.clear()
+    stats = crud.get_job_dashboard_stats(db, "admin", "super_admin")
+    assert len(db.statements) == 2
+
+    assert stats["total_jobs"] == 5
+    assert stats["jobs_by_status"]["completed"] == 2
+    assert stats["jobs_by_status"]["cancelled"] == 0
+    assert stats["jobs_by_priority"]["urgent"] == 1
+    assert stats["jobs_by_type"]["cnc_mill"] == 1
+    assert stats["pending_jobs"] == 1
+    assert stats["active_jobs"] == 2
+    assert stats["completed_today"] == 2
+    assert stats["average_completion_time"] == pytest.approx(1.0)
+    assert stats["material_usage_today"]["pla"] == 25.0
+    assert stats["material_usage_today"]["abs"] == 0.0
+    assert stats["revenue_today"] == 100.0
+
+    db.statements.clear()
+    assert crud.get_job_dashboard_stats(db, "other-admin", "makerspace_admin") == stats
+    assert db.statements == []
+
+    # A user's counts are scoped to their jobs, revenue is not
+    alice = crud.get_job_dashboard_stats(db, "alice", "user")
+    assert len(db.statements) == 2
+    assert alice["total_jobs"] == 3
+    assert alice["average_completion_time"] == pytest.approx(0.5)
+    assert alice["revenue_this_month"] == 100.0
+
+
+def test_job_writes_invalidate_cached_stats(db):
+    _seed(db)
+    before = crud.get_job_dashboard_stats(db, "bob", "user")
+
+    db.add(_job(6, "bob", JobStatus.PENDING))
+    db.commit()
+    after = crud.get_job_dashboard_stats(db, "bob", "user")
+
+    assert after["total_jobs"] == before["total_jobs"] + 1
+    assert after["pending_jobs"] == before["pending_jobs"] + 1
+
+
+def test_stats_are_invalidated_at_commit_not_flush(db, monkeypatch):
+    _seed(db)
+    crud.get_job_dashboard_stats(db, "bob", "user")
+
+    db.add(_job(6, "bob", JobStatus.PENDING))
+    db.flush()
+    assert "user:bob" in crud._dashboard_stats_cache
+    db.commit()
+    assert crud._dashboard_stats_cache == {}
+
+    # Stats computed across an invalidation are returned but not cached
+    compute = crud._compute_job_dashboard_stats
+
+    def compute_then_commit(*args):
+        stats = compute(*args)
+        crud.invalidate_dashboard_stats()
+        return stats
+
+    monkeypatch.setattr(crud, "_compute_job_dashboard_stats", compute_then_commit)
+    assert crud.get_job_dashboard_stats(db, "bob", "user")["total_jobs"] == 3
+    assert crud._dashboard_stats_cache == {}
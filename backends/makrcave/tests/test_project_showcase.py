@@ -0,0 +1,183 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backends.makrcave.models.enhanced_member import Member, MemberRole
+from backends.makrcave.models.membership_plans import MembershipPlan
+from backends.makrcave.models.project import (
+    Project,
+    ProjectBookmark,
+    ProjectCollaborator,
+    ProjectFollow,
+    ProjectLike,
+    ProjectTrendingEvent,
+    ProjectVisibility,
+)
+from backends.makrcave.routes import project_showcase as routes
+from backends.makrcave.services.project_trending import event_score
+
+VIEWER = {"user_id": "kc-viewer"}
+NOW = datetime.utcnow()
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    tables = [
+        MembershipPlan.__table__,
+        Member.__table__,
+        Project.__table__,
+        ProjectCollaborator.__table__,
+        ProjectLike.__table__,
+        ProjectBookmark.__table__,
+        ProjectFollow.__table__,
+        ProjectTrendingEvent.__table__,
+    ]
+    Member.metadata.create_all(engine, tables=tables)
+    session = sessionmaker(bind=engine)()
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    session.statements = statements
+    routes._trending_cache.clear()
+    yield session
+    routes._trending_cache.clear()
+    session.close()
+    engine.dispose()
+
+
+def _seed(db, projects=40, owners=8):
+    members = []
+    for n in range(owners):
+        member = Member(
+            keycloak_user_id=f"kc-{n}",
+            email=f"maker{n}@example.com",
+            first_name="Maker",
+            last_name=str(n),
+            role=MemberRole.USER,
+            membership_plan_id=uuid.uuid4(),
+            makerspace_id=uuid.uuid4(),
+            start_date=NOW,
+            end_date=NOW + timedelta(days=30),
+        )
+        db.add(member)
+        members.append(member)
+    db.flush()
+    for n in range(projects):
+        project_id = f"p-{n:03d}"
+        db.add(
+            Project(
+                project_id=project_id,
+                name=f"Project {n}",
+                creator_id=f"kc-{n % owners}",
+                visibility=ProjectVisibility.PUBLIC,
+                category="Electronics",
+                like_count=n,
+                view_count=0,
+                fork_count=0,
+                trending_score=event_score(NOW, n + 1),
+                is_featured=n % 10 == 0,
+            )
+        )
+        for collaborator in range(n % 3):
+            db.add(
+                ProjectCollaborator(
+                    project_id=project_id,
+                    user_id=f"kc-collab-{collaborator}",
+                    invited_by="kc-0",
+                )
+            )
+    db.add(ProjectLike(project_id="p-039", user_id="kc-viewer"))
+    db.add(ProjectBookmark(project_id="p-038", user_id="kc-viewer"))
+    db.add(
+        ProjectFollow(
+            owner_id=str(members[7].id), follower_id="kc-viewer", project_id="p-039"
+        )
+    )
+    db.commit()
+
+
+def _showcase(db, limit):
+    return asyncio.run(
+        routes.get_showcase_projects(
+            category=None,
+            difficulty=None,
+            tags=None,
+            sort_by="trending",
+            limit=limit,
+            offset=0,
+            current_user=VIEWER,
+            db=db,
+        )
+    )
+
+
+def test_showcase_query_count_does_not_grow_with_page_size(db):
+    _seed(db)
+
+    del db.statements[:]
+    _showcase(db, 5)
+    small_count = len(db.statements)
+    del db.statements[:]
+    page = _showcase(db, 40)
+
+    assert len(page) == 40
+    assert len(db.statements) == small_count == 6
+    top = page[0]
+    assert top.project_id == "p-039"
+    assert top.owner_name == "Maker 7"
+    assert top.collaborator_count == 0
+    assert (top.is_liked, top.is_following_owner, top.is_bookmarked) == (
+        True,
+        True,
+        False,
+    )
+    assert page[1].is_bookmarked and page[1].collaborator_count == 2
+    assert [card.collaborator_count for card in page[:3]] == [0, 2, 1]
+
+
+def test_trending_is_batched_and_memoized(db):
+    _seed(db, projects=20)
+
+    del db.statements[:]
+    trending = asyncio.run(
+        routes.get_trending_projects(limit=10, current_user=VIEWER, db=db)
+    )
+    assert len(db.statements) == 3  # projects, owners, collaborator counts
+    assert [card.project_id for card in trending][:2] == ["p-019", "p-018"]
+    assert trending[0].owner_name == "Maker 3"
+
+    del db.statements[:]
+    again = asyncio.run(
+        routes.get_trending_projects(limit=10, current_user=VIEWER, db=db)
+    )
+    assert again == trending
+    assert db.statements == []
+
+
+def test_featured_projects_load_owners_in_one_query(db):
+    _seed(db)
+
+    del db.statements[:]
+    featured = asyncio.run(
+        routes.get_featured_projects(limit=10, current_user=VIEWER, db=db)
+    )
+
+    assert sorted(card.project_id for card in featured) == [
+        "p-000",
+        "p-010",
+        "p-020",
+        "p-030",
+    ]
+    assert all(card.owner_name != "Unknown Maker" for card in featured)
+    assert len(db.statements) == 2
@@ -0,0 +1,189 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backends.makrcave.models.analytics_rollups import AnalyticsRollupWatermark
+from backends.makrcave.models.project import (
+    Project,
+    ProjectBookmark,
+    ProjectLike,
+    ProjectTrendingEvent,
+    ProjectViewer,
+    ProjectVisibility,
+)
+from backends.makrcave.routes import project_showcase as routes
+from backends.makrcave.services import project_trending as trending
+
+NOW = datetime.utcnow()
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    tables = [
+        Project.__table__,
+        ProjectLike.__table__,
+        ProjectBookmark.__table__,
+        ProjectTrendingEvent.__table__,
+        ProjectViewer.__table__,
+        AnalyticsRollupWatermark.__table__,
+    ]
+    Project.metadata.create_all(engine, tables=tables)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _project(db, project_id, visibility=ProjectVisibility.PUBLIC, **fields):
+    db.add(
+        Project(
+            project_id=project_id,
+            name=project_id,
+            creator_id="kc-1",
+            visibility=visibility,
+            **fields,
+        )
+    )
+
+
+def _event(db, project_id, kind, hours_ago):
+    db.add(
+        ProjectTrendingEvent(
+            project_id=project_id,
+            kind=kind,
+            occurred_at=NOW - timedelta(hours=hours_ago),
+        )
+    )
+
+
+def _decayed(events):
+    """Brute force: every event's weight, halved per half-life since it"""
+    totals = {}
+    for project_id, kind, hours_ago in events:
+        weight = trending.TRENDING_WEIGHTS[kind] * 0.5 ** (
+            hours_ago / trending.TRENDING_HALF_LIFE_HOURS
+        )
+        totals[project_id] = totals.get(project_id, 0.0) + weight
+    return totals
+
+
+def _weights(db):
+    return {
+        project.project_id: trending.current_weight(project.trending_score, NOW)
+        for project in db.query(Project)
+        if project.trending_score
+    }
+
+
+def test_events_fold_incrementally_into_decayed_scores(db):
+    for name in ("old-hit", "steady", "fresh", "quiet"):
+        _project(db, name)
+    db.commit()
+
+    db.add(ProjectLike(project_id="fresh", user_id="u1"))
+    db.add(ProjectBookmark(project_id="steady", user_id="u1"))
+    db.commit()
+    queued = db.query(ProjectTrendingEvent.project_id, ProjectTrendingEvent.kind)
+    assert sorted(queued) == [("fresh", "like"), ("steady", "bookmark")]
+
+    first = [("old-hit", "view", 24 * 10)] * 40 + [
+        ("steady", "like", 30),
+        ("steady", "view", 12),
+        ("fresh", "view", 1),
+    ]
+    for event in first:
+        _event(db, *event)
+    db.commit()
+    result = trending.refresh_trending_scores(db, now=NOW)
+    assert result["events"] == len(first) + 2
+    assert db.query(ProjectTrendingEvent).count() == 0
+
+    second = [("steady", "view", 0.5), ("old-hit", "fork", 60)]
+    for event in second:
+        _event(db, *event)
+    db.commit()
+    assert trending.refresh_trending_scores(db, now=NOW)["projects"] == 2
+
+    expected = _decayed(first + second + [("fresh", "like", 0)])
+    expected["steady"] += trending.TRENDING_WEIGHTS["bookmark"]
+    weights = _weights(db)
+    assert weights.keys() == expected.keys()
+    for project_id, weight in expected.items():
+        assert weights[project_id] == pytest.approx(weight, rel=1e-3)
+
+    # A burst of old views ranks below recent engagement
+    ranked = db.query(Project.project_id).order_by(Project.trending_score.desc())
+    assert [row[0] for row in ranked][:3] == ["steady", "fresh", "old-hit"]
+    mark = db.get(AnalyticsRollupWatermark, trending.WATERMARK_NAME)
+    assert mark.high_water >= NOW - timedelta(hours=1)
+
+
+def test_first_run_seeds_scores_from_counters(db):
+    updated = NOW - timedelta(hours=trending.TRENDING_HALF_LIFE_HOURS)
+    _project(db, "veteran", like_count=4, view_count=8, updated_at=updated)
+    _project(db, "unseen")
+    db.commit()
+
+    assert trending.refresh_trending_scores(db, now=NOW)["backfilled"] == 1
+    assert _weights(db) == {"veteran": pytest.approx((4 * 3.0 + 8 * 1.0) / 2)}
+    assert db.get(Project, "veteran").updated_at == updated
+
+    db.get(Project, "veteran").trending_score = 0
+    db.commit()
+    assert trending.refresh_trending_scores(db, now=NOW)["backfilled"] == 0
+
+
+def test_view_endpoint_counts_views_without_touching_updated_at(db):
+    updated = NOW - timedelta(days=3)
+    _project(db, "public", view_count=2, updated_at=updated)
+    _project(db, "private", visibility=ProjectVisibility.PRIVATE)
+    db.commit()
+    trending.refresh_trending_scores(db, now=NOW)  # seeds the two earlier views
+
+    user = {"user_id": "kc-viewer"}
+    asyncio.run(routes.view_project("public", current_user=user, db=db))
+    with pytest.raises(HTTPException) as missing:
+        asyncio.run(routes.view_project("private", current_user=user, db=db))
+    assert missing.value.status_code == 404
+
+    project = db.get(Project, "public")
+    db.refresh(project)
+    assert project.view_count == 3 and project.updated_at == updated
+    trending.refresh_trending_scores(db)
+    db.refresh(project)
+    seeded = 2 * 0.5 ** (72 / trending.TRENDING_HALF_LIFE_HOURS)
+    assert trending.current_weight(project.trending_score) == pytest.approx(
+        seeded + 1, rel=1e-3
+    )
+
+
+def test_repeat_views_by_a_user_count_once_per_window(db):
+    _project(db, "public")
+    db.commit()
+    window = timedelta(hours=trending.PROJECT_VIEW_WINDOW_HOURS)
+    start = trending.view_window_start(NOW)
+
+    for user_id, at in [
+        ("kc-a", start),
+        ("kc-a", start + window / 2),  # same window: not counted
+        ("kc-b", start + window / 2),
+        ("kc-a", start + window),  # next window
+    ]:
+        assert trending.record_project_view(db, "public", user_id, now=at)
+    assert not trending.record_project_view(db, "missing", "kc-a", now=start)
+    db.commit()
+
+    assert db.get(Project, "public").view_count == 3
+    assert db.query(ProjectTrendingEvent).count() == 3
+
+    trending.refresh_trending_scores(db, now=start + window)
+    viewers = db.query(ProjectViewer.user_id, ProjectViewer.window_start).all()
+    assert viewers == [("kc-a", start + window)]
@@ -0,0 +1,210 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backends.makrcave.crud import skill as skill_crud
+from backends.makrcave.models.equipment import Equipment, EquipmentCategory
+from backends.makrcave.models.equipment_reservations import (
+    EquipmentSkillGate,
+    SkillGateType,
+)
+from backends.makrcave.models.skill import (
+    Skill,
+    SkillLevel,
+    SkillStatus,
+    UserSkill,
+    skill_equipment,
+)
+from backends.makrcave.routes.equipment_reservations import verify_skill_gates
+from backends.makrcave.services.access import access_matrix_cache
+
+NOW = datetime.utcnow()
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    tables = [
+        Equipment.__table__,
+        Skill.__table__,
+        skill_equipment,
+        UserSkill.__table__,
+        EquipmentSkillGate.__table__,
+    ]
+    Equipment.metadata.create_all(engine, tables=tables)
+    session = sessionmaker(bind=engine)()
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    session.statements = statements
+    access_matrix_cache.invalidate()
+    yield session
+    access_matrix_cache.invalidate()
+    session.close()
+    engine.dispose()
+
+
+def _skill(db, name):
+    skill = Skill(
+        id=name,
+        name=name.title(),
+        category="safety",
+        level=SkillLevel.BEGINNER,
+        makerspace_id="ms-1",
+    )
+    db.add(skill)
+    return skill
+
+
+def _machine(db, name, skills=(), makerspace_id="ms-1"):
+    equipment = Equipment(
+        id=name,
+        equipment_id=name,
+        name=name.title(),
+        category=EquipmentCategory.LASER_CUTTER,
+        location="Bay 1",
+        linked_makerspace_id=makerspace_id,
+        created_by="admin",
+        required_skills=list(skills),
+    )
+    db.add(equipment)
+    return equipment
+
+
+def _certify(db, user_id, skill, expires_in_days=None, status=SkillStatus.CERTIFIED):
+    db.add(
+        UserSkill(
+            id=f"{user_id}-{skill.id}",
+            user_id=user_id,
+            skill_id=skill.id,
+            status=status,
+            expires_at=(
+                NOW + timedelta(days=expires_in_days)
+                if expires_in_days is not None
+                else None
+            ),
+        )
+    )
+
+
+def test_accessible_equipment_matches_per_machine_checks(db):
+    rng = random.Random(11)
+    skills = [_skill(db, f"skill-{n}") for n in range(12)]
+    for n in range(60):
+        _machine(db, f"machine-{n:02d}", rng.sample(skills, rng.randrange(0, 4)))
+    _machine(db, "elsewhere", makerspace_id="ms-2")
+    held = set(rng.sample(skills[2:], 6))
+    for skill in held:
+        _certify(db, "u1", skill)
+    _certify(db, "u1", skills[0], expires_in_days=-1)
+    _certify(db, "u1", skills[1], status=SkillStatus.PENDING)
+    db.commit()
+
+    expected = sorted(
+        equipment.id
+        for equipment in db.query(Equipment).filter_by(linked_makerspace_id="ms-1")
+        if set(equipment.required_skills) <= held
+    )
+
+    del db.statements[:]
+    accessible = skill_crud.get_user_accessible_equipment(db, "u1", "ms-1")
+    assert sorted(accessible) == expected
+    assert len(db.statements) == 2  # the matrix, then the member's certifications
+    del db.statements[:]
+    skill_crud.get_user_accessible_equipment(db, "u2", "ms-1")
+    assert len(db.statements) == 1  # the matrix is cached
+
+    checks = skill_crud.check_equipment_access_bulk(db, "u1", "ms-1")
+    assert sorted(c.equipment_id for c in checks if c.can_access) == expected
+    assert len(checks) == 60
+
+
+def test_access_check_reports_missing_skills_and_follows_changes(db):
+    laser, cnc = _skill(db, "laser"), _skill(db, "cnc")
+    machine = _machine(db, "cutter", [laser])
+    _certify(db, "u1", laser)
+    db.commit()
+
+    check = skill_crud.check_equipment_access(db, "u1", "cutter")
+    assert check.can_access and check.user_skills == ["Laser"]
+
+    machine.required_skills.append(cnc)
+    db.commit()
+    check = skill_crud.check_equipment_access(db, "u1", "cutter")
+    assert not check.can_access
+    assert check.missing_skills == ["Cnc"]
+    assert check.reason == "Missing required skills: Cnc"
+
+    cnc.name = "CNC Router"
+    db.commit()
+    assert skill_crud.check_equipment_access(db, "u1", "cutter").missing_skills == [
+        "CNC Router"
+    ]
+    unknown = skill_crud.check_equipment_access(db, "u1", "lathe")
+    assert unknown.reason == "Equipment not found"
+
+
+def test_authorized_users_of_a_machine(db):
+    laser, cnc = _skill(db, "laser"), _skill(db, "cnc")
+    _machine(db, "cutter", [laser, cnc])
+    _machine(db, "bench")
+    for user_id in ("u1", "u2", "u3"):
+        _certify(db, user_id, laser)
+    _certify(db, "u1", cnc)
+    _certify(db, "u2", cnc, expires_in_days=-1)
+    _certify(db, "u3", cnc, expires_in_days=10)
+    db.commit()
+
+    authorized = skill_crud.get_equipment_authorized_users(db, "cutter")
+    assert authorized["user_ids"] == ["u1", "u3"]
+    assert authorized["required_skills"] == ["Cnc", "Laser"]
+    open_machine = skill_crud.get_equipment_authorized_users(db, "bench")
+    assert open_machine["open_access"] and open_machine["user_ids"] == []
+    assert skill_crud.get_equipment_authorized_users(db, "lathe") is None
+
+
+def test_skill_gates_check_certifications(db):
+    laser, cnc = _skill(db, "laser"), _skill(db, "cnc")
+    _machine(db, "cutter", [laser, cnc])
+    _certify(db, "u1", laser, expires_in_days=-2)
+    _certify(db, "u1", cnc)
+    gates = [
+        ("laser cert", SkillGateType.CERTIFICATION, "laser", 0),
+        ("laser grace", SkillGateType.REQUIRED_SKILL, "laser", 7),
+        ("machine skills", SkillGateType.REQUIRED_SKILL, None, 0),
+        ("experience", SkillGateType.EXPERIENCE_LEVEL, None, 0),
+    ]
+    for name, gate_type, skill_id, grace in gates:
+        db.add(
+            EquipmentSkillGate(
+                equipment_id="cutter",
+                gate_name=name,
+                gate_type=gate_type,
+                required_skill_id=skill_id,
+                grace_period_days=grace,
+                created_by="admin",
+            )
+        )
+    db.commit()
+
+    results = asyncio.run(verify_skill_gates(db, "cutter", "u1"))
+
+    passed = {result["gate_name"]: result["passed"] for result in results}
+    assert passed == {
+        "laser cert": False,
+        "laser grace": True,
+        "machine skills": False,
+        "experience": True,
+    }
+    notes = {result["gate_name"]: result["notes"] for result in results}
+    assert notes["machine skills"] == "Missing skills: Laser"
@@ -0,0 +1,135 @@
+import csv
+import io
+import json
+import subprocess
+import sys
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backends.makrcave.crud.inventory import EXPORT_COLUMNS, InventoryCRUD
+from backends.makrcave.models.inventory import InventoryItem, ItemStatus
+from backends.makrcave.utils.streaming_export import csv_chunks, json_chunks
+
+MEMORY_CEILING = 8 * 1024 * 1024
+
+# Runs in a fresh interpreter so ru_maxrss only reflects this export
+# The child imports backends.*, so it runs from the repo root whatever the
+# directory pytest was started from
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
+MILLION_ROW_EXPORT = """
+import resource
+from datetime import datetime, timedelta
+
+from backends.makrcave.utils.streaming_export import csv_chunks
+
+start = datetime(2025, 1, 1)
+rows = (
+    [f"evt-{i:07d}", start + timedelta(seconds=i), "equipment_usage",
+     f"user-{i % 977}", i % 240, "printer bay 3"]
+    for i in range(1_000_000)
+)
+header = ["id", "timestamp", "event", "user", "minutes", "resource"]
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+size = chunks = 0
+for chunk in csv_chunks(header, rows, chunk_rows=1000):
+    size += len(chunk)
+    chunks += 1
+growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+print(size, chunks, growth * 1024)
+"""
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    InventoryItem.metadata.create_all(engine, tables=[InventoryItem.__table__])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_million_row_csv_export_stays_under_memory_ceiling():
+    result = subprocess.run(
+        [sys.executable, "-c", MILLION_ROW_EXPORT],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    size, chunks, growth = map(int, result.stdout.split()[-3:])
+
+    assert chunks == 1000
+    assert size > 60 * 1024 * 1024  # the whole export, were it held at once
+    assert growth < MEMORY_CEILING
+
+
+def test_json_export_is_one_valid_document():
+    text = "".join(json_chunks(["id", "n"], ([i, i * 2] for i in range(25)), 10))
+
+    assert json.loads(text)[24] == {"id": 24, "n": 48}
+    assert json.loads("".join(json_chunks(["id"], iter(())))) == []
+
+
+def test_inventory_export_streams_from_a_batched_cursor(db):
+    now = datetime(2026, 3, 1)
+    db.execute(
+        insert(InventoryItem),
+        [
+            {
+                "id": f"item-{i:06d}",
+                "name": f"Part {i}",
+                "category": "components",
+                "quantity": float(i % 40),
+                "unit": "pcs",
+                "min_threshold": 2,
+                "location": "Bin",
+                "status": ItemStatus.DAMAGED if i % 10 == 0 else ItemStatus.ACTIVE,
+                "linked_makerspace_id": "ms-1" if i % 4 else "ms-2",
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(12_000)
+        ],
+    )
+    db.commit()
+    crud = InventoryCRUD(db)
+
+    def export(makerspace_id):
+        tracemalloc.start()
+        try:
+            chunks = sum(
+                1
+                for _ in csv_chunks(
+                    EXPORT_COLUMNS,
+                    crud.iter_export_rows(makerspace_id, chunk_size=500),
+                    chunk_rows=500,
+                )
+            )
+            return chunks, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    export("ms-2")  # warm statement and type caches
+    small_chunks, small_peak = export("ms-2")
+    large_chunks, large_peak = export("ms-1")
+    assert (small_chunks, large_chunks) == (6, 18)
+    assert large_peak < small_peak * 1.5  # three times the rows, flat memory
+
+    rows = list(csv.DictReader(io.StringIO(crud.export_to_csv("ms-1"))))
+    assert len(rows) == 9000
+    assert rows[0]["id"] == "item-000001"
+    assert rows[0]["status"] == "active"
+    assert rows[0]["created_at"] == "2026-03-01T00:00:00"
+
+    damaged = crud.export_to_csv("ms-1", {"status": "damaged"}).splitlines()
+    assert len(damaged) == 1 + 600
@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from backends.makrcave.core.threadpool import offload_blocking_endpoints
+from backends.makrcave.database import get_db
+
+
+def _app():
+    app = FastAPI()
+
+    @app.get("/blocking")
+    async def blocking(db=Depends(get_db)):
+        time.sleep(0.2)  # stands in for a slow synchronous query
+        return {"ok": True}
+
+    @app.get("/awaiting")
+    async def awaiting(db=Depends(get_db)):
+        await asyncio.sleep(0)
+        return {"ok": True}
+
+    @app.get("/no-db")
+    async def no_db():
+        return {"ok": True}
+
+    return app
+
+
+async def _concurrent_get(app, path, n):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(client.get(path) for _ in range(n)))
+        elapsed = time.perf_counter() - started
+    assert all(r.status_code == 200 and r.json() == {"ok": True} for r in responses)
+    return elapsed
+
+
+def test_only_await_free_db_endpoints_are_offloaded():
+    app = _app()
+
+    converted = offload_blocking_endpoints(app)
+
+    assert converted == ["/blocking"]
+
+
+def test_offloaded_endpoints_no_longer_serialise_on_the_event_loop():
+    before = asyncio.run(_concurrent_get(_app(), "/blocking", 5))
+
+    app = _app()
+    offload_blocking_endpoints(app)
+    after = asyncio.run(_concurrent_get(app, "/blocking", 5))
+
+    assert before >= 1.0  # 5 x 200ms, one at a time
+    assert after < 0.6
@@ -1,5 +1,6 @@
 import os
 from datetime import date, datetime
+from typing import Iterator
 
 import openpyxl  # noqa: F401 - required for Excel export engine
 import pandas as pd
@@ -16,6 +17,8 @@ from reportlab.platypus import (
 )
 from sqlalchemy.orm import Session
 
+from .streaming_export import csv_chunks
+
 
 class ReportGenerator:
     def __init__(self, db: Session):
@@ -40,73 +43,35 @@ class ReportGenerator:
         self, makerspace_id: str, start_date: date, end_date: date
     ) -> str:
         """Generate usage analytics CSV report"""
-        # Query usage events
-        from ..models.analytics import UsageEvent
-
-        events = (
-            self.db.query(UsageEvent)
-            .filter(
-                UsageEvent.makerspace_id == makerspace_id,
-                UsageEvent.timestamp >= start_date,
-                UsageEvent.timestamp <= end_date,
-            )
-            .all()
-        )
-
-        # Convert to DataFrame
-        data = []
-        for event in events:
-            data.append(
-                {
-                    "Date": event.timestamp.strftime("%Y-%m-%d"),
-                    "Time": event.timestamp.strftime("%H:%M:%S"),
-                    "Event Type": event.event_type,
-                    "User ID": (str(event.user_id) if event.user_id else "System"),
-                    "Resource Type": event.resource_type or "N/A",
-                    "Resource ID": (
-                        str(event.resource_id) if event.resource_id else "N/A"
-                    ),
-                    "Duration (minutes)": event.duration_minutes or 0,
-                    "Metadata": str(event.metadata) if event.metadata else "",
-                }
-            )
-
-        df = pd.DataFrame(data)
-
-        # Generate summary statistics
-        summary_data = []
-        summary_data.append(["Total Events", len(df)])
-        summary_data.append(["Date Range", f"{start_date} to {end_date}"])
-        summary_data.append(
-            [
-                "Most Common Event",
-                df["Event Type"].mode().iloc[0] if not df.empty else "N/A",
-            ]
-        )
-        summary_data.append(
-            [
-                "Total Duration (hours)",
-                round(df["Duration (minutes)"].sum() / 60, 2),
-            ]
-        )
-
-        # Save to CSV
         filename = f"usage_report_{makerspace_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
         filepath = os.path.join("/tmp", filename)
 
-        with open(filepath, "w") as f:
-            f.write("# USAGE ANALYTICS REPORT\n")
-            f.write(f"# Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"# Makerspace ID: {makerspace_id}\n")
-            f.write(f"# Period: {start_date} to {end_date}\n")
-            f.write("\n# SUMMARY\n")
-            for summary_item in summary_data:
-                f.write(f"# {summary_item[0]}: {summary_item[1]}\n")
-            f.write("\n")
-
-        df.to_csv(filepath, mode="a", index=False)
+        with open(filepath, "w", newline="") as f:
+            for chunk in self.stream_usage_report_csv(
+                makerspace_id, start_date, end_date
+            ):
+                f.write(chunk)
         return filepath
 
+    def stream_usage_report_csv(
+        self, makerspace_id: str, start_date: date, end_date: date
+    ) -> Iterator[str]:
+        """Yield the usage report CSV in chunks, summary header first.
+
+        The summary is aggregated in SQL and events are read with yield_per,
+        so memory stays flat however many events the period holds.
+        """
+        from ..crud.analytics import USAGE_REPORT_COLUMNS, AnalyticsCRUD
+
+        analytics = AnalyticsCRUD(self.db)
+        yield from csv_chunks(
+            USAGE_REPORT_COLUMNS,
+            analytics.iter_usage_report_rows(makerspace_id, start_date, end_date),
+            preamble=analytics.usage_report_preamble(
+                makerspace_id, start_date, end_date
+            ),
+        )
+
     def generate_inventory_report_xlsx(
         self, makerspace_id: str, start_date: date, end_date: date
     ) -> str:
@@ -0,0 +1,160 @@
+"""
+Streaming export helpers
+
+Exports are produced as a pipeline instead of being built in memory: a
+``yield_per`` query feeds rows to a chunked CSV/JSON/XLSX writer, and the
+resulting chunks go out through a StreamingResponse. Memory use depends on
+the chunk size, not on how many rows are exported.
+"""
+
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Query, Session
+
+from ..database import get_db_session
+
+# Rows fetched per cursor batch and written per emitted chunk
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+
+# Bytes read per chunk when sending a finished XLSX file
+XLSX_BLOCK_SIZE = 64 * 1024
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def iter_query(query: Query, chunk_size: int = EXPORT_CHUNK_ROWS) -> Iterator[Any]:
+    """Iterate a query in batches of ``chunk_size`` rows.
+
+    ``yield_per`` also turns on server-side cursors for drivers that support
+    them (psycopg2), so the database does not send the whole result at once.
+    """
+    return iter(query.yield_per(chunk_size))
+
+
+def export_value(value: Any) -> Any:
+    """Flatten a column value to something every writer can serialize"""
+    if value is None:
+        return ""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def csv_chunks(
+    header: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+    preamble: str = "",
+) -> Iterator[str]:
+    """Write rows as CSV, yielding the text every ``chunk_rows`` rows"""
+    buffer = io.StringIO()
+    buffer.write(preamble)
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def json_chunks(
+    header: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+) -> Iterator[str]:
+    """Write rows as a JSON array of objects keyed by ``header``"""
+    parts = ["["]
+    for count, row in enumerate(rows):
+        item = json.dumps(dict(zip(header, row)), default=str)
+        parts.append("," + item if count else item)
+        if len(parts) >= chunk_rows:
+            yield "".join(parts)
+            parts = []
+    parts.append("]")
+    yield "".join(parts)
+
+
+def xlsx_chunks(
+    header: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    sheet_title: str = "Export",
+) -> Iterator[bytes]:
+    """Write rows to a write-only workbook and yield the file in blocks.
+
+    openpyxl's write-only mode streams each row to disk, and the finished
+    workbook is read back in fixed-size blocks, so neither step holds the
+    sheet in memory.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise ImportError("XLSX export requires the optional openpyxl package") from exc
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title)
+    sheet.append(list(header))
+    for row in rows:
+        sheet.append(list(row))
+
+    with tempfile.TemporaryFile() as handle:
+        workbook.save(handle)
+        handle.seek(0)
+        while block := handle.read(XLSX_BLOCK_SIZE):
+            yield block
+
+
+def export_chunks(
+    fmt: str, header: Sequence[str], rows: Iterable[Sequence[Any]], **kwargs: Any
+) -> Iterator[Any]:
+    """Dispatch to the writer for ``fmt`` (csv, json or xlsx)"""
+    writers = {"csv": csv_chunks, "json": json_chunks, "xlsx": xlsx_chunks}
+    if fmt not in writers:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    return writers[fmt](header, rows, **kwargs)
+
+
+def stream_with_session(
+    produce: Callable[[Session], Iterable[Any]],
+    session_factory: Optional[Callable[[], Session]] = None,
+) -> Iterator[Any]:
+    """Run ``produce`` on a session that lives as long as the stream.
+
+    The request-scoped get_db session is closed once the endpoint returns,
+    before a StreamingResponse body is sent, so exports open their own.
+    """
+    db = (session_factory or get_db_session)()
+    try:
+        yield from produce(db)
+    finally:
+        db.close()
+
+
+def streaming_download(
+    chunks: Iterable[Any], filename: str, fmt: str = "csv"
+) -> StreamingResponse:
+    """Send export chunks as an attachment"""
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
@@ -178,6 +178,11 @@ def on_startup():
             logger.warning(f"Table init failed (ok if using Alembic): {e}")
 
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    await ws.hub.close()
+
+
 @app.get("/")
 def root():
     return {
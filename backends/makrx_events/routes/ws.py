@@ -1,28 +1,31 @@
+import os
+
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import Set
+
+from backends.utils import FanoutHub
 
 router = APIRouter()
 
-connections: Set[WebSocket] = set()
+# Broadcasts reach sockets on every worker through Redis pub/sub when
+# WS_FANOUT_REDIS_URL (or REDIS_URL) is set; otherwise they stay in-process.
+WS_FANOUT_REDIS_URL = os.getenv("WS_FANOUT_REDIS_URL") or os.getenv("REDIS_URL")
+if os.getenv("ENVIRONMENT") == "test":
+    WS_FANOUT_REDIS_URL = None
+
+BROADCAST_CHANNEL = "broadcast"
+
+hub = FanoutHub("makrx_events:ws", redis_url=WS_FANOUT_REDIS_URL)
 
 
 @router.websocket("/ws")
 async def websocket_endpoint(ws: WebSocket):
-    await ws.accept()
-    connections.add(ws)
+    connection = await hub.connect(ws, [BROADCAST_CHANNEL])
     try:
         while True:
             msg = await ws.receive_text()
             # Broadcast simple echo to all clients
-            for conn in list(connections):
-                try:
-                    await conn.send_text(msg)
-                except Exception:
-                    try:
-                        connections.remove(conn)
-                    except KeyError:
-                        pass
+            await hub.publish(BROADCAST_CHANNEL, msg)
     except WebSocketDisconnect:
         pass
     finally:
-        connections.discard(ws)
+        await hub.disconnect(connection)
@@ -1,11 +1,10 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import jwt, JWTError
 import os
-import httpx
-import time
 from typing import Optional, List
 
+from backends.utils import TokenVerificationError, TokenVerifier, shared_key_set
+
 security = HTTPBearer()
 
 KEYCLOAK_URL = os.getenv("KEYCLOAK_URL", "http://localhost:8081")
@@ -22,41 +21,19 @@ KEYCLOAK_USE_JWKS = os.getenv("KEYCLOAK_USE_JWKS", "true").lower() in (
     "yes",
 )
 
-_jwks_cache = {}
-_jwks_ts = 0.0
-
-
-def _pem_from_x5c(x5c_entry: str) -> str:
-    return f"-----BEGIN CERTIFICATE-----\n{x5c_entry}\n-----END CERTIFICATE-----"
-
-
-async def get_jwks_pem(kid: str) -> Optional[str]:
-    global _jwks_cache, _jwks_ts
-    now = time.time()
-    if (
-        _jwks_cache
-        and (now - _jwks_ts) < KEYCLOAK_PK_TTL_SECONDS
-        and kid in _jwks_cache
-    ):
-        return _jwks_cache.get(kid)
-    url = f"{KEYCLOAK_URL}/realms/{KEYCLOAK_REALM}/protocol/openid-connect/certs"
-    try:
-        async with httpx.AsyncClient(timeout=5) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            data = resp.json()
-            new_cache = {}
-            for k in data.get("keys", []):
-                this_kid = k.get("kid")
-                x5c = k.get("x5c")
-                if this_kid and x5c:
-                    new_cache[this_kid] = _pem_from_x5c(x5c[0])
-            if new_cache:
-                _jwks_cache = new_cache
-                _jwks_ts = now
-            return _jwks_cache.get(kid)
-    except Exception:
-        return _jwks_cache.get(kid)
+# One verifier per process; JWKS keys refresh single-flight in the background
+# and verified claims are reused until the token expires
+token_verifier = TokenVerifier(
+    shared_key_set(
+        f"{KEYCLOAK_URL}/realms/{KEYCLOAK_REALM}/protocol/openid-connect/certs",
+        realm_url=f"{KEYCLOAK_URL}/realms/{KEYCLOAK_REALM}",
+        ttl=KEYCLOAK_PK_TTL_SECONDS,
+    ),
+    issuer=KEYCLOAK_ISSUER,
+    audience=KEYCLOAK_CLIENT_ID if KEYCLOAK_VERIFY_AUD else None,
+    use_jwks=KEYCLOAK_USE_JWKS,
+    realm_key_fallback=True,
+)
 
 
 class CurrentUser(dict):
@@ -82,26 +59,7 @@ async def get_current_user(
     )
 
     try:
-        token = credentials.credentials
-        header = jwt.get_unverified_header(token)
-        key_to_use = None
-        if KEYCLOAK_USE_JWKS:
-            kid = header.get("kid")
-            if kid:
-                key_to_use = await get_jwks_pem(kid)
-        if not key_to_use:
-            # fallback to realm public key
-            realm_info_url = f"{KEYCLOAK_URL}/realms/{KEYCLOAK_REALM}"
-            async with httpx.AsyncClient(timeout=5) as client:
-                r = await client.get(realm_info_url)
-                r.raise_for_status()
-                public_key = r.json().get("public_key")
-                key_to_use = f"-----BEGIN PUBLIC KEY-----\n{public_key}\n-----END PUBLIC KEY-----"
-
-        decode_kwargs = {"algorithms": ["RS256"], "issuer": KEYCLOAK_ISSUER}
-        if KEYCLOAK_VERIFY_AUD:
-            decode_kwargs["audience"] = KEYCLOAK_CLIENT_ID
-        payload = jwt.decode(token, key_to_use, **decode_kwargs)
+        payload = await token_verifier.verify(credentials.credentials)
         user_id = payload.get("sub")
         email = payload.get("email")
         # roles: realm + client roles
@@ -115,7 +73,7 @@ async def get_current_user(
         if not user_id:
             raise credentials_exception
         return CurrentUser(user_id=user_id, email=email, roles=roles)
-    except JWTError:
+    except TokenVerificationError:
         raise credentials_exception
 
 def require_roles(allowed_roles: List[str]):
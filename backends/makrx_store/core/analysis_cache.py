@@ -0,0 +1,297 @@
+"""
+Content-addressed cache for 3D mesh analysis results
+Keyed by file SHA-256, analyzer version and options; memory LRU and on-disk
+tiers with size-bounded eviction, plus an optional shared Redis tier.
+Every lookup returns a freshly decoded dict, so callers may mutate it.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import anyio
+import numpy as np
+
+from .config import settings
+from .storage import calculate_file_hash
+
+logger = logging.getLogger(__name__)
+
+REDIS_PREFIX = "mesh-analysis:"
+
+
+def file_content_hash(file_path: str) -> str:
+    with open(file_path, "rb") as f:
+        return calculate_file_hash(f)
+
+
+def analysis_cache_key(
+    content_hash: str,
+    analyzer: str,
+    version: str,
+    options: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Cache key for one analysis.
+
+    `version` is owned by the analyzer and must be bumped whenever its output
+    changes, which orphans every result computed by older code.
+    """
+    opts = json.dumps(options or {}, sort_keys=True, default=str)
+    digest = hashlib.sha256(
+        f"{analyzer}:{version}:{content_hash}:{opts}".encode()
+    ).hexdigest()
+    return f"{analyzer}-{digest}"
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+class AnalysisCache:
+    """
+    Two local tiers and an optional Redis tier.
+
+    Memory holds the hottest `memory_entries` results; the disk tier keeps
+    JSON files under `directory` and evicts least recently used files once
+    their total size passes `max_disk_bytes`. Redis, when configured, shares
+    results across workers and hosts and expires entries after `redis_ttl`.
+    Redis failures are logged and treated as misses.
+
+    Both local tiers hold the serialized JSON rather than the dict, so a hit
+    never hands out an object shared with another caller. The async API runs
+    disk access in a worker thread.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+        memory_entries: int = 256,
+        redis_url: Optional[str] = None,
+        redis_ttl: int = 7 * 24 * 3600,
+    ):
+        self.directory = directory or os.path.join(
+            tempfile.gettempdir(), "makrx-analysis-cache"
+        )
+        self.max_disk_bytes = max_disk_bytes
+        self.memory_entries = memory_entries
+        self.redis_url = redis_url
+        self.redis_ttl = redis_ttl
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None
+        self._redis = None
+        self._async_redis = None
+        self.hits = {"memory": 0, "disk": 0, "redis": 0}
+        self.misses = 0
+
+    # Memory tier
+
+    def _memory_get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            payload = self._memory.get(key)
+            if payload is None:
+                return None
+            self._memory.move_to_end(key)
+        self.hits["memory"] += 1
+        return json.loads(payload)
+
+    def _memory_set(self, key: str, payload: str) -> None:
+        with self._lock:
+            self._memory[key] = payload
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    # Disk tier
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _disk_get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = f.read()
+            value = json.loads(payload)
+            os.utime(path)  # mtime doubles as last-access time for eviction
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable analysis cache entry {key}: {e}")
+            self._remove(path)
+            return None
+        self.hits["disk"] += 1
+        self._memory_set(key, payload)
+        return value
+
+    def _disk_set(self, key: str, payload: str) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Analysis cache disk write failed: {e}")
+            self._remove(tmp_path)
+            return
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+            else:
+                self._disk_bytes += len(payload.encode())
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._evict_disk()
+
+    def _entries(self):
+        try:
+            with os.scandir(self.directory) as it:
+                return [e for e in it if e.name.endswith(".json")]
+        except FileNotFoundError:
+            return []
+
+    def _scan_disk_bytes(self) -> int:
+        return sum(e.stat().st_size for e in self._entries())
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict_disk(self) -> None:
+        """Delete least recently used files until under 90% of the budget"""
+        entries = sorted(
+            ((e.stat().st_mtime, e.stat().st_size, e.path) for e in self._entries())
+        )
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_disk_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            self._remove(path)
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+
+    # Redis tier
+
+    def _sync_redis(self):
+        if self.redis_url and self._redis is None:
+            import redis
+
+            self._redis = redis.Redis.from_url(self.redis_url)
+        return self._redis
+
+    def _async_redis_client(self):
+        if self.redis_url and self._async_redis is None:
+            from redis.asyncio import Redis as AsyncRedis
+
+            self._async_redis = AsyncRedis.from_url(self.redis_url)
+        return self._async_redis
+
+    # Public API
+
+    def _from_redis(self, key: str, raw) -> Optional[str]:
+        """Payload of a Redis hit, also kept in memory; the caller writes disk"""
+        if raw is None:
+            return None
+        payload = raw.decode() if isinstance(raw, bytes) else raw
+        json.loads(payload)  # only well-formed results reach the local tiers
+        self.hits["redis"] += 1
+        self._memory_set(key, payload)
+        return payload
+
+    def _serialize(self, value: Dict[str, Any]) -> str:
+        return json.dumps(value, default=_json_default, separators=(",", ":"))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Blocking lookup for synchronous callers"""
+        value = self._memory_get(key)
+        if value is None:
+            value = self._disk_get(key)
+        if value is None and self.redis_url:
+            try:
+                raw = self._sync_redis().get(REDIS_PREFIX + key)
+                payload = self._from_redis(key, raw)
+                if payload is not None:
+                    self._disk_set(key, payload)
+                    value = json.loads(payload)
+            except Exception as e:
+                logger.warning(f"Analysis cache Redis get failed: {e}")
+        if value is None:
+            self.misses += 1
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        payload = self._serialize(value)
+        self._memory_set(key, payload)
+        self._disk_set(key, payload)
+        if self.redis_url:
+            try:
+                self._sync_redis().set(REDIS_PREFIX + key, payload, ex=self.redis_ttl)
+            except Exception as e:
+                logger.warning(f"Analysis cache Redis set failed: {e}")
+
+    async def get_async(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._memory_get(key)
+        if value is None:
+            value = await anyio.to_thread.run_sync(self._disk_get, key)
+        if value is None and self.redis_url:
+            try:
+                raw = await self._async_redis_client().get(REDIS_PREFIX + key)
+                payload = self._from_redis(key, raw)
+                if payload is not None:
+                    await anyio.to_thread.run_sync(self._disk_set, key, payload)
+                    value = json.loads(payload)
+            except Exception as e:
+                logger.warning(f"Analysis cache Redis get failed: {e}")
+        if value is None:
+            self.misses += 1
+        return value
+
+    async def set_async(self, key: str, value: Dict[str, Any]) -> None:
+        payload = self._serialize(value)
+        self._memory_set(key, payload)
+        await anyio.to_thread.run_sync(self._disk_set, key, payload)
+        if self.redis_url:
+            try:
+                await self._async_redis_client().set(
+                    REDIS_PREFIX + key, payload, ex=self.redis_ttl
+                )
+            except Exception as e:
+                logger.warning(f"Analysis cache Redis set failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            memory_entries = len(self._memory)
+        return {
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "memory_entries": memory_entries,
+            "disk_bytes": self._disk_bytes,
+            "redis": bool(self.redis_url),
+        }
+
+
+# Global analysis cache instance
+analysis_cache = AnalysisCache(
+    directory=settings.ANALYSIS_CACHE_DIR,
+    max_disk_bytes=settings.ANALYSIS_CACHE_MAX_BYTES,
+    memory_entries=settings.ANALYSIS_CACHE_MEMORY_ENTRIES,
+    redis_url=settings.ANALYSIS_CACHE_REDIS_URL,
+    redis_ttl=settings.ANALYSIS_CACHE_REDIS_TTL_SECONDS,
+)
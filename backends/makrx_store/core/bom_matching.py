@@ -0,0 +1,363 @@
+"""
+Bulk BOM-to-product matching
+Resolves exact part numbers in one query and fuzzy-matches the rest against an
+in-memory token/trigram index of active products; price and stock of fuzzy
+matches are read live, since the index snapshot may be minutes old
+"""
+
+import asyncio
+import logging
+import re
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, replace
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.commerce import Product
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+
+# Rarest query trigrams used to pull fuzzy candidates from the index
+CANDIDATE_TRIGRAMS = 12
+# Candidates scored exactly per BOM line
+MAX_CANDIDATES = 200
+# Distinct (name, manufacturer) results memoized per index snapshot
+MEMO_MAX_ENTRIES = 10_000
+
+
+def normalize(text: Optional[str]) -> str:
+    return " ".join(_WORD_RE.findall((text or "").lower()))
+
+
+def word_set(text: str) -> FrozenSet[str]:
+    return frozenset(text.split())
+
+
+def trigram_set(text: str) -> FrozenSet[str]:
+    """pg_trgm-style trigrams: each word padded with two leading spaces"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def name_similarity(
+    words_a: FrozenSet[str],
+    grams_a: FrozenSet[str],
+    words_b: FrozenSet[str],
+    grams_b: FrozenSet[str],
+) -> float:
+    """
+    Similarity in [0, 1]: the better of word-set and trigram Jaccard.
+
+    Word overlap rewards reordered names; trigram overlap tolerates typos,
+    plurals and run-together part names ("M3x10" vs "M3 x 10").
+    """
+    return max(_jaccard(words_a, words_b), _jaccard(grams_a, grams_b))
+
+
+def text_similarity(name1: str, name2: str) -> float:
+    n1, n2 = normalize(name1), normalize(name2)
+    return name_similarity(word_set(n1), trigram_set(n1), word_set(n2), trigram_set(n2))
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    id: int
+    name: str
+    brand: Optional[str]
+    brand_norm: str
+    price: float
+    stock_qty: int
+    words: FrozenSet[str]
+    grams: FrozenSet[str]
+
+
+@dataclass(frozen=True)
+class CandidateMatch:
+    entry: CatalogEntry
+    confidence: float
+    match_type: str  # exact, partial, fuzzy
+    reason: str
+
+
+class CatalogMatchIndex:
+    """Immutable token/trigram index over a snapshot of active products"""
+
+    def __init__(self, entries: Iterable[CatalogEntry]):
+        self.entries: Dict[int, CatalogEntry] = {}
+        self._by_word: Dict[str, List[int]] = defaultdict(list)
+        self._by_gram: Dict[str, List[int]] = defaultdict(list)
+        for entry in entries:
+            self.entries[entry.id] = entry
+            for word in entry.words:
+                self._by_word[word].append(entry.id)
+            for gram in entry.grams:
+                self._by_gram[gram].append(entry.id)
+        self.built_at = time.monotonic()
+        # Results are only valid for this snapshot, so the memo lives here
+        self.memo: Dict[Tuple[str, str], List["CandidateMatch"]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def candidates(
+        self, words: FrozenSet[str], grams: FrozenSet[str]
+    ) -> List[CatalogEntry]:
+        """Entries sharing a word or one of the rarest trigrams, best first"""
+        # Counter.update over a list counts in C; a shared word weighs like
+        # three shared trigrams
+        hits: Counter = Counter()
+        for word in words:
+            postings = self._by_word.get(word)
+            if postings:
+                hits.update(postings * 3)
+        rare = sorted(
+            (g for g in grams if g in self._by_gram),
+            key=lambda g: len(self._by_gram[g]),
+        )[:CANDIDATE_TRIGRAMS]
+        for gram in rare:
+            hits.update(self._by_gram[gram])
+        return [self.entries[i] for i, _ in hits.most_common(MAX_CANDIDATES)]
+
+
+def _entry_from_row(row) -> CatalogEntry:
+    name_norm = normalize(row.name)
+    return CatalogEntry(
+        id=row.id,
+        name=row.name,
+        brand=row.brand,
+        brand_norm=normalize(row.brand),
+        price=float(row.sale_price or row.price or 0),
+        stock_qty=row.stock_qty or 0,
+        words=word_set(name_norm),
+        grams=trigram_set(name_norm),
+    )
+
+
+_LIVE_COLUMNS = (
+    Product.id,
+    Product.price,
+    Product.sale_price,
+    Product.stock_qty,
+)
+_PRODUCT_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.brand,
+    Product.price,
+    Product.sale_price,
+    Product.stock_qty,
+)
+
+
+class BOMMatcher:
+    """
+    Batch matcher for whole BOMs.
+
+    The fuzzy index is rebuilt lazily after a product change (ORM events) or
+    once it is older than `max_age_seconds`, which bounds staleness for
+    changes made by other workers. Only names and brands are taken from the
+    index: stock moves with every reservation (Core UPDATEs no ORM event
+    sees), so price and stock of the matched products are re-read per call.
+    """
+
+    def __init__(self, max_age_seconds: float = 300.0):
+        self.max_age_seconds = max_age_seconds
+        self._index: Optional[CatalogMatchIndex] = None
+        self._stale = True
+        self._lock = asyncio.Lock()
+
+    def mark_stale(self) -> None:
+        self._stale = True
+
+    def _needs_refresh(self) -> bool:
+        return (
+            self._index is None
+            or self._stale
+            or time.monotonic() - self._index.built_at > self.max_age_seconds
+        )
+
+    async def get_index(self, db: AsyncSession) -> CatalogMatchIndex:
+        if not self._needs_refresh():
+            return self._index
+        async with self._lock:
+            if self._needs_refresh():
+                self._stale = False
+                rows = (
+                    await db.execute(
+                        select(*_PRODUCT_COLUMNS).where(Product.is_active.is_(True))
+                    )
+                ).all()
+                self._index = CatalogMatchIndex(_entry_from_row(r) for r in rows)
+                logger.info(f"BOM match index rebuilt: {len(rows)} products")
+        return self._index
+
+    async def find_exact(
+        self, db: AsyncSession, part_numbers: Sequence[str]
+    ) -> Dict[str, List[CatalogEntry]]:
+        """Resolve every part number / SKU with a single query"""
+        codes = sorted({p for p in part_numbers if p})
+        if not codes:
+            return {}
+        part_col = Product.attributes["part_number"].astext
+        sku_attr = Product.attributes["sku"].astext
+        stmt = select(
+            *_PRODUCT_COLUMNS,
+            part_col.label("attr_part_number"),
+            sku_attr.label("attr_sku"),
+            Product.sku.label("sku"),
+        ).where(
+            Product.is_active.is_(True),
+            or_(part_col.in_(codes), sku_attr.in_(codes), Product.sku.in_(codes)),
+        )
+        found: Dict[str, List[CatalogEntry]] = defaultdict(list)
+        for row in (await db.execute(stmt)).all():
+            entry = _entry_from_row(row)
+            keys = {row.attr_part_number, row.attr_sku, row.sku}
+            for code in keys & set(codes):
+                found[code].append(entry)
+        return found
+
+    def fuzzy_matches(
+        self,
+        index: CatalogMatchIndex,
+        name: str,
+        manufacturer: Optional[str] = None,
+    ) -> List[CandidateMatch]:
+        """Brand+name matches if a manufacturer is given, else name-only"""
+        name_norm = normalize(name)
+        brand = normalize(manufacturer)
+        key = (name_norm, brand)
+        cached = index.memo.get(key)
+        if cached is not None:
+            return cached
+
+        words, grams = word_set(name_norm), trigram_set(name_norm)
+        candidates = index.candidates(words, grams)
+        scored = [
+            (entry, name_similarity(words, grams, entry.words, entry.grams))
+            for entry in candidates
+        ]
+
+        matches: List[CandidateMatch] = []
+        if brand:
+            matches = [
+                CandidateMatch(entry, sim * 0.8, "partial", "Brand and name similarity")
+                for entry, sim in scored
+                if sim > 0.7 and brand in entry.brand_norm
+            ]
+        if not matches:
+            fuzzy = sorted(
+                ((e, s) for e, s in scored if s > 0.5),
+                key=lambda es: es[1],
+                reverse=True,
+            )[:5]
+            matches = [
+                CandidateMatch(entry, sim * 0.6, "fuzzy", "Name similarity")
+                for entry, sim in fuzzy
+            ]
+        matches.sort(key=lambda m: m.confidence, reverse=True)
+
+        if len(index.memo) >= MEMO_MAX_ENTRIES:
+            index.memo.clear()
+        index.memo[key] = matches
+        return matches
+
+    async def match_items(
+        self,
+        db: AsyncSession,
+        items: Sequence[Tuple[str, Optional[str], Optional[str]]],
+    ) -> List[List[CandidateMatch]]:
+        """
+        Match (name, manufacturer, part_number) tuples in one pass.
+
+        Issues at most three queries regardless of BOM size: one for exact
+        part numbers, one to rebuild the index (only if it is stale) and one
+        for the current price and stock of the fuzzy matches.
+        """
+        exact = await self.find_exact(db, [pn for _, _, pn in items if pn])
+        index = None
+        results: List[List[CandidateMatch]] = []
+        for name, manufacturer, part_number in items:
+            if part_number and exact.get(part_number):
+                results.append(
+                    [
+                        CandidateMatch(entry, 0.95, "exact", "Exact part number match")
+                        for entry in exact[part_number]
+                    ]
+                )
+                continue
+            if index is None:
+                index = await self.get_index(db)
+            results.append(self.fuzzy_matches(index, name, manufacturer))
+        if index is not None:
+            results = await self._with_live_stock(db, results)
+        return results
+
+    async def _with_live_stock(
+        self, db: AsyncSession, results: List[List[CandidateMatch]]
+    ) -> List[List[CandidateMatch]]:
+        """
+        Copy of `results` with index entries carrying current price and
+        stock; products deactivated since the snapshot are dropped. The
+        memoized matches themselves are left untouched.
+        """
+        ids = sorted(
+            {
+                match.entry.id
+                for matches in results
+                for match in matches
+                if match.match_type != "exact"
+            }
+        )
+        if not ids:
+            return results
+        rows = (
+            await db.execute(
+                select(*_LIVE_COLUMNS).where(
+                    Product.id.in_(ids), Product.is_active.is_(True)
+                )
+            )
+        ).all()
+        live = {
+            row.id: (float(row.sale_price or row.price or 0), row.stock_qty or 0)
+            for row in rows
+        }
+        refreshed: List[List[CandidateMatch]] = []
+        for matches in results:
+            current = []
+            for match in matches:
+                if match.match_type == "exact":
+                    current.append(match)  # read by this call's exact query
+                elif match.entry.id in live:
+                    price, stock_qty = live[match.entry.id]
+                    entry = replace(match.entry, price=price, stock_qty=stock_qty)
+                    current.append(replace(match, entry=entry))
+            refreshed.append(current)
+        return refreshed
+
+
+# Global instance
+bom_matcher = BOMMatcher(settings.BOM_MATCH_INDEX_MAX_AGE_SECONDS)
+
+
+def _mark_index_stale(mapper, connection, target) -> None:
+    bom_matcher.mark_stale()
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(Product, _event_name, _mark_index_stale)
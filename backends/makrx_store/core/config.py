@@ -61,6 +61,28 @@ class Settings(BaseSettings):
         description="Redis URL for caching and rate limiting",
     )
 
+    # Catalog search facet cache
+    FACET_CACHE_TTL_SECONDS: float = Field(
+        60.0, description="Seconds a cached facet result stays fresh"
+    )
+    FACET_CACHE_MAX_ENTRIES: int = Field(
+        1024, description="Max distinct filter sets kept in the facet cache"
+    )
+
+    # BOM import matching
+    BOM_MATCH_INDEX_MAX_AGE_SECONDS: float = Field(
+        300.0,
+        description="Max age of the in-memory BOM match index before rebuild",
+    )
+
+    # Stock reservations
+    STOCK_RESERVATION_TTL_SECONDS: int = Field(
+        900, description="Seconds a cart holds reserved stock before release"
+    )
+    STOCK_RESERVATION_SWEEP_INTERVAL_SECONDS: float = Field(
+        60.0, description="Seconds between sweeps of expired reservations"
+    )
+
     # Authentication (Keycloak)
     KEYCLOAK_URL: str = Field(
         "http://localhost:8081", description="Keycloak base URL"
@@ -77,6 +99,12 @@ class Settings(BaseSettings):
         None, description="Keycloak client secret"
     )
     KEYCLOAK_JWKS_URL: Optional[str] = None
+    JWKS_CACHE_TTL_SECONDS: float = Field(
+        3600.0, description="Age at which cached JWKS keys are refreshed"
+    )
+    JWT_CLAIMS_CACHE_SIZE: int = Field(
+        10000, description="Verified token claims kept in memory (0 disables)"
+    )
     # Audience for service-to-service tokens (Store ↔ Cave, etc.)
     SERVICE_AUDIENCE: str = Field(
         default="makrx-services",
@@ -173,6 +201,34 @@ class Settings(BaseSettings):
         ".stp",
     ]
 
+    # Mesh analysis worker pool
+    ANALYSIS_POOL_WORKERS: int = Field(
+        2, description="Worker processes for 3D mesh analysis"
+    )
+    ANALYSIS_QUEUE_SIZE: int = Field(
+        32, description="Max analysis jobs waiting for a free worker"
+    )
+    ANALYSIS_TIMEOUT_SECONDS: float = Field(
+        120.0, description="Per-file mesh analysis timeout"
+    )
+
+    # Mesh analysis result cache
+    ANALYSIS_CACHE_DIR: Optional[str] = Field(
+        None, description="Directory for cached analyses (default: system temp)"
+    )
+    ANALYSIS_CACHE_MAX_BYTES: int = Field(
+        256 * 1024 * 1024, description="Disk budget for cached analyses"
+    )
+    ANALYSIS_CACHE_MEMORY_ENTRIES: int = Field(
+        256, description="Analyses kept in the in-process LRU"
+    )
+    ANALYSIS_CACHE_REDIS_URL: Optional[str] = Field(
+        None, description="Optional Redis URL to share analyses across hosts"
+    )
+    ANALYSIS_CACHE_REDIS_TTL_SECONDS: int = Field(
+        7 * 24 * 3600, description="Expiry of analyses stored in Redis"
+    )
+
     # Rate Limiting
     RATE_LIMIT_REQUESTS: int = Field(100, description="Requests per window")
     RATE_LIMIT_WINDOW: int = Field(
@@ -0,0 +1,192 @@
+"""
+Search facet cache
+In-process TTL/LRU cache for catalog facets keyed by the normalized filter set,
+invalidated once a transaction that changed products commits. Core UPDATEs
+skip mapper events and must call invalidate_facets_after_commit themselves.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from ..core.config import settings
+from ..core.search import tokenize_query
+from ..models.commerce import Product
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_facet_key(query: Optional[str], filters: Any) -> str:
+    """
+    Build a stable cache key from a search query and filter model.
+
+    Unset filters are dropped and list values are de-duplicated and sorted, so
+    equivalent requests share one entry regardless of ordering.
+    """
+    normalized: Dict[str, Any] = {}
+    if filters is not None:
+        data = (
+            filters.model_dump(exclude_none=True)
+            if hasattr(filters, "model_dump")
+            else dict(filters)
+        )
+        for name, value in data.items():
+            if isinstance(value, (list, tuple, set)):
+                value = sorted({str(v) for v in value})
+                if not value:
+                    continue
+            normalized[name] = value
+    terms = tokenize_query(query)
+    if terms:
+        normalized["_q"] = terms
+    return json.dumps(normalized, sort_keys=True, default=str)
+
+
+class FacetCache:
+    """TTL + LRU cache of facet results with hit/miss counters"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a fresh cached value or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(
+        self, key: str, value: Any, generation: Optional[int] = None
+    ) -> None:
+        """Store a value unless the cache was invalidated since `generation`"""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    async def get_or_build(
+        self, key: str, builder: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Return the cached value for `key`, building it on a miss.
+
+        Concurrent misses for the same key share a single build. If that
+        build is cancelled, its waiters build the value themselves.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.hits += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # this waiter was cancelled, not the build
+            return await self.get_or_build(key, builder)
+
+        self.misses += 1
+        generation = self._generation
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await builder()
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure is not logged twice
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            self.set(key, value, generation)
+            return value
+        finally:
+            # Cancellation is a BaseException: never leave waiters hanging
+            if not future.done():
+                future.cancel()
+            self._inflight.pop(key, None)
+
+    def invalidate(self) -> None:
+        """Drop every entry (called on product changes)"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for tuning TTL and size"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
+
+
+# Global instance
+facet_cache = FacetCache(
+    ttl_seconds=settings.FACET_CACHE_TTL_SECONDS,
+    max_entries=settings.FACET_CACHE_MAX_ENTRIES,
+)
+
+
+_PENDING_KEY = "facet_cache_invalidations"
+
+
+def invalidate_facets_after_commit(session) -> None:
+    """Drop cached facets once `session` commits (immediately without one)"""
+    if session is None:
+        facet_cache.invalidate()
+    else:
+        session.info[_PENDING_KEY] = True
+
+
+# Invalidating at flush would let a build running before the commit cache
+# the old rows again for the full TTL
+def _queue_invalidation(mapper, connection, target) -> None:
+    invalidate_facets_after_commit(object_session(target))
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(Product, _event_name, _queue_invalidation)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_invalidations(session: Session) -> None:
+    if session.info.pop(_PENDING_KEY, False):
+        facet_cache.invalidate()
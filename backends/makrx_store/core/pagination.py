@@ -0,0 +1,191 @@
+"""
+Keyset (cursor) pagination helpers
+Opaque cursors over (sort key, id) plus exact/estimated/skipped totals
+"""
+
+import base64
+import binascii
+import json
+import logging
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, func, literal, literal_column, or_, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.elements import ClauseElement, ColumnElement
+
+from .search import dialect_name
+
+logger = logging.getLogger(__name__)
+
+# (expression, descending) pairs, most significant first; the last key must be
+# unique (normally the primary key) so the ordering is total
+OrderKeys = Sequence[Tuple[ColumnElement, bool]]
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded or belongs to another ordering"""
+
+
+class KeysetPage(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "dec" in value:
+            return Decimal(value["dec"])
+        raise InvalidCursor("Unknown cursor value")
+    return value
+
+
+def encode_cursor(ordering: str, values: Sequence[Any]) -> str:
+    """Encode sort-key values of the last row into an opaque cursor"""
+    payload = {"o": ordering, "k": [_encode_value(v) for v in values]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, ordering: str, key_count: int) -> List[Any]:
+    """Decode a cursor, checking it was issued for the same ordering"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload["k"]
+        issued_for = payload["o"]
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("Malformed cursor") from e
+    if issued_for != ordering or len(values) != key_count:
+        raise InvalidCursor("Cursor does not match the requested sort")
+    return [_decode_value(v) for v in values]
+
+
+def _nullable(expr) -> bool:
+    """Whether a sort key can be NULL; non-column expressions are assumed to"""
+    return getattr(getattr(expr, "expression", expr), "nullable", True)
+
+
+def order_by_clauses(order_keys: OrderKeys) -> List[Any]:
+    """
+    ORDER BY clauses for `order_keys`.
+
+    Nullable keys sort NULLs last on every dialect, which keyset_condition
+    relies on; offset pages must use the same clauses to agree with cursors.
+    """
+    clauses = []
+    for expr, descending in order_keys:
+        clause = expr.desc() if descending else expr.asc()
+        clauses.append(clause.nulls_last() if _nullable(expr) else clause)
+    return clauses
+
+
+def _equals(expr, value):
+    return expr.is_(None) if value is None else expr == value
+
+
+def keyset_condition(order_keys: OrderKeys, values: Sequence[Any]):
+    """
+    Rows strictly after `values` in the given ordering.
+
+    Expands to (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ..., with the comparison
+    flipped for descending keys, so mixed directions are supported. NULLs sort
+    last (see order_by_clauses): after a non-NULL value every NULL follows,
+    and nothing follows a NULL within the same key.
+    """
+    clauses = []
+    for i, (expr, descending) in enumerate(order_keys):
+        value = values[i]
+        if value is None:
+            continue
+        value = literal(value, expr.type)  # booleans compare as values too
+        after = expr < value if descending else expr > value
+        if _nullable(expr):
+            after = or_(after, expr.is_(None))
+        equal_prefix = [_equals(order_keys[j][0], values[j]) for j in range(i)]
+        clauses.append(and_(*equal_prefix, after) if equal_prefix else after)
+    return or_(*clauses)
+
+
+async def fetch_keyset_page(
+    db,
+    stmt,
+    order_keys: OrderKeys,
+    ordering: str,
+    cursor: Optional[str],
+    limit: int,
+) -> KeysetPage:
+    """
+    Fetch one page of entities from `stmt` after `cursor`.
+
+    The sort-key values are selected alongside each row so the next cursor can
+    be built without re-deriving them in Python.
+    """
+    if cursor:
+        values = decode_cursor(cursor, ordering, len(order_keys))
+        stmt = stmt.where(keyset_condition(order_keys, values))
+
+    stmt = stmt.add_columns(
+        *[expr.label(f"_keyset_{i}") for i, (expr, _) in enumerate(order_keys)]
+    ).order_by(*order_by_clauses(order_keys))
+
+    rows = (await db.execute(stmt.limit(limit + 1))).all()
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit and page:
+        next_cursor = encode_cursor(ordering, list(page[-1][1:]))
+    return KeysetPage([row[0] for row in page], next_cursor)
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) wrapper used for planner row estimates"""
+
+    inherit_cache = False
+
+    def __init__(self, stmt):
+        self.stmt = stmt
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.stmt, **kw)
+
+
+async def count_rows(db, stmt, mode: str = "exact") -> Tuple[Optional[int], bool]:
+    """
+    Count rows matched by `stmt`.
+
+    Returns (total, is_estimate). "estimate" uses the PostgreSQL planner's row
+    estimate (no scan) and falls back to an exact count elsewhere; "none" skips
+    counting entirely.
+    """
+    if mode == "none":
+        return None, False
+
+    if mode == "estimate" and dialect_name(db) == "postgresql":
+        try:
+            plan = (await db.execute(_Explain(stmt.order_by(None)))).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"]), True
+        except Exception as e:
+            logger.warning(f"Row estimate failed, counting exactly: {e}")
+
+    # Select a constant so the subquery does not carry every (deferred) column
+    matched = stmt.with_only_columns(
+        literal_column("1"), maintain_column_froms=True
+    ).order_by(None)
+    count_stmt = select(func.count()).select_from(matched.subquery())
+    return (await db.execute(count_stmt)).scalar_one(), False
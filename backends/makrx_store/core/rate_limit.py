@@ -0,0 +1,129 @@
+"""
+GCRA rate limiting backed by a single Redis Lua call
+Checks every key of a request (IP and user) atomically and keeps an
+in-process pre-filter of clients already known to be over their limit
+"""
+
+import logging
+import math
+import time
+from typing import Dict, NamedTuple, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# GCRA over all KEYS at once: a request is admitted only if every key admits
+# it, and only then are the theoretical arrival times (TATs) advanced, so a
+# request rejected by the user limit does not consume the IP allowance.
+# Redis server time is used so workers with skewed clocks agree.
+#
+# ARGV[1] emission interval (ms per request), ARGV[2] burst offset (ms)
+# Returns {allowed, index of the denying key (1-based, 0 if allowed),
+#          retry_after_ms, remaining for the tightest key}
+GCRA_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local new_tats = {}
+local remaining = -1
+for i, key in ipairs(KEYS) do
+    local tat = tonumber(redis.call('GET', key)) or now
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + interval
+    local allow_at = new_tat - burst
+    if allow_at > now then
+        return {0, i, allow_at - now, 0}
+    end
+    new_tats[i] = new_tat
+    local left = math.floor((now - allow_at) / interval)
+    if remaining < 0 or left < remaining then
+        remaining = left
+    end
+end
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, new_tats[i], 'PX', new_tats[i] - now)
+end
+return {1, 0, 0, remaining}
+"""
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    denied_key: Optional[str]
+    retry_after: float  # seconds
+    remaining: int
+
+
+ALLOWED = RateLimitResult(True, None, 0.0, -1)
+
+
+class GCRARateLimiter:
+    """
+    Generic cell rate algorithm: `limit` requests per `window` seconds with
+    bursts up to `limit`. Unlike whole-second sorted-set members, every
+    request is accounted for, including bursts within the same millisecond.
+
+    Rejections are remembered locally until their retry-after elapses; GCRA
+    guarantees the key stays over limit until then (rejected requests do not
+    consume capacity), so those requests are refused without a Redis call.
+    """
+
+    def __init__(self, redis_client, max_blocked: int = 100_000):
+        self.redis = redis_client
+        self.max_blocked = max_blocked
+        self._script = redis_client.register_script(GCRA_LUA)
+        self._blocked: Dict[str, float] = {}
+
+    def _prefiltered(self, keys: Sequence[str]) -> Optional[RateLimitResult]:
+        now = time.monotonic()
+        for key in keys:
+            until = self._blocked.get(key)
+            if until is None:
+                continue
+            if until > now:
+                return RateLimitResult(False, key, until - now, 0)
+            del self._blocked[key]
+        return None
+
+    def _remember(self, key: str, retry_after: float) -> None:
+        if len(self._blocked) >= self.max_blocked:
+            now = time.monotonic()
+            self._blocked = {k: v for k, v in self._blocked.items() if v > now}
+            if len(self._blocked) >= self.max_blocked:
+                self._blocked.clear()
+        self._blocked[key] = time.monotonic() + retry_after
+
+    async def check(
+        self, keys: Sequence[str], limit: int, window: float
+    ) -> RateLimitResult:
+        """
+        Admit or reject one request against every key in one round trip.
+
+        The keys go to a single EVAL, so on Redis Cluster they must share a
+        hash slot, e.g. through a common {hash tag}.
+        """
+        blocked = self._prefiltered(keys)
+        if blocked is not None:
+            return blocked
+
+        interval_ms = max(1, int(window * 1000 / limit))
+        burst_ms = interval_ms * limit
+        allowed, index, retry_ms, remaining = await self._script(
+            keys=list(keys), args=[interval_ms, burst_ms]
+        )
+        if int(allowed):
+            return RateLimitResult(True, None, 0.0, int(remaining))
+
+        key = keys[int(index) - 1]
+        retry_after = int(retry_ms) / 1000
+        self._remember(key, retry_after)
+        return RateLimitResult(False, key, retry_after, 0)
+
+    def blocked_count(self) -> int:
+        return len(self._blocked)
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
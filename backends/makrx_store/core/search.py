@@ -0,0 +1,106 @@
+"""
+Catalog full-text search
+Ranked product search backed by a tsvector/trigram index on PostgreSQL,
+with a portable LIKE-based fallback for SQLite and other dialects
+"""
+
+import logging
+import re
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import and_, case, func, literal_column, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+from ..models.commerce import Product
+
+logger = logging.getLogger(__name__)
+
+# Text search configuration used by both the stored vector and the queries
+SEARCH_CONFIG = "english"
+
+# Field weights for the portable fallback ranking (mirrors tsvector A-D)
+FALLBACK_WEIGHTS = (
+    ("name", 1.0),
+    ("brand", 0.8),
+    ("short_description", 0.4),
+    ("description", 0.2),
+)
+
+_TOKEN_RE = re.compile(r"\w+(?:\.\w+)*", re.UNICODE)
+
+
+class SearchClause(NamedTuple):
+    """WHERE condition and relevance expression for a search query"""
+
+    condition: ColumnElement
+    rank: ColumnElement
+
+
+def tokenize_query(query: Optional[str], max_terms: int = 8) -> List[str]:
+    """Split a user query into safe search terms"""
+    if not query:
+        return []
+    return [t.lower() for t in _TOKEN_RE.findall(query)][:max_terms]
+
+
+def dialect_name(db) -> str:
+    """Return the dialect name for a (sync or async) session"""
+    bind = getattr(db, "bind", None)
+    dialect = getattr(bind, "dialect", None)
+    return getattr(dialect, "name", None) or "postgresql"
+
+
+def _tsquery(terms: List[str]) -> ColumnElement:
+    """Prefix-matching AND query, e.g. 'pla:* & 1.75:*'"""
+    expr = " & ".join(f"{term}:*" for term in terms)
+    return func.to_tsquery(literal_column(f"'{SEARCH_CONFIG}'"), expr)
+
+
+def _postgres_clause(terms: List[str]) -> SearchClause:
+    tsquery = _tsquery(terms)
+    phrase = " ".join(terms)
+
+    condition = or_(
+        Product.search_vector.op("@@")(tsquery),
+        Product.name.op("%")(phrase),
+        Product.brand.op("%")(phrase),
+    )
+    rank = func.ts_rank_cd(Product.search_vector, tsquery, 32) + func.greatest(
+        func.similarity(Product.name, phrase),
+        func.similarity(func.coalesce(Product.brand, ""), phrase) * 0.8,
+    )
+    return SearchClause(condition, rank)
+
+
+def _fallback_clause(terms: List[str]) -> SearchClause:
+    conditions = []
+    scores = []
+    for term in terms:
+        pattern = f"%{term}%"
+        matches = []
+        for field, weight in FALLBACK_WEIGHTS:
+            match = getattr(Product, field).ilike(pattern)
+            matches.append(match)
+            scores.append(case((match, weight), else_=0.0))
+        conditions.append(or_(*matches))
+
+    rank = scores[0]
+    for score in scores[1:]:
+        rank = rank + score
+    return SearchClause(and_(*conditions), rank)
+
+
+def build_search_clause(
+    query: Optional[str], dialect: str = "postgresql"
+) -> Optional[SearchClause]:
+    """
+    Build the match condition and relevance rank for a catalog query.
+
+    Returns None when the query has no searchable terms.
+    """
+    terms = tokenize_query(query)
+    if not terms:
+        return None
+    if dialect == "postgresql":
+        return _postgres_clause(terms)
+    return _fallback_clause(terms)
@@ -2,97 +2,51 @@
 
 import logging
 from dataclasses import dataclass
-from datetime import datetime, timedelta
 from typing import List, Optional
 
-import httpx
 from .config import settings
 from .unified_auth import get_request_id
 from ..schemas.auth_error import AuthError
+from backends.utils import (
+    TokenVerificationError,
+    TokenVerifier,
+    VerifiedClaimsCache,
+    shared_key_set,
+)
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import jwt
-from jose.exceptions import ExpiredSignatureError, JWTClaimsError, JWTError
 
 logger = logging.getLogger(__name__)
 
 security = HTTPBearer(auto_error=False)
 
-# JWKS caching
-jwks_cache: Optional[dict] = None
-jwks_cache_expiry: Optional[datetime] = None
-
-
-async def get_jwks() -> dict:
-    """Fetch JWKS from Keycloak with simple caching."""
-    global jwks_cache, jwks_cache_expiry
-    if (
-        jwks_cache
-        and jwks_cache_expiry
-        and datetime.utcnow() < jwks_cache_expiry
-    ):
-        return jwks_cache
-
-    async with httpx.AsyncClient() as client:
-        jwks_url = (
-            settings.KEYCLOAK_JWKS_URL
-            or f"{settings.KEYCLOAK_ISSUER}/protocol/openid-connect/certs"
-        )
-        response = await client.get(jwks_url)
-        response.raise_for_status()
-        jwks_cache = response.json()
-        jwks_cache_expiry = datetime.utcnow() + timedelta(hours=1)
-        return jwks_cache
+# JWKS keys are shared process-wide per URL (see backends.utils.jwt_verifier)
+token_verifier = TokenVerifier(
+    shared_key_set(
+        settings.KEYCLOAK_JWKS_URL
+        or f"{settings.KEYCLOAK_ISSUER}/protocol/openid-connect/certs",
+        ttl=settings.JWKS_CACHE_TTL_SECONDS,
+    ),
+    issuer=settings.KEYCLOAK_ISSUER,
+    audience=settings.KEYCLOAK_CLIENT_ID,
+    cache=VerifiedClaimsCache(settings.JWT_CLAIMS_CACHE_SIZE),
+)
 
 
 async def decode_token(token: str, request_id: Optional[str] = None) -> dict:
     """Decode and verify a JWT using the realm's JWKS."""
     try:
-        header = jwt.get_unverified_header(token)
-        kid = header.get("kid")
-        jwks = await get_jwks()
-        key = next(
-            (k for k in jwks.get("keys", []) if k.get("kid") == kid), None
-        )
-        if not key:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail=AuthError(
-                    error="Unauthorized",
-                    message="Invalid token",
-                    code="invalid_token",
-                    request_id=request_id,
-                ).model_dump(mode="json"),
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-
-        return jwt.decode(
-            token,
-            key,
-            algorithms=["RS256"],
-            audience=settings.KEYCLOAK_CLIENT_ID,
-            issuer=settings.KEYCLOAK_ISSUER,
-        )
-
-    except ExpiredSignatureError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=AuthError(
-                error="Unauthorized",
-                message="Token expired",
-                code="token_expired",
-                request_id=request_id,
-            ).model_dump(mode="json"),
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    except (JWTClaimsError, JWTError) as exc:
-        logger.error(f"JWT verification failed: {exc}")
+        return await token_verifier.verify(token)
+    except TokenVerificationError as exc:
+        expired = exc.code == "token_expired"
+        if not expired:
+            logger.error(f"JWT verification failed: {exc}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=AuthError(
                 error="Unauthorized",
-                message="Invalid token",
-                code="invalid_token",
+                message="Token expired" if expired else "Invalid token",
+                code="token_expired" if expired else "invalid_token",
                 request_id=request_id,
             ).model_dump(mode="json"),
             headers={"WWW-Authenticate": "Bearer"},
@@ -0,0 +1,322 @@
+"""
+Stock reservations for carts and checkout
+Stock is taken with one conditional UPDATE ... RETURNING per product, so
+concurrent buyers never oversell and hot rows are not read and locked first
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, NamedTuple, Optional, Sequence
+
+from sqlalchemy import and_, bindparam, insert, or_, select, update
+
+from ..core.config import settings
+from ..core.facets import invalidate_facets_after_commit
+from ..database import async_session
+from ..models.commerce import Product, StockReservation
+
+logger = logging.getLogger(__name__)
+
+HELD = "held"
+COMMITTED = "committed"
+RELEASED = "released"
+
+_products = Product.__table__
+_reservations = StockReservation.__table__
+
+# Only rows whose stock covers the request (or that may go negative on
+# backorder) are decremented. The check and the write are one statement, so
+# there is no SELECT ... FOR UPDATE round trip while the row is locked; callers
+# issue it as the last write before committing to keep the lock short.
+_take_stock = (
+    update(_products)
+    .where(
+        _products.c.id == bindparam("product_id"),
+        _products.c.track_inventory.isnot(False),
+        or_(
+            _products.c.stock_quantity >= bindparam("quantity"),
+            _products.c.allow_backorder.is_(True),
+        ),
+    )
+    .values(stock_quantity=_products.c.stock_quantity - bindparam("quantity"))
+    .returning(_products.c.stock_quantity)
+)
+
+_return_stock = (
+    update(_products)
+    .where(_products.c.id == bindparam("b_product_id"))
+    .values(stock_quantity=_products.c.stock_quantity + bindparam("b_quantity"))
+)
+
+
+class InsufficientStock(Exception):
+    """Raised when a product cannot cover the requested quantity"""
+
+    def __init__(self, product_id: int, requested: int, available: int):
+        super().__init__(
+            f"Only {available} of product {product_id} available, "
+            f"{requested} requested"
+        )
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+
+
+class Reservation(NamedTuple):
+    id: int
+    product_id: int
+    quantity: int
+    remaining: int
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def reserve_stock(
+    db,
+    product_id: int,
+    quantity: int,
+    user_id: str,
+    cart_id: Optional[int] = None,
+    order_id: Optional[int] = None,
+    ttl_seconds: Optional[float] = None,
+    now: Optional[datetime] = None,
+) -> Optional[Reservation]:
+    """
+    Take `quantity` units of a product and record who holds them.
+
+    Held for a cart until the TTL runs out, or committed straight to
+    `order_id`. Returns None for products that do not track inventory.
+    """
+    if quantity <= 0:
+        raise ValueError("quantity must be positive")
+    now = now or _utcnow()
+    params = {"product_id": product_id, "quantity": quantity}
+    remaining = (await db.execute(_take_stock, params)).scalar_one_or_none()
+
+    if remaining is None:
+        product = (
+            await db.execute(
+                select(
+                    _products.c.stock_quantity, _products.c.track_inventory
+                ).where(_products.c.id == product_id)
+            )
+        ).one_or_none()
+        if product is not None and product.track_inventory is False:
+            return None
+        available = (product.stock_quantity or 0) if product else 0
+        raise InsufficientStock(product_id, quantity, max(available, 0))
+
+    if remaining <= 0 < remaining + quantity:
+        # Sold out: in_stock facet counts change
+        invalidate_facets_after_commit(db)
+
+    if ttl_seconds is None:
+        ttl_seconds = settings.STOCK_RESERVATION_TTL_SECONDS
+    reservation_id = (
+        await db.execute(
+            insert(_reservations)
+            .values(
+                product_id=product_id,
+                cart_id=cart_id,
+                order_id=order_id,
+                user_id=user_id,
+                quantity=quantity,
+                status=COMMITTED if order_id is not None else HELD,
+                expires_at=now + timedelta(seconds=ttl_seconds),
+                created_at=now,
+            )
+            .returning(_reservations.c.id)
+        )
+    ).scalar_one()
+    return Reservation(reservation_id, product_id, quantity, remaining)
+
+
+async def _release(db, criteria, now: Optional[datetime]) -> Dict[int, int]:
+    """Move matching reservations to released and put their units back"""
+    rows = (
+        await db.execute(
+            update(_reservations)
+            .where(*criteria)
+            .values(status=RELEASED, released_at=now or _utcnow())
+            .returning(_reservations.c.product_id, _reservations.c.quantity)
+        )
+    ).all()
+    released: Dict[int, int] = {}
+    for product_id, quantity in rows:
+        released[product_id] = released.get(product_id, 0) + quantity
+    if released:
+        # One statement per product, in id order so concurrent releases
+        # lock rows in the same order
+        await db.execute(
+            _return_stock,
+            [
+                {"b_product_id": product_id, "b_quantity": quantity}
+                for product_id, quantity in sorted(released.items())
+            ],
+        )
+        # Restocked products may be back in stock
+        invalidate_facets_after_commit(db)
+    return released
+
+
+async def release_cart_reservations(
+    db,
+    cart_id: int,
+    product_id: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> Dict[int, int]:
+    """Return a cart's held stock, optionally for one product only"""
+    criteria = [
+        _reservations.c.cart_id == cart_id,
+        _reservations.c.status == HELD,
+    ]
+    if product_id is not None:
+        criteria.append(_reservations.c.product_id == product_id)
+    return await _release(db, criteria, now)
+
+
+async def release_order_reservations(
+    db, order_id: int, now: Optional[datetime] = None
+) -> Dict[int, int]:
+    """Return the stock committed to an order, e.g. when it is cancelled"""
+    criteria = [
+        _reservations.c.order_id == order_id,
+        _reservations.c.status == COMMITTED,
+    ]
+    return await _release(db, criteria, now)
+
+
+async def commit_cart_reservations(
+    db,
+    cart_id: int,
+    order_id: int,
+    needed: Dict[int, int],
+    now: Optional[datetime] = None,
+) -> Dict[int, int]:
+    """
+    Hand a cart's held stock over to an order, up to `needed` per product.
+
+    Held units beyond what the order needs (a row is split if it straddles
+    the limit) are released in the same transaction. Reservations the
+    sweeper released first are not returned; callers reserve the shortfall
+    again.
+    """
+    held = (
+        await db.execute(
+            select(_reservations)
+            .where(
+                _reservations.c.cart_id == cart_id,
+                _reservations.c.status == HELD,
+            )
+            .order_by(_reservations.c.product_id, _reservations.c.id)
+            .with_for_update()
+        )
+    ).all()
+    wanted = dict(needed)
+    committed: Dict[int, int] = {}
+    commit_ids = []
+    surplus_ids = []
+    for row in held:
+        take = min(row.quantity, max(wanted.get(row.product_id, 0), 0))
+        if take == row.quantity:
+            commit_ids.append(row.id)
+        else:
+            surplus_ids.append(row.id)
+        if take == 0:
+            continue
+        if take < row.quantity:
+            # Split: the row keeps the surplus, a new row carries the rest
+            await db.execute(
+                update(_reservations)
+                .where(_reservations.c.id == row.id)
+                .values(quantity=row.quantity - take)
+            )
+            await db.execute(
+                insert(_reservations).values(
+                    product_id=row.product_id,
+                    cart_id=cart_id,
+                    order_id=order_id,
+                    user_id=row.user_id,
+                    quantity=take,
+                    status=COMMITTED,
+                    expires_at=row.expires_at,
+                    created_at=row.created_at,
+                )
+            )
+        wanted[row.product_id] -= take
+        committed[row.product_id] = committed.get(row.product_id, 0) + take
+
+    if commit_ids:
+        await db.execute(
+            update(_reservations)
+            .where(_reservations.c.id.in_(commit_ids))
+            .values(status=COMMITTED, order_id=order_id)
+        )
+    if surplus_ids:
+        await _release(
+            db,
+            [
+                _reservations.c.id.in_(surplus_ids),
+                _reservations.c.status == HELD,
+            ],
+            now,
+        )
+    return committed
+
+
+async def sweep_expired_reservations(
+    db, now: Optional[datetime] = None, batch_size: int = 500
+) -> int:
+    """Release held reservations past their TTL; returns units restocked"""
+    now = now or _utcnow()
+    restocked = 0
+    while True:
+        ids: Sequence[int] = (
+            await db.execute(
+                select(_reservations.c.id)
+                .where(
+                    _reservations.c.status == HELD,
+                    _reservations.c.expires_at <= now,
+                )
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+        ).scalars().all()
+        if not ids:
+            break
+        released = await _release(
+            db,
+            [
+                and_(
+                    _reservations.c.id.in_(ids),
+                    _reservations.c.status == HELD,
+                )
+            ],
+            now,
+        )
+        await db.commit()
+        restocked += sum(released.values())
+        if len(ids) < batch_size:
+            break
+    return restocked
+
+
+async def run_reservation_sweeper(interval_seconds: Optional[float] = None):
+    """Background loop returning expired cart reservations to stock"""
+    interval = (
+        interval_seconds or settings.STOCK_RESERVATION_SWEEP_INTERVAL_SECONDS
+    )
+    while True:
+        try:
+            async with async_session() as db:
+                restocked = await sweep_expired_reservations(db)
+            if restocked:
+                logger.info(f"Released {restocked} expired reserved units")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Stock reservation sweep failed: {e}")
+        await asyncio.sleep(interval)
@@ -3,16 +3,20 @@ Unified Authentication System
 One Keycloak realm with precise JWT handling as specified
 """
 
-import json
 import logging
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Any, Dict, Optional
 
-import httpx
-import jwt
 from .config import settings
 from ..schemas.auth_error import AuthError
+from backends.utils import (
+    KeySetUnavailable,
+    TokenVerificationError,
+    TokenVerifier,
+    VerifiedClaimsCache,
+    shared_key_set,
+)
 from fastapi import Depends, Header, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
@@ -33,35 +37,16 @@ class UnifiedAuth:
     def __init__(self):
         self.keycloak_url = settings.KEYCLOAK_URL
         self.realm = settings.KEYCLOAK_REALM
-        self.jwks_cache = {}
-        self.jwks_cache_expiry = None
-
-    async def get_jwks(self) -> Dict[str, Any]:
-        """Get JWKS from Keycloak with caching"""
-        if (
-            self.jwks_cache_expiry
-            and datetime.utcnow() < self.jwks_cache_expiry
-            and self.jwks_cache
-        ):
-            return self.jwks_cache
-
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.keycloak_url}/realms/{self.realm}/protocol/openid-connect/certs"
-                )
-                response.raise_for_status()
-
-                self.jwks_cache = response.json()
-                self.jwks_cache_expiry = datetime.utcnow() + timedelta(hours=1)
-                return self.jwks_cache
-
-        except Exception as e:
-            logger.error(f"Failed to fetch JWKS: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Authentication service unavailable",
-            )
+        realm_url = f"{self.keycloak_url}/realms/{self.realm}"
+        self.verifier = TokenVerifier(
+            shared_key_set(
+                f"{realm_url}/protocol/openid-connect/certs",
+                ttl=settings.JWKS_CACHE_TTL_SECONDS,
+            ),
+            issuer=realm_url,
+            cache=VerifiedClaimsCache(settings.JWT_CLAIMS_CACHE_SIZE),
+            require_kid=True,
+        )
 
     async def verify_jwt(
         self,
@@ -74,94 +59,22 @@ class UnifiedAuth:
         - Validate issuer/audience
         - Check expiration
         - Verify signature with JWKS
+        Verified claims are cached per token and audience until exp.
         """
         try:
-            # Decode header to get key ID
-            header = jwt.get_unverified_header(token)
-            kid = header.get("kid")
-
-            if not kid:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail=AuthError(
-                        error="Unauthorized",
-                        message="Invalid token: missing key ID",
-                        code="invalid_token",
-                        request_id=request_id,
-                    ).model_dump(),
-                )
-
-            # Get JWKS and find matching key
-            jwks = await self.get_jwks()
-            key = None
-
-            for jwk in jwks.get("keys", []):
-                if jwk.get("kid") == kid:
-                    key = jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(jwk))
-                    break
-
-            if not key:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail=AuthError(
-                        error="Unauthorized",
-                        message="Invalid token: key not found",
-                        code="invalid_token",
-                        request_id=request_id,
-                    ).model_dump(),
-                )
-
-            # Verify JWT with exact issuer/audience checks
-            expected_issuer = f"{self.keycloak_url}/realms/{self.realm}"
-
-            payload = jwt.decode(
-                token,
-                key,
-                algorithms=["RS256"],
-                issuer=expected_issuer,
-                audience=expected_audience,
-            )
-
-            return payload
-
-        except jwt.ExpiredSignatureError:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail=AuthError(
-                    error="Unauthorized",
-                    message="Token expired",
-                    code="token_expired",
-                    request_id=request_id,
-                ).model_dump(),
-            )
-        except jwt.InvalidAudienceError:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail=AuthError(
-                    error="Unauthorized",
-                    message=f"Token not valid for audience: {expected_audience}",
-                    code="invalid_audience",
-                    request_id=request_id,
-                ).model_dump(),
-            )
-        except jwt.InvalidIssuerError:
+            return await self.verifier.verify(token, audience=expected_audience)
+        except KeySetUnavailable:
             raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail=AuthError(
-                    error="Unauthorized",
-                    message="Token from invalid issuer",
-                    code="invalid_issuer",
-                    request_id=request_id,
-                ).model_dump(),
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service unavailable",
             )
-        except Exception as e:
-            logger.error(f"JWT verification failed: {e}")
+        except TokenVerificationError as e:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=AuthError(
                     error="Unauthorized",
-                    message="Invalid token",
-                    code="invalid_token",
+                    message=e.message,
+                    code=e.code,
                     request_id=request_id,
                 ).model_dump(),
             )
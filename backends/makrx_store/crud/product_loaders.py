@@ -0,0 +1,65 @@
+"""
+Batched loaders for product enrichment
+Fetch per-product data (ratings, etc.) for a whole page in one query
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.commerce import Product
+from ..models.reviews import ProductRatingSummary
+
+logger = logging.getLogger(__name__)
+
+
+def serialize_rating_summary(summary: ProductRatingSummary) -> Dict[str, Any]:
+    """Serialize a rating summary to the shape used by catalog responses"""
+    return {
+        "average": float(summary.average_rating or 0),
+        "count": summary.total_reviews,
+        "verified_count": summary.verified_reviews,
+    }
+
+
+class ProductEnrichmentLoader:
+    """Batch-load per-product enrichment for a page of products"""
+
+    async def load_rating_summaries(
+        self, db: AsyncSession, product_ids: Iterable[int]
+    ) -> Dict[int, ProductRatingSummary]:
+        """Load rating summaries for all product ids in a single query"""
+        ids = list({pid for pid in product_ids if pid is not None})
+        if not ids:
+            return {}
+
+        stmt = select(ProductRatingSummary).where(
+            ProductRatingSummary.product_id.in_(ids)
+        )
+        summaries = (await db.execute(stmt)).scalars().all()
+        return {s.product_id: s for s in summaries}
+
+    async def load(
+        self, db: AsyncSession, products: List[Product]
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Return enrichment keyed by product id.
+
+        Each value is a dict of extra response fields for that product; products
+        without any enrichment map to an empty dict.
+        """
+        enrichment: Dict[int, Dict[str, Any]] = {p.id: {} for p in products}
+        if not products:
+            return enrichment
+
+        ratings = await self.load_rating_summaries(db, enrichment.keys())
+        for product_id, summary in ratings.items():
+            enrichment[product_id]["rating"] = serialize_rating_summary(summary)
+
+        return enrichment
+
+
+# Global instance
+product_enrichment_loader = ProductEnrichmentLoader()
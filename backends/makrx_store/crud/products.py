@@ -10,6 +10,7 @@ from typing import List, Optional, Tuple, Dict, Any
 import logging
 
 from ..models.commerce import Product, Category, OrderItem
+from ..core.search import build_search_clause, dialect_name
 from ..schemas import (
     ProductCreate,
     ProductUpdate,
@@ -251,20 +252,21 @@ class ProductCRUD:
                             Product.tags.contains([tag])
                         )
 
-            # Apply search query
-            if search.q:
-                search_term = f"%{search.q}%"
-                search_filter = or_(
-                    Product.name.ilike(search_term),
-                    Product.description.ilike(search_term),
-                    Product.short_description.ilike(search_term),
-                    Product.brand.ilike(search_term),
-                )
-                query = query.where(search_filter)
-                count_query = count_query.where(search_filter)
+            # Apply ranked full-text search
+            search_clause = build_search_clause(search.q, dialect_name(db))
+            if search_clause is not None:
+                query = query.where(search_clause.condition)
+                count_query = count_query.where(search_clause.condition)
 
             # Apply sorting
-            if search.sort == ProductSort.NAME_ASC:
+            if (
+                search.sort == ProductSort.RELEVANCE
+                and search_clause is not None
+            ):
+                query = query.order_by(
+                    desc(search_clause.rank), desc(Product.created_at)
+                )
+            elif search.sort == ProductSort.NAME_ASC:
                 query = query.order_by(asc(Product.name))
             elif search.sort == ProductSort.NAME_DESC:
                 query = query.order_by(desc(Product.name))
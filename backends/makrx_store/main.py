@@ -3,10 +3,8 @@ MakrX Store Backend - FastAPI Application
 Migrated to MakrX Unified Ecosystem with Keycloak Integration
 """
 
-from fastapi import FastAPI, Request, Response, Depends
-from fastapi.responses import JSONResponse
-import time
-import uuid
+from fastapi import FastAPI, Response, Depends
+import asyncio
 import logging
 import structlog
 import os
@@ -32,8 +30,10 @@ from .routes import (
 )
 from .database_sync import create_tables, test_connection
 from .middleware.api_security import setup_api_security
+from .middleware.asgi import MetricsTokenStage, RequestContextStage
 from .core.config import settings
 from .core.security import require_roles, get_current_user
+from .core.stock_reservations import run_reservation_sweeper
 
 # Config: single source of truth via core.config.settings
 
@@ -64,8 +64,13 @@ app = FastAPI(
     redoc_url="/redoc",
 )
 
-# Security middleware: industry-grade request hardening
-setup_api_security(app)
+# Security middleware: industry-grade request hardening. Request context
+# (request_id + structlog) and, in production, the optional /metrics token
+# guard run first in the same pure-ASGI pass as the security stages
+request_stages = [RequestContextStage()]
+if settings.ENVIRONMENT == "production" and os.getenv("METRICS_TOKEN"):
+    request_stages.append(MetricsTokenStage(os.getenv("METRICS_TOKEN")))
+setup_api_security(app, request_stages=request_stages)
 
 # Optional: Metrics exporter (Prometheus) and Sentry (if available)
 try:
@@ -99,52 +104,9 @@ try:
 except Exception as e:
     logger.info(f"Sentry not enabled: {e}")
 
-# Protect /metrics in production with optional token
-if settings.ENVIRONMENT == "production" and os.getenv("METRICS_TOKEN"):
-    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
-
-    @app.middleware("http")
-    async def metrics_protection_middleware(request: Request, call_next):
-        if request.url.path == "/metrics":
-            token = request.headers.get("X-Metrics-Token")
-            if token != METRICS_TOKEN:
-                return JSONResponse(
-                    status_code=403, content={"detail": "Forbidden"}
-                )
-        return await call_next(request)
-
-
 # CORS is configured by security middleware (setup_api_security)
 
 
-# Request middleware with request_id and structlog context enrichment
-@app.middleware("http")
-async def request_middleware(request: Request, call_next):
-    # Check for incoming correlation ID, or generate a new one
-    correlation_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
-
-    # Make it available to the application state
-    request.state.request_id = correlation_id
-
-    # Bind to structlog context for logging
-    structlog.contextvars.bind_contextvars(request_id=correlation_id)
-
-    start_time = time.time()
-
-    response = await call_next(request)
-
-    process_time = (time.time() - start_time) * 1000
-
-    # Ensure the correlation ID is in the response headers
-    response.headers["X-Request-ID"] = correlation_id
-    response.headers["X-Response-Time"] = f"{process_time:.2f}ms"
-
-    # Clear context variables for the next request
-    structlog.contextvars.clear_contextvars()
-
-    return response
-
-
 # Include routers
 app.include_router(health.router, tags=["Health"])
 app.include_router(catalog.router, tags=["Catalog"])
@@ -196,6 +158,9 @@ async def startup_event():
                 message="Production mode: skipping auto table creation; use Alembic migrations",
                 mode="production",
             )
+        app.state.reservation_sweeper = asyncio.create_task(
+            run_reservation_sweeper()
+        )
         logger.info(
             "startup_complete",
             message="MakrX Store API started successfully",
@@ -209,6 +174,22 @@ async def startup_event():
         raise
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks started at startup and the analysis workers"""
+    sweeper = getattr(app.state, "reservation_sweeper", None)
+    if sweeper is not None:
+        sweeper.cancel()
+        try:
+            await sweeper
+        except asyncio.CancelledError:
+            pass
+
+    from .services.file_analysis_service import file_analysis_service
+
+    await asyncio.to_thread(file_analysis_service.shutdown)
+
+
 # Health endpoints are provided by routes.health router
 
 
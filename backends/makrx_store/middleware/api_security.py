@@ -4,7 +4,7 @@ Implements comprehensive API security per specification:
 - TLS enforcement (HTTPS, HSTS)
 - CORS restrictions to known domains
 - CSRF protection for browser forms
-- Rate limiting with Redis token bucket
+- Rate limiting with Redis GCRA (token bucket equivalent)
 - API Gateway protections
 """
 
@@ -12,7 +12,7 @@ import time
 import json
 from redis.asyncio import Redis as AsyncRedis
 import logging
-from typing import Optional, Dict, Any, Set
+from typing import Optional, Dict, Any, Sequence, Set
 from fastapi import FastAPI, Request, Response, HTTPException, status
 from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi.middleware.cors import CORSMiddleware
@@ -22,6 +22,12 @@ import secrets
 import hashlib
 
 from ..core.config import settings
+from ..core.rate_limit import (
+    ALLOWED,
+    GCRARateLimiter,
+    RateLimitResult,
+    retry_after_header,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -88,6 +94,198 @@ class APISecurityConfig:
     }
 
 
+# ==========================================
+# Shared request checks
+# Used by the BaseHTTPMiddleware classes below and the pure-ASGI stages in
+# middleware/asgi.py so both stacks behave identically
+# ==========================================
+
+CSRF_EXEMPT_PATHS = {
+    "/webhooks/",  # Webhooks are signature-verified
+    "/api/auth/",  # JWT-based auth
+    "/health",
+    "/metrics",
+}
+
+# Blocked paths (security)
+GATEWAY_BLOCKED_PATHS = {
+    "/.env",
+    "/config",
+    "/admin/debug",
+    "/.git",
+    "/backup",
+}
+
+# Allowed API paths
+GATEWAY_ALLOWED_PATTERNS = {
+    "/api/",
+    "/auth/",
+    "/webhooks/",
+    "/health",
+    "/quick-reorder/",
+    "/metrics",
+    "/docs",
+    "/openapi.json",
+}
+
+
+def is_gateway_path_allowed(path: str) -> bool:
+    """Deny-list first, then the allowed API prefixes"""
+    if any(blocked in path for blocked in GATEWAY_BLOCKED_PATHS):
+        return False
+    return any(pattern in path for pattern in GATEWAY_ALLOWED_PATTERNS)
+
+
+def response_security_headers() -> Dict[str, str]:
+    """Security headers added to every response"""
+    headers = APISecurityConfig.SECURITY_HEADERS.copy()
+    # Tighten CSP in production
+    if settings.ENVIRONMENT == "production":
+        headers["Content-Security-Policy"] = (
+            "default-src 'self'; "
+            "script-src 'self' https://js.stripe.com https://checkout.razorpay.com; "
+            "style-src 'self'; "
+            "img-src 'self' data: https:; "
+            "connect-src 'self' https://api.stripe.com https://api.razorpay.com; "
+            "frame-ancestors 'none';"
+        )
+    return headers
+
+
+def endpoint_type_for(path: str) -> str:
+    """Determine endpoint type for rate limiting"""
+    if "/upload" in path:
+        return "upload"
+    elif "/quote" in path or "/pricing" in path:
+        return "quote"
+    elif "/checkout" in path or "/payment" in path:
+        return "checkout"
+    elif "/auth/login" in path:
+        return "login"
+    elif "/webhooks" in path:
+        return "webhook"
+    else:
+        return "api"
+
+
+def client_identifiers(headers, client_host: Optional[str]) -> tuple[str, str]:
+    """Get (ip, user id) identifiers for rate limiting"""
+    # IP address (with proxy support)
+    ip = headers.get("X-Forwarded-For", "").split(",")[0].strip()
+    if not ip:
+        ip = headers.get("X-Real-IP", "")
+    if not ip:
+        ip = client_host or "unknown"
+
+    # User ID from token (if available)
+    user_id = None
+    auth_header = headers.get("Authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        try:
+            # Extract user ID from token (simplified - would use full JWT decode)
+            # For now, create a hash-based identifier
+            user_id = hashlib.sha256(auth_header.encode()).hexdigest()[:16]
+        except Exception:
+            pass
+
+    return ip, user_id
+
+
+def rate_limit_keys(endpoint_type: str, ip: str, user_id: Optional[str]) -> list[str]:
+    """
+    IP key first, then the user key when the caller is identified.
+
+    Both go into one script call, so they share the {endpoint_type} hash tag
+    and land in the same Redis Cluster slot (no CROSSSLOT error).
+    """
+    keys = [f"rate_limit:{{{endpoint_type}}}:ip:{ip}"]
+    if user_id:
+        keys.append(f"rate_limit:{{{endpoint_type}}}:user:{user_id}")
+    return keys
+
+
+def rate_limited_response(
+    result: RateLimitResult, ip: str, user_id: Optional[str], endpoint_type: str
+) -> JSONResponse:
+    scope = "ip" if ":ip:" in result.denied_key else "user"
+    subject = ip if scope == "ip" else user_id
+    logger.warning(f"Rate limit exceeded for {scope} {subject} on {endpoint_type}")
+    retry_after = retry_after_header(result.retry_after)
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={
+            "detail": "Rate limit exceeded",
+            "type": f"{scope}_limit_{endpoint_type}",
+            "retry_after": int(retry_after),
+        },
+        headers={"Retry-After": retry_after},
+    )
+
+
+def rate_limit_backend_missing(endpoint_type: str) -> Optional[JSONResponse]:
+    """In production, fail closed on critical endpoints when Redis is absent"""
+    if settings.ENVIRONMENT != "production":
+        return None
+    critical = {"upload", "quote", "checkout", "login", "webhook"}
+    if endpoint_type not in critical:
+        return None
+    logger.error(
+        "Rate limiting backend unavailable in production; "
+        "blocking critical endpoint request"
+    )
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Rate limiting unavailable"},
+    )
+
+
+def https_violation(
+    scheme: str, url, forwarded_proto: Optional[str]
+) -> Optional[JSONResponse]:
+    """Redirect/refuse plain HTTP in production"""
+    if settings.ENVIRONMENT != "production":
+        return None
+    # Check for HTTP in production
+    if scheme == "http":
+        # Force HTTPS redirect
+        https_url = url.replace(scheme="https")
+        return JSONResponse(
+            status_code=status.HTTP_301_MOVED_PERMANENTLY,
+            headers={"Location": str(https_url)},
+            content={"detail": "HTTPS required"},
+        )
+
+    # Verify X-Forwarded-Proto header (for load balancers)
+    if forwarded_proto and forwarded_proto.lower() != "https":
+        return JSONResponse(
+            status_code=status.HTTP_426_UPGRADE_REQUIRED,
+            content={"detail": "HTTPS required"},
+        )
+    return None
+
+
+def verify_double_submit(
+    header_token: Optional[str], cookie_token: Optional[str]
+) -> bool:
+    """Verify CSRF token using double submit pattern"""
+    # Both must exist and match
+    if not header_token or not cookie_token:
+        return False
+    return secrets.compare_digest(header_token, cookie_token)
+
+
+def upload_too_large_response() -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        content={
+            "detail": (
+                "File too large. "
+                f"Max size: {APISecurityConfig.MAX_UPLOAD_SIZE} bytes"
+            )
+        },
+    )
+
+
 # ==========================================
 # HTTPS/TLS Enforcement Middleware
 # ==========================================
@@ -101,41 +299,18 @@ class HTTPSRedirectMiddleware(BaseHTTPMiddleware):
     """
 
     async def dispatch(self, request: Request, call_next):
-        # Check if running in production
-        if settings.ENVIRONMENT == "production":
-            # Check for HTTP in production
-            if request.url.scheme == "http":
-                # Force HTTPS redirect
-                https_url = request.url.replace(scheme="https")
-                return JSONResponse(
-                    status_code=status.HTTP_301_MOVED_PERMANENTLY,
-                    headers={"Location": str(https_url)},
-                    content={"detail": "HTTPS required"},
-                )
-
-            # Verify X-Forwarded-Proto header (for load balancers)
-            forwarded_proto = request.headers.get("X-Forwarded-Proto")
-            if forwarded_proto and forwarded_proto.lower() != "https":
-                return JSONResponse(
-                    status_code=status.HTTP_426_UPGRADE_REQUIRED,
-                    content={"detail": "HTTPS required"},
-                )
+        violation = https_violation(
+            request.url.scheme,
+            request.url,
+            request.headers.get("X-Forwarded-Proto"),
+        )
+        if violation is not None:
+            return violation
 
         response = await call_next(request)
 
         # Add HSTS header per specification
-        # Tighten CSP in production
-        headers = APISecurityConfig.SECURITY_HEADERS.copy()
-        if settings.ENVIRONMENT == "production":
-            headers["Content-Security-Policy"] = (
-                "default-src 'self'; "
-                "script-src 'self' https://js.stripe.com https://checkout.razorpay.com; "
-                "style-src 'self'; "
-                "img-src 'self' data: https:; "
-                "connect-src 'self' https://api.stripe.com https://api.razorpay.com; "
-                "frame-ancestors 'none';"
-            )
-        response.headers.update(headers)
+        response.headers.update(response_security_headers())
 
         return response
 
@@ -147,8 +322,8 @@ class HTTPSRedirectMiddleware(BaseHTTPMiddleware):
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
     """
-    Rate limiting with Redis token bucket per specification
-    - Per-IP & per-user limits
+    Rate limiting with Redis GCRA per specification
+    - Per-IP & per-user limits, checked atomically in one round trip
     - Different limits for file uploads, quotes, checkout, login
     """
 
@@ -157,69 +332,32 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         self.redis_client = (
             AsyncRedis.from_url(redis_url) if redis_url else None
         )
+        self.limiter = (
+            GCRARateLimiter(self.redis_client) if self.redis_client else None
+        )
 
     def _get_endpoint_type(self, path: str) -> str:
         """Determine endpoint type for rate limiting"""
-        if "/upload" in path:
-            return "upload"
-        elif "/quote" in path or "/pricing" in path:
-            return "quote"
-        elif "/checkout" in path or "/payment" in path:
-            return "checkout"
-        elif "/auth/login" in path:
-            return "login"
-        elif "/webhooks" in path:
-            return "webhook"
-        else:
-            return "api"
+        return endpoint_type_for(path)
 
     def _get_client_identifier(self, request: Request) -> tuple[str, str]:
         """Get client identifiers for rate limiting"""
-        # IP address (with proxy support)
-        ip = request.headers.get("X-Forwarded-For", "").split(",")[0].strip()
-        if not ip:
-            ip = request.headers.get("X-Real-IP", "")
-        if not ip:
-            ip = request.client.host if request.client else "unknown"
-
-        # User ID from token (if available)
-        user_id = None
-        auth_header = request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            try:
-                # Extract user ID from token (simplified - would use full JWT decode)
-                # For now, create a hash-based identifier
-                user_id = hashlib.sha256(auth_header.encode()).hexdigest()[:16]
-            except Exception:
-                pass
-
-        return ip, user_id
+        return client_identifiers(
+            request.headers, request.client.host if request.client else None
+        )
 
     async def _check_rate_limit(
-        self, key: str, limit: int, window: int
-    ) -> bool:
-        """Check rate limit using Redis token bucket"""
-        if not self.redis_client:
-            return True  # Allow if Redis unavailable
+        self, keys: list[str], limit: int, window: int
+    ) -> RateLimitResult:
+        """Check all keys with one atomic GCRA call (local pre-filter first)"""
+        if not self.limiter:
+            return ALLOWED  # Allow if Redis unavailable
 
         try:
-            current_time = int(time.time())
-            window_start = current_time - window
-
-            # Use sliding window with Redis sorted sets (async)
-            pipe = self.redis_client.pipeline()
-            await pipe.zremrangebyscore(key, 0, window_start)
-            await pipe.zadd(key, {str(current_time): current_time})
-            await pipe.zcard(key)
-            await pipe.expire(key, window)
-            results = await pipe.execute()
-            request_count = results[2]
-
-            return request_count <= limit
-
+            return await self.limiter.check(keys, limit, window)
         except Exception as e:
             logger.error(f"Rate limiting failed: {e}")
-            return True  # Allow on error (fail open)
+            return ALLOWED  # Allow on error (fail open)
 
     async def dispatch(self, request: Request, call_next):
         # Skip rate limiting for health checks
@@ -233,60 +371,23 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         )
 
         # In production, if Redis is unavailable, fail closed on critical endpoints
-        if not self.redis_client and settings.ENVIRONMENT == "production":
-            critical = {"upload", "quote", "checkout", "login", "webhook"}
-            if endpoint_type in critical:
-                logger.error(
-                    "Rate limiting backend unavailable in production; blocking critical endpoint request"
-                )
-                return JSONResponse(
-                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    content={"detail": "Rate limiting unavailable"},
-                )
+        if not self.redis_client:
+            blocked = rate_limit_backend_missing(endpoint_type)
+            if blocked is not None:
+                return blocked
 
         # Get client identifiers
         ip, user_id = self._get_client_identifier(request)
 
-        # Check IP rate limit
-        ip_key = f"rate_limit:ip:{endpoint_type}:{ip}"
-        ip_allowed = await self._check_rate_limit(
-            ip_key, rate_config["requests"], rate_config["window"]
+        # IP and user limits are checked together in a single Redis call
+        result = await self._check_rate_limit(
+            rate_limit_keys(endpoint_type, ip, user_id),
+            rate_config["requests"],
+            rate_config["window"],
         )
 
-        if not ip_allowed:
-            logger.warning(
-                f"Rate limit exceeded for IP {ip} on {endpoint_type}"
-            )
-            return JSONResponse(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                content={
-                    "detail": "Rate limit exceeded",
-                    "type": f"ip_limit_{endpoint_type}",
-                    "retry_after": rate_config["window"],
-                },
-                headers={"Retry-After": str(rate_config["window"])},
-            )
-
-        # Check user rate limit (if user identified)
-        if user_id:
-            user_key = f"rate_limit:user:{endpoint_type}:{user_id}"
-            user_allowed = await self._check_rate_limit(
-                user_key, rate_config["requests"], rate_config["window"]
-            )
-
-            if not user_allowed:
-                logger.warning(
-                    f"Rate limit exceeded for user {user_id} on {endpoint_type}"
-                )
-                return JSONResponse(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    content={
-                        "detail": "Rate limit exceeded",
-                        "type": f"user_limit_{endpoint_type}",
-                        "retry_after": rate_config["window"],
-                    },
-                    headers={"Retry-After": str(rate_config["window"])},
-                )
+        if not result.allowed:
+            return rate_limited_response(result, ip, user_id, endpoint_type)
 
         return await call_next(request)
 
@@ -306,12 +407,7 @@ class CSRFProtectionMiddleware(BaseHTTPMiddleware):
 
     def __init__(self, app):
         super().__init__(app)
-        self.csrf_exempt_paths = {
-            "/webhooks/",  # Webhooks are signature-verified
-            "/api/auth/",  # JWT-based auth
-            "/health",
-            "/metrics",
-        }
+        self.csrf_exempt_paths = set(CSRF_EXEMPT_PATHS)
 
     def _is_csrf_exempt(self, path: str) -> bool:
         """Check if path is exempt from CSRF protection"""
@@ -323,17 +419,9 @@ class CSRFProtectionMiddleware(BaseHTTPMiddleware):
 
     def _verify_csrf_token(self, request: Request) -> bool:
         """Verify CSRF token using double submit pattern"""
-        # Get token from header
-        header_token = request.headers.get("X-CSRF-Token")
-
-        # Get token from cookie
-        cookie_token = request.cookies.get("csrf_token")
-
-        # Both must exist and match
-        if not header_token or not cookie_token:
-            return False
-
-        return secrets.compare_digest(header_token, cookie_token)
+        return verify_double_submit(
+            request.headers.get("X-CSRF-Token"), request.cookies.get("csrf_token")
+        )
 
     async def dispatch(self, request: Request, call_next):
         # Skip CSRF for exempt paths
@@ -441,12 +529,7 @@ class FileUploadSecurityMiddleware(BaseHTTPMiddleware):
         # Check content length
         content_length = int(request.headers.get("content-length", 0))
         if content_length > APISecurityConfig.MAX_UPLOAD_SIZE:
-            return JSONResponse(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                content={
-                    "detail": f"File too large. Max size: {APISecurityConfig.MAX_UPLOAD_SIZE} bytes"
-                },
-            )
+            return upload_too_large_response()
 
         return await call_next(request)
 
@@ -467,26 +550,8 @@ class APIGatewayMiddleware(BaseHTTPMiddleware):
     def __init__(self, app):
         super().__init__(app)
 
-        # Blocked paths (security)
-        self.blocked_paths = {
-            "/.env",
-            "/config",
-            "/admin/debug",
-            "/.git",
-            "/backup",
-        }
-
-        # Allowed API paths
-        self.allowed_api_patterns = {
-            "/api/",
-            "/auth/",
-            "/webhooks/",
-            "/health",
-            "/quick-reorder/",
-            "/metrics",
-            "/docs",
-            "/openapi.json",
-        }
+        self.blocked_paths = set(GATEWAY_BLOCKED_PATHS)
+        self.allowed_api_patterns = set(GATEWAY_ALLOWED_PATTERNS)
 
     def _is_path_allowed(self, path: str) -> bool:
         """Check if API path is allowed"""
@@ -542,9 +607,17 @@ class APIGatewayMiddleware(BaseHTTPMiddleware):
 # ==========================================
 
 
-def setup_api_security(app: FastAPI):
+def setup_api_security(
+    app: FastAPI, composed: bool = True, request_stages: Sequence[Any] = ()
+):
     """
     Setup all API security middleware per specification
+
+    By default the HTTPS, gateway, rate-limit, CSRF and upload checks run as
+    pure-ASGI stages in one middleware pass (middleware/asgi.py); pass
+    composed=False for the equivalent BaseHTTPMiddleware stack.
+    `request_stages` (e.g. request context, metrics guard) run first, in the
+    same pass as the security stages.
     """
     # Adjust CSP per environment: stricter in production
     if settings.ENVIRONMENT == "production":
@@ -556,17 +629,8 @@ def setup_api_security(app: FastAPI):
             "connect-src 'self' https://api.stripe.com https://api.razorpay.com; "
             "frame-ancestors 'none';"
         )
-    # 1. HTTPS/TLS enforcement
-    app.add_middleware(HTTPSRedirectMiddleware)
-
-    # 2. API Gateway protections
-    app.add_middleware(APIGatewayMiddleware)
-
-    # 3. Rate limiting
     redis_url = getattr(settings, "REDIS_URL", None)
-    if redis_url:
-        app.add_middleware(RateLimitMiddleware, redis_url=redis_url)
-    else:
+    if not redis_url:
         if settings.ENVIRONMENT == "production":
             logger.error(
                 "REDIS_URL is required in production for rate limiting and CSRF; critical endpoints will fail closed"
@@ -576,11 +640,43 @@ def setup_api_security(app: FastAPI):
                 "REDIS_URL not set; rate limiting will fail open in development"
             )
 
-    # 4. CSRF protection
-    app.add_middleware(CSRFProtectionMiddleware)
+    if composed:
+        from .asgi import (
+            APIGatewayStage,
+            ComposedMiddleware,
+            CSRFProtectionStage,
+            FileUploadSecurityStage,
+            HTTPSRedirectStage,
+            RateLimitStage,
+        )
+
+        # Outermost first, matching the order of the classic stack below
+        stages = [*request_stages, FileUploadSecurityStage(), CSRFProtectionStage()]
+        if redis_url:
+            stages.append(RateLimitStage(redis_url=redis_url))
+        stages += [APIGatewayStage(), HTTPSRedirectStage()]
+        app.add_middleware(ComposedMiddleware, stages=stages)
+    else:
+        # 1. HTTPS/TLS enforcement
+        app.add_middleware(HTTPSRedirectMiddleware)
+
+        # 2. API Gateway protections
+        app.add_middleware(APIGatewayMiddleware)
+
+        # 3. Rate limiting
+        if redis_url:
+            app.add_middleware(RateLimitMiddleware, redis_url=redis_url)
+
+        # 4. CSRF protection
+        app.add_middleware(CSRFProtectionMiddleware)
+
+        # 5. File upload security
+        app.add_middleware(FileUploadSecurityMiddleware)
+
+        if request_stages:
+            from .asgi import ComposedMiddleware
 
-    # 5. File upload security
-    app.add_middleware(FileUploadSecurityMiddleware)
+            app.add_middleware(ComposedMiddleware, stages=list(request_stages))
 
     # 6. CORS with exact domains from specification
     allowed_origins = APISecurityConfig.ALLOWED_ORIGINS.copy()
@@ -0,0 +1,459 @@
+"""
+Pure-ASGI middleware stages for the store API
+Same behaviour as the BaseHTTPMiddleware classes, composed into a single
+middleware pass with no per-layer task or stream wrapping
+"""
+
+import json
+import logging
+import secrets
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import structlog
+from redis.asyncio import Redis as AsyncRedis
+from starlette.datastructures import URL, Headers, MutableHeaders, QueryParams
+from starlette.requests import cookie_parser
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..core.config import settings
+from ..core.rate_limit import ALLOWED, GCRARateLimiter
+from . import observability
+from .api_security import (
+    CSRF_EXEMPT_PATHS,
+    APISecurityConfig,
+    client_identifiers,
+    endpoint_type_for,
+    https_violation,
+    is_gateway_path_allowed,
+    rate_limit_backend_missing,
+    rate_limit_keys,
+    rate_limited_response,
+    response_security_headers,
+    upload_too_large_response,
+    verify_double_submit,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RequestContext:
+    """Per-request data shared by the stages of one composed pass"""
+
+    __slots__ = ("scope", "headers", "path", "method", "started", "values")
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.headers = Headers(scope=scope)
+        self.path: str = scope["path"]
+        self.method: str = scope["method"]
+        self.started = time.time()
+        self.values: Dict[str, Any] = {}
+
+    @property
+    def client_host(self) -> Optional[str]:
+        client = self.scope.get("client")
+        return client[0] if client else None
+
+    @property
+    def cookies(self) -> Dict[str, str]:
+        if "cookies" not in self.values:
+            self.values["cookies"] = cookie_parser(self.headers.get("cookie", ""))
+        return self.values["cookies"]
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        # Backs request.state in Starlette
+        return self.scope.setdefault("state", {})
+
+
+class Stage:
+    """
+    One middleware concern. Stages run outermost first: `before` may return
+    a response to short-circuit the request, `after` edits the response
+    headers of every response produced further in (including early responses
+    of inner stages), exactly like nested middleware would.
+    """
+
+    async def before(self, ctx: RequestContext) -> Optional[Response]:
+        return None
+
+    def wrap_receive(self, ctx: RequestContext, receive: Receive) -> Receive:
+        return receive
+
+    def after(self, ctx: RequestContext, status: int, headers: MutableHeaders) -> None:
+        pass
+
+    def on_error(self, ctx: RequestContext, error: Exception) -> None:
+        pass
+
+    def finish(self, ctx: RequestContext) -> None:
+        pass
+
+
+class PayloadTooLarge(Exception):
+    """
+    Raised from a stage's receive() when a streamed body passes its size
+    limit. ComposedMiddleware answers 413 itself and hands the app a
+    disconnect: body parsers (FastAPI's form/UploadFile handling) would turn
+    an exception into a 400.
+    """
+
+
+class ComposedMiddleware:
+    """Run several stages as one ASGI middleware"""
+
+    def __init__(self, app: ASGIApp, stages: Sequence[Stage]):
+        self.app = app
+        self.stages: List[Stage] = list(stages)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        ctx = RequestContext(scope)
+        stages = self.stages
+        ran = 0
+        response_started = False
+        rejected = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if rejected:
+                return  # the app's reply after a 413 was already sent
+            if message["type"] == "http.response.start":
+                response_started = True
+                message["headers"] = list(message.get("headers", ()))
+                headers = MutableHeaders(scope=message)
+                for stage in reversed(stages[:ran]):
+                    stage.after(ctx, message["status"], headers)
+            await send(message)
+
+        try:
+            for stage in stages:
+                early = await stage.before(ctx)
+                if early is not None:
+                    await early(scope, receive, send_wrapper)
+                    return
+                ran += 1
+
+            stage_receive = receive
+            for stage in stages:
+                stage_receive = stage.wrap_receive(ctx, stage_receive)
+
+            async def guarded_receive() -> Message:
+                nonlocal rejected
+                if rejected:
+                    return {"type": "http.disconnect"}
+                try:
+                    return await stage_receive()
+                except PayloadTooLarge:
+                    if response_started:
+                        raise
+                    await upload_too_large_response()(scope, receive, send_wrapper)
+                    rejected = True
+                    return {"type": "http.disconnect"}
+
+            try:
+                await self.app(scope, guarded_receive, send_wrapper)
+            except Exception:
+                # e.g. ClientDisconnect from an endpoint reading the body
+                if not rejected:
+                    raise
+        except Exception as e:
+            for stage in stages[:ran]:
+                stage.on_error(ctx, e)
+            raise
+        finally:
+            for stage in reversed(stages[:ran]):
+                stage.finish(ctx)
+
+
+# ==========================================
+# Security stages (api_security.py equivalents)
+# ==========================================
+
+
+class HTTPSRedirectStage(Stage):
+    """HTTPSRedirectMiddleware: HTTPS enforcement and security headers"""
+
+    async def before(self, ctx):
+        return https_violation(
+            ctx.scope.get("scheme", "http"),
+            URL(scope=ctx.scope),
+            ctx.headers.get("X-Forwarded-Proto"),
+        )
+
+    def after(self, ctx, status, headers):
+        headers.update(response_security_headers())
+
+
+class APIGatewayStage(Stage):
+    """APIGatewayMiddleware: path allow/deny lists, request id, access log"""
+
+    async def before(self, ctx):
+        if not is_gateway_path_allowed(ctx.path):
+            logger.warning(
+                f"Blocked path access: {ctx.path} from {ctx.client_host}"
+            )
+            return JSONResponse(status_code=404, content={"detail": "Not found"})
+
+        request_id = ctx.headers.get("X-Request-ID", secrets.token_urlsafe(16))
+        ctx.values["gateway_request_id"] = request_id
+        ctx.values["gateway_started"] = time.time()
+        logger.info(
+            f"API Request: {ctx.method} {ctx.path} "
+            f"from {ctx.client_host} [{request_id}]"
+        )
+        return None
+
+    def after(self, ctx, status, headers):
+        request_id = ctx.values["gateway_request_id"]
+        duration = (time.time() - ctx.values["gateway_started"]) * 1000
+        headers["X-Request-ID"] = request_id
+        headers["X-Response-Time"] = f"{duration:.2f}ms"
+        logger.info(
+            f"API Response: {status} for {ctx.method} {ctx.path} "
+            f"[{request_id}] {duration:.2f}ms"
+        )
+
+
+class RateLimitStage(Stage):
+    """RateLimitMiddleware: GCRA over IP and user keys in one Redis call"""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.redis_client = AsyncRedis.from_url(redis_url) if redis_url else None
+        self.limiter = (
+            GCRARateLimiter(self.redis_client) if self.redis_client else None
+        )
+
+    async def before(self, ctx):
+        # Skip rate limiting for health checks
+        if ctx.path in ("/health", "/metrics"):
+            return None
+
+        endpoint_type = endpoint_type_for(ctx.path)
+        rate_config = APISecurityConfig.RATE_LIMITS.get(
+            endpoint_type, APISecurityConfig.RATE_LIMITS["api"]
+        )
+        if not self.limiter:
+            return rate_limit_backend_missing(endpoint_type)
+
+        ip, user_id = client_identifiers(ctx.headers, ctx.client_host)
+        try:
+            result = await self.limiter.check(
+                rate_limit_keys(endpoint_type, ip, user_id),
+                rate_config["requests"],
+                rate_config["window"],
+            )
+        except Exception as e:
+            logger.error(f"Rate limiting failed: {e}")
+            result = ALLOWED  # Allow on error (fail open)
+
+        if not result.allowed:
+            return rate_limited_response(result, ip, user_id, endpoint_type)
+        return None
+
+
+class CSRFProtectionStage(Stage):
+    """CSRFProtectionMiddleware: double-submit cookie check"""
+
+    def __init__(self):
+        self.csrf_exempt_paths = set(CSRF_EXEMPT_PATHS)
+
+    async def before(self, ctx):
+        if any(exempt in ctx.path for exempt in self.csrf_exempt_paths):
+            return None
+
+        if ctx.method in ("GET", "HEAD", "OPTIONS"):
+            ctx.values["issue_csrf"] = "csrf_token" not in ctx.cookies
+            return None
+
+        if ctx.method in ("POST", "PUT", "PATCH", "DELETE"):
+            if not verify_double_submit(
+                ctx.headers.get("X-CSRF-Token"), ctx.cookies.get("csrf_token")
+            ):
+                logger.warning(f"CSRF verification failed for {ctx.client_host}")
+                return JSONResponse(
+                    status_code=403,
+                    content={"detail": "CSRF token missing or invalid"},
+                )
+        return None
+
+    def after(self, ctx, status, headers):
+        if not ctx.values.get("issue_csrf"):
+            return
+        # Set CSRF token for future requests
+        cookie = Response()
+        cookie.set_cookie(
+            "csrf_token",
+            secrets.token_urlsafe(32),
+            httponly=False,  # Double-submit: must be JS-readable
+            secure=(settings.ENVIRONMENT == "production"),
+            samesite="strict",
+            max_age=3600,  # 1 hour
+        )
+        for name, value in cookie.raw_headers:
+            if name == b"set-cookie":
+                headers.append("set-cookie", value.decode("latin-1"))
+
+
+class FileUploadSecurityStage(Stage):
+    """
+    FileUploadSecurityMiddleware: upload size limit.
+
+    Besides Content-Length, the streamed body is counted as the endpoint
+    reads it, so chunked uploads are cut off at the limit without buffering.
+    """
+
+    def _applies(self, ctx) -> bool:
+        return "/upload" in ctx.path and ctx.method == "POST"
+
+    async def before(self, ctx):
+        if not self._applies(ctx):
+            return None
+        content_length = int(ctx.headers.get("content-length", 0))
+        if content_length > APISecurityConfig.MAX_UPLOAD_SIZE:
+            return upload_too_large_response()
+        return None
+
+    def wrap_receive(self, ctx, receive):
+        if not self._applies(ctx):
+            return receive
+        limit = APISecurityConfig.MAX_UPLOAD_SIZE
+        received = 0
+
+        async def counting_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise PayloadTooLarge()
+            return message
+
+        return counting_receive
+
+
+# ==========================================
+# Observability and request context stages
+# ==========================================
+
+
+class ObservabilityStage(Stage):
+    """ObservabilityMiddleware: request id and structured JSON access logs"""
+
+    def _client_ip(self, ctx) -> str:
+        forwarded_for = ctx.headers.get("x-forwarded-for")
+        if forwarded_for:
+            return forwarded_for.split(",")[0].strip()
+        real_ip = ctx.headers.get("x-real-ip")
+        if real_ip:
+            return real_ip
+        return ctx.client_host or "unknown"
+
+    async def before(self, ctx):
+        request_id = ctx.headers.get("X-Request-ID") or str(uuid.uuid4())
+        ctx.values["obs_request_id"] = request_id
+        ctx.state["request_id"] = request_id
+        url = URL(scope=ctx.scope)
+        observability.logger.info(
+            json.dumps(
+                {
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "level": "INFO",
+                    "event": "request_start",
+                    "request_id": request_id,
+                    "method": ctx.method,
+                    "url": str(url),
+                    "path": ctx.path,
+                    "query_params": dict(QueryParams(url.query)),
+                    "headers": {
+                        "user-agent": ctx.headers.get("user-agent"),
+                        "authorization": (
+                            "Bearer ***"
+                            if ctx.headers.get("authorization")
+                            else None
+                        ),
+                        "content-type": ctx.headers.get("content-type"),
+                        "x-forwarded-for": ctx.headers.get("x-forwarded-for"),
+                    },
+                    "client_ip": self._client_ip(ctx),
+                }
+            )
+        )
+        return None
+
+    def after(self, ctx, status, headers):
+        process_time = time.time() - ctx.started
+        request_id = ctx.values["obs_request_id"]
+        headers["X-Request-ID"] = request_id
+        headers["X-Process-Time"] = f"{process_time:.4f}"
+        observability.logger.info(
+            json.dumps(
+                {
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "level": "INFO",
+                    "event": "request_complete",
+                    "request_id": request_id,
+                    "method": ctx.method,
+                    "url": str(URL(scope=ctx.scope)),
+                    "status_code": status,
+                    "process_time_seconds": round(process_time, 4),
+                    "response_size": headers.get("content-length"),
+                }
+            )
+        )
+
+    def on_error(self, ctx, error):
+        observability.logger.error(
+            json.dumps(
+                {
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "level": "ERROR",
+                    "event": "request_error",
+                    "request_id": ctx.values["obs_request_id"],
+                    "method": ctx.method,
+                    "url": str(URL(scope=ctx.scope)),
+                    "error_type": type(error).__name__,
+                    "error_message": str(error),
+                    "process_time_seconds": round(time.time() - ctx.started, 4),
+                }
+            )
+        )
+
+
+class RequestContextStage(Stage):
+    """main.py request_middleware: correlation id bound to structlog context"""
+
+    async def before(self, ctx):
+        correlation_id = ctx.headers.get("X-Request-ID") or str(uuid.uuid4())
+        ctx.values["correlation_id"] = correlation_id
+        ctx.state["request_id"] = correlation_id
+        structlog.contextvars.bind_contextvars(request_id=correlation_id)
+        return None
+
+    def after(self, ctx, status, headers):
+        process_time = (time.time() - ctx.started) * 1000
+        headers["X-Request-ID"] = ctx.values["correlation_id"]
+        headers["X-Response-Time"] = f"{process_time:.2f}ms"
+
+    def finish(self, ctx):
+        # Clear context variables for the next request
+        structlog.contextvars.clear_contextvars()
+
+
+class MetricsTokenStage(Stage):
+    """main.py metrics_protection_middleware: token-guarded /metrics"""
+
+    def __init__(self, token: str):
+        self.token = token
+
+    async def before(self, ctx):
+        if ctx.path == "/metrics" and ctx.headers.get("X-Metrics-Token") != self.token:
+            return JSONResponse(status_code=403, content={"detail": "Forbidden"})
+        return None
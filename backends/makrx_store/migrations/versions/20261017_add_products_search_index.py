@@ -0,0 +1,55 @@
+"""add full-text search vector and trigram indexes to products
+
+Revision ID: add_products_search_index
+Revises: manual_add_stock_20250914
+Create Date: 2026-10-17 00:00:00
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "add_products_search_index"
+down_revision = "manual_add_stock_20250914"
+branch_labels = None
+depends_on = None
+
+# Must match PRODUCT_SEARCH_VECTOR_SQL in models/commerce.py
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(brand, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(sku, '')), 'A') || "
+    "setweight(jsonb_to_tsvector('english', coalesce(tags, '[]'::jsonb), "
+    "'[\"string\"]'), 'B') || "
+    "setweight(to_tsvector('english', "
+    "coalesce(attributes->>'material', '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(short_description, '')), 'C') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'D')"
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "ALTER TABLE store_products ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_store_products_search_vector "
+        "ON store_products USING GIN (search_vector)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_store_products_name_trgm "
+        "ON store_products USING GIN (name gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_store_products_brand_trgm "
+        "ON store_products USING GIN (brand gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_store_products_brand_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_store_products_name_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_store_products_search_vector")
+    op.execute("ALTER TABLE store_products DROP COLUMN IF EXISTS search_vector")
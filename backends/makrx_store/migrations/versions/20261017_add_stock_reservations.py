@@ -0,0 +1,96 @@
+"""add store_stock_reservations for cart and checkout stock holds
+
+Revision ID: add_stock_reservations
+Revises: add_products_search_index
+Create Date: 2026-10-17 00:00:00
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "add_stock_reservations"
+down_revision = "add_products_search_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "store_stock_reservations",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "product_id",
+            sa.Integer(),
+            sa.ForeignKey("store_products.id"),
+            nullable=False,
+        ),
+        sa.Column(
+            "cart_id",
+            sa.Integer(),
+            sa.ForeignKey("store_carts.id"),
+            nullable=True,
+        ),
+        sa.Column(
+            "order_id",
+            sa.Integer(),
+            sa.ForeignKey("store_orders.id"),
+            nullable=True,
+        ),
+        sa.Column("user_id", sa.String(length=255), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column(
+            "status",
+            sa.String(length=20),
+            nullable=False,
+            server_default="held",
+        ),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("NOW()"),
+        ),
+        sa.Column("released_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(
+        "ix_store_stock_reservations_product_id",
+        "store_stock_reservations",
+        ["product_id"],
+    )
+    op.create_index(
+        "ix_store_stock_reservations_cart_id",
+        "store_stock_reservations",
+        ["cart_id"],
+    )
+    op.create_index(
+        "ix_store_stock_reservations_order_id",
+        "store_stock_reservations",
+        ["order_id"],
+    )
+    op.create_index(
+        "ix_store_stock_reservations_sweep",
+        "store_stock_reservations",
+        ["status", "expires_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_store_stock_reservations_sweep",
+        table_name="store_stock_reservations",
+    )
+    op.drop_index(
+        "ix_store_stock_reservations_order_id",
+        table_name="store_stock_reservations",
+    )
+    op.drop_index(
+        "ix_store_stock_reservations_cart_id",
+        table_name="store_stock_reservations",
+    )
+    op.drop_index(
+        "ix_store_stock_reservations_product_id",
+        table_name="store_stock_reservations",
+    )
+    op.drop_table("store_stock_reservations")
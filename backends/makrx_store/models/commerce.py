@@ -14,13 +14,30 @@ from sqlalchemy import (
     ForeignKey,
     UniqueConstraint,
     Index,
+    Computed,
+    DDL,
+    event,
 )
-from sqlalchemy.dialects.postgresql import JSONB, UUID
-from sqlalchemy.orm import relationship, synonym
+from sqlalchemy.dialects.postgresql import JSONB, UUID, TSVECTOR
+from sqlalchemy.orm import relationship, synonym, deferred
 from sqlalchemy.sql import func
 from ..base import Base
 import uuid
 
+# Weighted full-text document for catalog search (see core/search.py).
+# Kept in sync with migration add_products_search_index.
+PRODUCT_SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(brand, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(sku, '')), 'A') || "
+    "setweight(jsonb_to_tsvector('english', coalesce(tags, '[]'::jsonb), "
+    "'[\"string\"]'), 'B') || "
+    "setweight(to_tsvector('english', "
+    "coalesce(attributes->>'material', '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(short_description, '')), 'C') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'D')"
+)
+
 
 class Brand(Base):
     __tablename__ = "store_brands"
@@ -118,6 +135,11 @@ class Product(Base):
     is_active = Column(Boolean, default=True)
     tags = Column(JSONB, default=[])
 
+    # Search (generated column; deferred so listings never load it)
+    search_vector = deferred(
+        Column(TSVECTOR, Computed(PRODUCT_SEARCH_VECTOR_SQL, persisted=True))
+    )
+
     # SEO
     seo_title = Column(String(255))
     seo_description = Column(String(500))
@@ -135,9 +157,36 @@ class Product(Base):
     __table_args__ = (
         Index("ix_store_products_status", "status"),
         Index("ix_store_products_status_category", "status", "category_id"),
+        Index(
+            "ix_store_products_search_vector",
+            "search_vector",
+            postgresql_using="gin",
+        ),
+        Index(
+            "ix_store_products_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_store_products_brand_trgm",
+            "brand",
+            postgresql_using="gin",
+            postgresql_ops={"brand": "gin_trgm_ops"},
+        ),
     )
 
 
+# Trigram indexes and similarity() need pg_trgm; create it with the table
+event.listen(
+    Product.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(
+        dialect="postgresql"
+    ),
+)
+
+
 class Tag(Base):
     __tablename__ = "store_tags"
 
@@ -249,6 +298,41 @@ class CartItem(Base):
     product = relationship("Product", back_populates="cart_items")
 
 
+class StockReservation(Base):
+    """Units taken out of a product's stock_quantity for a cart or an order
+
+    held: in a cart until expires_at, then returned by the sweeper
+    committed: sold with order_id; returned only if the order is cancelled
+    released: returned to stock
+    """
+
+    __tablename__ = "store_stock_reservations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(
+        Integer, ForeignKey("store_products.id"), nullable=False, index=True
+    )
+    cart_id = Column(
+        Integer, ForeignKey("store_carts.id"), nullable=True, index=True
+    )
+    order_id = Column(
+        Integer, ForeignKey("store_orders.id"), nullable=True, index=True
+    )
+    user_id = Column(String(255), nullable=False)
+
+    quantity = Column(Integer, nullable=False)
+    status = Column(String(20), nullable=False, default="held")
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    released_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_store_stock_reservations_sweep", "status", "expires_at"),
+    )
+
+
 class Order(Base):
     __tablename__ = "store_orders"
 
@@ -291,6 +375,7 @@ class Order(Base):
     items = relationship(
         "OrderItem", back_populates="order", cascade="all, delete-orphan"
     )
+    service_orders = relationship("ServiceOrder", back_populates="order")
 
 
 class OrderItem(Base):
@@ -14,6 +14,7 @@ from datetime import datetime, timedelta
 from uuid import uuid4
 
 from ..database import get_db
+from ..core.bom_matching import CandidateMatch, bom_matcher
 from ..core.security import get_current_user
 from ..models.commerce import Product, Cart, CartItem
 from ..models.subscriptions import BOMIntegration
@@ -140,16 +141,13 @@ async def import_bom_from_makrcave(
         db.refresh(integration)
 
         # Map BOM items to store products
-        mapping_results = []
         mapped_count = 0
         unmapped_count = 0
         estimated_total = 0.0
         warnings = []
 
-        for bom_item in bom_data.items:
-            result = await map_bom_item_to_products(db, bom_item)
-            mapping_results.append(result)
-
+        mapping_results = await map_bom_items_to_products(db, bom_data.items)
+        for bom_item, result in zip(bom_data.items, mapping_results):
             if result.best_match:
                 mapped_count += 1
                 estimated_total += (
@@ -384,14 +382,11 @@ async def preview_bom_import(
             raise HTTPException(status_code=404, detail="BOM not found")
 
         # Map items to get preview
-        preview_results = []
+        preview_results = await map_bom_items_to_products(db, bom_data.items)
         total_estimated_cost = 0.0
         mappable_items = 0
 
-        for bom_item in bom_data.items:
-            result = await map_bom_item_to_products(db, bom_item)
-            preview_results.append(result)
-
+        for bom_item, result in zip(bom_data.items, preview_results):
             if result.best_match:
                 mappable_items += 1
                 total_estimated_cost += (
@@ -627,7 +622,47 @@ async def map_bom_item_to_products(
     # Sort matches by confidence
     matches.sort(key=lambda x: x.confidence, reverse=True)
 
-    # Determine best match and status
+    return build_mapping_result(bom_item, matches)
+
+
+async def map_bom_items_to_products(
+    db: AsyncSession, bom_items: List[BOMItem]
+) -> List[BOMMappingResult]:
+    """
+    Map a whole BOM in one pass.
+
+    Exact part numbers/SKUs are resolved with a single query; everything else
+    is matched against the shared in-memory catalog index, so the number of
+    queries does not grow with the BOM.
+    """
+    candidates = await bom_matcher.match_items(
+        db,
+        [(item.name, item.manufacturer, item.part_number) for item in bom_items],
+    )
+    return [
+        build_mapping_result(item, [_product_match(c) for c in matches])
+        for item, matches in zip(bom_items, candidates)
+    ]
+
+
+def _product_match(candidate: CandidateMatch) -> ProductMatch:
+    entry = candidate.entry
+    return ProductMatch(
+        confidence=candidate.confidence,
+        match_type=candidate.match_type,
+        store_product_id=entry.id,
+        store_product_name=entry.name,
+        store_product_brand=entry.brand,
+        store_product_price=entry.price,
+        quantity_available=entry.stock_qty,
+        match_reasons=[candidate.reason],
+    )
+
+
+def build_mapping_result(
+    bom_item: BOMItem, matches: List[ProductMatch]
+) -> BOMMappingResult:
+    """Pick the best match (preferring in-stock) and derive the item status"""
     best_match = None
     status = "unmapped"
 
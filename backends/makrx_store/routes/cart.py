@@ -12,6 +12,11 @@ from typing import Optional
 from ..database import get_db
 from ..models.commerce import Cart, CartItem, Product
 from ..core.security import require_auth, AuthUser
+from ..core.stock_reservations import (
+    InsufficientStock,
+    release_cart_reservations,
+    reserve_stock,
+)
 
 router = APIRouter()
 
@@ -38,8 +43,10 @@ async def add_to_cart(
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    if not product.in_stock:
-        raise HTTPException(status_code=400, detail="Product is out of stock")
+    if request.quantity <= 0:
+        raise HTTPException(
+            status_code=400, detail="Quantity must be greater than 0"
+        )
 
     # Get or create cart for user
     cart_query = select(Cart).where(
@@ -74,6 +81,19 @@ async def add_to_cart(
         )
         db.add(cart_item)
 
+    # Last write before commit, so the product row stays locked briefly
+    await db.flush()
+    try:
+        await reserve_stock(
+            db, product.id, request.quantity, user_id, cart_id=cart.id
+        )
+    except InsufficientStock as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail=f"Only {e.available} left in stock",
+        )
+
     await db.commit()
 
     return {
@@ -188,6 +208,9 @@ async def remove_cart_item(
         raise HTTPException(status_code=404, detail="Cart item not found")
 
     await db.delete(cart_item)
+    await release_cart_reservations(
+        db, cart_item.cart_id, product_id=cart_item.product_id
+    )
     await db.commit()
 
     return {"message": "Item removed from cart successfully", "success": True}
@@ -229,7 +252,26 @@ async def update_cart_item(
     if not cart_item:
         raise HTTPException(status_code=404, detail="Cart item not found")
 
+    # Swap the held stock for the new quantity in one transaction
     cart_item.quantity = request.quantity
+    await db.flush()
+    await release_cart_reservations(
+        db, cart_item.cart_id, product_id=cart_item.product_id
+    )
+    try:
+        await reserve_stock(
+            db,
+            cart_item.product_id,
+            request.quantity,
+            user_id,
+            cart_id=cart_item.cart_id,
+        )
+    except InsufficientStock as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail=f"Only {e.available} left in stock",
+        )
     await db.commit()
 
     return {
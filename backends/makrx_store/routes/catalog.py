@@ -5,11 +5,18 @@ Product catalog routes
 from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from sqlalchemy import select, func, and_, or_
+from sqlalchemy import select, and_
 from typing import List, Optional
 
 from ..database import get_db
 from ..models.commerce import Product, Category
+from ..core.search import build_search_clause, dialect_name
+from ..core.pagination import (
+    InvalidCursor,
+    count_rows,
+    fetch_keyset_page,
+    order_by_clauses,
+)
 from ..schemas.commerce import ProductOut, ProductListOut
 
 router = APIRouter()
@@ -61,57 +68,105 @@ def _serialize_product(product: Product) -> dict:
     }
 
 
+async def _paginate_products(
+    db: AsyncSession,
+    base,
+    order_keys,
+    ordering: str,
+    skip: int,
+    limit: int,
+    pagination: str,
+    cursor: Optional[str],
+    total_mode: Optional[str],
+) -> dict:
+    """
+    Page through `base` with offset or keyset pagination.
+
+    Offset mode keeps the legacy skip/page response; keyset mode returns an
+    opaque next_cursor and counts only when asked (exact or estimated).
+    """
+    use_cursor = pagination == "cursor" or cursor is not None
+    total_mode = total_mode or ("none" if use_cursor else "exact")
+    next_cursor = None
+
+    if use_cursor:
+        try:
+            keyset_page = await fetch_keyset_page(
+                db, base, order_keys, ordering, cursor, limit
+            )
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        items = keyset_page.items
+        next_cursor = keyset_page.next_cursor
+    else:
+        ordered = base.order_by(*order_by_clauses(order_keys))
+        result = await db.execute(ordered.offset(skip).limit(limit))
+        items = result.scalars().all()
+
+    total, is_estimate = await count_rows(db, base, total_mode)
+    pages = (
+        max(1, (total + limit - 1) // limit) if total is not None else None
+    )
+
+    return {
+        "products": [_serialize_product(p) for p in items],
+        "total": total,
+        "page": None if use_cursor else (skip // limit) + 1,
+        "per_page": limit,
+        "pages": pages,
+        "next_cursor": next_cursor,
+        "total_is_estimate": is_estimate,
+    }
+
+
 @router.get("/api/products", response_model=ProductListOut)
 async def get_products(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     category_id: Optional[int] = Query(None),
     search: Optional[str] = Query(None),
+    pagination: str = Query("offset", pattern="^(offset|cursor)$"),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from a previous page (keyset mode)"
+    ),
+    total: Optional[str] = Query(
+        None,
+        pattern="^(exact|estimate|none)$",
+        description="Total count mode; defaults to exact (offset) or none (cursor)",
+    ),
     db: AsyncSession = Depends(get_db),
 ):
     """Get products with pagination and filtering"""
+    conditions = [Product.status == "active"]
+    if category_id:
+        conditions.append(Product.category_id == category_id)
+    search_clause = build_search_clause(search, dialect_name(db))
+    if search_clause is not None:
+        conditions.append(search_clause.condition)
+
     base = (
         select(Product)
         .options(selectinload(Product.category))
-        .where(Product.status == "active")
-    )
-    if category_id:
-        base = base.where(Product.category_id == category_id)
-    if search:
-        like = f"%{search}%"
-        base = base.where(
-            or_(Product.name.ilike(like), Product.description.ilike(like))
-        )
-
-    # Count total
-    count_stmt = (
-        select(func.count(Product.id))
-        .select_from(Product)
-        .where(Product.status == "active")
+        .where(*conditions)
     )
-    if category_id:
-        count_stmt = count_stmt.where(Product.category_id == category_id)
-    if search:
-        like = f"%{search}%"
-        count_stmt = count_stmt.where(
-            or_(Product.name.ilike(like), Product.description.ilike(like))
-        )
-    total = (await db.execute(count_stmt)).scalar_one()
-
-    # Fetch page
-    page = (skip // limit) + 1 if limit else 1
-    per_page = limit
-    pages = max(1, (total + per_page - 1) // per_page)
-    result = await db.execute(base.offset(skip).limit(limit))
-    items = result.scalars().all()
+    if search_clause is not None:
+        order_keys = [(search_clause.rank, True), (Product.id, False)]
+        ordering = "relevance"
+    else:
+        order_keys = [(Product.id, False)]
+        ordering = "id"
 
-    return {
-        "products": [_serialize_product(p) for p in items],
-        "total": total,
-        "page": page,
-        "per_page": per_page,
-        "pages": pages,
-    }
+    return await _paginate_products(
+        db,
+        base,
+        order_keys,
+        ordering,
+        skip,
+        limit,
+        pagination,
+        cursor,
+        total,
+    )
 
 
 @router.get("/api/products/{product_id}", response_model=ProductOut)
@@ -180,6 +235,9 @@ async def get_category_products(
     category_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    pagination: str = Query("offset", pattern="^(offset|cursor)$"),
+    cursor: Optional[str] = Query(None),
+    total: Optional[str] = Query(None, pattern="^(exact|estimate|none)$"),
     db: AsyncSession = Depends(get_db),
 ):
     """Get products for a specific category"""
@@ -197,24 +255,22 @@ async def get_category_products(
             "category": None,
         }
 
-    # Count total
-    count_stmt = select(func.count(Product.id)).where(
-        Product.category_id == category_id, Product.status == "active"
-    )
-    total = (await db.execute(count_stmt)).scalar_one()
-
-    # Get products in category
-    products_query = (
+    base = (
         select(Product)
+        .options(selectinload(Product.category))
         .where(Product.category_id == category_id, Product.status == "active")
-        .offset(skip)
-        .limit(limit)
     )
-    products_result = await db.execute(products_query)
-    products = products_result.scalars().all()
-    page = (skip // limit) + 1 if limit else 1
-    per_page = limit
-    pages = max(1, (total + per_page - 1) // per_page)
+    listing = await _paginate_products(
+        db,
+        base,
+        [(Product.id, False)],
+        "id",
+        skip,
+        limit,
+        pagination,
+        cursor,
+        total,
+    )
 
     return {
         "category": {
@@ -223,9 +279,5 @@ async def get_category_products(
             "slug": category.slug,
             "description": category.description,
         },
-        "products": [_serialize_product(p) for p in products],
-        "total": total,
-        "page": page,
-        "per_page": per_page,
-        "pages": pages,
+        **listing,
     }
@@ -13,7 +13,7 @@ from fastapi import (
 )
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_, func
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import logging
 import json
 from datetime import datetime, timedelta
@@ -22,8 +22,17 @@ from ..database import get_db
 from ..models.commerce import Product, Category, Order, OrderItem
 from ..models.subscriptions import QuickReorder, BOMIntegration
 from ..models.reviews import Review, ProductRatingSummary
+from ..crud.product_loaders import product_enrichment_loader
+from ..core.search import build_search_clause, dialect_name
+from ..core.facets import facet_cache, normalize_facet_key
+from ..core.pagination import (
+    InvalidCursor,
+    count_rows,
+    fetch_keyset_page,
+    order_by_clauses,
+)
 from pydantic import BaseModel, Field
-from ..core.security import get_current_user_optional, AuthUser
+from ..core.security import get_current_user_optional, AuthUser, require_admin
 
 logger = logging.getLogger(__name__)
 
@@ -69,6 +78,15 @@ class AdvancedSearchRequest(BaseModel):
     )
     page: int = Field(1, ge=1)
     per_page: int = Field(20, ge=1, le=100)
+    pagination: str = Field("offset", pattern="^(offset|cursor)$")
+    cursor: Optional[str] = Field(
+        None, description="next_cursor from a previous page (keyset mode)"
+    )
+    total: Optional[str] = Field(
+        None,
+        pattern="^(exact|estimate|none)$",
+        description="Total count mode; defaults to exact (offset) or none (cursor)",
+    )
     include_suggestions: bool = Field(
         True, description="Include search suggestions"
     )
@@ -83,10 +101,12 @@ class SearchFacet(BaseModel):
 
 class AdvancedSearchResponse(BaseModel):
     products: List[Dict[str, Any]]
-    total_count: int
-    page: int
+    total_count: Optional[int]
+    page: Optional[int]
     per_page: int
-    total_pages: int
+    total_pages: Optional[int]
+    next_cursor: Optional[str] = None
+    total_is_estimate: bool = False
     search_time_ms: float
     suggestions: Optional[List[str]] = None
     facets: Optional[List[SearchFacet]] = None
@@ -118,149 +138,30 @@ async def advanced_product_search(
         # Build base query
         base_stmt = select(Product).where(Product.is_active == True)
 
-        # Apply text search
-        if request.query:
-            search_terms = request.query.strip().split()
-            search_conditions = []
-
-            for term in search_terms:
-                term_condition = or_(
-                    Product.name.ilike(f"%{term}%"),
-                    Product.description.ilike(f"%{term}%"),
-                    Product.short_description.ilike(f"%{term}%"),
-                    Product.brand.ilike(f"%{term}%"),
-                    Product.tags.op("@>")([term.lower()]),  # JSONB contains
-                    Product.attributes.op("@>")({f"material": term.lower()}),
-                )
-                search_conditions.append(term_condition)
-
-            if search_conditions:
-                base_stmt = base_stmt.where(and_(*search_conditions))
+        # Apply ranked full-text search
+        search = build_search_clause(request.query, dialect_name(db))
+        if search is not None:
+            base_stmt = base_stmt.where(search.condition)
 
         # Apply filters
-        if request.filters:
-            filters = request.filters
-
-            # Basic filters
-            if filters.category_ids:
-                base_stmt = base_stmt.where(
-                    Product.category_id.in_(filters.category_ids)
-                )
-
-            if filters.brands:
-                base_stmt = base_stmt.where(Product.brand.in_(filters.brands))
-
-            if filters.price_min is not None:
-                base_stmt = base_stmt.where(
-                    func.coalesce(Product.sale_price, Product.price)
-                    >= filters.price_min
-                )
-
-            if filters.price_max is not None:
-                base_stmt = base_stmt.where(
-                    func.coalesce(Product.sale_price, Product.price)
-                    <= filters.price_max
-                )
-
-            if filters.in_stock is not None:
-                if filters.in_stock:
-                    base_stmt = base_stmt.where(Product.stock_qty > 0)
-                else:
-                    base_stmt = base_stmt.where(Product.stock_qty <= 0)
-
-            if filters.is_featured is not None:
-                base_stmt = base_stmt.where(
-                    Product.is_featured == filters.is_featured
-                )
-
-            # Maker-specific filters
-            if filters.material_types:
-                material_conditions = [
-                    Product.attributes["material"].astext.ilike(
-                        f"%{material}%"
-                    )
-                    for material in filters.material_types
-                ]
-                base_stmt = base_stmt.where(or_(*material_conditions))
-
-            if filters.printer_compatibility:
-                compat_conditions = [
-                    Product.compatibility.op("@>")([printer])
-                    for printer in filters.printer_compatibility
-                ]
-                base_stmt = base_stmt.where(or_(*compat_conditions))
-
-            if filters.diameter:
-                diameter_conditions = [
-                    Product.attributes["diameter"].astext == diameter
-                    for diameter in filters.diameter
-                ]
-                base_stmt = base_stmt.where(or_(*diameter_conditions))
-
-            # Advanced filters
-            if filters.new_arrivals_days:
-                cutoff_date = datetime.now() - timedelta(
-                    days=filters.new_arrivals_days
-                )
-                base_stmt = base_stmt.where(Product.created_at >= cutoff_date)
-
-            if filters.sale_items_only:
-                base_stmt = base_stmt.where(Product.sale_price.is_not(None))
-
-            if filters.rating_min:
-                # Join with rating summary
-                base_stmt = base_stmt.join(
-                    ProductRatingSummary,
-                    Product.id == ProductRatingSummary.product_id,
-                )
-                base_stmt = base_stmt.where(
-                    ProductRatingSummary.average_rating >= filters.rating_min
-                )
-
-            if filters.has_reviews:
-                review_subquery = (
-                    select(Review.target_id)
-                    .where(
-                        and_(
-                            Review.target_type == "product",
-                            Review.status == "published",
-                        )
-                    )
-                    .distinct()
-                )
-
-                if filters.has_reviews:
-                    base_stmt = base_stmt.where(
-                        Product.id.in_(review_subquery)
-                    )
-                else:
-                    base_stmt = base_stmt.where(
-                        ~Product.id.in_(review_subquery)
-                    )
+        base_stmt = base_stmt.where(*build_filter_conditions(request.filters))
 
-        # Get total count before pagination
-        count_stmt = select(func.count()).select_from(base_stmt.subquery())
-        total_count = (await db.execute(count_stmt)).scalar_one()
-
-        # Apply sorting
+        # Resolve ordering as (expression, descending) keys with an id tiebreak
+        effective_price = func.coalesce(Product.sale_price, Product.price)
         if request.sort_by == "price_asc":
-            base_stmt = base_stmt.order_by(
-                func.coalesce(Product.sale_price, Product.price).asc()
-            )
+            order_keys = [(effective_price, False)]
         elif request.sort_by == "price_desc":
-            base_stmt = base_stmt.order_by(
-                func.coalesce(Product.sale_price, Product.price).desc()
-            )
+            order_keys = [(effective_price, True)]
         elif request.sort_by == "newest":
-            base_stmt = base_stmt.order_by(Product.created_at.desc())
+            order_keys = [(Product.created_at, True)]
         elif request.sort_by == "rating":
             base_stmt = base_stmt.outerjoin(
                 ProductRatingSummary,
                 Product.id == ProductRatingSummary.product_id,
             )
-            base_stmt = base_stmt.order_by(
-                ProductRatingSummary.average_rating.desc().nullslast()
-            )
+            order_keys = [
+                (func.coalesce(ProductRatingSummary.average_rating, 0), True)
+            ]
         elif request.sort_by == "popularity":
             # Order by total orders (simplified)
             popularity_subquery = (
@@ -275,18 +176,57 @@ async def advanced_product_search(
                 popularity_subquery,
                 Product.id == popularity_subquery.c.product_id,
             )
-            base_stmt = base_stmt.order_by(
-                popularity_subquery.c.total_orders.desc().nullslast()
-            )
-        else:  # relevance (default)
-            base_stmt = base_stmt.order_by(
-                Product.is_featured.desc(), Product.created_at.desc()
+            order_keys = [
+                (func.coalesce(popularity_subquery.c.total_orders, 0), True)
+            ]
+        elif search is not None:  # relevance (default) with a query
+            order_keys = [
+                (search.rank, True),
+                (Product.is_featured, True),
+                (Product.created_at, True),
+            ]
+        else:  # relevance without a query
+            order_keys = [
+                (Product.is_featured, True),
+                (Product.created_at, True),
+            ]
+        order_keys.append((Product.id, False))
+        ordering = f"{request.sort_by}:{bool(search)}"
+
+        use_cursor = request.pagination == "cursor" or request.cursor is not None
+        total_mode = request.total or ("none" if use_cursor else "exact")
+
+        if use_cursor:
+            try:
+                keyset_page = await fetch_keyset_page(
+                    db,
+                    base_stmt,
+                    order_keys,
+                    ordering,
+                    request.cursor,
+                    request.per_page,
+                )
+            except InvalidCursor as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            products = keyset_page.items
+            next_cursor = keyset_page.next_cursor
+        else:
+            offset = (request.page - 1) * request.per_page
+            products_query = (
+                base_stmt.order_by(*order_by_clauses(order_keys))
+                .offset(offset)
+                .limit(request.per_page)
             )
+            products = (await db.execute(products_query)).scalars().all()
+            next_cursor = None
 
-        # Apply pagination
-        offset = (request.page - 1) * request.per_page
-        products_query = base_stmt.offset(offset).limit(request.per_page)
-        products = (await db.execute(products_query)).scalars().all()
+        # Count matches (exact, planner estimate, or skipped)
+        total_count, total_is_estimate = await count_rows(
+            db, base_stmt, total_mode
+        )
+
+        # Batch-load per-product enrichment for the whole page
+        enrichment = await product_enrichment_loader.load(db, products)
 
         # Convert to dict format with additional data
         product_list = []
@@ -319,18 +259,8 @@ async def advanced_product_search(
                 ),
             }
 
-            # Add rating data if available
-            rating_stmt = select(ProductRatingSummary).where(
-                ProductRatingSummary.product_id == product.id
-            )
-            rating_summary = (await db.execute(rating_stmt)).scalars().first()
-
-            if rating_summary:
-                product_dict["rating"] = {
-                    "average": float(rating_summary.average_rating),
-                    "count": rating_summary.total_reviews,
-                    "verified_count": rating_summary.verified_reviews,
-                }
+            # Add rating data (and other enrichment) loaded for the page
+            product_dict.update(enrichment.get(product.id, {}))
 
             product_list.append(product_dict)
 
@@ -341,10 +271,15 @@ async def advanced_product_search(
         response = AdvancedSearchResponse(
             products=product_list,
             total_count=total_count,
-            page=request.page,
+            page=None if use_cursor else request.page,
             per_page=request.per_page,
-            total_pages=(total_count + request.per_page - 1)
-            // request.per_page,
+            total_pages=(
+                (total_count + request.per_page - 1) // request.per_page
+                if total_count is not None
+                else None
+            ),
+            next_cursor=next_cursor,
+            total_is_estimate=total_is_estimate,
             search_time_ms=round(search_time, 2),
         )
 
@@ -358,16 +293,26 @@ async def advanced_product_search(
 
         # Add facets if requested
         if request.include_facets:
-            facets = await build_search_facets(db, request.filters)
+            facets = await build_search_facets(
+                db, request.filters, request.query
+            )
             response.facets = facets
 
         return response
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Advanced search error: {e}")
         raise HTTPException(status_code=500, detail="Search failed")
 
 
+@router.get("/search/facets/cache-stats")
+async def get_facet_cache_stats(admin: AuthUser = Depends(require_admin)):
+    """Facet cache hit/miss counters for tuning TTL and size"""
+    return facet_cache.stats()
+
+
 @router.get("/recommendations", response_model=List[Dict[str, Any]])
 async def get_product_recommendations(
     request: ProductRecommendationRequest = Depends(),
@@ -678,19 +623,149 @@ async def get_search_suggestions(
     return suggestions[:limit]
 
 
+def build_filter_conditions(
+    filters: Optional[AdvancedProductFilter], exclude: Tuple[str, ...] = ()
+) -> List[Any]:
+    """
+    Translate search filters into WHERE conditions on Product.
+
+    Dimensions named in `exclude` ("category", "brand", "price") are skipped so
+    facet counts for a dimension are not narrowed by its own selection.
+    """
+    if not filters:
+        return []
+
+    conditions = []
+
+    # Basic filters
+    if filters.category_ids and "category" not in exclude:
+        conditions.append(Product.category_id.in_(filters.category_ids))
+
+    if filters.brands and "brand" not in exclude:
+        conditions.append(Product.brand.in_(filters.brands))
+
+    if "price" not in exclude:
+        effective_price = func.coalesce(Product.sale_price, Product.price)
+        if filters.price_min is not None:
+            conditions.append(effective_price >= filters.price_min)
+        if filters.price_max is not None:
+            conditions.append(effective_price <= filters.price_max)
+
+    if filters.in_stock is not None:
+        if filters.in_stock:
+            conditions.append(Product.stock_qty > 0)
+        else:
+            conditions.append(Product.stock_qty <= 0)
+
+    if filters.is_featured is not None:
+        conditions.append(Product.is_featured == filters.is_featured)
+
+    # Maker-specific filters
+    if filters.material_types:
+        conditions.append(
+            or_(
+                *[
+                    Product.attributes["material"].astext.ilike(
+                        f"%{material}%"
+                    )
+                    for material in filters.material_types
+                ]
+            )
+        )
+
+    if filters.printer_compatibility:
+        conditions.append(
+            or_(
+                *[
+                    Product.compatibility.op("@>")([printer])
+                    for printer in filters.printer_compatibility
+                ]
+            )
+        )
+
+    if filters.diameter:
+        conditions.append(
+            or_(
+                *[
+                    Product.attributes["diameter"].astext == diameter
+                    for diameter in filters.diameter
+                ]
+            )
+        )
+
+    # Advanced filters
+    if filters.new_arrivals_days:
+        cutoff_date = datetime.now() - timedelta(
+            days=filters.new_arrivals_days
+        )
+        conditions.append(Product.created_at >= cutoff_date)
+
+    if filters.sale_items_only:
+        conditions.append(Product.sale_price.is_not(None))
+
+    if filters.rating_min:
+        conditions.append(
+            Product.id.in_(
+                select(ProductRatingSummary.product_id).where(
+                    ProductRatingSummary.average_rating >= filters.rating_min
+                )
+            )
+        )
+
+    if filters.has_reviews is not None:
+        review_subquery = (
+            select(Review.target_id)
+            .where(
+                and_(
+                    Review.target_type == "product",
+                    Review.status == "published",
+                )
+            )
+            .distinct()
+        )
+        if filters.has_reviews:
+            conditions.append(Product.id.in_(review_subquery))
+        else:
+            conditions.append(~Product.id.in_(review_subquery))
+
+    return conditions
+
+
 async def build_search_facets(
-    db: AsyncSession, filters: Optional[AdvancedProductFilter]
+    db: AsyncSession,
+    filters: Optional[AdvancedProductFilter],
+    query: Optional[str] = None,
+) -> List[SearchFacet]:
+    """Build facets for the active query and filters (cached)"""
+    key = normalize_facet_key(query, filters)
+    return await facet_cache.get_or_build(
+        key, lambda: _compute_search_facets(db, filters, query)
+    )
+
+
+async def _compute_search_facets(
+    db: AsyncSession,
+    filters: Optional[AdvancedProductFilter],
+    query: Optional[str],
 ) -> List[SearchFacet]:
-    """Build facets for search filtering"""
+    """Run the facet aggregates; each facet ignores its own filter"""
     facets = []
 
+    base_conditions = [Product.is_active == True]
+    search = build_search_clause(query, dialect_name(db))
+    if search is not None:
+        base_conditions.append(search.condition)
+
     # Category facet
     cats_stmt = (
         select(
             Category.id, Category.name, func.count(Product.id).label("count")
         )
         .join(Product, Category.id == Product.category_id)
-        .where(Product.is_active == True)
+        .where(
+            *base_conditions,
+            *build_filter_conditions(filters, exclude=("category",)),
+        )
         .group_by(Category.id, Category.name)
     )
     categories = (await db.execute(cats_stmt)).all()
@@ -709,7 +784,11 @@ async def build_search_facets(
     # Brand facet
     brands_stmt = (
         select(Product.brand, func.count(Product.id).label("count"))
-        .where(and_(Product.is_active == True, Product.brand.is_not(None)))
+        .where(
+            *base_conditions,
+            Product.brand.is_not(None),
+            *build_filter_conditions(filters, exclude=("brand",)),
+        )
         .group_by(Product.brand)
     )
     brands = (await db.execute(brands_stmt)).all()
@@ -730,7 +809,10 @@ async def build_search_facets(
         func.max(func.coalesce(Product.sale_price, Product.price)).label(
             "max_price"
         ),
-    ).where(Product.is_active == True)
+    ).where(
+        *base_conditions,
+        *build_filter_conditions(filters, exclude=("price",)),
+    )
     price_stats = (await db.execute(price_stats_stmt)).first()
 
     if price_stats.min_price and price_stats.max_price:
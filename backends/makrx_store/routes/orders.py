@@ -14,6 +14,12 @@ from datetime import datetime
 from ..database import get_db
 from ..models.commerce import Order, OrderItem, Product, Cart, CartItem
 from ..core.security import require_auth, AuthUser
+from ..core.stock_reservations import (
+    InsufficientStock,
+    commit_cart_reservations,
+    release_order_reservations,
+    reserve_stock,
+)
 
 router = APIRouter()
 
@@ -230,6 +236,31 @@ async def checkout(
 
         # Clear cart (mark as converted)
         cart.status = "converted"
+        await db.flush()
+
+        # Stock last, so hot product rows stay locked only until the commit.
+        # Units the cart still holds move to the order up to what it lists,
+        # any surplus is released; anything the cart never held or the
+        # sweeper already returned is taken now.
+        needed = {}
+        for cart_item in cart.items:
+            needed[cart_item.product_id] = (
+                needed.get(cart_item.product_id, 0) + cart_item.quantity
+            )
+        committed = await commit_cart_reservations(
+            db, cart.id, new_order.id, needed
+        )
+        for product_id in sorted(needed):
+            shortfall = needed[product_id] - committed.get(product_id, 0)
+            if shortfall > 0:
+                await reserve_stock(
+                    db,
+                    product_id,
+                    shortfall,
+                    user_id,
+                    cart_id=cart.id,
+                    order_id=new_order.id,
+                )
 
         await db.commit()
 
@@ -242,6 +273,20 @@ async def checkout(
             payment_required=True,
         )
 
+    except HTTPException:
+        await db.rollback()
+        raise
+    except InsufficientStock as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "Not enough stock for this order",
+                "product_id": e.product_id,
+                "requested": e.requested,
+                "available": e.available,
+            },
+        )
     except Exception as e:
         await db.rollback()
         raise HTTPException(
@@ -268,6 +313,8 @@ async def update_order_status(
         new_status = status_data.get("status")
         new_payment_status = status_data.get("payment_status")
 
+        if new_status == "cancelled" and order.status != "cancelled":
+            await release_order_reservations(db, order.id)
         if new_status:
             order.status = new_status
         if new_payment_status:
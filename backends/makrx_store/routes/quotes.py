@@ -91,6 +91,33 @@ class QuoteResponse(BaseModel):
     file_analysis: FileAnalysis
 
 
+class QuoteMatrixRequest(BaseModel):
+    upload_id: str = Field(..., description="File upload ID")
+    materials: List[str] = Field(..., min_length=1, max_length=20)
+    qualities: List[str] = Field(..., min_length=1, max_length=10)
+    quantities: List[int] = Field(
+        ..., min_length=1, max_length=20, description="Quantity tiers"
+    )
+    infill_percentage: int = Field(
+        20, ge=0, le=100, description="Infill percentage"
+    )
+    layer_height: float = Field(
+        0.2, ge=0.1, le=0.4, description="Layer height in mm"
+    )
+    supports: bool = Field(False, description="Enable supports")
+    brim: bool = Field(False, description="Enable brim")
+    rush_order: bool = Field(False, description="Rush order (faster delivery)")
+    delivery_address: Optional[Dict[str, Any]] = None
+    pickup_location: Optional[str] = None
+
+
+class QuoteMatrixResponse(BaseModel):
+    upload_id: str
+    volume_mm3: float
+    currency: str = "INR"
+    quotes: List[Dict[str, Any]]
+
+
 # Material database
 MATERIALS = {
     "PLA": MaterialProperties(
@@ -180,6 +207,16 @@ class QuoteCalculator:
         file_analysis: FileAnalysis, settings: PrintSettings
     ) -> Dict[str, float]:
         """Calculate material costs including waste"""
+        return QuoteCalculator.scale_material_cost(
+            QuoteCalculator.calculate_piece_material(file_analysis, settings),
+            settings.quantity,
+        )
+
+    @staticmethod
+    def calculate_piece_material(
+        file_analysis: FileAnalysis, settings: PrintSettings
+    ) -> Dict[str, float]:
+        """Material for one piece; independent of quality and quantity"""
         material_props = MATERIALS.get(settings.material)
         if not material_props:
             raise ValueError(f"Unknown material: {settings.material}")
@@ -211,16 +248,30 @@ class QuoteCalculator:
         # Convert to mass
         total_mass_g = total_volume_mm3 * material_props.density_g_cm3 / 1000
 
+        return {
+            "total_mass_g": total_mass_g,
+            "solid_volume_mm3": solid_volume_mm3,
+            "support_volume_mm3": support_volume_mm3,
+            "brim_volume_mm3": brim_volume_mm3,
+            "total_volume_mm3": total_volume_mm3,
+            "cost_per_g": material_props.cost_per_kg / 1000,
+        }
+
+    @staticmethod
+    def scale_material_cost(
+        piece: Dict[str, float], quantity: int
+    ) -> Dict[str, float]:
+        """Material breakdown for `quantity` copies of one piece"""
         # Calculate cost
-        cost_per_g = material_props.cost_per_kg / 1000
-        material_cost = total_mass_g * cost_per_g * settings.quantity
+        cost_per_g = piece["cost_per_g"]
+        material_cost = piece["total_mass_g"] * cost_per_g * quantity
 
         return {
-            "total_mass_g": total_mass_g * settings.quantity,
-            "solid_volume_mm3": solid_volume_mm3 * settings.quantity,
-            "support_volume_mm3": support_volume_mm3 * settings.quantity,
-            "brim_volume_mm3": brim_volume_mm3 * settings.quantity,
-            "waste_volume_mm3": total_volume_mm3 * 0.1 * settings.quantity,
+            "total_mass_g": piece["total_mass_g"] * quantity,
+            "solid_volume_mm3": piece["solid_volume_mm3"] * quantity,
+            "support_volume_mm3": piece["support_volume_mm3"] * quantity,
+            "brim_volume_mm3": piece["brim_volume_mm3"] * quantity,
+            "waste_volume_mm3": piece["total_volume_mm3"] * 0.1 * quantity,
             "material_cost": material_cost,
             "cost_per_g": cost_per_g,
         }
@@ -230,6 +281,16 @@ class QuoteCalculator:
         file_analysis: FileAnalysis, settings: PrintSettings
     ) -> Dict[str, float]:
         """Calculate printing time with quality and complexity adjustments"""
+        return QuoteCalculator.scale_print_time(
+            QuoteCalculator.calculate_piece_time(file_analysis, settings),
+            settings.quantity,
+        )
+
+    @staticmethod
+    def calculate_piece_time(
+        file_analysis: FileAnalysis, settings: PrintSettings
+    ) -> Dict[str, float]:
+        """Print time for one piece; independent of quantity"""
         base_time_hours = file_analysis.estimated_print_time_hours
 
         # Quality adjustment
@@ -268,13 +329,9 @@ class QuoteCalculator:
             / speed_multiplier
         )
 
-        # Total time for all quantities
-        total_time_hours = adjusted_time_hours * settings.quantity
-
         return {
             "base_time_hours": base_time_hours,
             "adjusted_time_per_piece": adjusted_time_hours,
-            "total_time_hours": total_time_hours,
             "adjustments": {
                 "layer_height": layer_adjustment,
                 "infill": infill_adjustment,
@@ -285,6 +342,21 @@ class QuoteCalculator:
             },
         }
 
+    @staticmethod
+    def scale_print_time(
+        piece: Dict[str, Any], quantity: int
+    ) -> Dict[str, Any]:
+        """Time breakdown for `quantity` copies of one piece"""
+        # Total time for all quantities
+        total_time_hours = piece["adjusted_time_per_piece"] * quantity
+
+        return {
+            "base_time_hours": piece["base_time_hours"],
+            "adjusted_time_per_piece": piece["adjusted_time_per_piece"],
+            "total_time_hours": total_time_hours,
+            "adjustments": piece["adjustments"],
+        }
+
     @staticmethod
     def calculate_labor_cost(
         time_info: Dict[str, float], settings: PrintSettings
@@ -376,6 +448,104 @@ class QuoteCalculator:
             "estimated_days": 2 if city in ["bangalore", "bengaluru"] else 4,
         }
 
+    @staticmethod
+    def calculate_totals(
+        material_breakdown: Dict[str, float],
+        labor_breakdown: Dict[str, float],
+        delivery_breakdown: Dict[str, Any],
+    ) -> Dict[str, float]:
+        """Subtotal, GST and total cost of a quote"""
+        subtotal = (
+            material_breakdown["material_cost"]
+            + labor_breakdown["machine_cost"]
+            + labor_breakdown["labor_cost"]
+        )
+
+        # Apply taxes (18% GST for India)
+        tax_rate = 0.18
+        tax_amount = subtotal * tax_rate
+
+        # Total cost
+        total_before_delivery = subtotal + tax_amount
+        total_cost = (
+            total_before_delivery + delivery_breakdown["delivery_cost"]
+        )
+
+        return {
+            "subtotal": subtotal,
+            "tax_rate": tax_rate,
+            "tax_amount": tax_amount,
+            "delivery_cost": delivery_breakdown["delivery_cost"],
+            "total_cost": total_cost,
+        }
+
+    @staticmethod
+    def calculate_quote_matrix(
+        file_analysis: FileAnalysis,
+        settings: PrintSettings,
+        materials: List[str],
+        qualities: List[str],
+        quantities: List[int],
+        delivery_breakdown: Dict[str, Any],
+    ) -> List[Dict[str, Any]]:
+        """
+        Price every material × quality × quantity tier of one file
+
+        Each cell totals what create_quote charges for the same settings.
+        Material per piece is computed once per material and print time per
+        piece once per material and quality; only the quantity scaling,
+        labor and totals run per cell.
+        """
+        labor_settings = {
+            (quality, quantity): settings.model_copy(
+                update={"quality": quality, "quantity": quantity}
+            )
+            for quality in qualities
+            for quantity in quantities
+        }
+
+        matrix = []
+        for material in materials:
+            by_material = settings.model_copy(update={"material": material})
+            piece_material = QuoteCalculator.calculate_piece_material(
+                file_analysis, by_material
+            )
+            for quality in qualities:
+                piece_time = QuoteCalculator.calculate_piece_time(
+                    file_analysis,
+                    by_material.model_copy(update={"quality": quality}),
+                )
+                for quantity in quantities:
+                    material_breakdown = QuoteCalculator.scale_material_cost(
+                        piece_material, quantity
+                    )
+                    time_breakdown = QuoteCalculator.scale_print_time(
+                        piece_time, quantity
+                    )
+                    labor_breakdown = QuoteCalculator.calculate_labor_cost(
+                        time_breakdown, labor_settings[quality, quantity]
+                    )
+                    totals = QuoteCalculator.calculate_totals(
+                        material_breakdown, labor_breakdown, delivery_breakdown
+                    )
+                    matrix.append(
+                        {
+                            "material": material,
+                            "quality": quality,
+                            "quantity": quantity,
+                            "material_cost": material_breakdown[
+                                "material_cost"
+                            ],
+                            "machine_cost": labor_breakdown["machine_cost"],
+                            "labor_cost": labor_breakdown["labor_cost"],
+                            "total_time_hours": time_breakdown[
+                                "total_time_hours"
+                            ],
+                            **totals,
+                        }
+                    )
+        return matrix
+
 
 def mock_file_analysis(upload_id: str) -> FileAnalysis:
     """Mock file analysis - replace with actual 3D file processing"""
@@ -434,21 +604,11 @@ async def create_quote(
         )
 
         # Calculate total cost
-        subtotal = (
-            material_breakdown["material_cost"]
-            + labor_breakdown["machine_cost"]
-            + labor_breakdown["labor_cost"]
-        )
-
-        # Apply taxes (18% GST for India)
-        tax_rate = 0.18
-        tax_amount = subtotal * tax_rate
-
-        # Total cost
-        total_before_delivery = subtotal + tax_amount
-        total_cost = (
-            total_before_delivery + delivery_breakdown["delivery_cost"]
+        totals = QuoteCalculator.calculate_totals(
+            material_breakdown, labor_breakdown, delivery_breakdown
         )
+        tax_rate = totals["tax_rate"]
+        total_cost = totals["total_cost"]
 
         # Generate quote ID
         quote_id = f"QT-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
@@ -469,11 +629,7 @@ async def create_quote(
 
         # Create comprehensive breakdown
         breakdown = {
-            "subtotal": subtotal,
-            "tax_rate": tax_rate,
-            "tax_amount": tax_amount,
-            "delivery_cost": delivery_breakdown["delivery_cost"],
-            "total_cost": total_cost,
+            **totals,
             "material": material_breakdown,
             "time": time_breakdown,
             "labor": labor_breakdown,
@@ -519,6 +675,79 @@ async def create_quote(
         ) from exc
 
 
+@router.post("/matrix", response_model=QuoteMatrixResponse)
+async def create_quote_matrix(
+    matrix_request: QuoteMatrixRequest,
+    current_user=Depends(get_current_user),
+):
+    """Price every material × quality × quantity tier of a file at once"""
+    materials = {name.upper(): name for name in MATERIALS}
+    unknown = [m for m in matrix_request.materials if m.upper() not in materials]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=error_detail(
+                "INVALID_INPUT", f"Unsupported material: {unknown[0]}"
+            ),
+        )
+    unknown = [
+        q for q in matrix_request.qualities if q.lower() not in QUALITY_SETTINGS
+    ]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=error_detail(
+                "INVALID_INPUT", f"Unsupported quality: {unknown[0]}"
+            ),
+        )
+    if any(not 1 <= quantity <= 100 for quantity in matrix_request.quantities):
+        raise HTTPException(
+            status_code=400,
+            detail=error_detail(
+                "INVALID_INPUT", "Quantities must be between 1 and 100"
+            ),
+        )
+
+    settings = PrintSettings(
+        material=materials[matrix_request.materials[0].upper()],
+        quality=matrix_request.qualities[0].lower(),
+        infill_percentage=matrix_request.infill_percentage,
+        layer_height=matrix_request.layer_height,
+        supports=matrix_request.supports,
+        brim=matrix_request.brim,
+        rush_order=matrix_request.rush_order,
+    )
+    file_analysis = mock_file_analysis(matrix_request.upload_id)
+    delivery_breakdown = QuoteCalculator.calculate_delivery_cost(
+        matrix_request.delivery_address, matrix_request.pickup_location
+    )
+    try:
+        quotes = QuoteCalculator.calculate_quote_matrix(
+            file_analysis,
+            settings,
+            # Priced under the names create_quote accepts
+            list(
+                dict.fromkeys(
+                    materials[m.upper()] for m in matrix_request.materials
+                )
+            ),
+            list(dict.fromkeys(q.lower() for q in matrix_request.qualities)),
+            matrix_request.quantities,
+            delivery_breakdown,
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=400,
+            detail=error_detail("INVALID_INPUT", str(exc)),
+        ) from exc
+
+    return QuoteMatrixResponse(
+        upload_id=matrix_request.upload_id,
+        volume_mm3=file_analysis.volume_mm3,
+        quotes=quotes,
+    )
+
+
 @router.get("/{quote_id}")
 async def get_quote(
     quote_id: str,
@@ -15,6 +15,11 @@ import trimesh
 import numpy as np
 import multipart  # noqa: F401 - ensure python-multipart is installed for UploadFile support
 from ..schemas.admin import MessageResponse
+from ..core.analysis_cache import (
+    analysis_cache,
+    analysis_cache_key,
+    file_content_hash,
+)
 from ..database import get_db
 from ..core.security import get_current_user
 from ..models.services import Upload
@@ -101,6 +106,9 @@ class S3Service:
 class FileProcessor:
     """3D file analysis and processing"""
 
+    # Bump whenever analyze_mesh_file output changes to invalidate the cache
+    ANALYSIS_VERSION = "1"
+
     @staticmethod
     def validate_file(
         filename: str, content_type: str, file_size: int
@@ -132,6 +140,22 @@ class FileProcessor:
 
     @staticmethod
     def analyze_mesh_file(file_path: str) -> Dict[str, any]:
+        """Analyze 3D mesh file, reusing the cached result for known content"""
+        cache_key = analysis_cache_key(
+            file_content_hash(file_path),
+            "upload-mesh",
+            FileProcessor.ANALYSIS_VERSION,
+        )
+        cached = analysis_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        analysis = FileProcessor._analyze_mesh_uncached(file_path)
+        analysis_cache.set(cache_key, analysis)
+        return analysis
+
+    @staticmethod
+    def _analyze_mesh_uncached(file_path: str) -> Dict[str, any]:
         """Analyze 3D mesh file using trimesh"""
         try:
             start_time = datetime.now()
@@ -183,10 +183,13 @@ class ProductOut(BaseModel):
 
 class ProductListOut(BaseModel):
     products: List[ProductOut]
-    total: int
-    page: int
+    total: Optional[int]
+    page: Optional[int]
     per_page: int
-    pages: int
+    pages: Optional[int]
+    # Keyset pagination
+    next_cursor: Optional[str] = None
+    total_is_estimate: bool = False
 
 
 # Cart schemas
@@ -382,6 +385,7 @@ class ProductSort(str, Enum):
     CREATED_DESC = "created_desc"
     POPULARITY = "popularity"
     RATING = "rating"
+    RELEVANCE = "relevance"
 
 
 class ProductSearch(BaseModel):
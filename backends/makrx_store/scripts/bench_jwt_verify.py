@@ -0,0 +1,118 @@
+"""
+Benchmark JWT verification cost per request
+
+Verifies RS256 tokens the way each backend used to (JWK dict or PEM parsed
+on every decode, JWKS cache checked per call) and through the shared
+TokenVerifier with the claims cache off and on. Keycloak is simulated with
+an in-process transport, so only verification work is measured.
+
+    python -m backends.makrx_store.scripts.bench_jwt_verify --requests 5000
+
+--users controls how many distinct tokens are cycled (cache working set).
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from backends.utils.jwt_verifier import JWKSKeySet, TokenVerifier, VerifiedClaimsCache
+
+ISSUER = "http://keycloak.bench/realms/makrx"
+
+
+def _signing_key(kid):
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    public_pem = private.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    public = jwk.construct(public_pem.decode(), "RS256").to_dict()
+    return pem, {**public, "kid": kid, "use": "sig"}
+
+
+def _token(pem, kid, sub):
+    claims = {
+        "sub": sub,
+        "iss": ISSUER,
+        "aud": "makrx-store",
+        "exp": int(time.time()) + 3600,
+    }
+    return jwt.encode(claims, pem, algorithm="RS256", headers={"kid": kid})
+
+
+async def _legacy_verify(token, jwks):
+    # Previous store/cave path: find the JWK dict, let jose rebuild the key
+    kid = jwt.get_unverified_header(token).get("kid")
+    key = next(k for k in jwks["keys"] if k.get("kid") == kid)
+    return jwt.decode(
+        token, key, algorithms=["RS256"], audience="makrx-store", issuer=ISSUER
+    )
+
+
+def _shared_verifier(jwks, cache_size):
+    async def handler(request):
+        return httpx.Response(200, json=jwks)
+
+    keys = JWKSKeySet(
+        f"{ISSUER}/protocol/openid-connect/certs",
+        transport=httpx.MockTransport(handler),
+    )
+    return TokenVerifier(
+        keys,
+        issuer=ISSUER,
+        audience="makrx-store",
+        cache=VerifiedClaimsCache(cache_size),
+    )
+
+
+async def _measure(verify, tokens, requests):
+    for token in tokens:  # warm up: keys fetched, cache filled
+        await verify(token)
+    started = time.perf_counter()
+    for i in range(requests):
+        await verify(tokens[i % len(tokens)])
+    return (time.perf_counter() - started) / requests * 1_000_000
+
+
+async def run(requests, users):
+    pem, public = _signing_key("bench")
+    jwks = {"keys": [public]}
+    tokens = [_token(pem, "bench", f"user-{i}") for i in range(users)]
+
+    uncached = _shared_verifier(jwks, cache_size=0)
+    cached = _shared_verifier(jwks, cache_size=10_000)
+    scenarios = [
+        ("legacy decode", lambda t: _legacy_verify(t, jwks)),
+        ("shared, no cache", uncached.verify),
+        ("shared + claims", cached.verify),
+    ]
+    print(f"requests={requests} distinct tokens={users}")
+    print(f"{'scenario':<20}{'us/verify':>12}{'verify/s':>12}")
+    for name, verify in scenarios:
+        per_call = await _measure(verify, tokens, requests)
+        print(f"{name:<20}{per_call:>12.1f}{1_000_000 / per_call:>12.0f}")
+    lookups = max(cached.cache.hits + cached.cache.misses, 1)
+    print(f"claims cache hit rate: {cached.cache.hits / lookups:.1%}")
+    await uncached.keys.aclose()
+    await cached.keys.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.users))
+
+
+if __name__ == "__main__":
+    main()
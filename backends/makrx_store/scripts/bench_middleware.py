@@ -0,0 +1,141 @@
+"""
+Benchmark per-request middleware overhead on a trivial endpoint
+
+Calls the ASGI app directly (no HTTP client in the loop) and compares: no
+middleware, the classic BaseHTTPMiddleware stack (security + observability +
+request id) and the same behaviour as one ComposedMiddleware pass.
+
+    python -m backends.makrx_store.scripts.bench_middleware --requests 20000
+
+Rate limiting is left out (REDIS_URL unset) so only middleware cost is measured.
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from fastapi import FastAPI, Request
+
+from ..core.config import settings
+from ..middleware.api_security import setup_api_security
+from ..middleware.asgi import (
+    ComposedMiddleware,
+    ObservabilityStage,
+    RequestContextStage,
+)
+from ..middleware.observability import ObservabilityMiddleware
+
+
+def _app(variant):
+    app = FastAPI()
+
+    @app.get("/api/ping")
+    async def ping():
+        return {"ok": True}
+
+    if variant == "classic":
+        setup_api_security(app, composed=False)
+        app.add_middleware(ObservabilityMiddleware)
+
+        @app.middleware("http")
+        async def request_middleware(request: Request, call_next):
+            request.state.request_id = request.headers.get("x-request-id")
+            response = await call_next(request)
+            response.headers["X-Request-ID"] = request.state.request_id or ""
+            return response
+
+    elif variant == "composed":
+        setup_api_security(app, composed=True)
+        app.add_middleware(
+            ComposedMiddleware, stages=[RequestContextStage(), ObservabilityStage()]
+        )
+    return app
+
+
+def _scope():
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/ping",
+        "raw_path": b"/api/ping",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"localhost"),
+            (b"x-request-id", b"bench"),
+            (b"cookie", b"csrf_token=bench"),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 80),
+    }
+
+
+async def _call(app):
+    status = None
+    body_sent = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Like a server: the client only disconnects after the response
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(_scope(), receive, send)
+    finished.set()
+    return status
+
+
+async def _measure(app, requests):
+    for _ in range(200):  # warm up routing and lazy middleware stack
+        assert await _call(app) == 200
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await _call(app)
+        latencies.append((time.perf_counter() - started) * 1_000_000)
+    latencies.sort()
+    return {
+        "mean": statistics.fmean(latencies),
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+
+async def run(requests):
+    settings.REDIS_URL = None
+    logging.disable(logging.CRITICAL)
+    print(f"requests={requests}")
+    print(f"{'stack':<12}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}{'overhead':>10}")
+    baseline = None
+    for variant in ("none", "classic", "composed"):
+        stats = await _measure(_app(variant), requests)
+        baseline = baseline or stats["mean"]
+        print(
+            f"{variant:<12}{stats['mean']:>10.1f}{stats['p50']:>10.1f}"
+            f"{stats['p99']:>10.1f}{stats['mean'] - baseline:>10.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
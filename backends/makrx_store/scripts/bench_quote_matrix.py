@@ -0,0 +1,114 @@
+"""
+Benchmark the quote UI matrix: scalar quotes vs calculate_quote_matrix
+
+Prices every material × quality × quantity tier of one file the way
+POST /api/quotes does, one cell at a time (material cost, print time, labor
+and totals per cell), and in one QuoteCalculator.calculate_quote_matrix call,
+which computes material per piece once per material and print time per piece
+once per material and quality. Both must produce identical totals.
+
+    python -m backends.makrx_store.scripts.bench_quote_matrix --repeat 50
+"""
+
+import argparse
+import itertools
+import time
+
+from backends.makrx_store.routes.quotes import (
+    MATERIALS,
+    QUALITY_SETTINGS,
+    PrintSettings,
+    QuoteCalculator,
+    mock_file_analysis,
+)
+
+QUANTITIES = [1, 2, 5, 10, 20, 50, 100]
+
+
+def _scalar(file_analysis, settings, materials, qualities, quantities, delivery):
+    cells = []
+    for material, quality, quantity in itertools.product(
+        materials, qualities, quantities
+    ):
+        cell_settings = settings.model_copy(
+            update={"material": material, "quality": quality, "quantity": quantity}
+        )
+        material_breakdown = QuoteCalculator.calculate_material_cost(
+            file_analysis, cell_settings
+        )
+        time_breakdown = QuoteCalculator.calculate_print_time(
+            file_analysis, cell_settings
+        )
+        labor_breakdown = QuoteCalculator.calculate_labor_cost(
+            time_breakdown, cell_settings
+        )
+        cells.append(
+            QuoteCalculator.calculate_totals(
+                material_breakdown, labor_breakdown, delivery
+            )["total_cost"]
+        )
+    return cells
+
+
+def _matrix(file_analysis, settings, materials, qualities, quantities, delivery):
+    return [
+        cell["total_cost"]
+        for cell in QuoteCalculator.calculate_quote_matrix(
+            file_analysis, settings, materials, qualities, quantities, delivery
+        )
+    ]
+
+
+def _measure(fn, repeat):
+    result = fn()  # warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return result, (time.perf_counter() - started) / repeat * 1000
+
+
+def run(quantities, repeat):
+    file_analysis = mock_file_analysis("bench")
+    materials = list(MATERIALS)
+    qualities = list(QUALITY_SETTINGS)
+    cells = len(materials) * len(qualities) * len(quantities)
+    print(
+        f"{len(materials)} materials x {len(qualities)} qualities x "
+        f"{len(quantities)} quantities = {cells} cells, repeat={repeat}"
+    )
+    print(f"{'scenario':<28}{'ms/matrix':>12}{'us/cell':>12}")
+    for options, delivery_address in (
+        ({}, None),
+        (
+            {"supports": True, "rush_order": True, "infill_percentage": 40},
+            {"city": "Pune"},
+        ),
+    ):
+        settings = PrintSettings(
+            material=materials[0], quality=qualities[0], **options
+        )
+        delivery = QuoteCalculator.calculate_delivery_cost(delivery_address, None)
+        args = (file_analysis, settings, materials, qualities, quantities, delivery)
+        scalar, scalar_ms = _measure(lambda: _scalar(*args), repeat)
+        matrix, matrix_ms = _measure(lambda: _matrix(*args), repeat)
+        assert matrix == scalar, "matrix differs from scalar quotes"
+        label = "supports+rush" if options else "defaults"
+        for name, elapsed in (("scalar", scalar_ms), ("matrix", matrix_ms)):
+            print(
+                f"{f'{label}, {name}':<28}{elapsed:>12.2f}"
+                f"{elapsed * 1000 / cells:>12.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--quantities", type=int, nargs="+", default=QUANTITIES
+    )
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    run(args.quantities, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark rate-limit middleware overhead at a fixed request rate
+
+Drives a trivial endpoint through RateLimitMiddleware in-process (httpx ASGI
+transport) with an open-loop schedule (default 5k req/s) and reports latency
+percentiles for: no limiter, the legacy per-key sorted-set pipeline, GCRA in
+one Lua call, and GCRA for clients already over limit (local pre-filter).
+
+    python -m backends.makrx_store.scripts.bench_rate_limit \
+        --redis-url redis://localhost:6379/15
+
+Uses the given Redis database; keys are namespaced per run and expire.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI
+from redis.asyncio import Redis as AsyncRedis
+
+from ..core.rate_limit import ALLOWED, RateLimitResult
+from ..middleware.api_security import APISecurityConfig, RateLimitMiddleware
+
+
+class LegacyRateLimitMiddleware(RateLimitMiddleware):
+    """Previous implementation: ZSET pipeline per key, IP then user"""
+
+    async def _check_rate_limit(self, keys, limit, window):
+        for key in keys:
+            current_time = int(time.time())
+            pipe = self.redis_client.pipeline()
+            pipe.zremrangebyscore(key, 0, current_time - window)
+            pipe.zadd(key, {str(current_time): current_time})
+            pipe.zcard(key)
+            pipe.expire(key, window)
+            results = await pipe.execute()
+            if results[2] > limit:
+                return RateLimitResult(False, key, window, 0)
+        return ALLOWED
+
+
+def _app(middleware, redis_url):
+    app = FastAPI()
+
+    @app.get("/api/ping")
+    async def ping():
+        return {"ok": True}
+
+    if middleware:
+        app.add_middleware(middleware, redis_url=redis_url)
+    return app
+
+
+async def _drive(app, rate, seconds, users, tag):
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def one(i):
+            headers = {
+                # Tagged so each scenario starts from an empty key space
+                "X-Forwarded-For": f"{tag}-10.0.{i % users // 250}.{i % 250}",
+                "Authorization": f"Bearer {tag}-user-{i % users}",
+            }
+            started = time.perf_counter()
+            await client.get("/api/ping", headers=headers)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        total = int(rate * seconds)
+        tasks = []
+        start = time.perf_counter()
+        for i in range(total):
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(i)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "achieved_rps": total / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+
+async def run(redis_url, rate, seconds, users):
+    probe = AsyncRedis.from_url(redis_url)
+    await probe.ping()
+    await probe.aclose()
+
+    run_id = uuid.uuid4().hex[:8]
+    limits = APISecurityConfig.RATE_LIMITS
+    original = dict(limits["api"])
+    scenarios = [
+        ("no limiter", None, 10**9),
+        ("legacy zset x2", LegacyRateLimitMiddleware, 10**9),
+        ("gcra lua x1", RateLimitMiddleware, 10**9),
+        ("gcra over limit", RateLimitMiddleware, 1),
+    ]
+    print(f"rate={rate}/s seconds={seconds} clients={users}")
+    print(f"{'scenario':<18}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    try:
+        for index, (name, middleware, limit) in enumerate(scenarios):
+            limits["api"] = {"requests": limit, "window": 300}
+            app = _app(middleware, redis_url)
+            stats = await _drive(app, rate, seconds, users, f"{run_id}{index}")
+            print(
+                f"{name:<18}{stats['achieved_rps']:>10.0f}"
+                f"{stats['p50']:>10.2f}{stats['p99']:>10.2f}"
+            )
+    finally:
+        limits["api"] = original
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--rate", type=int, default=5000)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--clients", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.redis_url, args.rate, args.seconds, args.clients))
+
+
+if __name__ == "__main__":
+    main()
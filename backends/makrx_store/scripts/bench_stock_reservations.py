@@ -0,0 +1,240 @@
+"""
+Benchmark concurrent checkouts at a product drop: oversell and throughput
+
+Runs a burst of concurrent checkouts against a handful of SKUs whose total
+demand exceeds stock, in a throwaway SQLite file through aiosqlite, two ways:
+
+- read the stock, then write the decremented value (check-then-act);
+- reserve_stock, the single conditional UPDATE ... RETURNING.
+
+The script fails if reserve_stock sells more units than were stocked, if the
+stock left and the committed reservations disagree, or if throughput falls
+below --min-throughput checkouts per second. SQLite serializes writers, so the
+numbers are a floor for what PostgreSQL's row-level locks allow.
+
+    python -m backends.makrx_store.scripts.bench_stock_reservations \
+        --checkouts 1000 --skus 10
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    MetaData,
+    event,
+    func,
+    insert,
+    select,
+    update,
+)
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from ..core import stock_reservations as stock
+from ..models.commerce import Product, StockReservation
+from .catalog_tables import portable_table
+
+
+def _engine(path, connections):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=connections,
+        max_overflow=0,
+        connect_args={"timeout": 60},
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    return engine
+
+
+async def _seed(engine, products, skus, units):
+    async with engine.begin() as conn:
+        await conn.run_sync(products.metadata.drop_all)
+        await conn.run_sync(products.metadata.create_all)
+        await conn.execute(
+            insert(products),
+            [
+                {
+                    "id": sku,
+                    "name": f"Drop SKU {sku}",
+                    "stock_quantity": units,
+                    "track_inventory": True,
+                    "allow_backorder": False,
+                }
+                for sku in range(1, skus + 1)
+            ],
+        )
+
+
+async def _check_then_act(db, products, reservations, order):
+    sku, quantity = order["sku"], order["quantity"]
+    on_hand = (
+        await db.execute(
+            select(products.c.stock_quantity).where(products.c.id == sku)
+        )
+    ).scalar_one()
+    await db.commit()
+    if on_hand < quantity:
+        return False
+    await asyncio.sleep(0)  # the rest of the request runs here
+    await db.execute(
+        update(products)
+        .where(products.c.id == sku)
+        .values(stock_quantity=on_hand - quantity)
+    )
+    await db.execute(
+        insert(reservations).values(
+            product_id=sku,
+            order_id=order["id"],
+            user_id=order["user_id"],
+            quantity=quantity,
+            status=stock.COMMITTED,
+            expires_at=datetime.now(timezone.utc),
+        )
+    )
+    await db.commit()
+    return True
+
+
+async def _reserve(db, products, reservations, order):
+    try:
+        await stock.reserve_stock(
+            db,
+            order["sku"],
+            order["quantity"],
+            order["user_id"],
+            order_id=order["id"],
+        )
+    except stock.InsufficientStock:
+        await db.rollback()
+        return False
+    await db.commit()
+    return True
+
+
+async def _burst(engine, checkout, products, reservations, orders):
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def one(order):
+        async with sessions() as db:
+            return await checkout(db, products, reservations, order)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(order) for order in orders))
+    return sum(results), time.perf_counter() - started
+
+
+async def _tally(engine, products, reservations):
+    async with engine.connect() as conn:
+        left = dict(
+            (await conn.execute(select(products.c.id, products.c.stock_quantity)))
+            .all()
+        )
+        sold = dict(
+            (
+                await conn.execute(
+                    select(
+                        reservations.c.product_id,
+                        func.sum(reservations.c.quantity),
+                    )
+                    .where(reservations.c.status == stock.COMMITTED)
+                    .group_by(reservations.c.product_id)
+                )
+            ).all()
+        )
+    return left, sold
+
+
+async def run(checkouts, skus, units, max_quantity, connections, min_throughput):
+    path = os.path.join(tempfile.mkdtemp(), "bench_stock_reservations.db")
+    engine = _engine(path, connections)
+    metadata = MetaData()
+    products = portable_table(Product.__table__, metadata)
+    reservations = portable_table(StockReservation.__table__, metadata)
+
+    rng = random.Random(7)
+    orders = [
+        {
+            "id": n,
+            "user_id": f"kc-{n}",
+            "sku": rng.randint(1, skus),
+            "quantity": rng.randint(1, max_quantity),
+        }
+        for n in range(1, checkouts + 1)
+    ]
+    demand = sum(order["quantity"] for order in orders)
+    print(
+        f"{checkouts} concurrent checkouts on {skus} SKUs x {units} units, "
+        f"{demand} units demanded, {connections} connections"
+    )
+    print(
+        f"{'strategy':<24}{'accepted':>10}{'sold':>8}{'oversold':>10}"
+        f"{'seconds':>10}{'checkouts/s':>13}"
+    )
+
+    outcome = {}
+    for label, checkout in (
+        ("check-then-act", _check_then_act),
+        ("conditional update", _reserve),
+    ):
+        await _seed(engine, products, skus, units)
+        accepted, elapsed = await _burst(
+            engine, checkout, products, reservations, orders
+        )
+        left, sold = await _tally(engine, products, reservations)
+        oversold = sum(max(sold.get(sku, 0) - units, 0) for sku in left)
+        throughput = checkouts / elapsed
+        print(
+            f"{label:<24}{accepted:>10}{sum(sold.values()):>8}{oversold:>10}"
+            f"{elapsed:>10.2f}{throughput:>13.0f}"
+        )
+        outcome[label] = (left, sold, oversold, throughput)
+
+    await engine.dispose()
+    os.remove(path)
+
+    left, sold, oversold, throughput = outcome["conditional update"]
+    assert oversold == 0, f"reserve_stock oversold {oversold} units"
+    for sku, remaining in left.items():
+        assert remaining >= 0, f"SKU {sku} went negative"
+        assert remaining + sold.get(sku, 0) == units, f"SKU {sku} lost units"
+    assert (
+        throughput >= min_throughput
+    ), f"{throughput:.0f} checkouts/s is below {min_throughput}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--checkouts", type=int, default=1000)
+    parser.add_argument("--skus", type=int, default=10)
+    parser.add_argument("--units", type=int, default=100)
+    parser.add_argument("--max-quantity", type=int, default=3)
+    parser.add_argument("--connections", type=int, default=20)
+    parser.add_argument("--min-throughput", type=float, default=100.0)
+    args = parser.parse_args()
+    asyncio.run(
+        run(
+            args.checkouts,
+            args.skus,
+            args.units,
+            args.max_quantity,
+            args.connections,
+            args.min_throughput,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
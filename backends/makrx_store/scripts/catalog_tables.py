@@ -0,0 +1,44 @@
+"""
+Product tables for benchmarks and tests
+On PostgreSQL the real store tables are created in a scratch schema; on any
+other database (e.g. SQLite) a portable copy of store_products is used.
+"""
+
+from sqlalchemy import JSON, Column, MetaData, Table, text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from ..base import Base
+from ..models import reviews, services, subscriptions  # noqa: F401 (mappers)
+from ..models.commerce import Brand, Category, Product
+
+
+def portable_table(source: Table, metadata: MetaData) -> Table:
+    """
+    Copy of a model table without Postgres-only types and foreign keys.
+
+    JSONB columns become JSON and the generated search_vector column is
+    omitted (it is deferred on the model, so ORM selects skip it).
+    """
+    columns = []
+    for col in source.columns:
+        if col.name == "search_vector":
+            continue
+        col_type = JSON() if isinstance(col.type, JSONB) else col.type
+        columns.append(Column(col.name, col_type, primary_key=col.primary_key))
+    return Table(source.name, metadata, *columns)
+
+
+def create_catalog_tables(conn, dialect: str) -> Table:
+    """Create the product table(s) on `conn` and return store_products"""
+    if dialect == "postgresql":
+        conn.execute(text("CREATE SCHEMA IF NOT EXISTS catalog_bench"))
+        conn.execute(text("SET LOCAL search_path TO catalog_bench, public"))
+        Base.metadata.create_all(
+            conn, tables=[Brand.__table__, Category.__table__, Product.__table__]
+        )
+        return Product.__table__
+
+    metadata = MetaData()
+    table = portable_table(Product.__table__, metadata)
+    metadata.create_all(conn)
+    return table
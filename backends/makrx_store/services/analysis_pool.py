@@ -0,0 +1,189 @@
+"""
+Bounded process pool for CPU-heavy analysis jobs
+Keeps mesh processing off the event loop with a job queue, per-job timeouts
+and cancellation that terminates the worker running the job
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from typing import Any, Callable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisError(Exception):
+    """A job raised inside the worker process"""
+
+
+class AnalysisTimeout(AnalysisError):
+    """A job exceeded its timeout; its worker was terminated"""
+
+
+class AnalysisQueueFull(AnalysisError):
+    """Too many jobs are already waiting for a worker"""
+
+
+def _worker_main(conn, func: Callable[..., Any]) -> None:
+    """Worker loop: receive (args, kwargs), reply (ok, result-or-message)"""
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        args, kwargs = job
+        try:
+            conn.send((True, func(*args, **kwargs)))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    def __init__(self, ctx, func: Callable[..., Any]):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child_conn, func), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self) -> None:
+        self.process.terminate()
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ProcessJobPool:
+    """
+    Run a picklable top-level function in up to `max_workers` processes.
+
+    Jobs beyond the worker count wait in an in-process queue of at most
+    `max_queue` entries; a queued job that is cancelled never reaches a
+    worker. A running job that times out or is cancelled has its worker
+    terminated and replaced on demand, so a runaway mesh cannot pin a CPU.
+    Terminating waits up to a few seconds for the process to exit, so it
+    runs in a thread rather than on the event loop. Workers are started
+    lazily and reused between jobs.
+    """
+
+    def __init__(
+        self,
+        func: Callable[..., Any],
+        max_workers: int = 2,
+        max_queue: int = 32,
+        default_timeout: Optional[float] = None,
+        start_method: str = "spawn",
+    ):
+        self.func = func
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.default_timeout = default_timeout
+        self._ctx = multiprocessing.get_context(start_method)
+        self._idle: List[_Worker] = []
+        self._busy: Set[_Worker] = set()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self._running = 0
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "running": self._running,
+            "queued": self._waiting,
+            "idle_workers": len(self._idle),
+        }
+
+    def _acquire_worker(self) -> _Worker:
+        while self._idle:
+            worker = self._idle.pop()
+            if worker.alive():
+                return worker
+            worker.kill()
+        return _Worker(self._ctx, self.func)
+
+    async def run(self, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run one job and return its result without blocking the loop"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        if self._slots.locked() and self._waiting >= self.max_queue:
+            raise AnalysisQueueFull(
+                f"Analysis queue is full ({self.max_queue} jobs waiting)"
+            )
+
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+        timeout = self.default_timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        worker = None
+        self._running += 1
+        try:
+            worker = self._acquire_worker()
+            self._busy.add(worker)
+            worker.conn.send((args, kwargs))
+            ok, payload = await asyncio.wait_for(
+                loop.run_in_executor(None, worker.conn.recv), timeout
+            )
+        except asyncio.TimeoutError:
+            await self._discard(worker)
+            worker = None
+            raise AnalysisTimeout(f"Analysis timed out after {timeout}s")
+        except (EOFError, BrokenPipeError, OSError) as e:
+            await self._discard(worker)
+            worker = None
+            raise AnalysisError(f"Analysis worker died: {e}")
+        except BaseException:
+            # Cancelled (client went away, shutdown): stop the running job
+            await self._discard(worker)
+            worker = None
+            raise
+        finally:
+            self._running -= 1
+            if worker is not None:
+                self._busy.discard(worker)
+                self._idle.append(worker)
+            self._slots.release()
+
+        if not ok:
+            raise AnalysisError(payload)
+        return payload
+
+    async def _discard(self, worker: Optional[_Worker]) -> None:
+        if worker is None:
+            return
+        self._busy.discard(worker)
+        logger.warning(f"Terminating analysis worker {worker.process.pid}")
+        # kill() joins the process; the thread finishes it even if this
+        # await is cancelled
+        await asyncio.get_running_loop().run_in_executor(None, worker.kill)
+
+    def shutdown(self) -> None:
+        """
+        Stop idle workers and terminate busy ones; their jobs fail with
+        AnalysisError. Blocking, so async callers run it in a thread.
+        """
+        while self._idle:
+            self._idle.pop().stop()
+        for worker in list(self._busy):
+            worker.kill()
@@ -14,12 +14,23 @@ import magic
 from PIL import Image
 import io
 
+from ..core.analysis_cache import (
+    analysis_cache,
+    analysis_cache_key,
+    file_content_hash,
+)
+from ..core.config import settings
+from .analysis_pool import ProcessJobPool
+
 logger = logging.getLogger(__name__)
 
 
 class FileAnalysisService:
     """Advanced 3D file analysis with real mesh processing"""
 
+    # Bump whenever the analysis output changes to invalidate cached results
+    ANALYSIS_VERSION = "2"
+
     def __init__(self):
         # Supported file formats
         self.supported_formats = {
@@ -74,10 +85,84 @@ class FileAnalysisService:
             "ultra": {"layer_height": 0.1, "speed_mm_s": 30, "infill": 25},
         }
 
+        self._pool: Optional[ProcessJobPool] = None
+
+    @property
+    def pool(self) -> ProcessJobPool:
+        """Worker pool shared by this service, created on first use"""
+        if self._pool is None:
+            self._pool = ProcessJobPool(
+                _analyze_in_worker,
+                max_workers=settings.ANALYSIS_POOL_WORKERS,
+                max_queue=settings.ANALYSIS_QUEUE_SIZE,
+                default_timeout=settings.ANALYSIS_TIMEOUT_SECONDS,
+            )
+        return self._pool
+
+    def shutdown(self) -> None:
+        """Stop the worker pool if one was started; blocks until it exits"""
+        if self._pool is not None:
+            self._pool.shutdown()
+
     async def analyze_file(
+        self,
+        file_path: str,
+        analysis_options: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Comprehensive 3D file analysis.
+
+        The mesh work runs in the process pool; this coroutine only awaits the
+        result, so the event loop keeps serving other requests. Cancelling it
+        terminates the worker running the job.
+        """
+        start_time = datetime.now()
+
+        try:
+            # Cheap checks stay in-process so bad requests never queue
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"File not found: {file_path}")
+
+            file_ext = Path(file_path).suffix.lower()
+            if file_ext not in self.supported_formats:
+                raise ValueError(f"Unsupported file format: {file_ext}")
+
+            options = analysis_options or {}
+            loop = asyncio.get_running_loop()
+            content_hash = await loop.run_in_executor(
+                None, file_content_hash, file_path
+            )
+            cache_key = analysis_cache_key(
+                content_hash, "file-analysis", self.ANALYSIS_VERSION, options
+            )
+            cached = await analysis_cache.get_async(cache_key)
+            if cached is not None:
+                # Same content may arrive under a new name; describe this file
+                file_info = await loop.run_in_executor(
+                    None, self._get_file_info, file_path
+                )
+                return {**cached, "file_info": file_info, "cache_hit": True}
+
+            result = await self.pool.run(file_path, options, timeout=timeout)
+            if "error" not in result:
+                await analysis_cache.set_async(cache_key, result)
+            return result
+
+        except Exception as e:
+            logger.error(f"File analysis failed: {e}")
+            return {
+                "error": str(e),
+                "file_path": file_path,
+                "processing_time_seconds": (
+                    datetime.now() - start_time
+                ).total_seconds(),
+            }
+
+    def analyze_file_sync(
         self, file_path: str, analysis_options: Optional[Dict] = None
     ) -> Dict[str, Any]:
-        """Comprehensive 3D file analysis"""
+        """Run the full analysis in the calling process (blocking)"""
         start_time = datetime.now()
 
         try:
@@ -93,34 +178,32 @@ class FileAnalysisService:
             file_info = self._get_file_info(file_path)
 
             # Load and analyze mesh
-            mesh_analysis = await self._analyze_mesh(file_path, file_ext)
+            mesh_analysis = self._analyze_mesh(file_path, file_ext)
+            # The Trimesh object is not part of the result sent back to callers
+            mesh = mesh_analysis.pop("mesh")
 
             # Geometric analysis
-            geometric_analysis = self._analyze_geometry(mesh_analysis["mesh"])
+            geometric_analysis = self._analyze_geometry(mesh)
 
             # Printability analysis
-            printability_analysis = self._analyze_printability(
-                mesh_analysis["mesh"]
-            )
+            printability_analysis = self._analyze_printability(mesh)
 
             # Cost estimation
             cost_analysis = self._analyze_cost_factors(
-                mesh_analysis["mesh"], analysis_options or {}
+                mesh, analysis_options or {}
             )
 
             # Time estimation
             time_analysis = self._estimate_print_time(
-                mesh_analysis["mesh"], analysis_options or {}
+                mesh, analysis_options or {}
             )
 
             # Quality recommendations
-            quality_analysis = self._analyze_quality_requirements(
-                mesh_analysis["mesh"]
-            )
+            quality_analysis = self._analyze_quality_requirements(mesh)
 
             # Material recommendations
             material_analysis = self._recommend_materials(
-                mesh_analysis["mesh"], printability_analysis
+                mesh, printability_analysis
             )
 
             processing_time = (datetime.now() - start_time).total_seconds()
@@ -166,14 +249,14 @@ class FileAnalysisService:
             "modified_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
         }
 
-    async def _analyze_mesh(
+    def _analyze_mesh(
         self, file_path: str, file_ext: str
     ) -> Dict[str, Any]:
         """Load and perform basic mesh analysis"""
         try:
             # Load mesh using appropriate method
             analysis_func = self.supported_formats[file_ext]
-            mesh = await analysis_func(file_path)
+            mesh = analysis_func(file_path)
 
             if mesh is None:
                 raise ValueError("Failed to load mesh from file")
@@ -231,19 +314,19 @@ class FileAnalysisService:
             logger.error(f"Mesh analysis failed: {e}")
             raise ValueError(f"Mesh analysis failed: {str(e)}")
 
-    async def _analyze_stl(self, file_path: str) -> trimesh.Trimesh:
+    def _analyze_stl(self, file_path: str) -> trimesh.Trimesh:
         """Analyze STL file"""
         return trimesh.load_mesh(file_path)
 
-    async def _analyze_obj(self, file_path: str) -> trimesh.Trimesh:
+    def _analyze_obj(self, file_path: str) -> trimesh.Trimesh:
         """Analyze OBJ file"""
         return trimesh.load_mesh(file_path)
 
-    async def _analyze_ply(self, file_path: str) -> trimesh.Trimesh:
+    def _analyze_ply(self, file_path: str) -> trimesh.Trimesh:
         """Analyze PLY file"""
         return trimesh.load_mesh(file_path)
 
-    async def _analyze_3mf(self, file_path: str) -> trimesh.Trimesh:
+    def _analyze_3mf(self, file_path: str) -> trimesh.Trimesh:
         """Analyze 3MF file (Microsoft 3D Manufacturing Format)"""
         # 3MF files are ZIP archives containing XML and mesh data
         try:
@@ -265,16 +348,16 @@ class FileAnalysisService:
             logger.warning(f"3MF parsing failed, trying as mesh: {e}")
             return trimesh.load_mesh(file_path)
 
-    async def _analyze_amf(self, file_path: str) -> trimesh.Trimesh:
+    def _analyze_amf(self, file_path: str) -> trimesh.Trimesh:
         """Analyze AMF file (Additive Manufacturing Format)"""
         # AMF files are XML-based
         return trimesh.load_mesh(file_path)
 
-    async def _analyze_off(self, file_path: str) -> trimesh.Trimesh:
+    def _analyze_off(self, file_path: str) -> trimesh.Trimesh:
         """Analyze OFF file (Object File Format)"""
         return trimesh.load_mesh(file_path)
 
-    async def _analyze_x3d(self, file_path: str) -> trimesh.Trimesh:
+    def _analyze_x3d(self, file_path: str) -> trimesh.Trimesh:
         """Analyze X3D file"""
         return trimesh.load_mesh(file_path)
 
@@ -873,3 +956,8 @@ class FileAnalysisService:
 
 # Global file analysis service instance
 file_analysis_service = FileAnalysisService()
+
+
+def _analyze_in_worker(file_path: str, analysis_options: Dict) -> Dict[str, Any]:
+    """Pool entry point; each worker process reuses its own service instance"""
+    return file_analysis_service.analyze_file_sync(file_path, analysis_options)
@@ -0,0 +1,14 @@
+import pytest
+from sqlalchemy import create_engine
+
+from backends.makrx_store.scripts.catalog_tables import create_catalog_tables
+
+
+@pytest.fixture()
+def sqlite_products():
+    """In-memory SQLite engine and a store_products table usable by the ORM"""
+    engine = create_engine("sqlite:///:memory:")
+    with engine.begin() as conn:
+        table = create_catalog_tables(conn, engine.dialect.name)
+    yield engine, table
+    engine.dispose()
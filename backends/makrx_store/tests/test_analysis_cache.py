@@ -0,0 +1,125 @@
+import asyncio
+import os
+import threading
+
+import trimesh
+
+from backends.makrx_store.core.analysis_cache import AnalysisCache, analysis_cache_key
+from backends.makrx_store.routes import uploads
+from backends.makrx_store.services import file_analysis_service as fas
+
+
+def _stl(tmp_path, name="part.stl"):
+    path = tmp_path / name
+    trimesh.creation.box(extents=(20, 30, 40)).export(path)
+    return str(path)
+
+
+def test_key_depends_on_content_version_and_options():
+    options = {"infill": 20, "q": "a"}
+    base = analysis_cache_key("abc", "file-analysis", "1", options)
+
+    assert base == analysis_cache_key(
+        "abc", "file-analysis", "1", {"q": "a", "infill": 20}
+    )
+    assert base != analysis_cache_key("abd", "file-analysis", "1", options)
+    assert base != analysis_cache_key("abc", "file-analysis", "2", options)
+    assert base != analysis_cache_key(
+        "abc", "file-analysis", "1", {**options, "infill": 30}
+    )
+
+
+def test_disk_tier_survives_restart_and_evicts_lru(tmp_path):
+    cache = AnalysisCache(
+        directory=str(tmp_path), max_disk_bytes=2000, memory_entries=2
+    )
+    blob = {"data": "x" * 500}
+    for key in ("a", "b", "c"):
+        cache.set(key, blob)
+    os.utime(tmp_path / "a.json", (1, 1))
+    cache.set("d", blob)
+
+    # "a" was least recently used on disk once the budget was exceeded
+    assert not (tmp_path / "a.json").exists()
+
+    restarted = AnalysisCache(directory=str(tmp_path), max_disk_bytes=2000)
+    assert restarted.get("d") == blob
+    assert restarted.get("a") is None
+    assert restarted.stats()["hits"]["disk"] == 1
+
+
+
+def test_hits_are_private_copies_and_async_disk_io_leaves_the_loop(tmp_path):
+    cache = AnalysisCache(directory=str(tmp_path), memory_entries=1)
+    disk_threads = []
+    for name in ("_disk_get", "_disk_set"):
+        real = getattr(cache, name)
+
+        def traced(*args, _real=real):
+            disk_threads.append(threading.get_ident())
+            return _real(*args)
+
+        setattr(cache, name, traced)
+
+    async def run():
+        await cache.set_async("a", {"mesh": {"faces": 12}})
+        first = await cache.get_async("a")  # memory
+        first["mesh"]["faces"] = 0
+        first["cache_hit"] = True
+        await cache.set_async("b", {"mesh": {"faces": 6}})  # pushes "a" out
+        from_disk = await cache.get_async("a")
+        return threading.get_ident(), first, from_disk, await cache.get_async("a")
+
+    loop_thread, first, from_disk, again = asyncio.run(run())
+
+    assert from_disk == again == {"mesh": {"faces": 12}}
+    assert from_disk is not again
+    assert cache.stats()["hits"] == {"memory": 2, "disk": 1, "redis": 0}
+    assert disk_threads and loop_thread not in disk_threads
+
+def test_upload_analysis_reuses_result_for_same_content(tmp_path, monkeypatch):
+    cache = AnalysisCache(directory=str(tmp_path / "cache"))
+    monkeypatch.setattr(uploads, "analysis_cache", cache)
+    calls = []
+    real = uploads.FileProcessor._analyze_mesh_uncached
+    monkeypatch.setattr(
+        uploads.FileProcessor,
+        "_analyze_mesh_uncached",
+        staticmethod(lambda path: calls.append(path) or real(path)),
+    )
+
+    first = uploads.FileProcessor.analyze_mesh_file(_stl(tmp_path, "a.stl"))
+    again = uploads.FileProcessor.analyze_mesh_file(_stl(tmp_path, "b.stl"))
+
+    assert len(calls) == 1
+    assert again == first
+    assert first["mesh_properties"]["face_count"] == 12
+
+
+def test_service_skips_the_pool_on_cache_hit(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        fas, "analysis_cache", AnalysisCache(directory=str(tmp_path / "cache"))
+    )
+    service = fas.FileAnalysisService()
+    jobs = []
+
+    class InlinePool:
+        async def run(self, file_path, options, timeout=None):
+            jobs.append(file_path)
+            return service.analyze_file_sync(file_path, options)
+
+    service._pool = InlinePool()
+    path = _stl(tmp_path)
+
+    async def run():
+        first = await service.analyze_file(path, {"material": "PLA"})
+        hit = await service.analyze_file(path, {"material": "PLA"})
+        other = await service.analyze_file(path, {"material": "ABS"})
+        return first, hit, other
+
+    first, hit, other = asyncio.run(run())
+
+    assert "error" not in first
+    assert hit["cache_hit"] is True
+    assert hit["mesh_analysis"] == first["mesh_analysis"]
+    assert jobs == [path, path]
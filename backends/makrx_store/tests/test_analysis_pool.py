@@ -0,0 +1,139 @@
+import asyncio
+import time
+
+import pytest
+import trimesh
+
+from backends.makrx_store.core.analysis_cache import AnalysisCache
+from backends.makrx_store.services import file_analysis_service as fas
+from backends.makrx_store.services.analysis_pool import (
+    AnalysisError,
+    AnalysisQueueFull,
+    AnalysisTimeout,
+    ProcessJobPool,
+    _Worker,
+)
+
+
+async def _heartbeat(stop: asyncio.Event, gaps: list, interval=0.01):
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        gaps.append(now - last)
+        last = now
+
+
+def test_large_mesh_analysis_keeps_event_loop_responsive(tmp_path, monkeypatch):
+    # An empty cache so the mesh is really analysed
+    monkeypatch.setattr(
+        fas, "analysis_cache", AnalysisCache(directory=str(tmp_path / "cache"))
+    )
+    path = tmp_path / "sphere.stl"
+    trimesh.creation.icosphere(subdivisions=6, radius=40).export(path)
+    service = fas.FileAnalysisService()
+
+    async def run():
+        stop, gaps = asyncio.Event(), []
+        ticker = asyncio.create_task(_heartbeat(stop, gaps))
+        try:
+            result = await service.analyze_file(str(path), {"material": "PLA"})
+        finally:
+            stop.set()
+            await ticker
+            service.pool.shutdown()
+        return result, gaps
+
+    result, gaps = asyncio.run(run())
+
+    assert "error" not in result
+    assert result["mesh_analysis"]["face_count"] == 81920
+    assert "mesh" not in result["mesh_analysis"]
+    # The loop kept ticking the whole time the worker was busy
+    assert len(gaps) > 10
+    assert max(gaps) < 0.25
+
+
+def test_timeout_terminates_worker_and_pool_recovers():
+    pool = ProcessJobPool(time.sleep, max_workers=1)
+
+    async def run():
+        with pytest.raises(AnalysisTimeout):
+            await pool.run(30, timeout=0.5)
+        # A fresh worker replaces the terminated one
+        assert await pool.run(0, timeout=30) is None
+
+    asyncio.run(run())
+    pool.shutdown()
+
+
+def test_cancel_and_queue_bound():
+    pool = ProcessJobPool(time.sleep, max_workers=1, max_queue=1)
+
+    async def run():
+        running = asyncio.create_task(pool.run(30))
+        queued = asyncio.create_task(pool.run(30))
+        await asyncio.sleep(0.1)
+        assert pool.stats()["queued"] == 1
+
+        with pytest.raises(AnalysisQueueFull):
+            await pool.run(0)
+
+        queued.cancel()
+        running.cancel()
+        results = await asyncio.gather(running, queued, return_exceptions=True)
+        assert all(isinstance(r, asyncio.CancelledError) for r in results)
+        assert pool.stats() == {
+            "max_workers": 1,
+            "running": 0,
+            "queued": 0,
+            "idle_workers": 0,
+        }
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    # Cancelling killed the 30s job instead of waiting for it
+    assert time.perf_counter() - started < 10
+
+
+def test_terminating_a_worker_keeps_the_loop_responsive(monkeypatch):
+    real_kill = _Worker.kill
+
+    def slow_kill(worker):
+        time.sleep(0.5)  # a worker slow to exit its join()
+        real_kill(worker)
+
+    monkeypatch.setattr(_Worker, "kill", slow_kill)
+    pool = ProcessJobPool(time.sleep, max_workers=1)
+
+    async def run():
+        stop, gaps = asyncio.Event(), []
+        ticker = asyncio.create_task(_heartbeat(stop, gaps))
+        try:
+            with pytest.raises(AnalysisTimeout):
+                await pool.run(30, timeout=0.5)
+        finally:
+            stop.set()
+            await ticker
+        return gaps
+
+    gaps = asyncio.run(run())
+    pool.shutdown()
+
+    assert max(gaps) < 0.25
+
+
+def test_shutdown_terminates_running_jobs():
+    pool = ProcessJobPool(time.sleep, max_workers=1)
+
+    async def run():
+        job = asyncio.create_task(pool.run(30))
+        await asyncio.sleep(0.5)
+        await asyncio.to_thread(pool.shutdown)
+        with pytest.raises(AnalysisError):
+            await job
+        assert pool.stats()["idle_workers"] == 0
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    assert time.perf_counter() - started < 10
@@ -0,0 +1,136 @@
+from fastapi import FastAPI, File, Request, UploadFile
+from fastapi.testclient import TestClient
+
+from backends.makrx_store.middleware import api_security
+from backends.makrx_store.middleware.asgi import (
+    ComposedMiddleware,
+    ObservabilityStage,
+    RequestContextStage,
+)
+from backends.makrx_store.middleware.observability import ObservabilityMiddleware
+
+VOLATILE = {"x-request-id", "x-response-time", "x-process-time", "set-cookie", "date"}
+
+
+def _app(composed, monkeypatch):
+    monkeypatch.setattr(api_security.settings, "REDIS_URL", None)
+    app = FastAPI()
+
+    @app.get("/api/items")
+    async def items(request: Request):
+        return {"request_id": request.state.request_id}
+
+    @app.post("/api/items")
+    async def create():
+        return {"ok": True}
+
+    @app.post("/api/uploads/file")
+    async def upload(request: Request):
+        return {"size": len(await request.body())}
+
+    @app.post("/api/uploads/form")
+    async def upload_form(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    if composed:
+        api_security.setup_api_security(
+            app, request_stages=[RequestContextStage(), ObservabilityStage()]
+        )
+    else:
+        api_security.setup_api_security(app, composed=False)
+        app.add_middleware(ObservabilityMiddleware)
+
+        @app.middleware("http")
+        async def request_middleware(request, call_next):
+            request.state.request_id = request.headers.get("X-Request-ID")
+            response = await call_next(request)
+            response.headers["X-Request-ID"] = request.state.request_id
+            return response
+
+    return TestClient(app)
+
+
+def _snapshot(response):
+    headers = {k: v for k, v in response.headers.items() if k not in VOLATILE}
+    return response.status_code, response.content, headers
+
+
+def test_composed_stack_matches_classic_middleware(monkeypatch):
+    classic = _app(False, monkeypatch)
+    composed = _app(True, monkeypatch)
+    cases = [
+        ("get", "/api/items", {"headers": {"X-Request-ID": "req-1"}}),
+        ("get", "/.env", {}),
+        ("post", "/api/items", {}),
+        ("post", "/api/items", {
+            "headers": {"X-CSRF-Token": "t", "Cookie": "csrf_token=t"}
+        }),
+        ("post", "/api/uploads/file", {
+            "content": b"x" * 10,
+            "headers": {"X-CSRF-Token": "t", "Cookie": "csrf_token=t"},
+        }),
+    ]
+
+    for method, path, kwargs in cases:
+        expected = getattr(classic, method)(path, **kwargs)
+        actual = getattr(composed, method)(path, **kwargs)
+        assert _snapshot(actual) == _snapshot(expected), (method, path)
+        assert ("set-cookie" in actual.headers) == ("set-cookie" in expected.headers)
+
+    # A fresh client, so the CSRF cookie has not been stored yet
+    response = _app(True, monkeypatch).get(
+        "/api/items", headers={"X-Request-ID": "req-1"}
+    )
+    assert response.json() == {"request_id": "req-1"}
+    assert response.headers["x-request-id"] == "req-1"
+    assert "csrf_token=" in response.headers["set-cookie"]
+    assert response.headers["x-frame-options"] == "DENY"
+
+
+def test_streamed_upload_is_cut_off_without_content_length(monkeypatch):
+    monkeypatch.setattr(api_security.APISecurityConfig, "MAX_UPLOAD_SIZE", 1000)
+    client = _app(True, monkeypatch)
+
+    def chunks():
+        for _ in range(20):
+            yield b"x" * 100
+
+    response = client.post(
+        "/api/uploads/file",
+        content=chunks(),
+        headers={"X-CSRF-Token": "t", "Cookie": "csrf_token=t"},
+    )
+
+    assert response.status_code == 413
+    assert response.headers["x-frame-options"] == "DENY"
+
+
+def test_oversize_multipart_upload_gets_413_in_one_pass(monkeypatch):
+    monkeypatch.setattr(api_security.APISecurityConfig, "MAX_UPLOAD_SIZE", 1000)
+    client = _app(True, monkeypatch)
+    composed = [
+        m for m in client.app.user_middleware if m.cls is ComposedMiddleware
+    ]
+    assert len(composed) == 1  # request context and security share one pass
+
+    def chunks(body):
+        for start in range(0, len(body), 100):
+            yield body[start : start + 100]
+
+    csrf = {"X-CSRF-Token": "t", "Cookie": "csrf_token=t"}
+    for size, status in ((500, 200), (5000, 413)):
+        body = (
+            b"--b\r\n"
+            b'Content-Disposition: form-data; name="file"; filename="a.stl"\r\n'
+            b"Content-Type: application/octet-stream\r\n\r\n"
+            + b"x" * size
+            + b"\r\n--b--\r\n"
+        )
+        response = client.post(
+            "/api/uploads/form",
+            content=chunks(body),  # streamed, so no Content-Length
+            headers={"Content-Type": "multipart/form-data; boundary=b", **csrf},
+        )
+        assert response.status_code == status
+    assert response.headers["x-request-id"]
+    assert response.headers["x-frame-options"] == "DENY"
@@ -0,0 +1,149 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from backends.makrx_store.core.bom_matching import BOMMatcher, text_similarity
+from backends.makrx_store.models import services  # noqa: F401 (Order mapper)
+from backends.makrx_store.routes import bom_import
+from backends.makrx_store.routes.bom_import import BOMItem, map_bom_items_to_products
+
+
+class CountingSession:
+    """Sync ORM session behind the awaitable execute() API, counting queries"""
+
+    def __init__(self, session):
+        self.session = session
+        self.bind = session.bind
+        self.queries = 0
+
+    async def execute(self, stmt):
+        self.queries += 1
+        return self.session.execute(stmt)
+
+
+PRODUCTS = [
+    (
+        1,
+        "Stepper Motor NEMA 17",
+        "StepperOnline",
+        {"part_number": "17HS4401"},
+        None,
+        40,
+    ),
+    (2, "M3 x 10 Socket Head Screw", "Misumi", {}, "SCR-M3-10", 500),
+    (3, "Arduino Nano Every", "Arduino", {}, None, 0),
+    (4, "Arduino Nano Clone", "Generic", {}, None, 25),
+    (5, "PLA Filament 1.75mm Black", "eSun", {}, None, 12),
+]
+
+
+@pytest.fixture()
+def db(sqlite_products):
+    engine, table = sqlite_products
+    with engine.begin() as conn:
+        conn.execute(
+            table.insert(),
+            [
+                {
+                    "id": pid,
+                    "name": name,
+                    "slug": f"p-{pid}",
+                    "brand": brand,
+                    "attributes": attrs,
+                    "sku": sku,
+                    "price": Decimal("10.00"),
+                    "stock_quantity": stock,
+                    "is_active": True,
+                }
+                for pid, name, brand, attrs, sku, stock in PRODUCTS
+            ],
+        )
+    with Session(engine) as session:
+        yield CountingSession(session)
+
+
+def _item(i, name, quantity=1, manufacturer=None, part_number=None):
+    return BOMItem(
+        id=str(i),
+        name=name,
+        description=None,
+        quantity=quantity,
+        unit="pcs",
+        manufacturer=manufacturer,
+        part_number=part_number,
+    )
+
+
+def test_trigram_similarity_tolerates_typos_and_spacing():
+    assert text_similarity("Stepper Motor NEMA17", "Stepper Motor NEMA 17") > 0.7
+    assert text_similarity("PLA filament black", "Arduino Nano") < 0.2
+
+
+def test_whole_bom_matches_with_constant_queries(db, monkeypatch):
+    monkeypatch.setattr(bom_import, "bom_matcher", BOMMatcher())
+    items = [
+        _item(1, "NEMA17 motor", part_number="17HS4401"),
+        _item(2, "Screw", quantity=20, part_number="SCR-M3-10"),
+        _item(3, "Arduino Nano Every", manufacturer="Arduino", quantity=2),
+        _item(4, "PLA Filamant 1.75mm Black"),
+        _item(5, "Unobtainium widget"),
+    ]
+
+    results = asyncio.run(map_bom_items_to_products(db, items))
+
+    # One query for all exact codes, one to build the index, one for the
+    # live price and stock of the fuzzy matches
+    assert db.queries == 3
+    by_id = {r.bom_item_id: r for r in results}
+    assert by_id["1"].best_match.store_product_id == 1
+    assert by_id["1"].best_match.match_type == "exact"
+    assert by_id["2"].best_match.store_product_id == 2
+    assert by_id["3"].best_match.match_type == "partial"
+    assert by_id["3"].status == "out_of_stock"
+    assert by_id["4"].best_match.store_product_id == 5
+    assert by_id["4"].best_match.match_type == "fuzzy"
+    assert by_id["5"].status == "unmapped"
+
+    # A warm index skips the rebuild
+    asyncio.run(map_bom_items_to_products(db, items))
+    assert db.queries == 5
+
+
+def test_fuzzy_matches_report_current_stock_and_price(
+    db, sqlite_products, monkeypatch
+):
+    monkeypatch.setattr(bom_import, "bom_matcher", BOMMatcher())
+    items = [_item(1, "Arduino Nano Every", manufacturer="Arduino")]
+    first = asyncio.run(map_bom_items_to_products(db, items))[0]
+    assert first.status == "out_of_stock"
+
+    # Restocked and repriced through Core, as stock reservations do; no ORM
+    # event marks the index stale
+    _, products = sqlite_products
+    db.session.execute(
+        update(products)
+        .where(products.c.id == 3)
+        .values(stock_quantity=8, sale_price=Decimal("7.50"))
+    )
+    again = asyncio.run(map_bom_items_to_products(db, items))[0]
+
+    assert again.best_match.store_product_id == 3
+    assert again.best_match.quantity_available == 8
+    assert again.best_match.store_product_price == 7.5
+    assert again.status != "out_of_stock"
+
+
+def test_index_rebuilds_after_catalog_change(db):
+    matcher = BOMMatcher()
+
+    async def run():
+        first = await matcher.get_index(db)
+        assert await matcher.get_index(db) is first
+        matcher.mark_stale()
+        assert await matcher.get_index(db) is not first
+
+    asyncio.run(run())
+    assert db.queries == 2
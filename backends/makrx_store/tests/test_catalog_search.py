@@ -0,0 +1,61 @@
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from backends.makrx_store.core.search import build_search_clause, tokenize_query
+from backends.makrx_store.models.commerce import Product
+
+
+def _search_ids(engine, query):
+    clause = build_search_clause(query, "sqlite")
+    stmt = (
+        select(Product.id)
+        .where(clause.condition)
+        .order_by(clause.rank.desc(), Product.id)
+    )
+    with engine.connect() as conn:
+        return list(conn.execute(stmt).scalars())
+
+
+def test_tokenize_query_strips_tsquery_syntax():
+    assert tokenize_query("PLA 1.75mm & !(abs):*") == ["pla", "1.75mm", "abs"]
+    assert tokenize_query("   ") == []
+
+
+def test_sqlite_fallback_ranks_name_matches_first(sqlite_products):
+    engine, table = sqlite_products
+
+    rows = [
+        (1, "Nozzle Kit", "Prusa", "Fits PLA printers"),
+        (2, "PLA Filament 1.75mm", "Generic", "Standard filament"),
+        (3, "Build Sheet", "PLA Works", "Spring steel"),
+        (4, "Hex Keys", "Generic", "Metric set"),
+    ]
+    with engine.begin() as conn:
+        conn.execute(
+            table.insert(),
+            [
+                {
+                    "id": pid,
+                    "name": name,
+                    "slug": f"p-{pid}",
+                    "brand": brand,
+                    "description": description,
+                    "price": 10,
+                }
+                for pid, name, brand, description in rows
+            ],
+        )
+
+    assert _search_ids(engine, "pla") == [2, 3, 1]
+    assert _search_ids(engine, "pla filament") == [2]
+    assert build_search_clause("", "sqlite") is None
+
+
+def test_postgres_clause_uses_text_search_index():
+    clause = build_search_clause("pla filament", "postgresql")
+    stmt = select(Product.id).where(clause.condition).order_by(clause.rank)
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+    assert "store_products.search_vector @@ to_tsquery('english'" in sql
+    assert "ts_rank_cd(store_products.search_vector" in sql
+    assert "store_products.name %" in sql
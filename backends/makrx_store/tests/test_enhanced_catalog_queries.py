@@ -0,0 +1,115 @@
+import asyncio
+from decimal import Decimal
+from types import SimpleNamespace
+
+from fastapi import BackgroundTasks
+
+from backends.makrx_store.models.commerce import Product
+from backends.makrx_store.models.reviews import ProductRatingSummary
+from backends.makrx_store.routes.enhanced_catalog import (
+    AdvancedSearchRequest,
+    advanced_product_search,
+)
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def scalar_one(self):
+        return self._rows[0]
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return list(self._rows)
+
+    def first(self):
+        return self._rows[0] if self._rows else None
+
+
+class RecordingSession:
+    """Minimal AsyncSession stand-in that counts executed statements"""
+
+    def __init__(self, products, summaries):
+        self.products = products
+        self.summaries = summaries
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        entity = stmt.column_descriptions[0].get("entity")
+        if entity is Product:
+            return _Result(self.products)
+        if entity is ProductRatingSummary:
+            return _Result(self.summaries)
+        return _Result([len(self.products)])
+
+
+def _make_products(n):
+    return [
+        SimpleNamespace(
+            id=i,
+            slug=f"p-{i}",
+            name=f"Product {i}",
+            description=None,
+            short_description=None,
+            brand=None,
+            price=Decimal("10.00"),
+            sale_price=None,
+            currency="INR",
+            stock_qty=5,
+            is_featured=False,
+            images=[],
+            attributes={},
+            specifications={},
+            compatibility=[],
+            tags=[],
+            created_at=None,
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+def _search(per_page):
+    products = _make_products(per_page)
+    summaries = [
+        SimpleNamespace(
+            product_id=p.id,
+            average_rating=Decimal("4.50"),
+            total_reviews=3,
+            verified_reviews=1,
+        )
+        for p in products[::2]
+    ]
+    db = RecordingSession(products, summaries)
+    request = AdvancedSearchRequest(
+        per_page=per_page, include_suggestions=False, include_facets=False
+    )
+    response = asyncio.run(
+        advanced_product_search(request, BackgroundTasks(), db=db)
+    )
+    return db, response
+
+
+def test_search_page_query_count_is_constant():
+    small_db, _ = _search(per_page=5)
+    large_db, response = _search(per_page=50)
+
+    # count + page + one batched rating lookup, independent of page size
+    assert len(small_db.statements) == 3
+    assert len(large_db.statements) == 3
+    assert len(response.products) == 50
+
+
+def test_search_page_attaches_batched_ratings():
+    _, response = _search(per_page=4)
+    by_id = {p["id"]: p for p in response.products}
+
+    assert by_id[1]["rating"] == {
+        "average": 4.5,
+        "count": 3,
+        "verified_count": 1,
+    }
+    assert "rating" not in by_id[2]
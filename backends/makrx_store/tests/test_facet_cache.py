@@ -0,0 +1,144 @@
+import asyncio
+from types import SimpleNamespace
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from backends.makrx_store.core.facets import (
+    FacetCache,
+    facet_cache,
+    normalize_facet_key,
+)
+from backends.makrx_store.models import services  # noqa: F401 (Order mapper)
+from backends.makrx_store.models.commerce import Product
+from backends.makrx_store.routes import enhanced_catalog
+from backends.makrx_store.routes.enhanced_catalog import (
+    AdvancedProductFilter,
+    build_search_facets,
+)
+
+
+class _Result:
+    def all(self):
+        return []
+
+    def first(self):
+        return SimpleNamespace(min_price=None, max_price=None)
+
+
+class CountingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return _Result()
+
+
+def test_normalized_key_ignores_ordering_and_unset_filters():
+    a = AdvancedProductFilter(brands=["Prusa", "eSun"], category_ids=[3, 1])
+    b = AdvancedProductFilter(category_ids=[1, 3], brands=["eSun", "Prusa"])
+
+    assert normalize_facet_key("PLA  silk", a) == normalize_facet_key(
+        "pla silk", b
+    )
+    assert normalize_facet_key(None, a) != normalize_facet_key("pla", a)
+    assert normalize_facet_key(None, AdvancedProductFilter()) == "{}"
+
+
+def test_cache_counts_hits_and_misses_and_invalidates():
+    cache = FacetCache(ttl_seconds=60, max_entries=2)
+    builds = []
+
+    async def builder():
+        builds.append(1)
+        return ["facets"]
+
+    async def run():
+        await cache.get_or_build("a", builder)
+        await cache.get_or_build("a", builder)
+        cache.invalidate()
+        await cache.get_or_build("a", builder)
+
+    asyncio.run(run())
+
+    assert len(builds) == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 1)
+
+
+def test_cancelled_build_does_not_strand_waiters():
+    cache = FacetCache(ttl_seconds=60, max_entries=2)
+    started = []
+
+    async def builder():
+        started.append(1)
+        if len(started) == 1:
+            await asyncio.sleep(3600)  # the first build never finishes
+        return ["facets"]
+
+    async def run():
+        first = asyncio.create_task(cache.get_or_build("a", builder))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_build("a", builder))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await asyncio.wait_for(waiter, timeout=1), first
+
+    value, first = asyncio.run(run())
+
+    assert value == ["facets"] and first.cancelled()
+    assert len(started) == 2  # the waiter rebuilt the value itself
+    assert cache._inflight == {}
+    assert cache.get("a") == ["facets"]
+
+
+def test_cache_evicts_least_recently_used_and_expires():
+    cache = FacetCache(ttl_seconds=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+    cache.ttl_seconds = 0
+    cache.set("d", 4)
+    assert cache.get("d") is None
+
+
+def test_hot_facet_queries_skip_the_database(monkeypatch):
+    monkeypatch.setattr(
+        enhanced_catalog, "facet_cache", FacetCache(ttl_seconds=60, max_entries=8)
+    )
+    filters = AdvancedProductFilter(category_ids=[1])
+    db = CountingSession()
+
+    asyncio.run(build_search_facets(db, filters, "pla"))
+    assert len(db.statements) == 3
+
+    # Category facet must not be narrowed by its own filter, others must be
+    cats_sql = str(db.statements[0])
+    brands_sql = str(db.statements[1])
+    assert "store_products.category_id IN" not in cats_sql
+    assert "store_products.category_id IN" in brands_sql
+
+    asyncio.run(build_search_facets(db, filters, "pla"))
+    assert len(db.statements) == 3
+
+
+def test_product_writes_invalidate_on_commit_not_flush(sqlite_products):
+    engine, table = sqlite_products
+    with engine.begin() as conn:
+        conn.execute(insert(table).values(id=1, name="PLA", slug="pla", price=10))
+
+    with Session(engine) as session:
+        before = facet_cache.invalidations
+        session.get(Product, 1).price = 12
+        session.flush()
+        # A facet build here still reads the committed price
+        assert facet_cache.invalidations == before
+        session.commit()
+        assert facet_cache.invalidations == before + 1
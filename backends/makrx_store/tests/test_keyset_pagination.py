@@ -0,0 +1,134 @@
+import asyncio
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from backends.makrx_store.core.pagination import (
+    InvalidCursor,
+    count_rows,
+    decode_cursor,
+    encode_cursor,
+    fetch_keyset_page,
+    order_by_clauses,
+)
+from backends.makrx_store.models.commerce import Product
+
+
+class AsyncSessionAdapter:
+    """Expose a sync ORM session through the awaitable execute() API"""
+
+    def __init__(self, session):
+        self.session = session
+        self.bind = session.bind
+
+    async def execute(self, stmt):
+        return self.session.execute(stmt)
+
+
+@pytest.fixture()
+def db(sqlite_products):
+    engine, table = sqlite_products
+    with engine.begin() as conn:
+        conn.execute(
+            table.insert(),
+            [
+                {
+                    "id": pid,
+                    "name": f"Product {pid}",
+                    "slug": f"p-{pid}",
+                    # Few distinct prices so the id tiebreak matters
+                    "price": Decimal(100 + (pid * 7) % 5),
+                    "status": "active",
+                }
+                for pid in range(1, 26)
+            ],
+        )
+    with Session(engine) as session:
+        yield AsyncSessionAdapter(session)
+
+
+def _walk(db, order_keys, limit):
+    async def run():
+        ids, cursor, pages = [], None, 0
+        while True:
+            page = await fetch_keyset_page(
+                db, select(Product), order_keys, "price", cursor, limit
+            )
+            ids.extend(p.id for p in page.items)
+            pages += 1
+            if page.next_cursor is None:
+                return ids, pages
+            cursor = page.next_cursor
+
+    return asyncio.run(run())
+
+
+def test_cursor_walk_matches_offset_ordering(db):
+    price = func.coalesce(Product.sale_price, Product.price)
+    order_keys = [(price, True), (Product.id, False)]
+    expected = [
+        p.id
+        for p in db.session.execute(
+            select(Product).order_by(price.desc(), Product.id)
+        ).scalars()
+    ]
+
+    ids, pages = _walk(db, order_keys, limit=10)
+
+    assert ids == expected
+    assert pages == 3
+
+
+def test_cursor_walk_crosses_null_sort_keys(db):
+    # Mostly NULL is_featured/created_at, so page boundaries land on NULLs
+    for pid in range(1, 26):
+        product = db.session.get(Product, pid)
+        product.is_featured = {0: True, 1: False}.get(pid % 3)
+        product.created_at = (
+            None if pid % 4 else datetime(2026, 1, pid, tzinfo=timezone.utc)
+        )
+    db.session.commit()
+    order_keys = [
+        (Product.is_featured, True),
+        (Product.created_at, True),
+        (Product.id, False),
+    ]
+    expected = [
+        p.id
+        for p in db.session.execute(
+            select(Product).order_by(*order_by_clauses(order_keys))
+        ).scalars()
+    ]
+
+    for limit in (2, 3, 4, 7):
+        ids, _ = _walk(db, order_keys, limit=limit)
+        assert ids == expected
+    assert sorted(expected) == list(range(1, 26))
+    # NULLs sort last for both keys
+    assert db.session.get(Product, expected[-1]).is_featured is None
+
+
+def test_cursor_is_bound_to_its_ordering():
+    cursor = encode_cursor("price", [Decimal("10.50"), 7])
+    assert decode_cursor(cursor, "price", 2) == [Decimal("10.50"), 7]
+
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, "newest", 2)
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor!", "price", 2)
+
+
+def test_count_modes(db):
+    stmt = select(Product).where(Product.price >= 102)
+
+    exact = asyncio.run(count_rows(db, stmt, "exact"))
+    # SQLite has no planner estimate, so "estimate" falls back to exact
+    estimate = asyncio.run(count_rows(db, stmt, "estimate"))
+    skipped = asyncio.run(count_rows(db, stmt, "none"))
+
+    assert exact == (15, False)
+    assert estimate == exact
+    assert skipped == (None, False)
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from backends.makrx_store.routes import quotes
+from backends.makrx_store.routes.quotes import QuoteMatrixRequest
+
+
+def test_matrix_endpoint_prices_every_tier_and_validates():
+    request = QuoteMatrixRequest(
+        upload_id="upload-1",
+        materials=["pla", "petg"],
+        qualities=["draft", "standard", "high"],
+        quantities=[1, 10, 100],
+    )
+    response = asyncio.run(quotes.create_quote_matrix(request, current_user=None))
+
+    assert len(response.quotes) == 18
+    first = response.quotes[0]
+    assert (first["material"], first["quality"], first["quantity"]) == (
+        "PLA",
+        "draft",
+        1,
+    )
+    last = response.quotes[-1]
+    assert (last["material"], last["quality"], last["quantity"]) == (
+        "PETG",
+        "high",
+        100,
+    )
+
+    request.materials = ["pla", "mithril"]
+    with pytest.raises(HTTPException) as invalid:
+        asyncio.run(quotes.create_quote_matrix(request, current_user=None))
+    assert invalid.value.status_code == 400
+
+    request.materials = ["pla"]
+    request.quantities = [1, 101]
+    with pytest.raises(HTTPException) as invalid:
+        asyncio.run(quotes.create_quote_matrix(request, current_user=None))
+    assert invalid.value.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "options, delivery",
+    [
+        ({}, {}),
+        (
+            {
+                "infill_percentage": 35,
+                "layer_height": 0.12,
+                "supports": True,
+                "brim": True,
+                "rush_order": True,
+            },
+            {"delivery_address": {"city": "Pune"}},
+        ),
+    ],
+)
+def test_matrix_cells_match_create_quote(options, delivery):
+    request = QuoteMatrixRequest(
+        upload_id="upload-1",
+        materials=list(quotes.MATERIALS),
+        qualities=list(quotes.QUALITY_SETTINGS),
+        quantities=[1, 7, 100],
+        **options,
+        **delivery,
+    )
+    response = asyncio.run(quotes.create_quote_matrix(request, current_user=None))
+
+    assert len(response.quotes) == 6 * 4 * 3
+    for cell in response.quotes:
+        quote = asyncio.run(
+            quotes.create_quote(
+                quotes.QuoteRequest(
+                    upload_id="upload-1",
+                    print_settings=quotes.PrintSettings(
+                        material=cell["material"],
+                        quality=cell["quality"],
+                        quantity=cell["quantity"],
+                        **options,
+                    ),
+                    **delivery,
+                ),
+                db=None,
+                current_user=None,
+            )
+        )
+        assert cell["total_cost"] == quote.total_price
+        for key in ("subtotal", "tax_amount", "delivery_cost"):
+            assert cell[key] == quote.breakdown[key]
@@ -0,0 +1,105 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backends.makrx_store.core.rate_limit import GCRARateLimiter
+from backends.makrx_store.middleware import api_security
+
+
+class FakeRedis:
+    """Executes the GCRA script semantics in Python with a controllable clock"""
+
+    def __init__(self):
+        self.now_ms = 1_000_000
+        self.tats = {}
+        self.calls = 0
+
+    def register_script(self, source):
+        assert "redis.call('TIME')" in source
+
+        async def script(keys, args):
+            self.calls += 1
+            interval, burst = args
+            new_tats = []
+            remaining = -1
+            for i, key in enumerate(keys, start=1):
+                tat = max(self.tats.get(key, self.now_ms), self.now_ms)
+                new_tat = tat + interval
+                allow_at = new_tat - burst
+                if allow_at > self.now_ms:
+                    return [0, i, allow_at - self.now_ms, 0]
+                new_tats.append(new_tat)
+                left = (self.now_ms - allow_at) // interval
+                remaining = left if remaining < 0 else min(remaining, left)
+            self.tats.update(zip(keys, new_tats))
+            return [1, 0, 0, remaining]
+
+        return script
+
+
+def test_burst_within_one_second_is_fully_counted():
+    redis = FakeRedis()
+    limiter = GCRARateLimiter(redis)
+
+    async def run():
+        return [await limiter.check(["ip:a"], limit=5, window=300) for _ in range(7)]
+
+    results = asyncio.run(run())
+
+    assert [r.allowed for r in results] == [True] * 5 + [False] * 2
+    assert results[0].remaining == 4
+    # One emission interval (60s) until the next request is admitted
+    assert results[5].retry_after == 60
+    # The second rejection came from the local pre-filter
+    assert redis.calls == 6
+
+
+def test_user_rejection_does_not_consume_ip_allowance():
+    redis = FakeRedis()
+    limiter = GCRARateLimiter(redis)
+
+    async def run():
+        await limiter.check(["ip:a", "user:u"], limit=2, window=10)
+        await limiter.check(["ip:b", "user:u"], limit=2, window=10)
+        denied = await limiter.check(["ip:a", "user:u"], limit=2, window=10)
+        ip_only = await limiter.check(["ip:a"], limit=2, window=10)
+        return denied, ip_only
+
+    denied, ip_only = asyncio.run(run())
+
+    assert denied.denied_key == "user:u"
+    assert ip_only.allowed
+
+
+def test_middleware_checks_ip_and_user_in_one_call(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(
+        api_security.AsyncRedis, "from_url", staticmethod(lambda url: redis)
+    )
+    monkeypatch.setitem(
+        api_security.APISecurityConfig.RATE_LIMITS,
+        "quote",
+        {"requests": 2, "window": 60},
+    )
+    app = FastAPI()
+
+    @app.get("/api/quote")
+    async def quote():
+        return {"ok": True}
+
+    app.add_middleware(api_security.RateLimitMiddleware, redis_url="redis://test")
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer abc", "X-Forwarded-For": "10.0.0.1"}
+
+    codes = [client.get("/api/quote", headers=headers).status_code for _ in range(3)]
+
+    assert codes == [200, 200, 429]
+    assert redis.calls == 3
+    assert len(redis.tats) == 2  # one IP key and one user key
+    # Same hash tag, so Redis Cluster serves the script from one slot
+    assert {key.split("{")[1].split("}")[0] for key in redis.tats} == {"quote"}
+    denied = client.get("/api/quote", headers=headers)
+    assert denied.json()["type"] == "ip_limit_quote"
+    assert denied.headers["Retry-After"] == "30"
+    assert redis.calls == 3  # served by the pre-filter
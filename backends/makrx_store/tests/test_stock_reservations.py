@@ -0,0 +1,169 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from backends.makrx_store.core import stock_reservations as stock
+from backends.makrx_store.core.facets import facet_cache
+from backends.makrx_store.models.commerce import StockReservation
+
+reservations = StockReservation.__table__
+NOW = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+
+
+class AsyncSessionAdapter:
+    """Expose a sync session through the awaitable execute()/commit() API"""
+
+    def __init__(self, session):
+        self.session = session
+        self.info = session.info
+
+    async def execute(self, stmt, params=None):
+        return self.session.execute(stmt, params)
+
+    async def commit(self):
+        self.session.commit()
+
+
+@pytest.fixture()
+def db(sqlite_products):
+    engine, table = sqlite_products
+    reservations.create(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(table),
+            [
+                {
+                    "id": id_,
+                    "name": name,
+                    "stock_quantity": qty,
+                    "track_inventory": tracked,
+                    "allow_backorder": backorder,
+                }
+                for id_, name, qty, tracked, backorder in [
+                    (1, "Filament", 5, True, False),
+                    (2, "Nozzle", 1, True, False),
+                    (3, "Service", None, False, False),
+                    (4, "Preorder", 0, True, True),
+                ]
+            ],
+        )
+    session = Session(engine)
+    yield AsyncSessionAdapter(session), table
+    session.close()
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def _stock(db, table):
+    rows = db.session.execute(select(table.c.id, table.c.stock_quantity))
+    return dict(rows.all())
+
+
+def _statuses(db):
+    rows = db.session.execute(
+        select(reservations.c.status).order_by(reservations.c.id)
+    )
+    return rows.scalars().all()
+
+
+def test_reserve_takes_stock_only_when_it_is_there(db):
+    db, table = db
+    held = _run(stock.reserve_stock(db, 1, 3, "u1", cart_id=10, now=NOW))
+    assert (held.product_id, held.quantity, held.remaining) == (1, 3, 2)
+
+    with pytest.raises(stock.InsufficientStock) as short:
+        _run(stock.reserve_stock(db, 1, 3, "u2", cart_id=11, now=NOW))
+    assert (short.value.requested, short.value.available) == (3, 2)
+    with pytest.raises(stock.InsufficientStock):
+        _run(stock.reserve_stock(db, 99, 1, "u2"))
+
+    assert _run(stock.reserve_stock(db, 3, 50, "u2", cart_id=11)) is None
+    assert _run(stock.reserve_stock(db, 4, 2, "u2", cart_id=11)).remaining == -2
+    db.session.commit()
+
+    assert _stock(db, table) == {1: 2, 2: 1, 3: None, 4: -2}
+    reservation = db.session.execute(
+        select(reservations).where(reservations.c.id == held.id)
+    ).one()
+    assert reservation.status == stock.HELD
+    expires = reservation.expires_at.replace(tzinfo=timezone.utc)
+    assert expires == NOW + timedelta(seconds=900)
+
+
+def test_sweeper_and_checkout_release_each_hold_once(db):
+    db, table = db
+    _run(stock.reserve_stock(db, 1, 2, "u1", cart_id=10, ttl_seconds=60, now=NOW))
+    _run(stock.reserve_stock(db, 2, 1, "u1", cart_id=10, ttl_seconds=60, now=NOW))
+    _run(stock.reserve_stock(db, 1, 1, "u2", cart_id=11, ttl_seconds=600, now=NOW))
+    db.session.commit()
+    assert _stock(db, table)[1] == 2
+
+    later = NOW + timedelta(seconds=120)
+    assert _run(stock.sweep_expired_reservations(db, now=later, batch_size=1)) == 3
+    assert _run(stock.sweep_expired_reservations(db, now=later)) == 0
+    assert _stock(db, table) == {1: 4, 2: 1, 3: None, 4: 0}
+
+    # The swept cart has nothing left to hand to its order
+    assert _run(stock.commit_cart_reservations(db, 10, 7, {1: 2, 2: 1})) == {}
+    assert _run(stock.commit_cart_reservations(db, 11, 8, {1: 1})) == {1: 1}
+    assert _run(stock.release_cart_reservations(db, 11)) == {}
+    db.session.commit()
+    assert _statuses(db) == ["released", "released", "committed"]
+
+    # Cancelling the order returns its units exactly once
+    assert _run(stock.release_order_reservations(db, 8, now=later)) == {1: 1}
+    assert _run(stock.release_order_reservations(db, 8, now=later)) == {}
+    db.session.commit()
+    assert _stock(db, table)[1] == 5
+
+
+
+def test_checkout_commits_only_what_the_order_lists(db):
+    db, table = db
+    for product_id, quantity in [(1, 2), (1, 2), (2, 1)]:
+        _run(stock.reserve_stock(db, product_id, quantity, "u1", cart_id=20, now=NOW))
+    db.session.commit()
+    assert _stock(db, table)[1] == 1
+
+    # The cart holds 4 filament and a nozzle, the order lists 3 filament
+    assert _run(stock.commit_cart_reservations(db, 20, 9, {1: 3})) == {1: 3}
+    db.session.commit()
+
+    assert _stock(db, table) == {1: 2, 2: 1, 3: None, 4: 0}
+    rows = db.session.execute(
+        select(
+            reservations.c.product_id,
+            reservations.c.quantity,
+            reservations.c.status,
+            reservations.c.order_id,
+        ).order_by(reservations.c.id)
+    ).all()
+    assert rows == [
+        (1, 2, "committed", 9),
+        (1, 1, "released", None),
+        (2, 1, "released", None),
+        (1, 1, "committed", 9),
+    ]
+    assert _run(stock.release_order_reservations(db, 9)) == {1: 3}
+
+def test_selling_out_and_restocking_invalidate_facets_after_commit(db):
+    db, table = db
+    before = facet_cache.invalidations
+    _run(stock.reserve_stock(db, 1, 2, "u1", cart_id=10, now=NOW))
+    db.session.commit()
+    assert facet_cache.invalidations == before  # still in stock
+
+    _run(stock.reserve_stock(db, 2, 1, "u1", cart_id=10, now=NOW))
+    assert facet_cache.invalidations == before
+    db.session.commit()
+    assert facet_cache.invalidations == before + 1
+
+    _run(stock.release_cart_reservations(db, 10))
+    db.session.commit()
+    assert facet_cache.invalidations == before + 2
+    assert _stock(db, table)[2] == 1
@@ -1,5 +1,23 @@
 """Utility helpers shared across MakrX backend services."""
 
 from .api_errors import error_detail
+from .jwt_verifier import (
+    JWKSKeySet,
+    KeySetUnavailable,
+    TokenVerificationError,
+    TokenVerifier,
+    VerifiedClaimsCache,
+    shared_key_set,
+)
+from .ws_fanout import FanoutHub
 
-__all__ = ["error_detail"]
+__all__ = [
+    "error_detail",
+    "FanoutHub",
+    "JWKSKeySet",
+    "KeySetUnavailable",
+    "TokenVerificationError",
+    "TokenVerifier",
+    "VerifiedClaimsCache",
+    "shared_key_set",
+]
@@ -0,0 +1,381 @@
+"""Shared Keycloak JWT verification for MakrX backend services.
+
+One JWKS key set per URL is shared by every verifier in the process. The set
+refreshes single-flight (concurrent misses wait on one fetch) and rotates in
+the background before it goes stale. Verified claims are kept in a small LRU
+keyed by token hash, and no entry outlives the token's ``exp``.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import httpx
+from jose import jwk, jwt
+from jose.backends.base import Key
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError, JWTError
+
+logger = logging.getLogger(__name__)
+
+_UNSET = object()
+
+
+class TokenVerificationError(Exception):
+    """Token rejected; ``code`` is the machine-readable reason"""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class KeySetUnavailable(TokenVerificationError):
+    """No signing keys could be loaded from Keycloak"""
+
+    def __init__(self, message: str = "Authentication service unavailable"):
+        super().__init__("auth_unavailable", message)
+
+
+class JWKSKeySet:
+    """
+    Signing keys for one realm, parsed once into jose Key objects.
+
+    Known keys are served from memory; a stale set is refreshed in the
+    background while the old keys keep verifying. An unknown ``kid`` (key
+    rotation) forces one refresh, rate limited by ``min_refresh_interval``
+    so garbage kids cannot hammer Keycloak.
+    """
+
+    def __init__(
+        self,
+        jwks_url: str,
+        realm_url: Optional[str] = None,
+        ttl: float = 3600.0,
+        min_refresh_interval: float = 10.0,
+        timeout: float = 5.0,
+        retries: int = 3,
+        algorithm: str = "RS256",
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.jwks_url = jwks_url
+        self.realm_url = realm_url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.retries = retries
+        self.algorithm = algorithm
+        self.transport = transport
+
+        self._keys: Dict[str, Key] = {}
+        self._realm_key: Optional[Key] = None
+        self._realm_fetched_at = 0.0
+        self.realm_public_key_pem: Optional[str] = None
+        self._fetched_at = 0.0
+        self._attempted_at = 0.0
+        self._refresh: Optional[asyncio.Task] = None
+        self._rotation: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.fetches = 0
+
+    def _bind_loop(self) -> None:
+        # Tasks and pooled connections belong to one event loop; start fresh
+        # when used from another (test clients, reloads)
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._client = None
+            self._refresh = None
+            self._rotation = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout, transport=self.transport
+            )
+        return self._client
+
+    def is_fresh(self) -> bool:
+        return bool(self._keys) and time.monotonic() - self._fetched_at < self.ttl
+
+    def load(self, jwks: Dict[str, Any]) -> None:
+        """Replace the key set from a JWKS document"""
+        keys = {}
+        for entry in jwks.get("keys", []):
+            kid = entry.get("kid")
+            if not kid or entry.get("use", "sig") != "sig":
+                continue
+            try:
+                if entry.get("kty") == "RSA" and "n" in entry:
+                    keys[kid] = jwk.construct(entry, self.algorithm)
+                elif entry.get("x5c"):
+                    pem = (
+                        "-----BEGIN CERTIFICATE-----\n"
+                        f"{entry['x5c'][0]}\n"
+                        "-----END CERTIFICATE-----"
+                    )
+                    keys[kid] = jwk.construct(pem, self.algorithm)
+            except Exception as e:
+                logger.warning(f"Skipping unusable JWKS key {kid}: {e}")
+        if keys:
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+
+    async def _get_json(self, url: str) -> Dict[str, Any]:
+        last_error: Optional[Exception] = None
+        for attempt in range(self.retries):
+            try:
+                response = await self.client.get(url)
+                response.raise_for_status()
+                return response.json()
+            except Exception as e:
+                last_error = e
+                if attempt + 1 < self.retries:
+                    await asyncio.sleep(0.2)
+        raise last_error  # type: ignore[misc]
+
+    async def _fetch(self) -> None:
+        self._attempted_at = time.monotonic()
+        self.fetches += 1
+        try:
+            self.load(await self._get_json(self.jwks_url))
+        except Exception as e:
+            # Keep serving the previous keys; callers see a missing kid
+            logger.error(f"Failed to fetch JWKS from {self.jwks_url}: {e}")
+
+    async def refresh(self) -> None:
+        """Fetch the JWKS, joining a fetch that is already in flight"""
+        self._bind_loop()
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.create_task(self._fetch())
+        # shield: a cancelled request must not abort the shared fetch
+        await asyncio.shield(self._refresh)
+
+    def _ensure_rotation(self) -> None:
+        if self._rotation is None or self._rotation.done():
+            self._rotation = asyncio.create_task(self._rotate())
+
+    async def _rotate(self) -> None:
+        # Refresh ahead of expiry so requests never wait on a stale set
+        while True:
+            age = time.monotonic() - self._fetched_at
+            await asyncio.sleep(max(self.ttl * 0.8 - age, self.min_refresh_interval))
+            await self.refresh()
+
+    async def get_key(self, kid: Optional[str]) -> Optional[Key]:
+        """Key for ``kid``; None when the realm does not publish it"""
+        self._bind_loop()
+        if not self._keys:
+            # While Keycloak is down, fail fast instead of queueing fetches
+            if time.monotonic() - self._attempted_at >= self.min_refresh_interval:
+                await self.refresh()
+            if not self._keys:
+                raise KeySetUnavailable()
+        self._ensure_rotation()
+
+        key = self._keys.get(kid) if kid else None
+        if key is not None:
+            if not self.is_fresh():
+                self._refresh_in_background()
+            return key
+        if kid and time.monotonic() - self._attempted_at >= self.min_refresh_interval:
+            await self.refresh()
+            return self._keys.get(kid)
+        return None
+
+    def _refresh_in_background(self) -> None:
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.create_task(self._fetch())
+
+    async def get_realm_key(self, force: bool = False) -> Key:
+        """Realm public key from the realm metadata (tokens without a kid)"""
+        if self.realm_url is None:
+            raise KeySetUnavailable("No realm public key configured")
+        self._bind_loop()
+        stale = time.monotonic() - self._realm_fetched_at >= self.ttl
+        if self._realm_key is None or stale or force:
+            try:
+                info = await self._get_json(self.realm_url)
+                pem = (
+                    "-----BEGIN PUBLIC KEY-----\n"
+                    f"{info['public_key']}\n"
+                    "-----END PUBLIC KEY-----"
+                )
+                self._realm_key = jwk.construct(pem, self.algorithm)
+                self.realm_public_key_pem = pem
+                self._realm_fetched_at = time.monotonic()
+            except Exception as e:
+                if self._realm_key is None:
+                    raise KeySetUnavailable(
+                        "Could not connect to authentication service"
+                    ) from e
+                logger.warning(f"Realm key refresh failed, using cached key: {e}")
+                # Retry after min_refresh_interval rather than on every request
+                self._realm_fetched_at = (
+                    time.monotonic() - self.ttl + self.min_refresh_interval
+                )
+        return self._realm_key
+
+    async def aclose(self) -> None:
+        for task in (self._rotation, self._refresh):
+            if task is not None and not task.done():
+                task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = self._rotation = self._refresh = None
+
+
+class VerifiedClaimsCache:
+    """LRU of verified claims; entries expire at the token's ``exp``"""
+
+    def __init__(self, max_entries: int = 10_000, max_age: float = 300.0):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        # (token digest, audience) -> (expires at, claims)
+        self._entries: "OrderedDict[Tuple[bytes, Any], Tuple[float, Dict]]" = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[bytes, Any]) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, claims = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return claims
+
+    def put(self, key: Tuple[bytes, Any], claims: Dict[str, Any]) -> None:
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)) or self.max_entries <= 0:
+            return
+        self._entries[key] = (min(exp, time.time() + self.max_age), claims)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TokenVerifier:
+    """Verifies RS256 access tokens for one issuer against a shared key set"""
+
+    def __init__(
+        self,
+        keys: JWKSKeySet,
+        issuer: str,
+        audience: Optional[str] = None,
+        algorithms: Iterable[str] = ("RS256",),
+        cache: Optional[VerifiedClaimsCache] = None,
+        require_kid: bool = False,
+        use_jwks: bool = True,
+        realm_key_fallback: bool = False,
+    ):
+        self.keys = keys
+        self.issuer = issuer
+        self.audience = audience
+        self.algorithms = list(algorithms)
+        self.cache = cache if cache is not None else VerifiedClaimsCache()
+        self.require_kid = require_kid
+        self.use_jwks = use_jwks
+        self.realm_key_fallback = realm_key_fallback or not use_jwks
+
+    async def _signing_key(self, kid: Optional[str]) -> Key:
+        key = None
+        if self.use_jwks and kid:
+            try:
+                key = await self.keys.get_key(kid)
+            except KeySetUnavailable:
+                if not self.realm_key_fallback:
+                    raise
+        if key is not None:
+            return key
+        if not self.realm_key_fallback:
+            raise TokenVerificationError(
+                "invalid_token", "Invalid token: key not found"
+            )
+        return await self.keys.get_realm_key()
+
+    async def verify(self, token: str, audience: Any = _UNSET) -> Dict[str, Any]:
+        """
+        Return the token's claims or raise TokenVerificationError.
+
+        ``audience`` overrides the verifier default; None skips the check.
+        The returned dict is a copy and may be modified by the caller.
+        """
+        audience = self.audience if audience is _UNSET else audience
+        cache_key = (hashlib.sha256(token.encode()).digest(), audience)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError:
+            raise TokenVerificationError("invalid_token", "Invalid token")
+        if header.get("alg") not in self.algorithms:
+            raise TokenVerificationError("invalid_token", "Invalid token")
+
+        kid = header.get("kid")
+        if not kid and self.require_kid:
+            raise TokenVerificationError(
+                "invalid_token", "Invalid token: missing key ID"
+            )
+        key = await self._signing_key(kid)
+
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=self.algorithms,
+                audience=audience,
+                issuer=self.issuer,
+                options={"verify_aud": audience is not None},
+            )
+        except ExpiredSignatureError:
+            raise TokenVerificationError("token_expired", "Token expired")
+        except JWTClaimsError as e:
+            reason = str(e).lower()
+            if "audience" in reason:
+                raise TokenVerificationError(
+                    "invalid_audience", f"Token not valid for audience: {audience}"
+                )
+            if "issuer" in reason:
+                raise TokenVerificationError(
+                    "invalid_issuer", "Token from invalid issuer"
+                )
+            raise TokenVerificationError("invalid_token", "Invalid token")
+        except JWTError as e:
+            logger.error(f"JWT verification failed: {e}")
+            raise TokenVerificationError("invalid_token", "Invalid token")
+
+        self.cache.put(cache_key, claims)
+        return dict(claims)
+
+
+_key_sets: Dict[str, JWKSKeySet] = {}
+
+
+def shared_key_set(jwks_url: str, **kwargs: Any) -> JWKSKeySet:
+    """Process-wide key set for ``jwks_url``; options apply on first use"""
+    key_set = _key_sets.get(jwks_url)
+    if key_set is None:
+        key_set = _key_sets[jwks_url] = JWKSKeySet(jwks_url, **kwargs)
+    elif key_set.realm_url is None and kwargs.get("realm_url"):
+        key_set.realm_url = kwargs["realm_url"]
+    return key_set
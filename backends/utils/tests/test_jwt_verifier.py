@@ -0,0 +1,146 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from backends.utils.jwt_verifier import (
+    JWKSKeySet,
+    KeySetUnavailable,
+    TokenVerificationError,
+    TokenVerifier,
+)
+
+ISSUER = "http://keycloak.test/realms/makrx"
+
+
+def _signing_key(kid):
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    public = jwk.construct(
+        private.public_key()
+        .public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        .decode(),
+        "RS256",
+    ).to_dict()
+    return pem, {**public, "kid": kid, "use": "sig"}
+
+
+def _token(pem, kid, sub="user-1", aud="makrx-store", ttl=300):
+    claims = {"sub": sub, "iss": ISSUER, "aud": aud, "exp": int(time.time()) + ttl}
+    return jwt.encode(claims, pem, algorithm="RS256", headers={"kid": kid})
+
+
+class FakeKeycloak:
+    def __init__(self, *jwks):
+        self.jwks = list(jwks)
+        self.requests = 0
+
+    async def handler(self, request):
+        self.requests += 1
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"keys": self.jwks})
+
+
+def _verifier(keycloak, **kwargs):
+    keys = JWKSKeySet(
+        f"{ISSUER}/protocol/openid-connect/certs",
+        transport=httpx.MockTransport(keycloak.handler),
+        retries=1,
+    )
+    return TokenVerifier(keys, issuer=ISSUER, audience="makrx-store", **kwargs)
+
+
+def test_concurrent_cold_requests_share_one_jwks_fetch_and_cache_claims():
+    pem, public = _signing_key("k1")
+    keycloak = FakeKeycloak(public)
+    verifier = _verifier(keycloak)
+    tokens = [_token(pem, "k1", sub=f"user-{i}") for i in range(20)]
+
+    async def run():
+        first = await asyncio.gather(*(verifier.verify(t) for t in tokens))
+        again = await verifier.verify(tokens[0])
+        await verifier.keys.aclose()
+        return first, again
+
+    first, again = asyncio.run(run())
+
+    assert [c["sub"] for c in first] == [f"user-{i}" for i in range(20)]
+    assert keycloak.requests == 1
+    assert again["sub"] == "user-0"
+    assert verifier.cache.hits == 1
+    # Cached claims never outlive the token
+    assert all(exp <= claims["exp"] for exp, claims in verifier.cache._entries.values())
+
+
+def test_rotated_kid_triggers_one_refresh_and_garbage_kids_do_not():
+    old_pem, old_public = _signing_key("old")
+    new_pem, new_public = _signing_key("new")
+    keycloak = FakeKeycloak(old_public)
+    verifier = _verifier(keycloak)
+    verifier.keys.min_refresh_interval = 0
+
+    async def run():
+        await verifier.verify(_token(old_pem, "old"))
+        keycloak.jwks.append(new_public)
+        rotated = await verifier.verify(_token(new_pem, "new"))
+        verifier.keys.min_refresh_interval = 60
+        with pytest.raises(TokenVerificationError) as exc:
+            await verifier.verify(_token(new_pem, "bogus"))
+        await verifier.keys.aclose()
+        return rotated, exc.value
+
+    rotated, error = asyncio.run(run())
+
+    assert rotated["sub"] == "user-1"
+    assert error.code == "invalid_token"
+    assert keycloak.requests == 2
+
+
+def test_rejections_are_not_cached_and_audience_is_part_of_the_key():
+    pem, public = _signing_key("k1")
+    verifier = _verifier(FakeKeycloak(public))
+    token = _token(pem, "k1")
+
+    async def run():
+        await verifier.verify(token)
+        with pytest.raises(TokenVerificationError) as audience:
+            await verifier.verify(token, audience="makrx-services")
+        with pytest.raises(TokenVerificationError) as expired:
+            await verifier.verify(_token(pem, "k1", ttl=-10))
+        await verifier.keys.aclose()
+        return audience.value, expired.value
+
+    audience, expired = asyncio.run(run())
+
+    assert audience.code == "invalid_audience"
+    assert expired.code == "token_expired"
+    assert len(verifier.cache) == 1
+
+
+def test_unreachable_keycloak_reports_unavailable():
+    async def down(request):
+        raise httpx.ConnectError("refused")
+
+    keys = JWKSKeySet(
+        "http://keycloak.test/certs", transport=httpx.MockTransport(down), retries=1
+    )
+    verifier = TokenVerifier(keys, issuer=ISSUER)
+    pem, _ = _signing_key("k1")
+
+    async def run():
+        with pytest.raises(KeySetUnavailable):
+            await verifier.verify(_token(pem, "k1"))
+        await keys.aclose()
+
+    asyncio.run(run())
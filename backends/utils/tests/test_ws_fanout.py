@@ -0,0 +1,213 @@
+import asyncio
+import json
+import time
+
+from backends.utils.ws_fanout import SLOW_CONSUMER_CLOSE_CODE, FanoutHub
+
+
+class FakeBroker:
+    """The slice of Redis the hub uses (pub/sub and hashes), shared by workers"""
+
+    def __init__(self):
+        self.subscribers = {}
+        self.hashes = {}
+
+    def client(self):
+        return FakeRedis(self)
+
+
+class FakeRedis:
+    def __init__(self, broker):
+        self.broker = broker
+
+    def pubsub(self):
+        return FakePubSub(self.broker)
+
+    async def publish(self, channel, data):
+        for pubsub in list(self.broker.subscribers.get(channel, ())):
+            pubsub.inbox.put_nowait(
+                {"type": "message", "channel": channel.encode(), "data": data}
+            )
+
+    async def hset(self, key, field, value):
+        self.broker.hashes.setdefault(key, {})[field] = value
+
+    async def expire(self, key, seconds):
+        pass
+
+    async def hdel(self, key, *fields):
+        for field in fields:
+            self.broker.hashes.get(key, {}).pop(field, None)
+
+    async def hgetall(self, key):
+        return {k.encode(): v for k, v in self.broker.hashes.get(key, {}).items()}
+
+
+class FakePubSub:
+    def __init__(self, broker):
+        self.broker = broker
+        self.inbox = asyncio.Queue()
+
+    async def subscribe(self, *channels):
+        for channel in channels:
+            self.broker.subscribers.setdefault(channel, set()).add(self)
+
+    async def unsubscribe(self, *channels):
+        for channel in channels:
+            self.broker.subscribers.get(channel, set()).discard(self)
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=None):
+        try:
+            return await asyncio.wait_for(self.inbox.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        pass
+
+
+class FakeSocket:
+    def __init__(self, delay=0.0, block=None):
+        self.delay = delay
+        self.block = block
+        self.sent = []
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.block is not None:
+            await self.block.wait()
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+
+async def _settle(seconds=0.05):
+    await asyncio.sleep(seconds)
+
+
+def test_publish_reaches_sockets_on_every_worker():
+    async def scenario():
+        broker = FakeBroker()
+        first = FanoutHub("test", redis=broker.client())
+        second = FanoutHub("test", redis=broker.client())
+        alice, bob, carol = FakeSocket(), FakeSocket(), FakeSocket()
+        sender = await first.connect(alice, ["project:1"])
+        await second.connect(bob, ["project:1"])
+        await second.connect(carol, ["project:2"])
+
+        await first.publish("project:1", {"n": 1}, exclude=sender)
+        await second.publish("project:1", {"n": 2})
+        await _settle()
+
+        assert alice.sent == [{"n": 2}]
+        assert bob.sent == [{"n": 1}, {"n": 2}]
+        assert carol.sent == []
+        await first.close()
+        await second.close()
+
+    asyncio.run(scenario())
+
+
+def test_slow_socket_does_not_stall_broadcasts():
+    async def scenario():
+        hub = FanoutHub("test", queue_size=4, send_timeout=5)
+        stuck = asyncio.Event()
+        slow, fast = FakeSocket(block=stuck), FakeSocket()
+        slow_connection = await hub.connect(slow, ["room"])
+        await hub.connect(fast, ["room"])
+        await _settle()
+
+        started = time.perf_counter()
+        for n in range(20):
+            await hub.publish("room", {"n": n})
+            await _settle(0.001)  # events arrive spread out, not in one tick
+        assert time.perf_counter() - started < 1  # publish never awaits sends
+        await _settle()
+
+        assert [m["n"] for m in fast.sent] == list(range(20))
+        stuck.set()
+        await _settle()
+        # The blocked send held message 0; the queue kept the newest four
+        assert [m["n"] for m in slow.sent] == [0, 16, 17, 18, 19]
+        assert slow_connection.dropped == 15
+        assert hub.stats()["dropped"] == 15
+        await hub.close()
+
+    asyncio.run(scenario())
+
+
+def test_disconnect_policy_evicts_slow_socket():
+    async def scenario():
+        hub = FanoutHub("test", queue_size=2, overflow="disconnect")
+        slow, fast = FakeSocket(block=asyncio.Event()), FakeSocket()
+        await hub.connect(slow, ["room"])
+        await hub.connect(fast, ["room"])
+        await _settle()
+
+        for n in range(5):
+            await hub.publish("room", {"n": n})
+            await _settle(0.001)
+        await _settle()
+
+        assert slow.close_code == SLOW_CONSUMER_CLOSE_CODE
+        assert hub.stats()["connections"] == 1
+        await hub.publish("room", {"n": 5})
+        await _settle()
+        assert [m["n"] for m in fast.sent] == list(range(6))
+        await hub.close()
+
+    asyncio.run(scenario())
+
+
+def test_presence_is_shared_across_workers_and_expires():
+    async def scenario():
+        broker = FakeBroker()
+        first = FanoutHub("test", redis=broker.client(), presence_ttl=0.3)
+        second = FanoutHub("test", redis=broker.client(), presence_ttl=0.3)
+        alice = await first.connect(
+            FakeSocket(), ["project:1"], presence=("project:1", {"user_id": "a"})
+        )
+        await second.connect(
+            FakeSocket(), ["project:1"], presence=("project:1", {"user_id": "b"})
+        )
+
+        users = {entry["user_id"] for entry in await second.presence("project:1")}
+        assert users == {"a", "b"}
+
+        await first.disconnect(alice)
+        users = {entry["user_id"] for entry in await second.presence("project:1")}
+        assert users == {"b"}
+
+        # A worker that stops refreshing (crashed) ages out after the TTL
+        second._heartbeat.cancel()
+        await asyncio.sleep(0.4)
+        assert await first.presence("project:1") == []
+        assert broker.hashes["test:presence:project:1"] == {}
+        await first.close()
+        await second.close()
+
+    asyncio.run(scenario())
+
+
+def test_malformed_message_does_not_stop_the_listener():
+    async def scenario():
+        broker = FakeBroker()
+        hub = FanoutHub("test", redis=broker.client())
+        socket = FakeSocket()
+        await hub.connect(socket, ["room"])
+
+        for garbage in (b"not json", b"[]", b'{"data": "x"}'):
+            await broker.client().publish("test:channel:room", garbage)
+        await hub.publish("room", {"n": 1})
+        await _settle()
+
+        assert socket.sent == [{"n": 1}]
+        await hub.close()
+        assert hub.stats()["connections"] == 0
+
+    asyncio.run(scenario())
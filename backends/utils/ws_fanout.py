@@ -0,0 +1,389 @@
+"""WebSocket fan-out shared by MakrX backend services.
+
+Each worker process runs one ``FanoutHub``. Sockets subscribe to channels
+(``project:<id>``, ``user:<id>``, ...) and ``publish`` goes through Redis
+pub/sub, so every worker delivers the message to its own sockets. Without a
+Redis client the hub delivers in-process only (single worker, tests).
+
+Every socket has a bounded send queue drained by its own writer task, so a
+broadcast never awaits a client and one slow socket cannot stall the rest.
+When a queue is full the overflow policy drops the oldest queued message
+(``drop_oldest``), drops the new one (``drop_newest``) or closes the socket
+(``disconnect``). Presence lives in Redis hashes and expires unless the
+owning worker keeps refreshing it, so a crashed worker's users age out.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+WS_OVERFLOW_POLICY = os.getenv("WS_OVERFLOW_POLICY", "drop_oldest")
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "10"))
+WS_PRESENCE_TTL_SECONDS = float(os.getenv("WS_PRESENCE_TTL_SECONDS", "60"))
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "disconnect")
+
+# Close code sent to clients evicted for not keeping up ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class Connection:
+    """One local socket: its channels, presence entry and send queue"""
+
+    def __init__(self, websocket: Any, queue_size: int):
+        self.id = uuid.uuid4().hex
+        self.websocket = websocket
+        self.channels: Set[str] = set()
+        self.presence: Optional[Tuple[str, Dict[str, Any]]] = None
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.writer: Optional[asyncio.Task] = None
+        self.closed = False
+
+
+class FanoutHub:
+    """
+    Per-process WebSocket hub backed by Redis pub/sub.
+
+    Pass ``redis_url`` (a client is created lazily on the running loop) or a
+    ready ``redis`` client. Channel and presence keys are prefixed with
+    ``namespace`` so services can share one Redis.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        redis_url: Optional[str] = None,
+        redis: Any = None,
+        queue_size: int = WS_SEND_QUEUE_SIZE,
+        overflow: str = WS_OVERFLOW_POLICY,
+        send_timeout: float = WS_SEND_TIMEOUT_SECONDS,
+        presence_ttl: float = WS_PRESENCE_TTL_SECONDS,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown WebSocket overflow policy: {overflow}")
+        self.namespace = namespace
+        self.redis_url = redis_url
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.send_timeout = send_timeout
+        self.presence_ttl = presence_ttl
+        self._redis = redis
+        self._owns_redis = redis is None
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._connections: Set[Connection] = set()
+        self._subscribers: Dict[str, Set[Connection]] = defaultdict(set)
+        self._presence: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        self._background: Set[asyncio.Task] = set()
+        self.delivered = 0
+        self.dropped = 0
+
+    # Redis
+
+    def _client(self):
+        if self._redis is None and self.redis_url:
+            from redis.asyncio import Redis
+
+            self._redis = Redis.from_url(self.redis_url)
+        return self._redis
+
+    def _channel_key(self, channel: str) -> str:
+        return f"{self.namespace}:channel:{channel}"
+
+    def _presence_key(self, scope: str) -> str:
+        return f"{self.namespace}:presence:{scope}"
+
+    async def _redis_subscribe(self, channels: Iterable[str]) -> None:
+        client = self._client()
+        if client is None:
+            return
+        keys = [self._channel_key(channel) for channel in channels]
+        if not keys:
+            return
+        try:
+            if self._pubsub is None:
+                self._pubsub = client.pubsub()
+            await self._pubsub.subscribe(*keys)
+            if self._listener is None:
+                self._listener = asyncio.create_task(self._listen())
+        except Exception as e:
+            logger.warning(f"WebSocket fan-out subscribe failed: {e}")
+
+    async def _redis_unsubscribe(self, channels: Iterable[str]) -> None:
+        keys = [self._channel_key(channel) for channel in channels]
+        if self._pubsub is None or not keys:
+            return
+        try:
+            await self._pubsub.unsubscribe(*keys)
+        except Exception as e:
+            logger.warning(f"WebSocket fan-out unsubscribe failed: {e}")
+
+    async def _listen(self) -> None:
+        prefix = self._channel_key("")
+        while True:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"WebSocket fan-out listener error: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if not message or message.get("type") != "message":
+                continue
+            try:
+                channel = message["channel"]
+                if isinstance(channel, bytes):
+                    channel = channel.decode()
+                envelope = json.loads(message["data"])
+                text, exclude = envelope["data"], envelope["exclude"]
+            except (ValueError, KeyError, TypeError) as e:
+                # Anyone with access to Redis can publish; skip, don't die
+                logger.warning(f"Dropping malformed WebSocket fan-out message: {e}")
+                continue
+            self._deliver(channel[len(prefix) :], text, exclude)
+
+    # Local delivery
+
+    def _deliver(self, channel: str, text: str, exclude: Optional[str]) -> None:
+        """Queue ``text`` for every local subscriber; never awaits a socket"""
+        for connection in list(self._subscribers.get(channel, ())):
+            if connection.id != exclude:
+                self._offer(connection, text)
+
+    def _offer(self, connection: Connection, text: str) -> None:
+        if connection.closed:
+            return
+        if connection.queue.full():
+            connection.dropped += 1
+            self.dropped += 1
+            if self.overflow == "drop_newest":
+                return
+            if self.overflow == "disconnect":
+                self._spawn(
+                    self.disconnect(connection, close_code=SLOW_CONSUMER_CLOSE_CODE)
+                )
+                return
+            connection.queue.get_nowait()
+        connection.queue.put_nowait(text)
+
+    async def _write(self, connection: Connection) -> None:
+        try:
+            while True:
+                text = await connection.queue.get()
+                await asyncio.wait_for(
+                    connection.websocket.send_text(text), self.send_timeout
+                )
+                self.delivered += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Send failed or timed out: the client is gone or stuck
+            self._spawn(self.disconnect(connection))
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    # Connections
+
+    async def connect(
+        self,
+        websocket: Any,
+        channels: Iterable[str] = (),
+        presence: Optional[Tuple[str, Dict[str, Any]]] = None,
+        accept: bool = True,
+    ) -> Connection:
+        """Register a socket, subscribe it and publish its presence entry"""
+        if accept:
+            await websocket.accept()
+        connection = Connection(websocket, self.queue_size)
+        self._connections.add(connection)
+        connection.writer = asyncio.create_task(self._write(connection))
+        await self.subscribe(connection, *channels)
+        if presence is not None:
+            connection.presence = presence
+            await self._set_presence(connection)
+            self._start_heartbeat()
+        return connection
+
+    async def disconnect(
+        self, connection: Connection, close_code: Optional[int] = None
+    ) -> None:
+        """Unsubscribe a socket and drop its presence; safe to call twice"""
+        if connection.closed:
+            return
+        connection.closed = True
+        self._connections.discard(connection)
+        await self.unsubscribe(connection, *connection.channels)
+        if connection.presence is not None:
+            await self._clear_presence(connection)
+        writer = connection.writer
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
+        if close_code is not None:
+            try:
+                await connection.websocket.close(code=close_code)
+            except Exception:
+                pass
+
+    async def subscribe(self, connection: Connection, *channels: str) -> None:
+        new = []
+        for channel in channels:
+            if not self._subscribers[channel]:
+                new.append(channel)
+            self._subscribers[channel].add(connection)
+            connection.channels.add(channel)
+        await self._redis_subscribe(new)
+
+    async def unsubscribe(self, connection: Connection, *channels: str) -> None:
+        emptied = []
+        for channel in list(channels):
+            subscribers = self._subscribers.get(channel)
+            connection.channels.discard(channel)
+            if subscribers is None:
+                continue
+            subscribers.discard(connection)
+            if not subscribers:
+                del self._subscribers[channel]
+                emptied.append(channel)
+        await self._redis_unsubscribe(emptied)
+
+    async def publish(
+        self,
+        channel: str,
+        message: Union[str, Dict[str, Any]],
+        exclude: Optional[Connection] = None,
+    ) -> None:
+        """Send to every subscriber of ``channel`` on every worker"""
+        text = message if isinstance(message, str) else json.dumps(message)
+        exclude_id = exclude.id if exclude is not None else None
+        client = self._client()
+        if client is not None:
+            envelope = json.dumps({"data": text, "exclude": exclude_id})
+            try:
+                await client.publish(self._channel_key(channel), envelope)
+                return
+            except Exception as e:
+                logger.warning(f"WebSocket fan-out publish failed: {e}")
+        # No Redis (or it is down): this worker's sockets still get it
+        self._deliver(channel, text, exclude_id)
+
+    def send(
+        self, connection: Connection, message: Union[str, Dict[str, Any]]
+    ) -> None:
+        """Queue a message for one local socket (replies, pongs)"""
+        text = message if isinstance(message, str) else json.dumps(message)
+        self._offer(connection, text)
+
+    # Presence
+
+    async def _set_presence(self, connection: Connection) -> None:
+        scope, data = connection.presence
+        entry = {**data, "seen": time.time()}
+        client = self._client()
+        if client is None:
+            self._presence[scope][connection.id] = entry
+            return
+        try:
+            key = self._presence_key(scope)
+            await client.hset(key, connection.id, json.dumps(entry))
+            await client.expire(key, int(self.presence_ttl * 2))
+        except Exception as e:
+            logger.warning(f"WebSocket presence update failed: {e}")
+
+    async def _clear_presence(self, connection: Connection) -> None:
+        scope, _ = connection.presence
+        client = self._client()
+        if client is None:
+            self._presence[scope].pop(connection.id, None)
+            return
+        try:
+            await client.hdel(self._presence_key(scope), connection.id)
+        except Exception as e:
+            logger.warning(f"WebSocket presence removal failed: {e}")
+
+    async def touch(self, connection: Connection, **data: Any) -> None:
+        """Refresh a socket's presence entry, optionally updating its data"""
+        if connection.presence is None or connection.closed:
+            return
+        scope, current = connection.presence
+        connection.presence = (scope, {**current, **data})
+        await self._set_presence(connection)
+
+    async def presence(self, scope: str) -> List[Dict[str, Any]]:
+        """Live presence entries for ``scope`` across all workers"""
+        cutoff = time.time() - self.presence_ttl
+        client = self._client()
+        if client is None:
+            entries = self._presence.get(scope, {})
+        else:
+            raw = await client.hgetall(self._presence_key(scope))
+            entries = {
+                (key.decode() if isinstance(key, bytes) else key): json.loads(value)
+                for key, value in raw.items()
+            }
+            stale = [key for key, entry in entries.items() if entry["seen"] < cutoff]
+            if stale:
+                await client.hdel(self._presence_key(scope), *stale)
+        return [entry for entry in entries.values() if entry["seen"] >= cutoff]
+
+    def _start_heartbeat(self) -> None:
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.create_task(self._refresh_presence())
+
+    async def _refresh_presence(self) -> None:
+        while True:
+            await asyncio.sleep(self.presence_ttl / 3)
+            for connection in list(self._connections):
+                if connection.presence is not None:
+                    await self._set_presence(connection)
+
+    # Lifecycle
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": len(self._connections),
+            "channels": len(self._subscribers),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "redis": self._client() is not None,
+        }
+
+    async def close(self) -> None:
+        """Close every socket and stop the hub's tasks and Redis connections"""
+        tasks = [
+            task
+            for task in (self._listener, self._heartbeat, *self._background)
+            if task is not None
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for connection in list(self._connections):
+            await self.disconnect(connection)
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.aclose()
+            except Exception:
+                pass
+        if self._owns_redis and self._redis is not None:
+            try:
+                await self._redis.aclose()
+            except Exception:
+                pass
+            self._redis = None
+        self._listener = self._heartbeat = self._pubsub = None